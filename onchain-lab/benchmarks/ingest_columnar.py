@@ -0,0 +1,84 @@
+"""Rows/sec of the per-row pydantic path versus the columnar Arrow path.
+
+For each synthetic block the "models" path runs ``_parse_block`` and converts
+every dataset with ``record_batch_from_models``; the "columnar" path runs
+``_parse_block_columns`` and ``DatasetColumns.to_record_batch``. Both stop at an
+Arrow batch, so the numbers isolate parsing and materialization from Parquet
+encoding.
+
+Usage:
+    python benchmarks/ingest_columnar.py --blocks 20 --tx-per-block 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.columnar import DATASETS, BlockColumns  # type: ignore  # noqa: E402
+from ingest.pipeline import _parse_block, _parse_block_columns  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.schemas import SCHEMA_REGISTRY, record_batch_from_models  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import synthetic_chain  # type: ignore  # noqa: E402
+
+
+def _models_path(blocks: List[Dict[str, object]]) -> int:
+    rows = 0
+    for height, block in enumerate(blocks):
+        block_record, txs, txins, txouts = _parse_block(height, block)
+        grouped = {"blocks": [block_record], "transactions": txs, "txin": txins, "txout": txouts}
+        for dataset in DATASETS:
+            rows += record_batch_from_models(grouped[dataset], SCHEMA_REGISTRY[dataset]).num_rows
+    return rows
+
+
+def _columnar_path(blocks: List[Dict[str, object]]) -> int:
+    rows = 0
+    columns = BlockColumns()
+    for height, block in enumerate(blocks):
+        _parse_block_columns(height, block, columns)
+        for dataset in DATASETS:
+            buffer = columns[dataset]
+            rows += buffer.to_record_batch().num_rows
+            buffer.clear()
+    return rows
+
+
+def run(blocks: int, tx_count: int, repeat: int) -> None:
+    corpus = [_normalize_block(block) for block in synthetic_chain(blocks, tx_count=tx_count)]
+    paths: Dict[str, Callable[[List[Dict[str, object]]], int]] = {
+        "models": _models_path,
+        "columnar": _columnar_path,
+    }
+    print(f"blocks={blocks} tx/block={tx_count} repeat={repeat}")
+    print(f"{'path':>9} {'seconds':>9} {'rows':>10} {'rows/s':>12}")
+    for label, path in paths.items():
+        best = float("inf")
+        rows = 0
+        for _ in range(repeat):
+            sample = copy.deepcopy(corpus)
+            started = time.perf_counter()
+            rows = path(sample)
+            best = min(best, time.perf_counter() - started)
+        print(f"{label:>9} {best:>9.3f} {rows:>10} {rows / best:>12.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--tx-per-block", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.blocks, args.tx_per_block, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
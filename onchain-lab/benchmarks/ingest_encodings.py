@@ -0,0 +1,212 @@
+"""File size, write and DuckDB scan throughput of one bucket under several writer profiles.
+
+Every dataset of one height bucket is rewritten with each preset writer profile
+(see ``writer_profiles`` in ``config/ingest.yaml``) and each row-group size. The
+sample is a synthetic chain, a recorded corpus, or a bucket of an existing
+data root (``--config`` and ``--bucket``); in the latter case the profiles
+configured there are measured too. ``--compacted`` sorts the sample the way
+``onchain compact`` does before writing it. Write throughput is Arrow bytes written per
+second, scan throughput is Arrow bytes per second returned by
+``SELECT * FROM read_parquet(...)`` in DuckDB. Both are medians over
+``--repeat`` runs.
+
+Presets:
+    default       dictionary on every column (what ingest writes without a profile)
+    no-hash-dict  dictionary on every column but the hash columns
+    delta         no-hash-dict, DELTA_BINARY_PACKED on heights, indexes, sequences and times
+    delta-hash    delta, DELTA_BYTE_ARRAY on hash columns (prefixes repeat in txid order)
+    small-pages   no-hash-dict with 64 KiB data pages
+
+Usage:
+    python benchmarks/ingest_encodings.py --blocks 100 --tx-per-block 500
+    python benchmarks/ingest_encodings.py --corpus corpus/800000 --schema-versions ingest.v2 \\
+        --compacted
+    python benchmarks/ingest_encodings.py --config config/ingest.yaml --bucket 800000
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.columnar import DATASETS, BlockColumns  # type: ignore  # noqa: E402
+from ingest.compact import SORT_KEYS  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, WriterProfile, load_config  # type: ignore  # noqa: E402
+from ingest.hashes import source_sql, to_schema_version  # type: ignore  # noqa: E402
+from ingest.pipeline import _parse_block_columns  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.schemas import HASH_COLUMNS, schema_for  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import load_corpus, synthetic_chain  # type: ignore  # noqa: E402
+from ingest.writer import (  # type: ignore  # noqa: E402
+    lookup_write_options,
+    partition_path,
+    profile_write_options,
+)
+
+_DELTA_COLUMNS = ("height", "idx", "prev_vout", "sequence", "prev_height", "time_utc")
+_SMALL_PAGE_BYTES = 64 * 1024
+
+
+def _presets(dataset: str, version: str) -> Dict[str, Optional[WriterProfile]]:
+    names = schema_for(dataset, version).names
+    plain = [name for name in names if name not in HASH_COLUMNS[dataset]]
+    delta = {name: "DELTA_BINARY_PACKED" for name in _DELTA_COLUMNS if name in names}
+    hashes = dict(delta, **{name: "DELTA_BYTE_ARRAY" for name in HASH_COLUMNS[dataset]})
+    rest = [name for name in plain if name not in delta]
+    return {
+        "default": None,
+        "no-hash-dict": WriterProfile(dictionary=plain),
+        "delta": WriterProfile(dictionary=rest, encodings=delta),
+        "delta-hash": WriterProfile(dictionary=rest, encodings=hashes),
+        "small-pages": WriterProfile(dictionary=plain, data_page_size=_SMALL_PAGE_BYTES),
+    }
+
+
+def _synthetic_sample(blocks: List[Dict[str, Any]], version: str) -> Dict[str, pa.Table]:
+    columns = BlockColumns(version)
+    first = int(blocks[0].get("height", 0))
+    for offset, block in enumerate(blocks):
+        _parse_block_columns(first + offset, block, columns)
+    return {
+        dataset: pa.Table.from_batches([columns[dataset].to_record_batch()]) for dataset in DATASETS
+    }
+
+
+def _bucket_sample(cfg: IngestConfig, bucket: int, version: str) -> Dict[str, pa.Table]:
+    tables: Dict[str, pa.Table] = {}
+    connection = duckdb.connect(database=":memory:")
+    try:
+        for dataset in DATASETS:
+            directory = partition_path(cfg.data_root, cfg.partitions[dataset], height_bucket=bucket)
+            files = sorted(directory.glob("*.parquet"))
+            if not files:
+                raise SystemExit(f"No {dataset} files in {directory}.")
+            table = connection.execute(source_sql(files, dataset)).arrow().read_all()
+            table = to_schema_version(table, dataset, version)
+            tables[dataset] = table.cast(schema_for(dataset, version))
+    finally:
+        connection.close()
+    return tables
+
+
+def _median_seconds(call: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _measure(
+    table: pa.Table,
+    path: Path,
+    profile: Optional[WriterProfile],
+    row_group_rows: int,
+    args: argparse.Namespace,
+) -> str:
+    def write() -> None:
+        pq.write_table(
+            table,
+            path,
+            row_group_size=row_group_rows,
+            compression="zstd",
+            compression_level=args.zstd_level,
+            coerce_timestamps="us",
+            **profile_write_options(table.schema, profile),
+            **lookup_write_options(table.schema, row_group_rows),
+        )
+
+    def scan() -> None:
+        connection.execute("SELECT * FROM read_parquet(?)", [str(path)]).arrow().read_all()
+
+    write_seconds = _median_seconds(write, args.repeat)
+    connection = duckdb.connect(database=":memory:")
+    try:
+        scan_seconds = _median_seconds(scan, args.repeat)
+    finally:
+        connection.close()
+    size = path.stat().st_size
+    arrow_mb = table.nbytes / 1e6
+    return (
+        f"{size / 1e6:>9.2f} {size / max(table.num_rows, 1):>9.1f} "
+        f"{arrow_mb / write_seconds:>10.1f} {arrow_mb / scan_seconds:>10.1f}"
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    cfg = load_config(args.config) if args.config is not None else None
+    if cfg is not None and args.bucket is None:
+        raise SystemExit("--config needs --bucket.")
+    blocks: List[Dict[str, Any]] = []
+    if cfg is None:
+        corpus = load_corpus(args.corpus) if args.corpus is not None else synthetic_chain(
+            args.blocks, tx_count=args.tx_per_block
+        )
+        blocks = [_normalize_block(block) for block in corpus]
+    group_sizes = [int(value) for value in args.row_group_rows.split(",")]
+    selected = args.datasets.split(",") if args.datasets else list(DATASETS)
+    print(
+        f"{'schema':>9} {'dataset':>12} {'profile':>12} {'rg rows':>8} {'rows':>9} "
+        f"{'MB':>9} {'B/row':>9} {'write MB/s':>10} {'scan MB/s':>10}"
+    )
+    for version in (value.strip() for value in args.schema_versions.split(",")):
+        if cfg is not None:
+            sample = _bucket_sample(cfg, args.bucket, version)
+        else:
+            sample = _synthetic_sample(blocks, version)
+        with tempfile.TemporaryDirectory(prefix="encoding-bench-") as tmp:
+            for dataset in selected:
+                table = sample[dataset]
+                if args.compacted:
+                    table = table.sort_by([(name, "ascending") for name in SORT_KEYS[dataset]])
+                profiles = _presets(dataset, version)
+                if cfg is not None and dataset in cfg.writer_profiles:
+                    profiles["config"] = cfg.writer_profiles[dataset]
+                for name, profile in profiles.items():
+                    for rows in group_sizes:
+                        path = Path(tmp) / f"{dataset}-{name}-{rows}.parquet"
+                        figures = _measure(table, path, profile, rows, args)
+                        print(
+                            f"{version:>9} {dataset:>12} {name:>12} {rows:>8} "
+                            f"{table.num_rows:>9} {figures}"
+                        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=100)
+    parser.add_argument("--tx-per-block", type=int, default=500)
+    parser.add_argument("--corpus", type=Path, default=None, help="Recorded corpus directory")
+    parser.add_argument(
+        "--config", type=Path, default=None, help="Config of the data root to sample"
+    )
+    parser.add_argument(
+        "--bucket", type=int, default=None, help="Height bucket to sample with --config"
+    )
+    parser.add_argument("--datasets", default=None, help="Comma-separated datasets (default: all)")
+    parser.add_argument("--schema-versions", default="ingest.v1,ingest.v2")
+    parser.add_argument("--row-group-rows", default="131072,1048576", help="Comma-separated sizes")
+    parser.add_argument(
+        "--compacted", action="store_true", help="Sort the sample by the compaction keys"
+    )
+    parser.add_argument("--zstd-level", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Point lookup latency against a DuckDB full scan, before and after compaction.
+
+Ingests a block corpus from a local fake bitcoind once per schema version, then
+times two questions for a sample of transactions: "what is in tx X?" and "where
+was outpoint X:n spent?". The baseline is what a query over the whole lake does
+today: DuckDB views over every file of ``transactions``, ``txin`` and ``txout``
+(the hex views of :func:`ingest.hashes.create_hex_views`) filtered by txid.
+The lookup side is :class:`ingest.lookup.PointLookup`. Both are measured on the freshly ingested,
+height-ordered files and again after ``compact_data_root`` has sorted every
+bucket by txid.
+
+Usage:
+    python benchmarks/ingest_lookup.py --blocks 200 --tx-per-block 200 --samples 20
+    python benchmarks/ingest_lookup.py --corpus corpus/800000 --schema-versions ingest.v2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import duckdb
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.compact import compact_data_root  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
+from ingest.hashes import create_hex_views, source_sql  # type: ignore  # noqa: E402
+from ingest.lookup import LookupScan, PointLookup, dataset_files  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    load_corpus,
+    synthetic_chain,
+)
+
+_DATASETS = ("transactions", "txin", "txout")
+
+
+def _config(
+    data_root: Path, node: FakeBitcoind, args: argparse.Namespace, version: str
+) -> IngestConfig:
+    return IngestConfig(
+        data_root=data_root,
+        partitions={
+            "blocks": "blocks/height={height_bucket}/",
+            "transactions": "tx/height={height_bucket}/",
+            "txin": "txin/height={height_bucket}/",
+            "txout": "txout/height={height_bucket}/",
+        },
+        height_bucket_size=args.bucket_size,
+        compression="zstd",
+        zstd_level=3,
+        writer_mode="rolling",
+        schema_version=version,
+        rpc=RPCConfig(host=node.host, port=node.port, user_env="BENCH_USER", pass_env="BENCH_PASS"),
+        limits=LimitsConfig(max_blocks_per_run=args.blocks, io_batch_size=2000, rpc_batch_size=8),
+        qa=QAConfig(golden_days=[], tolerance_pct=1.0),
+    )
+
+
+def _full_scan(cfg: IngestConfig) -> Tuple[Callable[[str], None], Callable[[str, int], None]]:
+    """Baseline queries over views of every file, as the QA and ad hoc queries build them."""
+    connection = duckdb.connect(database=":memory:")
+    for dataset in _DATASETS:
+        view = connection.sql(source_sql(dataset_files(cfg, dataset), dataset))
+        view.create_view(dataset, replace=True)
+    create_hex_views(connection, {dataset: dataset for dataset in _DATASETS})
+
+    def tx(txid: str) -> None:
+        for dataset in _DATASETS:
+            # Only the fixed view names are interpolated.
+            query = f"SELECT * FROM {dataset}_hex WHERE txid = ?"  # noqa: S608
+            connection.execute(query, [txid]).arrow().read_all()
+
+    def outpoint(txid: str, vout: int) -> None:
+        connection.execute(
+            "SELECT * FROM txout_hex WHERE txid = ? AND idx = ?", [txid, vout]
+        ).arrow().read_all()
+        connection.execute(
+            "SELECT * FROM txin_hex WHERE prev_txid = ? AND prev_vout = ?", [txid, vout]
+        ).arrow().read_all()
+
+    return tx, outpoint
+
+
+def _median_ms(call: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def _measure(
+    cfg: IngestConfig, samples: List[Tuple[str, int]], repeat: int
+) -> Dict[str, Tuple[float, float, LookupScan]]:
+    scan_tx, scan_outpoint = _full_scan(cfg)
+    tx_scan = tx_lookup = out_scan = out_lookup = 0.0
+    tx_pruning = out_pruning = LookupScan()
+    # Both sides keep their DuckDB connection (and views or catalog) across samples.
+    with PointLookup(cfg) as session:
+        for txid, vout in samples:
+            tx_scan += _median_ms(lambda txid=txid: scan_tx(txid), repeat)
+            tx_lookup += _median_ms(lambda txid=txid: session.tx(txid), repeat)
+            tx_pruning += sum(session.tx(txid).scans.values(), LookupScan())
+            out_scan += _median_ms(lambda txid=txid, vout=vout: scan_outpoint(txid, vout), repeat)
+            out_lookup += _median_ms(
+                lambda txid=txid, vout=vout: session.outpoint(txid, vout), repeat
+            )
+            out_pruning += sum(session.outpoint(txid, vout).scans.values(), LookupScan())
+    count = len(samples)
+    return {
+        "tx": (tx_scan / count, tx_lookup / count, tx_pruning),
+        "outpoint": (out_scan / count, out_lookup / count, out_pruning),
+    }
+
+
+def _corpus(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if args.corpus is not None:
+        return load_corpus(args.corpus)
+    return synthetic_chain(args.blocks, tx_count=args.tx_per_block)
+
+
+def run(args: argparse.Namespace) -> None:
+    corpus = _corpus(args)
+    first = int(corpus[0].get("height", 0))
+    last = first + len(corpus) - 1
+    args.blocks = len(corpus)
+    # Only picks which outputs to look up; a seeded, reproducible sample is the point.
+    picker = random.Random(args.seed)  # noqa: S311
+    candidates = [
+        (str(tx["txid"]), vout)
+        for block in corpus
+        for tx in block["tx"]
+        for vout in range(len(tx["vout"]))
+    ]
+    samples = picker.sample(candidates, min(args.samples, len(candidates)))
+    print(
+        f"blocks={len(corpus)} ({first}-{last}) transactions={sum(len(b['tx']) for b in corpus)} "
+        f"bucket={args.bucket_size} row_group_rows={args.row_group_rows} samples={len(samples)}"
+    )
+    print(
+        f"{'schema':>9} {'layout':>9} {'query':>9} {'scan ms':>9} {'lookup ms':>10} "
+        f"{'speedup':>8} {'row groups read':>16}"
+    )
+    os.environ.setdefault("BENCH_USER", "bench")
+    os.environ.setdefault("BENCH_PASS", "bench")
+    pipeline.console.quiet = True
+    with FakeBitcoind(corpus, base_height=first) as node:
+        for version in args.schema_versions.split(","):
+            with tempfile.TemporaryDirectory(prefix="lookup-bench-") as tmp:
+                cfg = _config(Path(tmp), node, args, version.strip())
+                pipeline.sync_range(first, last, config=cfg)
+                for layout in ("ingested", "compacted"):
+                    if layout == "compacted":
+                        compact_data_root(
+                            cfg, workers=2, min_depth=0, row_group_rows=args.row_group_rows
+                        )
+                    timings = _measure(cfg, samples, args.repeat)
+                    for query, (scan_ms, lookup_ms, pruning) in timings.items():
+                        print(
+                            f"{version.strip():>9} {layout:>9} {query:>9} {scan_ms:>9.1f} "
+                            f"{lookup_ms:>10.1f} {scan_ms / lookup_ms:>7.1f}x "
+                            f"{pruning.row_groups_read:>7}/{pruning.row_groups:<8}"
+                        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--tx-per-block", type=int, default=200)
+    parser.add_argument("--corpus", type=Path, default=None, help="Recorded corpus directory")
+    parser.add_argument("--bucket-size", type=int, default=50)
+    parser.add_argument("--row-group-rows", type=int, default=8192)
+    parser.add_argument("--schema-versions", default="ingest.v1,ingest.v2")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
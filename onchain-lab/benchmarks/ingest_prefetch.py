@@ -0,0 +1,106 @@
+"""Measure ingest throughput at different block prefetch depths and RPC batch sizes.
+
+Runs ``sync_range`` against a local fake bitcoind that adds a fixed latency to
+every HTTP request, which is the regime where prefetching and batching pay off.
+
+Usage:
+    python benchmarks/ingest_prefetch.py --blocks 200 --latency-ms 20 \
+        --depths 0,4,16 --batch-sizes 1,8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
+from ingest.rpc import BitcoinRPCClient  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+def _config(
+    data_root: Path, *, blocks: int, depth: int, workers: int, batch_size: int
+) -> IngestConfig:
+    return IngestConfig(
+        data_root=data_root,
+        partitions={
+            "blocks": "blocks/height={height_bucket}/",
+            "transactions": "tx/height={height_bucket}/",
+            "txin": "txin/height={height_bucket}/",
+            "txout": "txout/height={height_bucket}/",
+        },
+        height_bucket_size=10000,
+        compression="zstd",
+        zstd_level=3,
+        rpc=RPCConfig(host="127.0.0.1", port=8332, user_env="BENCH_USER", pass_env="BENCH_PASS"),
+        limits=LimitsConfig(
+            max_blocks_per_run=blocks,
+            io_batch_size=200,
+            fetch_workers=workers,
+            prefetch_depth=depth,
+            rpc_batch_size=batch_size,
+        ),
+        qa=QAConfig(golden_days=[], tolerance_pct=1.0),
+    )
+
+
+def run(
+    blocks: int,
+    latency_ms: float,
+    depths: List[int],
+    batch_sizes: List[int],
+    workers: int,
+    tx_count: int,
+) -> None:
+    corpus = synthetic_chain(blocks, tx_count=tx_count)
+    pipeline.console.quiet = True
+    print(f"blocks={blocks} latency={latency_ms}ms workers={workers} tx/block={tx_count}")
+    print(f"{'depth':>6} {'batch':>6} {'seconds':>9} {'blocks/s':>10} {'requests':>9}")
+    with FakeBitcoind(corpus, latency_seconds=latency_ms / 1000.0) as node:
+        for depth in depths:
+            for batch_size in batch_sizes:
+                node.request_count = 0
+                with tempfile.TemporaryDirectory(prefix="ingest-bench-") as tmp:
+                    cfg = _config(
+                        Path(tmp),
+                        blocks=blocks,
+                        depth=depth,
+                        workers=workers,
+                        batch_size=batch_size,
+                    )
+                    with BitcoinRPCClient(node.host, node.port, "bench", "bench") as client:
+                        started = time.perf_counter()
+                        pipeline.sync_range(0, blocks - 1, config=cfg, client=client)
+                        elapsed = time.perf_counter() - started
+                rate = blocks / elapsed if elapsed > 0 else float("inf")
+                print(
+                    f"{depth:>6} {batch_size:>6} {elapsed:>9.2f} {rate:>10.1f} "
+                    f"{node.request_count:>9}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--depths", default="0,4,16,32")
+    parser.add_argument("--batch-sizes", default="1,8")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--tx-per-block", type=int, default=20)
+    args = parser.parse_args()
+    depths = [int(item) for item in args.depths.split(",") if item.strip()]
+    batch_sizes = [int(item) for item in args.batch_sizes.split(",") if item.strip()]
+    run(args.blocks, args.latency_ms, depths, batch_sizes, args.workers, args.tx_per_block)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""End-to-end ``sync_range`` throughput and peak memory across writer settings.
+
+Serves a block corpus from a local fake bitcoind and ingests it once per
+combination of ``io_batch_size``, ``zstd_level`` and ``writer_mode``. Every run
+happens in a fresh child process so the reported peak RSS belongs to that run
+alone. The corpus is synthetic unless ``--corpus`` points at a directory
+written by ``benchmarks/record_corpus.py``.
+
+Usage:
+    python benchmarks/ingest_sync.py --blocks 300 --io-batch-sizes 16,200,2000 --zstd-levels 1,6
+    python benchmarks/ingest_sync.py --corpus corpus/800000 --writer-modes per_height,rolling
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
+from ingest.rpc import BitcoinRPCClient  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    load_corpus,
+    synthetic_chain,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+class Setting(NamedTuple):
+    io_batch_size: int
+    zstd_level: int
+    writer_mode: str
+
+
+class Result(NamedTuple):
+    seconds: float
+    rows: int
+    peak_rss_mb: Optional[float]
+    disk_mb: float
+
+
+def _config(
+    data_root: Path, blocks: int, setting: Setting, args: argparse.Namespace
+) -> IngestConfig:
+    return IngestConfig(
+        data_root=data_root,
+        partitions={
+            "blocks": "blocks/height={height_bucket}/",
+            "transactions": "tx/height={height_bucket}/",
+            "txin": "txin/height={height_bucket}/",
+            "txout": "txout/height={height_bucket}/",
+        },
+        height_bucket_size=10000,
+        compression="zstd",
+        zstd_level=setting.zstd_level,
+        writer_mode=setting.writer_mode,
+        block_format=args.block_format,
+        rpc=RPCConfig(host="127.0.0.1", port=8332, user_env="BENCH_USER", pass_env="BENCH_PASS"),
+        limits=LimitsConfig(
+            max_blocks_per_run=blocks,
+            io_batch_size=setting.io_batch_size,
+            fetch_workers=args.workers,
+            prefetch_depth=args.depth,
+            rpc_batch_size=args.batch_size,
+        ),
+        qa=QAConfig(golden_days=[], tolerance_pct=1.0),
+    )
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_one(
+    host: str, port: int, first: int, last: int, setting: Setting, args: argparse.Namespace
+) -> Result:
+    """Child-process entry point."""
+    pipeline.console.quiet = True
+    with tempfile.TemporaryDirectory(prefix="ingest-bench-") as tmp:
+        cfg = _config(Path(tmp), last - first + 1, setting, args)
+        with BitcoinRPCClient(host, port, "bench", "bench") as client:
+            started = time.perf_counter()
+            counts = pipeline.sync_range(first, last, config=cfg, client=client)
+            elapsed = time.perf_counter() - started
+        disk = sum(path.stat().st_size for path in Path(tmp).rglob("*.parquet"))
+    return Result(elapsed, sum(counts.values()), _peak_rss_mb(), disk / 1e6)
+
+
+def _corpus(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if args.corpus is not None:
+        return load_corpus(args.corpus)
+    return synthetic_chain(args.blocks, tx_count=args.tx_per_block)
+
+
+def run(args: argparse.Namespace, settings: List[Setting]) -> None:
+    corpus = _corpus(args)
+    first = int(corpus[0].get("height", 0))
+    last = first + len(corpus) - 1
+    blocks = last - first + 1
+    print(
+        f"blocks={blocks} ({first}-{last}) latency={args.latency_ms}ms "
+        f"block_format={args.block_format} depth={args.depth} rpc_batch={args.batch_size}"
+    )
+    print(
+        f"{'io_batch':>8} {'zstd':>5} {'writer':>10} {'seconds':>8} {'blocks/s':>9} "
+        f"{'rows/s':>10} {'peak MB':>8} {'disk MB':>8}"
+    )
+    context = multiprocessing.get_context("spawn")
+    with FakeBitcoind(corpus, latency_seconds=args.latency_ms / 1000.0, base_height=first) as node:
+        for setting in settings:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(
+                    _run_one, node.host, node.port, first, last, setting, args
+                ).result()
+            rss = f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb is not None else "-"
+            print(
+                f"{setting.io_batch_size:>8} {setting.zstd_level:>5} {setting.writer_mode:>10} "
+                f"{result.seconds:>8.2f} {blocks / result.seconds:>9.1f} "
+                f"{result.rows / result.seconds:>10.0f} {rss:>8} {result.disk_mb:>8.1f}"
+            )
+
+
+def _ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--tx-per-block", type=int, default=200)
+    parser.add_argument("--corpus", type=Path, default=None, help="Recorded corpus directory")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--io-batch-sizes", default="16,200,2000")
+    parser.add_argument("--zstd-levels", default="1,3,6")
+    parser.add_argument("--writer-modes", default="per_height")
+    parser.add_argument("--block-format", default="verbose", choices=["verbose", "raw", "prevout"])
+    parser.add_argument("--depth", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    settings = [
+        Setting(io_batch_size, zstd_level, writer_mode)
+        for writer_mode in [item.strip() for item in args.writer_modes.split(",") if item.strip()]
+        for io_batch_size in _ints(args.io_batch_sizes)
+        for zstd_level in _ints(args.zstd_levels)
+    ]
+    run(args, settings)
+
+
+if __name__ == "__main__":
+    main()
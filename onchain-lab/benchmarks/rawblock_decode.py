@@ -0,0 +1,107 @@
+"""Compare local raw-block decoding against the verbose JSON ingest path.
+
+``record`` pulls ``getblock <hash> 2`` together with ``getblock <hash> 0`` for a
+list of heights from the configured node and stores them as a corpus (one JSON
+file per block, raw bytes under ``hex``). ``run`` replays that corpus: it checks
+that both paths produce identical rows and times JSON decode +
+``_parse_block_columns`` against ``bytes.fromhex`` + ``decode_block_into``.
+
+Usage:
+    python benchmarks/rawblock_decode.py record --heights 170,100000,481824,840000 --out corpus/
+    python benchmarks/rawblock_decode.py run --corpus corpus/ --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.columnar import BlockColumns  # type: ignore  # noqa: E402
+from ingest.config import load_config  # type: ignore  # noqa: E402
+from ingest.pipeline import _create_rpc_client, _parse_block, _parse_block_columns  # type: ignore  # noqa: E402
+from ingest.rawblock import decode_block, decode_block_into  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import save_corpus  # type: ignore  # noqa: E402
+
+
+def record(heights: List[int], out: Path, config_path: Path | None) -> None:
+    cfg = load_config(config_path)
+    blocks: List[Dict[str, object]] = []
+    with _create_rpc_client(cfg) as client:
+        hashes = client.get_block_hashes(heights)
+        raw_blocks = client.get_blocks(hashes, verbosity=0)
+        for height, block_hash, raw in zip(heights, hashes, raw_blocks):
+            block = client.get_block(block_hash, verbosity=2)
+            block["height"] = height
+            block["hex"] = raw
+            blocks.append(block)
+    save_corpus(out, blocks)
+    print(f"recorded {len(blocks)} blocks into {out}")
+
+
+def run(corpus: Path, repeat: int, network: str) -> None:
+    payloads = [path.read_text(encoding="utf-8") for path in sorted(corpus.glob("*.json"))]
+    if not payloads:
+        raise SystemExit(f"No corpus files under {corpus}")
+    entries = []
+    for payload in payloads:
+        block = json.loads(payload)
+        raw_hex = block.pop("hex")
+        entries.append((int(block["height"]), json.dumps(block), raw_hex))
+
+    for height, verbose_json, raw_hex in entries:
+        expected = _parse_block(height, _normalize_block(json.loads(verbose_json)))
+        actual = decode_block(height, bytes.fromhex(raw_hex), network=network)
+        if actual != expected:
+            raise SystemExit(f"Parity mismatch at height {height}")
+
+    txs = sum(len(json.loads(verbose_json)["tx"]) for _, verbose_json, _ in entries)
+    print(f"blocks={len(entries)} txs={txs} repeat={repeat} parity=ok")
+    print(f"{'path':>8} {'seconds':>9} {'blocks/s':>10} {'tx/s':>11}")
+    for label in ("verbose", "raw"):
+        columns = BlockColumns()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for height, verbose_json, raw_hex in entries:
+                if label == "verbose":
+                    block = _normalize_block(json.loads(verbose_json))
+                    _parse_block_columns(height, block, columns)
+                else:
+                    decode_block_into(height, bytes.fromhex(raw_hex), columns, network=network)
+                columns = BlockColumns()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:>8} {elapsed:>9.3f} {len(entries) * repeat / elapsed:>10.1f} "
+            f"{txs * repeat / elapsed:>11.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("--heights", required=True)
+    rec.add_argument("--out", type=Path, required=True)
+    rec.add_argument("--config", type=Path, default=None)
+    bench = sub.add_parser("run")
+    bench.add_argument("--corpus", type=Path, required=True)
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.add_argument("--network", default="main")
+    args = parser.parse_args()
+    if args.command == "record":
+        heights = [int(item) for item in args.heights.split(",") if item.strip()]
+        record(heights, args.out, args.config)
+    else:
+        run(args.corpus, args.repeat, args.network)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Record a slice of blocks from the configured node for replay by the fake bitcoind.
+
+Each block is saved as ``<height>.json`` in the shape ``getblock <hash> 2``
+returns, plus its raw hex, so benchmarks can replay it with any block_format.
+
+Usage:
+    python benchmarks/record_corpus.py --from 800000 --to 800099 --out corpus/800000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.config import load_config  # type: ignore  # noqa: E402
+from ingest.pipeline import _create_rpc_client  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import record_corpus  # type: ignore  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--from", dest="start", type=int, required=True)
+    parser.add_argument("--to", dest="end", type=int, required=True)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--config", type=Path, default=None)
+    parser.add_argument("--no-raw", action="store_true", help="Skip the verbosity=0 hex")
+    args = parser.parse_args()
+    cfg = load_config(args.config)
+    with _create_rpc_client(cfg) as client:
+        written = record_corpus(client, args.start, args.end, args.out, raw=not args.no_raw)
+    print(f"Recorded {written} blocks to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 """ONCHAIN LAB ingest module."""
 
+from .backfill import backfill_parallel
 from .config import IngestConfig, load_config
-from .pipeline import sync_from_tip, sync_range
+from .pipeline import sync_blockfiles, sync_from_tip, sync_range, sync_range_async
 
 __all__ = [
     "IngestConfig",
+    "backfill_parallel",
     "load_config",
+    "sync_blockfiles",
     "sync_from_tip",
     "sync_range",
+    "sync_range_async",
 ]
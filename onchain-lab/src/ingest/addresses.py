@@ -0,0 +1,360 @@
+"""Address dictionary: interns output addresses to dense ``uint64`` ids.
+
+The on-disk index is a SQLite table ``addresses(address_id, address,
+first_seen_height)`` in ``_addresses/index.sqlite`` under the data root, with a
+unique index on the address text. An LRU of recently seen addresses sits in
+front of it, so the common case (an address reused within the last few million
+outputs) never leaves memory; misses for one block are resolved with a single
+write transaction. Ids come from an ``AUTOINCREMENT`` key, so concurrent
+backfill workers can share one index and never hand out the same id twice, and
+an id freed by a rollback is never handed out again.
+
+``txout.address_ids`` holds the ids aligned with ``txout.addresses``. The
+``addresses`` dataset (``addresses/part-addresses-<first>-<last>.parquet``) is
+an export of the index by id range; each finished ingest run appends the ids
+assigned since the previous export. ``first_seen_height`` is the lowest height
+any driver has interned the address at: under parallel backfill a shard that
+ran behind lowers it when it meets an address another shard interned first.
+
+Reorg rollback deletes addresses first seen at or above the resume height, so
+an id still referenced by a ``txout`` row below it is kept, and drops any
+exported parts that contained deleted ids; the next export rewrites them.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+INDEX_DIR = "_addresses"
+INDEX_FILE = "index.sqlite"
+DATASET_DIR = "addresses"
+ADDRESS_SCHEMA_VERSION = "addresses.v1"
+
+_PART_NAME = re.compile(r"^part-addresses-(\d{12})-(\d{12})\.parquet$")
+# SQLite's default limit on host parameters per statement.
+_QUERY_CHUNK = 900
+_EXPORT_BATCH = 262_144
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS addresses ("
+    "address_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "address TEXT NOT NULL UNIQUE, "
+    "first_seen_height INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS addresses_first_seen ON addresses (first_seen_height)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+
+
+class AddressDictionaryError(RuntimeError):
+    """Raised when the address index cannot be read, updated or exported."""
+
+
+def address_schema() -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field("address_id", pa.uint64(), nullable=False),
+            pa.field("address", pa.string(), nullable=False),
+            pa.field("first_seen_height", pa.int64(), nullable=False),
+        ],
+        metadata={b"schema_version": ADDRESS_SCHEMA_VERSION.encode("utf-8")},
+    )
+
+
+def _part_name(first_id: int, last_id: int) -> str:
+    return f"part-addresses-{first_id:012d}-{last_id:012d}.parquet"
+
+
+class AddressDictionary:
+    """Persistent address -> id mapping shared by every ingest driver of a data root."""
+
+    def __init__(
+        self,
+        data_root: Path,
+        *,
+        cache_size: int = 1_000_000,
+        compression: str = "zstd",
+        zstd_level: int = 3,
+    ) -> None:
+        if cache_size <= 0:
+            raise ValueError("cache_size must be positive")
+        self.dataset_dir = data_root / DATASET_DIR
+        index_dir = data_root / INDEX_DIR
+        index_dir.mkdir(parents=True, exist_ok=True)
+        self.path = index_dir / INDEX_FILE
+        self._cache_size = cache_size
+        # address -> (id, first_seen_height as of the last time this connection saw it)
+        self._cache: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._compression = compression
+        self._zstd_level = zstd_level
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        try:
+            # Backfill workers share the file and wait for each other's short write
+            # transactions; the async driver calls in from its single writer thread.
+            self._db = sqlite3.connect(
+                self.path, isolation_level=None, timeout=60.0, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+        except sqlite3.Error as exc:
+            raise AddressDictionaryError(
+                f"Failed to open address index {self.path}: {exc}"
+            ) from exc
+        self._epoch = self._meta("epoch")
+
+    def __enter__(self) -> "AddressDictionary":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._db.close()
+
+    def __len__(self) -> int:
+        return int(self._db.execute("SELECT COUNT(*) FROM addresses").fetchone()[0])
+
+    def _meta(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _set_meta(self, key: str, value: int) -> None:
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _check_epoch(self) -> None:
+        """Drop cached ids when another connection has rolled the index back."""
+        epoch = self._meta("epoch")
+        if epoch != self._epoch:
+            self._cache.clear()
+            self._epoch = epoch
+
+    def _remember(self, address: str, address_id: int, first_seen: int) -> None:
+        cache = self._cache
+        cache[address] = (address_id, first_seen)
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def lookup(self, address: str) -> Optional[int]:
+        """Id of ``address`` if it has been interned, without assigning one."""
+        row = self._db.execute(
+            "SELECT address_id FROM addresses WHERE address = ?", (address,)
+        ).fetchone()
+        return int(row[0]) if row else None
+
+    def intern(self, rows: Sequence[Sequence[str]], height: int) -> List[List[int]]:
+        """Ids for each row's addresses, assigning new ids first seen at ``height``."""
+        try:
+            self._check_epoch()
+            cache = self._cache
+            resolved: Dict[str, int] = {}
+            missing: Dict[str, None] = {}
+            for addresses in rows:
+                for address in addresses:
+                    if address in resolved or address in missing:
+                        continue
+                    cached = cache.get(address)
+                    if cached is None or cached[1] > height:
+                        # Unknown, or known only from heights above this one: a
+                        # backfill shard running behind must lower first_seen_height.
+                        missing[address] = None
+                    else:
+                        cache.move_to_end(address)
+                        resolved[address] = cached[0]
+            self.hits += len(resolved)
+            self.misses += len(missing)
+            if missing:
+                resolved.update(self._assign(list(missing), height))
+        except sqlite3.Error as exc:
+            raise AddressDictionaryError(
+                f"Failed to intern addresses at height {height}: {exc}"
+            ) from exc
+        return [[resolved[address] for address in addresses] for addresses in rows]
+
+    def _known(self, addresses: List[str]) -> Dict[str, Tuple[int, int]]:
+        known: Dict[str, Tuple[int, int]] = {}
+        for start in range(0, len(addresses), _QUERY_CHUNK):
+            chunk = addresses[start : start + _QUERY_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            for address_id, address, first_seen in self._db.execute(
+                # Only "?" placeholders are interpolated.
+                "SELECT address_id, address, first_seen_height FROM addresses "  # noqa: S608
+                f"WHERE address IN ({placeholders})",
+                chunk,
+            ):
+                known[address] = (int(address_id), int(first_seen))
+        return known
+
+    def _assign(self, addresses: List[str], height: int) -> Dict[str, int]:
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Existing rows are looked up first: an upsert that hits the unique index
+            # still consumes an AUTOINCREMENT value and would leave gaps in the ids.
+            known = self._known(addresses)
+            lowered = [address for address, (_, first_seen) in known.items() if first_seen > height]
+            db.executemany(
+                "UPDATE addresses SET first_seen_height = ? WHERE address = ?",
+                [(height, address) for address in lowered],
+            )
+            new = [address for address in addresses if address not in known]
+            db.executemany(
+                "INSERT INTO addresses (address, first_seen_height) VALUES (?, ?)",
+                [(address, height) for address in new],
+            )
+            assigned = {
+                address: (address_id, min(first_seen, height))
+                for address, (address_id, first_seen) in known.items()
+            }
+            assigned.update(self._known(new))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        for address, (address_id, first_seen) in assigned.items():
+            self._remember(address, address_id, first_seen)
+        return {address: address_id for address, (address_id, _) in assigned.items()}
+
+    def rollback(self, height: int) -> int:
+        """Forget addresses first seen at or above ``height``; returns how many were removed.
+
+        Ids referenced below ``height`` survive, and removed ids are never reassigned.
+        """
+        db = self._db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                first_removed = db.execute(
+                    "SELECT MIN(address_id) FROM addresses WHERE first_seen_height >= ?", (height,)
+                ).fetchone()[0]
+                removed = db.execute(
+                    "DELETE FROM addresses WHERE first_seen_height >= ?", (height,)
+                ).rowcount
+                if removed:
+                    self._set_meta("epoch", self._meta("epoch") + 1)
+                    self._drop_parts_from(int(first_removed))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError) as exc:
+            raise AddressDictionaryError(
+                f"Failed to roll addresses back to height {height}: {exc}"
+            ) from exc
+        if removed:
+            self._cache.clear()
+            self._epoch = self._meta("epoch")
+        return int(removed)
+
+    def _parts(self) -> List[tuple[int, int, Path]]:
+        if not self.dataset_dir.exists():
+            return []
+        parts = []
+        for path in self.dataset_dir.iterdir():
+            match = _PART_NAME.match(path.name)
+            if match:
+                parts.append((int(match.group(1)), int(match.group(2)), path))
+        return sorted(parts)
+
+    def _drop_parts_from(self, address_id: int) -> None:
+        """Delete exported parts holding ids >= ``address_id`` (inside a write transaction)."""
+        exported = self._meta("exported_through")
+        for first_id, last_id, path in self._parts():
+            if last_id >= address_id:
+                path.unlink(missing_ok=True)
+                exported = min(exported, first_id - 1)
+        self._set_meta("exported_through", exported)
+
+    def export(self) -> int:
+        """Write ids assigned since the last export as a new ``addresses`` part; returns rows."""
+        db = self._db
+        temp_path: Optional[Path] = None
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                exported = self._meta("exported_through")
+                last_id = db.execute("SELECT MAX(address_id) FROM addresses").fetchone()[0]
+                # Parts beyond the recorded watermark come from an export that crashed
+                # before commit.
+                for first_id, _, path in self._parts():
+                    if first_id > exported:
+                        path.unlink(missing_ok=True)
+                if last_id is None or int(last_id) <= exported:
+                    db.execute("COMMIT")
+                    return 0
+                last_id = int(last_id)
+                self.dataset_dir.mkdir(parents=True, exist_ok=True)
+                target = self.dataset_dir / _part_name(exported + 1, last_id)
+                temp_path = target.with_name(f".{target.name}.tmp")
+                rows = self._write_part(temp_path, exported, last_id)
+                os.replace(temp_path, target)
+                self._set_meta("exported_through", last_id)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError, pa.ArrowException) as exc:
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+            raise AddressDictionaryError(
+                f"Failed to export addresses to {self.dataset_dir}: {exc}"
+            ) from exc
+        return rows
+
+    def _write_part(self, path: Path, after_id: int, last_id: int) -> int:
+        schema = address_schema()
+        cursor = self._db.execute(
+            "SELECT address_id, address, first_seen_height FROM addresses "
+            "WHERE address_id > ? AND address_id <= ? ORDER BY address_id",
+            (after_id, last_id),
+        )
+        rows = 0
+        with pq.ParquetWriter(
+            path,
+            schema,
+            compression=self._compression,
+            compression_level=self._zstd_level,
+            write_statistics=True,
+        ) as writer:
+            while True:
+                chunk = cursor.fetchmany(_EXPORT_BATCH)
+                if not chunk:
+                    break
+                ids, addresses, heights = zip(*chunk)
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [
+                            pa.array(ids, type=pa.uint64()),
+                            pa.array(addresses, type=pa.string()),
+                            pa.array(heights, type=pa.int64()),
+                        ],
+                        schema=schema,
+                    )
+                )
+                rows += len(chunk)
+        return rows
+
+
+__all__ = [
+    "ADDRESS_SCHEMA_VERSION",
+    "AddressDictionary",
+    "AddressDictionaryError",
+    "DATASET_DIR",
+    "INDEX_DIR",
+    "address_schema",
+]
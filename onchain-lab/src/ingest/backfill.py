@@ -0,0 +1,276 @@
+"""Process-parallel historical backfill.
+
+``[start, end]`` is cut into shards along height-bucket boundaries, so no two
+workers ever write the same ``height=<bucket>/`` partition (or rolling file).
+Each shard runs :func:`ingest.pipeline.sync_range` in its own process with its
+own RPC client and records progress in a private state store under
+``_markers/shards/<first>-<last>/``. The coordinator copies those rows into the
+shared :class:`ProcessedHeightIndex` while workers run and once more when a
+shard finishes, then deletes the shard store.
+
+Shards are historical, so workers skip reorg detection. Heights within
+``min_depth`` of the node tip are left to the coordinator, which ingests them
+serially with reorg handling once the pool has drained. Shard stores left by an
+interrupted run are recovered and merged before new work is planned.
+
+The pool is recorded as one run in the shared run history (wall time, every
+shard's blocks and Parquet bytes), so ``onchain status`` reports the
+parallel ingest rate rather than a per-worker one.
+
+The live UTXO set (``utxo_set``) has to be applied in height order, so workers
+never touch it. Before the tail, the coordinator replays the merged heights into
+it from the datasets.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import re
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .config import IngestConfig, load_config
+from .pipeline import _RangeIngestor, _create_rpc_client, console, sync_range
+from .rpc import BitcoinRPCClient
+from .state import RUN_HISTORY, IngestRun, ProcessedHeightIndex
+from .utxoset import catch_up
+
+_SHARD_DIR = re.compile(r"^(\d+)-(\d+)$")
+
+
+class Shard(NamedTuple):
+    start: int
+    end: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.start}-{self.end}"
+
+
+def plan_shards(start_height: int, end_height: int, *, bucket_size: int) -> List[Shard]:
+    """One shard per height bucket overlapping ``[start_height, end_height]``."""
+    if start_height > end_height:
+        raise ValueError("start_height must be <= end_height")
+    if bucket_size <= 0:
+        raise ValueError("bucket_size must be positive")
+    shards: List[Shard] = []
+    bucket = (start_height // bucket_size) * bucket_size
+    while bucket <= end_height:
+        shards.append(Shard(max(bucket, start_height), min(bucket + bucket_size - 1, end_height)))
+        bucket += bucket_size
+    return shards
+
+
+def _shard_root(cfg: IngestConfig) -> Path:
+    return cfg.data_root / "_markers" / "shards"
+
+
+def _merge_shard(shared: ProcessedHeightIndex, state_dir: Path, cfg: IngestConfig) -> int:
+    with ProcessedHeightIndex(cfg.data_root, state_dir=state_dir) as shard_index:
+        rows = [
+            (height, shard_index.hash_for(height) or "")
+            for height in shard_index.heights()
+            if shard_index.hash_for(height) != shared.hash_for(height)
+        ]
+    return shared.mark_many(rows)
+
+
+def recover_shards(cfg: IngestConfig, shared: ProcessedHeightIndex) -> int:
+    """Finish rolling commits and merge progress left by an interrupted run."""
+    root = _shard_root(cfg)
+    if not root.exists():
+        return 0
+    recovered = 0
+    for state_dir in sorted(root.iterdir()):
+        if not (state_dir.is_dir() and _SHARD_DIR.match(state_dir.name)):
+            continue
+        with ProcessedHeightIndex(cfg.data_root, state_dir=state_dir) as shard_index:
+            # Constructing the ingestor replays any rolling-commit journal in the shard.
+            _RangeIngestor(cfg.model_copy(update={"utxo_set": False}), shard_index).close()
+        recovered += _merge_shard(shared, state_dir, cfg)
+        shutil.rmtree(state_dir)
+    return recovered
+
+
+def _run_shard(cfg: IngestConfig, shard: Shard, quiet: bool) -> Dict[str, int]:
+    """Worker entry point; runs in a child process."""
+    console.quiet = quiet
+    state_dir = _shard_root(cfg) / shard.name
+    with ProcessedHeightIndex(cfg.data_root) as shared:
+        done = [
+            (height, shared.hash_for(height) or "")
+            for height in range(shard.start, shard.end + 1)
+            if shared.is_done(height)
+        ]
+    shard_blocks = shard.end - shard.start + 1
+    limits = cfg.limits.model_copy(
+        update={"max_blocks_per_run": max(cfg.limits.max_blocks_per_run, shard_blocks)}
+    )
+    # Only the coordinator writes the metrics textfile; shards would overwrite each other.
+    telemetry = cfg.telemetry.model_copy(update={"metrics_textfile": None})
+    shard_cfg = cfg.model_copy(update={"limits": limits, "telemetry": telemetry, "utxo_set": False})
+    with ProcessedHeightIndex(cfg.data_root, state_dir=state_dir) as shard_index:
+        shard_index.mark_many(done)
+        return sync_range(
+            shard.start,
+            shard.end,
+            config=shard_cfg,
+            height_index=shard_index,
+            handle_reorgs=False,
+        )
+
+
+def backfill_parallel(
+    start_height: int,
+    end_height: int,
+    *,
+    workers: int,
+    config: IngestConfig | None = None,
+    client: BitcoinRPCClient | None = None,
+    min_depth: int = 100,
+    merge_interval_seconds: float = 5.0,
+    quiet_workers: bool = True,
+) -> Dict[str, int]:
+    """Backfill ``[start_height, end_height]`` with ``workers`` shard processes.
+
+    ``client`` is only used by the coordinator (tip lookup and the near-tip
+    tail); every worker builds its own client from ``config``.
+    """
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    if start_height > end_height:
+        raise ValueError("start_height must be <= end_height")
+    cfg = config or load_config()
+    cfg.data_root.mkdir(parents=True, exist_ok=True)
+    totals: Dict[str, int] = {name: 0 for name in ("blocks", "transactions", "txin", "txout")}
+
+    created_client = client or _create_rpc_client(cfg)
+    own_client = client is None
+    shared = ProcessedHeightIndex(cfg.data_root)
+    try:
+        recovered = recover_shards(cfg, shared)
+        if recovered:
+            console.log(f"Merged {recovered} heights left by an interrupted backfill")
+
+        tip = created_client.get_block_count()
+        end_height = min(end_height, tip)
+        historical_end = min(end_height, tip - min_depth)
+        shards: List[Shard] = []
+        if start_height <= historical_end:
+            shards = [
+                shard
+                for shard in plan_shards(
+                    start_height, historical_end, bucket_size=cfg.height_bucket_size
+                )
+                if not all(shared.is_done(height) for height in range(shard.start, shard.end + 1))
+            ]
+        console.log(
+            f"Backfilling {len(shards)} shards below height {historical_end + 1} "
+            f"with {workers} workers"
+        )
+
+        if shards:
+            started, clock = datetime.now(timezone.utc), time.perf_counter()
+            written = _run_pool(
+                cfg, shards, shared, totals, workers, merge_interval_seconds, quiet_workers
+            )
+            if totals["blocks"]:
+                shared.record_run(
+                    IngestRun(
+                        started=started,
+                        seconds=time.perf_counter() - clock,
+                        blocks=totals["blocks"],
+                        last_height=max(shard.end for shard in shards),
+                        rows=sum(totals.values()),
+                        bytes=written,
+                    )
+                )
+        if cfg.utxo_set:
+            applied, missing = catch_up(cfg, shared)
+            if applied:
+                console.log(
+                    f"Applied {applied} backfilled heights to the UTXO set "
+                    f"({missing} spends of unknown outputs)"
+                )
+
+        tail_start = max(start_height, historical_end + 1)
+        if tail_start <= end_height:
+            console.log(
+                f"Ingesting near-tip heights [{tail_start}, {end_height}] with reorg handling"
+            )
+            counts = sync_range(
+                tail_start, end_height, config=cfg, client=created_client, height_index=shared
+            )
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        shared.close()
+        if own_client:
+            created_client.close()
+    return totals
+
+
+def _run_pool(
+    cfg: IngestConfig,
+    shards: List[Shard],
+    shared: ProcessedHeightIndex,
+    totals: Dict[str, int],
+    workers: int,
+    merge_interval_seconds: float,
+    quiet_workers: bool,
+) -> int:
+    """Run ``shards`` in a process pool; returns the Parquet bytes they wrote."""
+    root = _shard_root(cfg)
+    # spawn: workers must not inherit the coordinator's SQLite handle or RPC sockets.
+    context = multiprocessing.get_context("spawn")
+    failure: Optional[BaseException] = None
+    written = 0
+    processes = min(workers, len(shards))
+    worker_cfg = cfg
+    budget = cfg.limits.memory_budget_bytes
+    if budget is not None:
+        # The memory budget covers the whole backfill; each worker process gets a share.
+        limits = cfg.limits.model_copy(update={"memory_budget_bytes": max(budget // processes, 1)})
+        worker_cfg = cfg.model_copy(update={"limits": limits})
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        running: Dict[Future[Dict[str, int]], Shard] = {
+            pool.submit(_run_shard, worker_cfg, shard, quiet_workers): shard for shard in shards
+        }
+        while running:
+            finished, _ = wait(
+                list(running), timeout=merge_interval_seconds, return_when=FIRST_COMPLETED
+            )
+            for state_dir in sorted(root.iterdir()) if root.exists() else []:
+                if state_dir.is_dir() and _SHARD_DIR.match(state_dir.name):
+                    _merge_shard(shared, state_dir, cfg)
+            for future in finished:
+                shard = running.pop(future)
+                try:
+                    counts = future.result()
+                except Exception as exc:  # reported once the pool drains
+                    console.log(f"Shard {shard.name} failed: {exc}")
+                    failure = failure or exc
+                    continue
+                written += _shard_bytes(cfg, root / shard.name)
+                shutil.rmtree(root / shard.name, ignore_errors=True)
+                for key, value in counts.items():
+                    totals[key] += value
+                console.log(f"Shard {shard.name} done: {counts}")
+    if failure is not None:
+        raise failure
+    return written
+
+
+def _shard_bytes(cfg: IngestConfig, state_dir: Path) -> int:
+    """Parquet bytes in the run history of a finished shard's private store."""
+    if not state_dir.is_dir():
+        return 0
+    with ProcessedHeightIndex(cfg.data_root, state_dir=state_dir) as shard_index:
+        return sum(run.bytes for run in shard_index.recent_runs(RUN_HISTORY))
+
+
+__all__ = ["Shard", "backfill_parallel", "plan_shards", "recover_shards"]
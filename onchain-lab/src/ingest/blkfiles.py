@@ -0,0 +1,218 @@
+"""Read serialized blocks straight from bitcoind's ``blocks/blk*.dat`` files.
+
+Each ``blk*.dat`` file is a sequence of ``<magic:4><size:4 LE><block>`` records,
+optionally XOR-obfuscated with the 8-byte key in ``blocks/xor.dat`` (Core 28+).
+Blocks are stored in arrival order, not height order, and stale forks stay on
+disk, so the reader scans every header once and rebuilds the active chain by
+chaining ``prev_hash`` links and keeping the tip with the most work. That
+replaces the LevelDB block index, which needs the node's own library to read.
+
+Undo data in ``rev*.dat`` is not used: its records are only addressable through
+the same block index.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .rawblock import _NULL_HASH, double_sha256, hash_hex
+
+MAGIC: Dict[str, bytes] = {
+    "main": bytes.fromhex("f9beb4d9"),
+    "test": bytes.fromhex("0b110907"),
+    "signet": bytes.fromhex("0a03cf40"),
+    "regtest": bytes.fromhex("fabfb5da"),
+}
+
+_BLK_PATTERN = re.compile(r"^blk(\d{5})\.dat$")
+_RECORD_HEADER = 8
+_BLOCK_HEADER = 80
+_unpack_u32 = struct.Struct("<I").unpack_from
+
+
+class BlockFileError(RuntimeError):
+    """Raised when the block files cannot be scanned or do not form a chain."""
+
+
+class BlockLocation(NamedTuple):
+    file_number: int
+    offset: int
+    size: int
+
+
+def _unxor(data: bytes, offset: int, key: bytes) -> bytes:
+    """Undo the ``xor.dat`` obfuscation for ``data`` read at file ``offset``."""
+    if not data or not any(key):
+        return data
+    shift = offset % len(key)
+    rotated = key[shift:] + key[:shift]
+    pad = (rotated * (len(data) // len(rotated) + 1))[: len(data)]
+    mixed = int.from_bytes(data, "little") ^ int.from_bytes(pad, "little")
+    return mixed.to_bytes(len(data), "little")
+
+
+def _block_work(bits: int) -> int:
+    exponent = bits >> 24
+    mantissa = bits & 0x007FFFFF
+    if exponent <= 3:
+        target = mantissa >> (8 * (3 - exponent))
+    else:
+        target = mantissa << (8 * (exponent - 3))
+    if target <= 0:
+        return 0
+    return (1 << 256) // (target + 1)
+
+
+class BlockFileReader:
+    """Memory-mapped view over a node's ``blocks/`` directory."""
+
+    def __init__(self, blocks_dir: Path, *, network: str = "main") -> None:
+        if network not in MAGIC:
+            raise BlockFileError(
+                f"Unsupported network '{network}'. Expected one of {sorted(MAGIC)}."
+            )
+        self._dir = Path(blocks_dir)
+        if not self._dir.is_dir():
+            raise BlockFileError(f"Blocks directory not found: {self._dir}")
+        self._magic = MAGIC[network]
+        xor_path = self._dir / "xor.dat"
+        self._xor_key = xor_path.read_bytes()[:8] if xor_path.exists() else bytes(8)
+        self._files: Dict[int, Path] = {}
+        for path in self._dir.iterdir():
+            match = _BLK_PATTERN.match(path.name)
+            if match:
+                self._files[int(match.group(1))] = path
+        self._maps: Dict[int, Tuple[BinaryIO, mmap.mmap]] = {}
+        self._locations: Dict[str, BlockLocation] = {}
+        self._parents: Dict[str, Optional[str]] = {}
+        self._bits: Dict[str, int] = {}
+        self._chain: Optional[List[str]] = None
+
+    def __enter__(self) -> "BlockFileReader":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for handle, mapped in self._maps.values():
+            mapped.close()
+            handle.close()
+        self._maps.clear()
+
+    def _map(self, file_number: int) -> mmap.mmap:
+        cached = self._maps.get(file_number)
+        if cached is not None:
+            return cached[1]
+        handle = self._files[file_number].open("rb")
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[file_number] = (handle, mapped)
+        return mapped
+
+    def _read(self, mapped: mmap.mmap, offset: int, size: int) -> bytes:
+        return _unxor(mapped[offset : offset + size], offset, self._xor_key)
+
+    def scan(self) -> int:
+        """Index every block header on disk; returns the number of blocks found."""
+        self._locations.clear()
+        self._parents.clear()
+        self._bits.clear()
+        self._chain = None
+        for file_number in sorted(self._files):
+            if self._files[file_number].stat().st_size == 0:
+                continue
+            mapped = self._map(file_number)
+            offset = 0
+            end = len(mapped)
+            while offset + _RECORD_HEADER + _BLOCK_HEADER <= end:
+                record = self._read(mapped, offset, _RECORD_HEADER)
+                magic = record[:4]
+                if magic == b"\x00\x00\x00\x00":
+                    # Core preallocates files; the zero-filled tail has no blocks.
+                    break
+                if magic != self._magic:
+                    raise BlockFileError(
+                        f"Unexpected magic {magic.hex()} in blk{file_number:05d}.dat "
+                        f"at offset {offset}"
+                    )
+                size = _unpack_u32(record, 4)[0]
+                body = offset + _RECORD_HEADER
+                if body + size > end:
+                    # Partially written record left behind by an unclean shutdown.
+                    break
+                header = self._read(mapped, body, _BLOCK_HEADER)
+                digest = hash_hex(double_sha256(header))
+                if digest not in self._locations:
+                    prev = header[4:36]
+                    self._locations[digest] = BlockLocation(file_number, body, size)
+                    self._parents[digest] = None if prev == _NULL_HASH else hash_hex(prev)
+                    self._bits[digest] = _unpack_u32(header, 72)[0]
+                offset = body + size
+        return len(self._locations)
+
+    def best_chain(self) -> List[str]:
+        """Block hashes of the most-work chain, indexed by height."""
+        if self._chain is not None:
+            return self._chain
+        if not self._locations:
+            self.scan()
+        # Cumulative work per block; -1 marks blocks whose ancestry never made it to disk.
+        work: Dict[str, int] = {}
+        for start in self._parents:
+            path: List[str] = []
+            cursor: Optional[str] = start
+            while cursor is not None and cursor not in work and cursor in self._parents:
+                path.append(cursor)
+                cursor = self._parents[cursor]
+            if cursor is None:
+                total = 0
+            else:
+                total = work.get(cursor, -1)
+            for item in reversed(path):
+                if total >= 0:
+                    total += _block_work(self._bits[item])
+                work[item] = total
+        connected = [item for item, total in work.items() if total >= 0]
+        if not connected:
+            raise BlockFileError(
+                f"No chain starting at genesis found under {self._dir}; "
+                "pruned nodes are unsupported"
+            )
+        # Ties keep the block that reached disk first, as the node would.
+        tip = max(connected, key=lambda item: (work[item], -self._order(item)))
+        chain: List[str] = []
+        link: Optional[str] = tip
+        while link is not None:
+            chain.append(link)
+            link = self._parents[link]
+        chain.reverse()
+        self._chain = chain
+        return chain
+
+    def _order(self, block_hash: str) -> int:
+        location = self._locations[block_hash]
+        return location.file_number << 32 | location.offset
+
+    def tip_height(self) -> int:
+        return len(self.best_chain()) - 1
+
+    def location(self, block_hash: str) -> BlockLocation:
+        return self._locations[block_hash]
+
+    def read_block(self, block_hash: str) -> bytes:
+        location = self._locations[block_hash]
+        return self._read(self._map(location.file_number), location.offset, location.size)
+
+    def iter_chain(self, start_height: int, end_height: int) -> Iterator[Tuple[int, str, bytes]]:
+        """Yield ``(height, hash, raw_block)`` along the best chain."""
+        chain = self.best_chain()
+        for height in range(max(start_height, 0), min(end_height, len(chain) - 1) + 1):
+            block_hash = chain[height]
+            yield height, block_hash, self.read_block(block_hash)
+
+
+__all__ = ["BlockFileError", "BlockFileReader", "BlockLocation", "MAGIC"]
@@ -0,0 +1,311 @@
+"""Block index: one small row per ingested height for time-bounded lookups.
+
+The index is a SQLite table ``blocks(height, hash, time_utc, median_time,
+tx_count, vin_count, vout_count, blocks_dir, transactions_dir, txin_dir,
+txout_dir)`` in ``_block_index/index.sqlite`` under the data root. Times are
+UTC seconds since the epoch; the ``*_dir`` columns hold the bucket directory
+(relative to the data root) that each dataset's rows for the height live in.
+Directories rather than file names are stored so that compaction, which
+rewrites the files inside a bucket, never invalidates the index.
+
+A time window resolves to a height range with one indexed query on
+``time_utc`` and from there to the handful of bucket directories involved, so
+readers such as the golden-day QA touch a few files instead of the whole
+chain. Block times are not monotonic; the range spans every height whose time
+falls inside the window, and readers still apply their own time predicate.
+
+Rows are written before a height is marked done (per-height writer) or when
+its bucket commits (rolling writer), so every processed height has a row.
+Reorg rollback deletes rows at and above the resume height. Data roots
+ingested before the index existed have no rows for those heights; callers
+fall back to scanning the dataset globs when a window resolves to nothing.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections import deque
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+INDEX_DIR = "_block_index"
+INDEX_FILE = "index.sqlite"
+DATASETS = ("blocks", "transactions", "txin", "txout")
+
+# Consensus median-time-past: the block and its ten predecessors.
+_MEDIAN_SPAN = 11
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS blocks ("
+    "height INTEGER PRIMARY KEY, "
+    "hash TEXT NOT NULL, "
+    "time_utc INTEGER NOT NULL, "
+    "median_time INTEGER, "
+    "tx_count INTEGER NOT NULL, "
+    "vin_count INTEGER NOT NULL, "
+    "vout_count INTEGER NOT NULL, "
+    "blocks_dir TEXT NOT NULL, "
+    "transactions_dir TEXT NOT NULL, "
+    "txin_dir TEXT NOT NULL, "
+    "txout_dir TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS blocks_time ON blocks (time_utc)",
+)
+_COLUMNS = (
+    "height, hash, time_utc, median_time, tx_count, vin_count, vout_count, "
+    "blocks_dir, transactions_dir, txin_dir, txout_dir"
+)
+
+
+class BlockIndexError(RuntimeError):
+    """Raised when the block index cannot be read or updated."""
+
+
+class BlockIndexEntry(NamedTuple):
+    height: int
+    hash: str
+    time_utc: datetime
+    median_time: Optional[datetime]
+    tx_count: int
+    vin_count: int
+    vout_count: int
+    locations: Mapping[str, str]
+
+
+def index_path(data_root: Path) -> Path:
+    return data_root / INDEX_DIR / INDEX_FILE
+
+
+def _seconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_seconds(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else datetime.fromtimestamp(int(value), tz=timezone.utc)
+
+
+class BlockIndex:
+    """Height -> (hash, times, counts, bucket directories) rows shared by every ingest driver."""
+
+    def __init__(self, data_root: Path, *, readonly: bool = False) -> None:
+        self.data_root = data_root
+        self.path = index_path(data_root)
+        self._closed = False
+        # (height, time_utc seconds) of the most recently seen heights, for median-time-past.
+        self._recent: Deque[Tuple[int, int]] = deque(maxlen=_MEDIAN_SPAN)
+        try:
+            if readonly:
+                self._db = sqlite3.connect(
+                    f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+                )
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Backfill workers share the file and wait for each other's short writes.
+                self._db = sqlite3.connect(
+                    self.path, isolation_level=None, timeout=60.0, check_same_thread=False
+                )
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                for statement in _SCHEMA:
+                    self._db.execute(statement)
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to open block index {self.path}: {exc}") from exc
+
+    @classmethod
+    def open_existing(cls, data_root: Path) -> Optional["BlockIndex"]:
+        """Read-only view of the index under ``data_root``, or ``None`` if there is none."""
+        if not index_path(data_root).exists():
+            return None
+        return cls(data_root, readonly=True)
+
+    def __enter__(self) -> "BlockIndex":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._db.close()
+
+    def __len__(self) -> int:
+        return int(self._db.execute("SELECT COUNT(*) FROM blocks").fetchone()[0])
+
+    def location(self, directory: Path) -> str:
+        """``directory`` as stored: relative to the data root when it lies inside it."""
+        try:
+            return directory.resolve().relative_to(self.data_root.resolve()).as_posix()
+        except ValueError:
+            return directory.resolve().as_posix()
+
+    def median_time_past(self, height: int, time_utc: datetime) -> Optional[datetime]:
+        """Median of this block's time and its ten predecessors', if all of them are known.
+
+        Heights are expected in order; each call remembers ``time_utc`` so the
+        next height needs no lookup, even before its predecessors are recorded.
+        """
+        seconds = _seconds(time_utc)
+        needed = min(height, _MEDIAN_SPAN - 1)
+        recent = self._recent
+        if not recent or recent[-1][0] != height - 1:
+            try:
+                rows = self._db.execute(
+                    "SELECT height, time_utc FROM blocks "
+                    "WHERE height >= ? AND height < ? ORDER BY height",
+                    (height - needed, height),
+                ).fetchall()
+            except sqlite3.Error as exc:
+                raise BlockIndexError(
+                    f"Failed to read block times from {self.path}: {exc}"
+                ) from exc
+            recent.clear()
+            recent.extend((int(row_height), int(row_time)) for row_height, row_time in rows)
+        previous = [row_time for row_height, row_time in recent if row_height >= height - needed]
+        recent.append((height, seconds))
+        if len(previous) < needed:
+            return None
+        # Same pick as bitcoind's GetMedianTimePast, including for short chains.
+        window = sorted(previous + [seconds])
+        return _from_seconds(window[len(window) // 2])
+
+    def record(self, entries: Iterable[BlockIndexEntry]) -> int:
+        """Insert or replace rows for ``entries`` in one transaction; returns how many."""
+        rows = [
+            (
+                entry.height,
+                entry.hash,
+                _seconds(entry.time_utc),
+                None if entry.median_time is None else _seconds(entry.median_time),
+                entry.tx_count,
+                entry.vin_count,
+                entry.vout_count,
+                *(entry.locations[dataset] for dataset in DATASETS),
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return 0
+        db = self._db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    # Only the fixed column list is interpolated.
+                    f"INSERT OR REPLACE INTO blocks ({_COLUMNS}) "  # noqa: S608
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to update block index {self.path}: {exc}") from exc
+        return len(rows)
+
+    def truncate(self, height: int) -> int:
+        """Delete rows at or above ``height``; returns how many were removed."""
+        try:
+            removed = self._db.execute("DELETE FROM blocks WHERE height >= ?", (height,)).rowcount
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to roll block index back to {height}: {exc}") from exc
+        self._recent.clear()
+        return int(removed)
+
+    def entry(self, height: int) -> Optional[BlockIndexEntry]:
+        rows = self._select("WHERE height = ?", (height,))
+        return rows[0] if rows else None
+
+    def entries(self, first: int, last: int) -> List[BlockIndexEntry]:
+        return self._select("WHERE height >= ? AND height <= ? ORDER BY height", (first, last))
+
+    def _select(self, clause: str, params: Tuple[object, ...]) -> List[BlockIndexEntry]:
+        try:
+            # Only the fixed column list and the clauses above are interpolated.
+            query = f"SELECT {_COLUMNS} FROM blocks {clause}"  # noqa: S608
+            rows = self._db.execute(query, params).fetchall()
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to read block index {self.path}: {exc}") from exc
+        return [
+            BlockIndexEntry(
+                height=int(row[0]),
+                hash=str(row[1]),
+                time_utc=_from_seconds(row[2]),  # type: ignore[arg-type]
+                median_time=_from_seconds(row[3]),
+                tx_count=int(row[4]),
+                vin_count=int(row[5]),
+                vout_count=int(row[6]),
+                locations=dict(zip(DATASETS, row[7:])),
+            )
+            for row in rows
+        ]
+
+    def height_range(self, start: datetime, end: datetime) -> Optional[Tuple[int, int]]:
+        """Lowest and highest height with ``start <= time_utc < end``, or ``None``."""
+        try:
+            low, high = self._db.execute(
+                "SELECT MIN(height), MAX(height) FROM blocks WHERE time_utc >= ? AND time_utc < ?",
+                (_seconds(start), _seconds(end)),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to read block index {self.path}: {exc}") from exc
+        if low is None:
+            return None
+        return int(low), int(high)
+
+    def directories(self, dataset: str, first: int, last: int) -> List[Path]:
+        """Distinct bucket directories holding ``dataset`` rows for heights ``first..last``."""
+        if dataset not in DATASETS:
+            raise BlockIndexError(f"Unknown dataset '{dataset}'")
+        try:
+            rows = self._db.execute(
+                # ``dataset`` was checked against DATASETS above.
+                f"SELECT DISTINCT {dataset}_dir FROM blocks "  # noqa: S608
+                "WHERE height >= ? AND height <= ?",
+                (first, last),
+            ).fetchall()
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to read block index {self.path}: {exc}") from exc
+        return sorted(self.data_root / row[0] for row in rows)
+
+    def files(self, dataset: str, first: int, last: int) -> List[str]:
+        """Parquet files in the bucket directories covering heights ``first..last``."""
+        matches: List[str] = []
+        for directory in self.directories(dataset, first, last):
+            if directory.is_dir():
+                matches.extend(str(path) for path in directory.glob("*.parquet"))
+        return sorted(matches)
+
+    def day_summary(self) -> Dict[date, Tuple[int, int, int, str]]:
+        """``(blocks, first_height, last_height, last_hash)`` per UTC day of block time."""
+        try:
+            rows = self._db.execute(
+                "WITH days AS (SELECT date(time_utc, 'unixepoch') AS day, COUNT(*) AS count, "
+                "MIN(height) AS first, MAX(height) AS last FROM blocks GROUP BY day) "
+                "SELECT day, count, first, last, hash "
+                "FROM days JOIN blocks ON blocks.height = days.last"
+            ).fetchall()
+        except sqlite3.Error as exc:
+            raise BlockIndexError(f"Failed to read block index {self.path}: {exc}") from exc
+        return {
+            date.fromisoformat(day): (int(count), int(first), int(last), str(last_hash))
+            for day, count, first, last, last_hash in rows
+        }
+
+    def window_files(self, start: datetime, end: datetime) -> Optional[Dict[str, List[str]]]:
+        """Files of every dataset for the heights timed in ``[start, end)``, or ``None``."""
+        heights = self.height_range(start, end)
+        if heights is None:
+            return None
+        return {dataset: self.files(dataset, *heights) for dataset in DATASETS}
+
+
+__all__ = [
+    "BlockIndex",
+    "BlockIndexEntry",
+    "BlockIndexError",
+    "INDEX_DIR",
+    "index_path",
+]
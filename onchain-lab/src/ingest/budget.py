@@ -0,0 +1,119 @@
+"""Memory budget for blocks held between the fetch and decode stages.
+
+The ingest drivers run fetch (RPC worker pool) -> decode and columnarize (the
+ingest thread) -> write (Parquet flush or rolling row groups). The fetch stage
+is the only one whose memory is not bounded by construction: a verbose
+ordinals-era block decodes to hundreds of MB of Python objects, and a prefetch
+window of ``prefetch_depth`` such blocks can exhaust a 16 GB box on its own.
+
+:class:`MemoryBudget` counts the bytes of blocks that have been fetched but not
+yet ingested, plus an estimate for chunks still in flight (a moving average of
+recent block footprints times their height count). The prefetchers only schedule
+another chunk while that projection stays under ``limits.memory_budget_bytes``,
+so a run of large blocks shrinks the prefetch window instead of growing memory,
+and it widens again once blocks get small. The chunk holding the height the
+ingest loop waits for is always scheduled, so the pipeline never stalls on its
+own budget.
+
+Column buffers downstream are bounded separately: the per-height writer
+flushes every block, and the rolling writer stages at most ``row_group_bytes``
+per dataset and bucket before writing a row group.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Mapping, Optional
+
+from .telemetry import IngestStats
+
+# Python objects per serialized byte for getblock verbosity >= 2 payloads.
+VERBOSE_EXPANSION = 10
+# Weight of the newest block in the footprint average; block sizes shift by era.
+_AVERAGE_WEIGHT = 0.2
+
+
+def block_footprint(block: Mapping[str, object]) -> int:
+    """Approximate in-memory bytes held for one fetched block."""
+    raw = block.get("raw")
+    if isinstance(raw, (bytes, bytearray)):
+        return len(raw)
+    size = block.get("size")
+    if isinstance(size, int):
+        return size * VERBOSE_EXPANSION
+    return 0
+
+
+class MemoryBudget:
+    """Bytes of fetched, not yet ingested blocks, capped at ``limit_bytes`` (``None``: no cap)."""
+
+    def __init__(
+        self, limit_bytes: Optional[int] = None, *, stats: IngestStats | None = None
+    ) -> None:
+        if limit_bytes is not None and limit_bytes <= 0:
+            raise ValueError("limit_bytes must be positive")
+        self.limit_bytes = limit_bytes
+        self._stats = stats
+        self._lock = threading.Lock()
+        self._held: Dict[int, int] = {}
+        self._in_flight: set[int] = set()
+        self._held_bytes = 0
+        self._average: Optional[float] = None
+        self.peak_bytes = 0
+
+    @property
+    def held_bytes(self) -> int:
+        with self._lock:
+            return self._held_bytes
+
+    def admits(self, heights: int) -> bool:
+        """Whether a chunk of ``heights`` more blocks fits next to what is held and in flight."""
+        if self.limit_bytes is None:
+            return True
+        with self._lock:
+            if not self._held and not self._in_flight:
+                return True
+            if self._average is None:
+                # No footprint known yet: keep to one chunk until the first one lands.
+                return False
+            projected = self._held_bytes + (len(self._in_flight) + heights) * self._average
+            return projected <= self.limit_bytes
+
+    def scheduled(self, heights: Iterable[int]) -> None:
+        with self._lock:
+            self._in_flight.update(heights)
+
+    def landed(self, footprints: Mapping[int, int]) -> None:
+        """Record fetched blocks; called from the fetch workers."""
+        with self._lock:
+            for height, nbytes in footprints.items():
+                if height not in self._in_flight:
+                    continue  # fetched for a window that was cleared since
+                self._in_flight.discard(height)
+                self._held_bytes += nbytes - self._held.get(height, 0)
+                self._held[height] = nbytes
+                average = self._average
+                self._average = (
+                    float(nbytes)
+                    if average is None
+                    else average + _AVERAGE_WEIGHT * (nbytes - average)
+                )
+            held = self._held_bytes
+            self.peak_bytes = max(self.peak_bytes, held)
+        if self._stats is not None:
+            self._stats.observe_peak("prefetch_held", held)
+
+    def consumed(self, height: int) -> None:
+        """Release ``height`` once the ingest loop has taken it."""
+        with self._lock:
+            self._held_bytes -= self._held.pop(height, 0)
+
+    def clear(self) -> None:
+        """Forget held and in-flight blocks, e.g. after the prefetch window was dropped."""
+        with self._lock:
+            self._held.clear()
+            self._in_flight.clear()
+            self._held_bytes = 0
+
+
+__all__ = ["MemoryBudget", "VERBOSE_EXPANSION", "block_footprint"]
@@ -0,0 +1,616 @@
+"""Part catalog: one row per committed Parquet file of the ingest datasets.
+
+Globbing the dataset trees recursively takes minutes on a data root with
+hundreds of thousands of part files (NTFS especially), before any query has
+started. The catalog is a SQLite table ``parts`` in ``_catalog/parts.sqlite``
+under the data root. It is keyed by the file path relative to the data root
+and records the dataset, bucket, row count, height and ``time_utc`` bounds,
+byte size, schema version, column names and a CRC-32 of the Parquet footer,
+which covers every row group's offsets, sizes and statistics without reading
+the data pages again.
+
+Writers keep it current. Per-height flushes and rolling-writer commits
+register the files they publish. Reorg rollback, compaction and schema
+conversion re-list the bucket directories they rewrote
+(:meth:`PartCatalog.sync_directory`). Every update is a single transaction.
+Heights come from the ``height`` column statistics where a dataset has one,
+then from the rolling and per-height file names, then from the bucket. Only
+``blocks`` and ``transactions`` carry times, so a time window resolves to
+heights through their rows.
+
+Readers get pruned file lists from :meth:`PartCatalog.files` and the recorded
+layouts from :meth:`PartCatalog.layouts`. With those layouts,
+:func:`ingest.hashes.source_sql` builds DuckDB views without opening a single
+footer. A catalog is only trusted once it is marked complete. That happens
+when a writer opens it while no bucket directory holds a file yet, or after
+``ingest catalog --rebuild`` has registered an older data root by listing its
+bucket directories rather than walking the tree. Until then, readers fall back
+to globbing.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import string
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import pyarrow.parquet as pq
+from pyarrow.lib import ArrowException
+
+from .config import IngestConfig
+from .schemas import schema_version_of
+from .writer import file_heights
+
+CATALOG_DIR = "_catalog"
+CATALOG_FILE = "parts.sqlite"
+DATASETS = ("blocks", "transactions", "txin", "txout")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS parts ("
+    "path TEXT PRIMARY KEY, "
+    "dataset TEXT NOT NULL, "
+    "directory TEXT NOT NULL, "
+    "bucket INTEGER, "
+    "rows INTEGER NOT NULL, "
+    "min_height INTEGER, "
+    "max_height INTEGER, "
+    "min_time INTEGER, "
+    "max_time INTEGER, "
+    "bytes INTEGER NOT NULL, "
+    "mtime_ns INTEGER NOT NULL, "
+    "schema_version TEXT NOT NULL, "
+    "columns TEXT NOT NULL, "
+    "checksum INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS parts_heights ON parts (dataset, min_height, max_height)",
+    "CREATE INDEX IF NOT EXISTS parts_directory ON parts (directory)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+_COLUMNS = (
+    "path, dataset, directory, bucket, rows, min_height, max_height, min_time, max_time, "
+    "bytes, mtime_ns, schema_version, columns, checksum"
+)
+_MAGIC = b"PAR1"
+# Paths per ``IN (...)`` lookup; stays under SQLite's bound-parameter limit.
+_LOOKUP_CHUNK = 500
+
+
+class CatalogError(RuntimeError):
+    """Raised when the part catalog cannot be read or updated."""
+
+
+class PartEntry(NamedTuple):
+    dataset: str
+    path: str
+    bucket: Optional[int]
+    rows: int
+    min_height: Optional[int]
+    max_height: Optional[int]
+    min_time: Optional[datetime]
+    max_time: Optional[datetime]
+    bytes: int
+    schema_version: str
+    columns: Tuple[str, ...]
+    checksum: int
+
+
+def catalog_path(data_root: Path) -> Path:
+    return data_root / CATALOG_DIR / CATALOG_FILE
+
+
+def bucket_pattern(template: str) -> Tuple[str, re.Pattern[str]]:
+    """Glob and regex for every bucket directory produced by ``template``."""
+    glob_parts: List[str] = []
+    regex_parts: List[str] = []
+    for literal, field_name, _, _ in string.Formatter().parse(template.strip("/")):
+        glob_parts.append(literal)
+        regex_parts.append(re.escape(literal))
+        if field_name is not None:
+            glob_parts.append("*")
+            regex_parts.append(r"(?P<bucket>\d+)" if field_name == "height_bucket" else ".*")
+    return "".join(glob_parts), re.compile("".join(regex_parts) + "$")
+
+
+def bucket_directories(cfg: IngestConfig, dataset: str) -> Dict[int, Path]:
+    pattern, matcher = bucket_pattern(cfg.partitions[dataset])
+    found: Dict[int, Path] = {}
+    for path in cfg.data_root.glob(pattern):
+        relative = path.relative_to(cfg.data_root).as_posix()
+        match = matcher.match(relative)
+        if match and path.is_dir():
+            found[int(match.group("bucket"))] = path
+    return dict(sorted(found.items()))
+
+
+def _holds_files(cfg: IngestConfig) -> bool:
+    """Whether any bucket directory of any dataset holds a file, committed or not."""
+    return any(
+        any(True for _ in directory.iterdir())
+        for dataset in DATASETS
+        for directory in bucket_directories(cfg, dataset).values()
+    )
+
+
+def footer_checksum(path: Path) -> int:
+    """CRC-32 of the Parquet footer: the metadata, its length and the closing magic."""
+    with path.open("rb") as handle:
+        size = handle.seek(0, 2)
+        if size < 12:
+            raise OSError(f"{path} is too short to be a Parquet file")
+        handle.seek(size - 8)
+        tail = handle.read(8)
+        if tail[4:] != _MAGIC:
+            raise OSError(f"{path} does not end with the Parquet magic")
+        length = int.from_bytes(tail[:4], "little")
+        if length + 12 > size:
+            raise OSError(f"{path} has a footer longer than the file")
+        handle.seek(size - 8 - length)
+        return zlib.crc32(handle.read(length + 8))
+
+
+def _seconds(value: object) -> Optional[int]:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    if isinstance(value, int):
+        # Raw statistics of a timestamp[us] column.
+        return value // 1_000_000
+    return None
+
+
+def _from_seconds(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else datetime.fromtimestamp(int(value), tz=timezone.utc)
+
+
+def _column_bounds(metadata: pq.FileMetaData, name: str) -> Tuple[object, object]:
+    """Min and max of column ``name`` over every row group, or ``(None, None)``."""
+    names = metadata.schema.names
+    if name not in names or metadata.num_row_groups == 0:
+        return None, None
+    column = names.index(name)
+    lows: List[object] = []
+    highs: List[object] = []
+    for index in range(metadata.num_row_groups):
+        group = metadata.row_group(index)
+        if group.num_rows == 0:
+            continue
+        statistics = group.column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            return None, None
+        lows.append(statistics.min)
+        highs.append(statistics.max)
+    if not lows:
+        return None, None
+    return min(lows), max(highs)  # type: ignore[type-var]
+
+
+class PartCatalog:
+    """Committed part files per dataset, with the bounds readers prune on."""
+
+    def __init__(
+        self,
+        data_root: Path,
+        *,
+        partitions: Mapping[str, str],
+        bucket_size: int,
+        readonly: bool = False,
+    ) -> None:
+        self.data_root = data_root
+        self.path = catalog_path(data_root)
+        self.bucket_size = bucket_size
+        self._matchers = {
+            dataset: bucket_pattern(template)[1] for dataset, template in partitions.items()
+        }
+        self._closed = False
+        try:
+            if readonly:
+                self._db = sqlite3.connect(
+                    f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+                )
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Backfill workers share the file and wait for each other's short writes.
+                self._db = sqlite3.connect(
+                    self.path, isolation_level=None, timeout=60.0, check_same_thread=False
+                )
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                for statement in _SCHEMA:
+                    self._db.execute(statement)
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to open part catalog {self.path}: {exc}") from exc
+
+    @classmethod
+    def for_config(cls, cfg: IngestConfig, *, readonly: bool = False) -> "PartCatalog":
+        return cls(
+            cfg.data_root,
+            partitions=cfg.partitions,
+            bucket_size=cfg.height_bucket_size,
+            readonly=readonly,
+        )
+
+    @classmethod
+    def open_existing(cls, cfg: IngestConfig) -> Optional["PartCatalog"]:
+        """Read-only view of a complete catalog under ``cfg.data_root``, else ``None``."""
+        if not catalog_path(cfg.data_root).exists():
+            return None
+        catalog = cls.for_config(cfg, readonly=True)
+        if not catalog.complete:
+            catalog.close()
+            return None
+        return catalog
+
+    def __enter__(self) -> "PartCatalog":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._db.close()
+
+    def __len__(self) -> int:
+        return int(self._db.execute("SELECT COUNT(*) FROM parts").fetchone()[0])
+
+    @property
+    def complete(self) -> bool:
+        """Whether every committed file under the data root has a row."""
+        try:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        return row is not None and row[0] == "1"
+
+    def mark_complete(self) -> None:
+        try:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to update part catalog {self.path}: {exc}") from exc
+
+    def mark_complete_if_empty(self, cfg: IngestConfig) -> bool:
+        """Mark the catalog complete when no bucket directory holds any file yet.
+
+        Every file written afterwards passes through the catalog. The check runs
+        under the write lock, so writers starting together (backfill workers)
+        agree; a file committed but not yet registered keeps the catalog
+        incomplete. Returns whether the catalog is complete.
+        """
+        db = self._db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                done = db.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+                registered = db.execute("SELECT 1 FROM parts LIMIT 1").fetchone()
+                if done is None and registered is None and not _holds_files(cfg):
+                    db.execute("INSERT INTO meta (key, value) VALUES ('complete', '1')")
+                    done = ("1",)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError) as exc:
+            raise CatalogError(f"Failed to update part catalog {self.path}: {exc}") from exc
+        return done is not None and done[0] == "1"
+
+    # --- maintenance -------------------------------------------------------------
+
+    def _relative(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(self.data_root.resolve()).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def _bucket(self, dataset: str, directory: str) -> Optional[int]:
+        matcher = self._matchers.get(dataset)
+        match = matcher.match(directory) if matcher is not None else None
+        return int(match.group("bucket")) if match is not None else None
+
+    def describe(self, dataset: str, path: Path) -> Tuple[object, ...]:
+        """The ``parts`` row for one file, read from its footer."""
+        relative = self._relative(path)
+        directory = relative.rpartition("/")[0]
+        bucket = self._bucket(dataset, directory)
+        try:
+            stat = path.stat()
+            parquet = pq.ParquetFile(path)
+            try:
+                metadata = parquet.metadata
+                schema = parquet.schema_arrow
+            finally:
+                parquet.close()
+            checksum = footer_checksum(path)
+        except (OSError, ArrowException) as exc:
+            raise CatalogError(f"Failed to describe {path}: {exc}") from exc
+        low, high = _column_bounds(metadata, "height")
+        heights = (int(low), int(high)) if low is not None else None  # type: ignore[call-overload]
+        if heights is None:
+            heights = file_heights(path.name, dataset)
+        if heights is None and bucket is not None:
+            heights = (bucket, bucket + self.bucket_size - 1)
+        first_time, last_time = _column_bounds(metadata, "time_utc")
+        return (
+            relative,
+            dataset,
+            directory,
+            bucket,
+            metadata.num_rows,
+            heights[0] if heights else None,
+            heights[1] if heights else None,
+            _seconds(first_time),
+            _seconds(last_time),
+            stat.st_size,
+            stat.st_mtime_ns,
+            schema_version_of(schema),
+            ",".join(schema.names),
+            checksum,
+        )
+
+    def _write(self, upserts: Sequence[Tuple[object, ...]], deletes: Sequence[str]) -> None:
+        db = self._db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if deletes:
+                    db.executemany(
+                        "DELETE FROM parts WHERE path = ?", [(path,) for path in deletes]
+                    )
+                if upserts:
+                    db.executemany(
+                        # Only the fixed column list is interpolated.
+                        f"INSERT OR REPLACE INTO parts ({_COLUMNS}) "  # noqa: S608
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        upserts,
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to update part catalog {self.path}: {exc}") from exc
+
+    def add(self, parts: Iterable[Tuple[str, Path]]) -> int:
+        """Register (or refresh) ``(dataset, path)`` pairs in one transaction; returns how many."""
+        rows = [self.describe(dataset, path) for dataset, path in parts]
+        if rows:
+            self._write(rows, [])
+        return len(rows)
+
+    def sync_directory(self, dataset: str, directory: Path) -> int:
+        """Make the rows of one bucket directory match its committed files; returns rows changed.
+
+        Files whose size and modification time match their row are not reread.
+        """
+        location = self._relative(directory)
+        try:
+            known = {
+                str(path): (int(size), int(mtime))
+                for path, size, mtime in self._db.execute(
+                    "SELECT path, bytes, mtime_ns FROM parts WHERE directory = ? AND dataset = ?",
+                    (location, dataset),
+                )
+            }
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        present = (
+            sorted(
+                path
+                for path in directory.glob("*.parquet")
+                if not path.name.startswith(".")
+            )
+            if directory.is_dir()
+            else []
+        )
+        upserts: List[Tuple[object, ...]] = []
+        seen = set()
+        for path in present:
+            relative = f"{location}/{path.name}" if location else path.name
+            seen.add(relative)
+            stat = path.stat()
+            if known.get(relative) != (stat.st_size, stat.st_mtime_ns):
+                upserts.append(self.describe(dataset, path))
+        deletes = [path for path in known if path not in seen]
+        if upserts or deletes:
+            self._write(upserts, deletes)
+        return len(upserts) + len(deletes)
+
+    def rebuild(
+        self, cfg: IngestConfig, datasets: Optional[Sequence[str]] = None
+    ) -> Dict[str, int]:
+        """Re-list every bucket directory of ``datasets``; returns rows changed per dataset.
+
+        A rebuild of every dataset marks the catalog complete.
+        """
+        changed: Dict[str, int] = {}
+        for dataset in datasets or DATASETS:
+            directories = bucket_directories(cfg, dataset).values()
+            count = sum(self.sync_directory(dataset, directory) for directory in directories)
+            locations = {self._relative(directory) for directory in directories}
+            try:
+                stale = [
+                    str(path)
+                    for path, directory in self._db.execute(
+                        "SELECT path, directory FROM parts WHERE dataset = ?", (dataset,)
+                    )
+                    if directory not in locations
+                ]
+            except sqlite3.Error as exc:
+                raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+            if stale:
+                self._write([], stale)
+            changed[dataset] = count + len(stale)
+        if datasets is None or set(DATASETS).issubset(datasets):
+            self.mark_complete()
+        return changed
+
+    def verify(self, dataset: Optional[str] = None) -> List[str]:
+        """Catalogued files that are missing or whose size or footer no longer match."""
+        clause, params = ("WHERE dataset = ?", (dataset,)) if dataset is not None else ("", ())
+        problems: List[str] = []
+        for entry in self._select(clause, params):
+            path = self.data_root / entry.path
+            if not path.exists():
+                problems.append(f"{entry.path}: missing")
+                continue
+            if path.stat().st_size != entry.bytes:
+                problems.append(f"{entry.path}: size {path.stat().st_size} != {entry.bytes}")
+                continue
+            try:
+                checksum = footer_checksum(path)
+            except OSError as exc:
+                problems.append(f"{entry.path}: unreadable footer ({exc})")
+                continue
+            if checksum != entry.checksum:
+                problems.append(f"{entry.path}: footer checksum mismatch")
+        return problems
+
+    # --- queries -----------------------------------------------------------------
+
+    def has(self, dataset: str) -> bool:
+        try:
+            row = self._db.execute(
+                "SELECT 1 FROM parts WHERE dataset = ? LIMIT 1", (dataset,)
+            ).fetchone()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        return row is not None
+
+    def _select(self, clause: str, params: Tuple[object, ...]) -> List[PartEntry]:
+        try:
+            # Only the fixed column list and clauses built in this class are interpolated.
+            query = f"SELECT {_COLUMNS} FROM parts {clause}"  # noqa: S608
+            rows = self._db.execute(query, params).fetchall()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        return [
+            PartEntry(
+                dataset=str(row[1]),
+                path=str(row[0]),
+                bucket=None if row[3] is None else int(row[3]),
+                rows=int(row[4]),
+                min_height=None if row[5] is None else int(row[5]),
+                max_height=None if row[6] is None else int(row[6]),
+                min_time=_from_seconds(row[7]),
+                max_time=_from_seconds(row[8]),
+                bytes=int(row[9]),
+                schema_version=str(row[11]),
+                columns=tuple(str(row[12]).split(",")),
+                checksum=int(row[13]),
+            )
+            for row in rows
+        ]
+
+    def parts(
+        self, dataset: str, first_height: Optional[int] = None, last_height: Optional[int] = None
+    ) -> List[PartEntry]:
+        """Parts of ``dataset`` that may hold heights ``first_height..last_height``.
+
+        Parts without known heights are always included.
+        """
+        clause = "WHERE dataset = ?"
+        params: List[object] = [dataset]
+        if last_height is not None:
+            clause += " AND (min_height IS NULL OR min_height <= ?)"
+            params.append(last_height)
+        if first_height is not None:
+            clause += " AND (max_height IS NULL OR max_height >= ?)"
+            params.append(first_height)
+        return self._select(clause + " ORDER BY path", tuple(params))
+
+    def files(
+        self, dataset: str, first_height: Optional[int] = None, last_height: Optional[int] = None
+    ) -> List[str]:
+        return [
+            str(self.data_root / entry.path)
+            for entry in self.parts(dataset, first_height, last_height)
+        ]
+
+    def layouts(
+        self, dataset: str, paths: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[str, Tuple[str, ...]]]:
+        """``{file: (schema version, column names)}`` for :func:`ingest.hashes.source_sql`.
+
+        Covers ``paths`` (as returned by :meth:`files`) or every part of ``dataset``.
+        """
+        if paths is None:
+            return {
+                str(self.data_root / entry.path): (entry.schema_version, entry.columns)
+                for entry in self.parts(dataset)
+            }
+        wanted = {self._relative(Path(path)): str(path) for path in paths}
+        keys = list(wanted)
+        layouts: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        for offset in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[offset : offset + _LOOKUP_CHUNK]
+            marks = ", ".join("?" for _ in chunk)
+            clause = f"WHERE dataset = ? AND path IN ({marks})"
+            for entry in self._select(clause, (dataset, *chunk)):
+                layouts[wanted[entry.path]] = (entry.schema_version, entry.columns)
+        return layouts
+
+    def height_range(self, start: datetime, end: datetime) -> Optional[Tuple[int, int]]:
+        """Heights of the ``blocks`` parts whose times overlap ``[start, end)``, or ``None``."""
+        try:
+            low, high = self._db.execute(
+                "SELECT MIN(min_height), MAX(max_height) FROM parts "
+                "WHERE dataset = 'blocks' AND min_time < ? AND max_time >= ?",
+                (_seconds(end), _seconds(start)),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        if low is None:
+            return None
+        return int(low), int(high)
+
+    def totals(self) -> Dict[str, Tuple[int, int, int]]:
+        """``(files, rows, bytes)`` per dataset."""
+        try:
+            rows = self._db.execute(
+                "SELECT dataset, COUNT(*), SUM(rows), SUM(bytes) FROM parts GROUP BY dataset"
+            ).fetchall()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        return {str(name): (int(files), int(count), int(size)) for name, files, count, size in rows}
+
+    def bucket_totals(self) -> Dict[str, Dict[int, Tuple[int, int, int]]]:
+        """``(files, rows, bytes)`` per dataset and height bucket.
+
+        Parts outside a bucket are left out.
+        """
+        try:
+            rows = self._db.execute(
+                "SELECT dataset, bucket, COUNT(*), SUM(rows), SUM(bytes) FROM parts "
+                "WHERE bucket IS NOT NULL GROUP BY dataset, bucket"
+            ).fetchall()
+        except sqlite3.Error as exc:
+            raise CatalogError(f"Failed to read part catalog {self.path}: {exc}") from exc
+        totals: Dict[str, Dict[int, Tuple[int, int, int]]] = {}
+        for name, bucket, files, count, size in rows:
+            totals.setdefault(str(name), {})[int(bucket)] = (int(files), int(count), int(size))
+        return totals
+
+
+def sync_directories(cfg: IngestConfig, dataset: str, directories: Iterable[Path]) -> int:
+    """Re-list ``directories`` in the catalog under ``cfg.data_root``, if it has one."""
+    if not catalog_path(cfg.data_root).exists():
+        return 0
+    with PartCatalog.for_config(cfg) as catalog:
+        return sum(catalog.sync_directory(dataset, directory) for directory in directories)
+
+
+__all__ = [
+    "CATALOG_DIR",
+    "CatalogError",
+    "PartCatalog",
+    "PartEntry",
+    "bucket_directories",
+    "bucket_pattern",
+    "catalog_path",
+    "footer_checksum",
+    "sync_directories",
+]
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+import signal
+import threading
+import time
 from datetime import date
 from pathlib import Path
 from typing import Optional
@@ -9,11 +13,22 @@ from rich.console import Console
 from rich.table import Table
 
 from .config import ConfigError, IngestConfig, load_config
-from .pipeline import sync_from_tip, sync_range
-from .qa import QAError, verify_date
+from .backfill import backfill_parallel
+from .blkfiles import BlockFileError
+from .catalog import CatalogError, PartCatalog
+from .compact import CompactionError, compact_data_root
+from .convert import ConversionError, convert_data_root
+from .follow import FollowError, follow_tip
+from .lookup import LookupScan, PointLookupError, lookup_outpoint, lookup_tx, parse_outpoint
+from .pipeline import sync_blockfiles, sync_from_tip, sync_range, sync_range_async
+from .qa import QAError, daily_stats_path, run_batch_checks, verify_date
 from .rpc import BitcoinRPCClient, RPCError
+from .status import DEFAULT_RUNS, StatusError, ingest_status
+from .utxoset import UtxoSet, UtxoSetError, catch_up
 
 app = typer.Typer(help="ONCHAIN LAB ingest CLI", add_completion=False)
+lookup_app = typer.Typer(help="Find one transaction or outpoint by txid", add_completion=False)
+app.add_typer(lookup_app, name="lookup")
 console = Console()
 
 
@@ -25,6 +40,17 @@ def _config(path: Optional[Path]) -> IngestConfig:
         raise typer.Exit(code=1) from exc
 
 
+def _with_verbosity(cfg: IngestConfig, verbose: bool) -> IngestConfig:
+    if not verbose:
+        return cfg
+    return cfg.model_copy(
+        update={"telemetry": cfg.telemetry.model_copy(update={"log_heights": True})}
+    )
+
+
+_VERBOSE_OPTION = typer.Option(False, "--verbose", "-v", help="Log every processed height")
+
+
 def _client(cfg: IngestConfig) -> BitcoinRPCClient:
     user, password = cfg.rpc.credentials()
     return BitcoinRPCClient(cfg.rpc.host, cfg.rpc.port, user, password)
@@ -51,17 +77,50 @@ def init(config_path: Optional[Path] = typer.Option(None, "--config", path_type=
 def backfill(
     from_height: int = typer.Option(..., "--from", min=0, help="Start height inclusive"),
     to_height: int = typer.Option(..., "--to", min=0, help="End height inclusive"),
+    async_io: bool = typer.Option(
+        False, "--async-io", help="Use the asyncio RPC client and overlap fetches with writes"
+    ),
+    source: str = typer.Option(
+        "rpc", "--source", help="Block source: 'rpc' (bitcoind) or 'files' (blk*.dat)"
+    ),
+    blocks_dir: Optional[Path] = typer.Option(
+        None, "--blocks-dir", path_type=Path, help="Override blocks_dir for --source files"
+    ),
+    workers: int = typer.Option(
+        1, "--workers", min=1, help="Ingest bucket-aligned shards in N parallel processes"
+    ),
+    min_depth: int = typer.Option(
+        100, "--min-depth", min=0, help="With --workers, heights this close to the tip run serially"
+    ),
+    verbose: bool = _VERBOSE_OPTION,
     config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
 ) -> None:
     """Backfill a specific height range."""
     if to_height < from_height:
         console.print("[red]--to must be >= --from[/red]")
         raise typer.Exit(code=1)
+    if source not in {"rpc", "files"}:
+        console.print("[red]--source must be 'rpc' or 'files'[/red]")
+        raise typer.Exit(code=1)
+    if workers > 1 and (source != "rpc" or async_io):
+        console.print("[red]--workers only applies to --source rpc without --async-io[/red]")
+        raise typer.Exit(code=1)
 
-    cfg = _config(config_path)
+    cfg = _with_verbosity(_config(config_path), verbose)
+    if blocks_dir is not None:
+        cfg = cfg.model_copy(update={"blocks_dir": blocks_dir.resolve()})
     try:
-        counts = sync_range(from_height, to_height, config=cfg)
-    except (RPCError, ConfigError) as exc:
+        if workers > 1:
+            counts = backfill_parallel(
+                from_height, to_height, workers=workers, config=cfg, min_depth=min_depth
+            )
+        elif source == "files":
+            counts = sync_blockfiles(from_height, to_height, config=cfg)
+        elif async_io:
+            counts = asyncio.run(sync_range_async(from_height, to_height, config=cfg))
+        else:
+            counts = sync_range(from_height, to_height, config=cfg)
+    except (RPCError, ConfigError, BlockFileError) as exc:
         console.print(f"[red]Backfill failed:[/red] {exc}")
         raise typer.Exit(code=2) from exc
 
@@ -71,10 +130,11 @@ def backfill(
 @app.command()
 def catchup(
     max_blocks: int = typer.Option(2000, "--max-blocks", min=1),
+    verbose: bool = _VERBOSE_OPTION,
     config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
 ) -> None:
     """Ingest up to N blocks from the current tip backward."""
-    cfg = _config(config_path)
+    cfg = _with_verbosity(_config(config_path), verbose)
     try:
         counts = sync_from_tip(max_blocks, config=cfg)
     except (RPCError, ConfigError) as exc:
@@ -84,6 +144,331 @@ def catchup(
     console.print(f"Catchup processed: {counts}")
 
 
+@app.command()
+def follow(
+    zmq_endpoint: Optional[str] = typer.Option(
+        None, "--zmq", help="Override follow.zmq_endpoint, e.g. tcp://127.0.0.1:28332"
+    ),
+    max_blocks: Optional[int] = typer.Option(
+        None,
+        "--max-blocks",
+        min=1,
+        help="Exit after ingesting N blocks (default: run until stopped)",
+    ),
+    verbose: bool = _VERBOSE_OPTION,
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Follow the node tip as a long-running process, ingesting blocks as they arrive."""
+    cfg = _with_verbosity(_config(config_path), verbose)
+    if zmq_endpoint is not None:
+        cfg = cfg.model_copy(
+            update={"follow": cfg.follow.model_copy(update={"zmq_endpoint": zmq_endpoint})}
+        )
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: stop.set())
+    try:
+        counts = follow_tip(config=cfg, stop=stop, max_blocks=max_blocks)
+    except KeyboardInterrupt:
+        console.print("Stopped following the tip.")
+        return
+    except (RPCError, ConfigError, FollowError) as exc:
+        console.print(f"[red]Follow failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+
+    console.print(f"Follow processed: {counts}")
+
+
+@app.command()
+def compact(
+    workers: int = typer.Option(2, "--workers", min=1, help="Buckets compacted in parallel"),
+    memory_mb: int = typer.Option(
+        2048, "--memory-mb", min=64, help="Memory shared by all workers before spilling"
+    ),
+    min_depth: int = typer.Option(
+        100, "--min-depth", min=0, help="Leave buckets within this many heights of the tip"
+    ),
+    row_group_rows: Optional[int] = typer.Option(
+        None,
+        "--row-group-rows",
+        min=1,
+        help="Rows per row group (default: writer profile, else 524288)",
+    ),
+    file_rows: int = typer.Option(16 * 1024 * 1024, "--file-rows", min=1),
+    dataset: Optional[list[str]] = typer.Option(None, "--dataset", help="Restrict to dataset(s)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only list the buckets to compact"),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Merge part files per height bucket into sorted files with statistics."""
+    cfg = _config(config_path)
+    try:
+        results = compact_data_root(
+            cfg,
+            workers=workers,
+            memory_mb=memory_mb,
+            min_depth=min_depth,
+            row_group_rows=row_group_rows,
+            file_rows=file_rows,
+            datasets=dataset,
+            dry_run=dry_run,
+        )
+    except CompactionError as exc:
+        console.print(f"[red]Compaction failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+
+    table = Table(title="Compaction", show_header=True, header_style="bold")
+    for column in ("Dataset", "Bucket", "Status", "Files", "Rows", "MB in", "MB out"):
+        table.add_column(column)
+    for result in results:
+        if result.status.startswith("skipped") and not dry_run:
+            continue
+        table.add_row(
+            result.dataset,
+            str(result.bucket),
+            result.status,
+            f"{result.files_in} -> {result.files_out}",
+            f"{result.rows:,}",
+            f"{result.bytes_in / 1e6:.1f}",
+            f"{result.bytes_out / 1e6:.1f}",
+        )
+    console.print(table)
+    statuses = [result.status.split(":")[0] for result in results]
+    console.print(
+        f"compacted={statuses.count('compacted')} planned={statuses.count('planned')} "
+        f"skipped={statuses.count('skipped')}"
+    )
+
+
+@app.command("convert-schema")
+def convert_schema(
+    to_version: str = typer.Option(
+        "ingest.v2", "--to", help="Target schema: ingest.v1 or ingest.v2"
+    ),
+    dataset: Optional[list[str]] = typer.Option(None, "--dataset", help="Restrict to dataset(s)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count the files to convert"),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Rewrite committed Parquet files to another ingest schema version."""
+    cfg = _config(config_path)
+    try:
+        results = convert_data_root(cfg, version=to_version, datasets=dataset, dry_run=dry_run)
+    except ConversionError as exc:
+        console.print(f"[red]Conversion failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+
+    table = Table(title=f"Convert to {to_version}", show_header=True, header_style="bold")
+    for column in ("Dataset", "Files", "Already", "Rows", "MB in", "MB out"):
+        table.add_column(column)
+    for result in results:
+        table.add_row(
+            result.dataset,
+            str(result.files),
+            str(result.skipped),
+            f"{result.rows:,}",
+            f"{result.bytes_in / 1e6:.1f}",
+            f"{result.bytes_out / 1e6:.1f}",
+        )
+    console.print(table)
+    if cfg.schema_version != to_version and not dry_run:
+        console.print(
+            f"[yellow]Set schema_version: \"{to_version}\" so new heights match.[/yellow]"
+        )
+
+
+@app.command()
+def catalog(
+    rebuild: bool = typer.Option(
+        False, "--rebuild", help="Re-list every bucket directory and mark the catalog complete"
+    ),
+    verify_files: bool = typer.Option(
+        False, "--verify", help="Check every catalogued file's size and footer checksum"
+    ),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Show, rebuild or verify the part catalog readers use instead of globbing."""
+    cfg = _config(config_path)
+    try:
+        with PartCatalog.for_config(cfg) as parts:
+            if rebuild:
+                changed = parts.rebuild(cfg)
+                console.print(
+                    "Catalog rebuilt: "
+                    + " ".join(f"{dataset}={count}" for dataset, count in changed.items())
+                    + " rows changed"
+                )
+            problems = parts.verify() if verify_files else []
+            totals = parts.totals()
+            complete = parts.complete
+    except CatalogError as exc:
+        console.print(f"[red]Catalog failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+
+    table = Table(title="Part catalog", show_header=True, header_style="bold")
+    for column in ("Dataset", "Files", "Rows", "MB"):
+        table.add_column(column)
+    for dataset, (files, rows, size) in sorted(totals.items()):
+        table.add_row(dataset, f"{files:,}", f"{rows:,}", f"{size / 1e6:.1f}")
+    console.print(table)
+    if not complete:
+        console.print(
+            "[yellow]Catalog incomplete; readers glob until `catalog --rebuild` runs.[/yellow]"
+        )
+    for problem in problems:
+        console.print(f"[red]{problem}[/red]")
+    if problems:
+        raise typer.Exit(code=1)
+
+
+@app.command("utxo-set")
+def utxo_set(
+    sync: bool = typer.Option(
+        False, "--sync", help="Apply processed heights the set has not seen, read from the datasets"
+    ),
+    through: Optional[int] = typer.Option(
+        None, "--through", min=0, help="Stop syncing at this height"
+    ),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Show the live UTXO set, or catch it up with the ingested heights."""
+    from .state import ProcessedHeightIndex
+
+    cfg = _config(config_path)
+    try:
+        if sync:
+            height_index = ProcessedHeightIndex(cfg.data_root)
+            with height_index, UtxoSet.for_config(cfg) as utxos:
+                started = time.perf_counter()
+                applied, missing = catch_up(cfg, height_index, through=through, utxos=utxos)
+                console.print(
+                    f"Applied {applied:,} heights in {time.perf_counter() - started:.1f}s "
+                    f"({missing:,} spends of unknown outputs)"
+                )
+                status = utxos.status()
+        else:
+            existing = UtxoSet.open_existing(cfg)
+            if existing is None:
+                console.print("[yellow]No UTXO set yet; build one with `utxo-set --sync`.[/yellow]")
+                raise typer.Exit(code=1)
+            with existing as utxos:
+                status = utxos.status()
+    except UtxoSetError as exc:
+        console.print(f"[red]UTXO set failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+
+    table = Table(title="UTXO set", show_header=True, header_style="bold")
+    table.add_column("Field")
+    table.add_column("Value")
+    table.add_row("applied_height", str(status.applied_height))
+    table.add_row("undo_from", str(status.undo_from))
+    table.add_row("outputs", f"{status.outputs:,}")
+    table.add_row("value_btc", f"{status.value_sats / 1e8:,.8f}")
+    console.print(table)
+
+
+def _print_scans(scans: dict[str, LookupScan], started: float) -> None:
+    total = sum(scans.values(), LookupScan())
+    console.print(
+        f"[dim]Read {total.row_groups_read}/{total.row_groups} row groups in "
+        f"{total.files_read}/{total.files} files "
+        f"({', '.join(f'{dataset}={scan.row_groups_read}' for dataset, scan in scans.items())}) "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms[/dim]"
+    )
+
+
+def _outpoint(txid: object, vout: object) -> str:
+    return f"{txid}:{vout}" if txid is not None else "coinbase"
+
+
+@lookup_app.command("tx")
+def lookup_transaction(
+    txid: str = typer.Argument(..., help="Transaction id as 64 hex characters"),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Show a transaction with its inputs and outputs."""
+    cfg = _config(config_path)
+    started = time.perf_counter()
+    try:
+        result = lookup_tx(cfg, txid)
+    except PointLookupError as exc:
+        console.print(f"[red]Lookup failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+    if result.transaction is None:
+        console.print(f"[yellow]Transaction {result.txid} not found.[/yellow]")
+        _print_scans(result.scans, started)
+        raise typer.Exit(code=1)
+
+    summary = Table(title=f"Transaction {result.txid}", show_header=True, header_style="bold")
+    summary.add_column("Field")
+    summary.add_column("Value")
+    for key, value in result.transaction.items():
+        summary.add_row(key, str(value))
+    console.print(summary)
+
+    inputs = Table(title="Inputs", show_header=True, header_style="bold")
+    for column in ("Idx", "Spends", "Value sats", "Sequence"):
+        inputs.add_column(column)
+    for row in result.inputs:
+        inputs.add_row(
+            str(row["idx"]),
+            _outpoint(row["prev_txid"], row["prev_vout"]),
+            "-" if row.get("prev_value_sats") is None else f"{row['prev_value_sats']:,}",
+            str(row["sequence"]),
+        )
+    console.print(inputs)
+
+    outputs = Table(title="Outputs", show_header=True, header_style="bold")
+    for column in ("Idx", "Value sats", "Script type", "Addresses"):
+        outputs.add_column(column)
+    for row in result.outputs:
+        outputs.add_row(
+            str(row["idx"]),
+            f"{row['value_sats']:,}",
+            str(row["script_type"]),
+            ", ".join(row["addresses"] or []),  # type: ignore[arg-type]
+        )
+    console.print(outputs)
+    _print_scans(result.scans, started)
+
+
+@lookup_app.command("outpoint")
+def lookup_spend(
+    outpoint: str = typer.Argument(..., help="Outpoint as <txid>:<vout>"),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Show an output and the input that spent it."""
+    cfg = _config(config_path)
+    started = time.perf_counter()
+    try:
+        txid, vout = parse_outpoint(outpoint)
+        result = lookup_outpoint(cfg, txid, vout)
+    except PointLookupError as exc:
+        console.print(f"[red]Lookup failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+    if result.output is None:
+        console.print(f"[yellow]Output {_outpoint(result.txid, result.vout)} not found.[/yellow]")
+        _print_scans(result.scans, started)
+        raise typer.Exit(code=1)
+
+    table = Table(
+        title=f"Outpoint {_outpoint(result.txid, result.vout)}",
+        show_header=True,
+        header_style="bold",
+    )
+    table.add_column("Field")
+    table.add_column("Value")
+    table.add_row("height", str(result.height))
+    table.add_row("value_sats", f"{result.output['value_sats']:,}")
+    table.add_row("script_type", str(result.output["script_type"]))
+    table.add_row("addresses", ", ".join(result.output["addresses"] or []))  # type: ignore[arg-type]
+    if result.spent_by is None:
+        table.add_row("spent_by", "[green]unspent[/green]")
+    else:
+        table.add_row("spent_by", _outpoint(result.spent_by["txid"], result.spent_by["idx"]))
+        spent_height = "-" if result.spent_height is None else str(result.spent_height)
+        table.add_row("spent_height", spent_height)
+    console.print(table)
+    _print_scans(result.scans, started)
+
+
 @app.command()
 def verify(
     date_str: str = typer.Argument(..., help="Date (YYYY-MM-DD) to verify"),
@@ -105,6 +490,47 @@ def verify(
     console.print(table)
 
 
+@app.command("verify-batch")
+def verify_batch(
+    all_days: bool = typer.Option(
+        False, "--all-days", help="Also record stats for every ingested day"
+    ),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Check every configured golden day in one scan and update daily_ingest_stats."""
+    cfg = _config(config_path)
+    try:
+        result = run_batch_checks(config=cfg, all_days=all_days)
+    except QAError as exc:
+        console.print(f"[red]QA failed:[/red] {exc}")
+        raise typer.Exit(code=3) from exc
+
+    table = Table(title="Golden days", show_header=True, header_style="bold")
+    for column in ("Day", "Blocks", "Transactions", "Coinbase sats", "Status"):
+        table.add_column(column)
+    for day in sorted(cfg.qa.golden_days):
+        row = result.stats.get(day)
+        status = "[red]FAIL[/red]" if day in result.failures else "[green]PASS[/green]"
+        table.add_row(
+            day.isoformat(),
+            str(row.blocks) if row else "-",
+            str(row.transactions) if row else "-",
+            str(row.coinbase_sats) if row else "-",
+            status,
+        )
+    console.print(table)
+    reused = sum(1 for day in result.stats if day not in result.scanned)
+    console.print(
+        f"Scanned {len(result.scanned)} days, reused {reused}; stats in {daily_stats_path(cfg)}"
+    )
+    for day in result.changed:
+        console.print(f"[yellow]Stats changed since last run:[/yellow] {day.isoformat()}")
+    for message in result.failures.values():
+        console.print(f"[red]{message}[/red]")
+    if result.failures:
+        raise typer.Exit(code=3)
+
+
 @app.command()
 def info(config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path)) -> None:
     """Display the active ingest configuration."""
@@ -119,6 +545,19 @@ def info(config_path: Optional[Path] = typer.Option(None, "--config", path_type=
     table.add_row("zstd_level", str(cfg.zstd_level))
     table.add_row("max_blocks_per_run", str(cfg.limits.max_blocks_per_run))
     table.add_row("io_batch_size", str(cfg.limits.io_batch_size))
+    table.add_row("fetch_workers", str(cfg.limits.fetch_workers))
+    table.add_row("prefetch_depth", str(cfg.limits.prefetch_depth))
+    table.add_row("rpc_batch_size", str(cfg.limits.rpc_batch_size))
+    table.add_row("block_format", cfg.block_format)
+    table.add_row("network", cfg.network)
+    table.add_row("writer_mode", cfg.writer_mode)
+    table.add_row("schema_version", cfg.schema_version)
+    table.add_row("utxo_set", str(cfg.utxo_set))
+    table.add_row("blocks_dir", str(cfg.blocks_dir) if cfg.blocks_dir else "-")
+    table.add_row(
+        "metrics_textfile",
+        str(cfg.telemetry.metrics_textfile) if cfg.telemetry.metrics_textfile else "-",
+    )
     table.add_row("rpc_host", cfg.rpc.host)
     table.add_row("rpc_port", str(cfg.rpc.port))
     table.add_row("qa_golden_days", ", ".join(day.isoformat() for day in cfg.qa.golden_days))
@@ -126,17 +565,85 @@ def info(config_path: Optional[Path] = typer.Option(None, "--config", path_type=
     console.print(table)
 
 
+@app.command()
+def status(
+    json_output: bool = typer.Option(
+        False, "--json", help="Emit JSON for monitoring instead of tables"
+    ),
+    runs: int = typer.Option(
+        DEFAULT_RUNS, "--runs", min=1, help="Recent runs behind the ingest rate"
+    ),
+    all_buckets: bool = typer.Option(
+        False, "--buckets", help="List every bucket, not only incomplete ones"
+    ),
+    config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path),
+) -> None:
+    """Show progress, holes and per-bucket completeness from the state store and part catalog."""
+    cfg = _config(config_path)
+    try:
+        report = ingest_status(cfg, runs=runs)
+    except StatusError as exc:
+        console.print(f"[red]Status failed:[/red] {exc}")
+        raise typer.Exit(code=2) from exc
+    if json_output:
+        typer.echo(report.to_json())
+        return
+
+    table = Table(title="Ingest status", show_header=True, header_style="bold")
+    table.add_column("Field")
+    table.add_column("Value")
+    table.add_row("data_root", str(report.data_root))
+    table.add_row("processed", f"{report.processed:,}")
+    table.add_row("height_range", f"{report.min_height} - {report.max_height}")
+    table.add_row("max_contiguous", str(report.max_contiguous))
+    holes = ", ".join(f"{hole.first}-{hole.last}" for hole in report.holes[:5])
+    if len(report.holes) > 5:
+        holes += f", ... ({len(report.holes) - 5} more)"
+    table.add_row("holes", holes or "-")
+    for dataset, (files, rows, size) in sorted(report.datasets.items()):
+        table.add_row(dataset, f"{files:,} files, {rows:,} rows, {size / 1e6:,.1f} MB")
+    rate = report.blocks_per_second
+    table.add_row(
+        "ingest_rate",
+        f"{rate:,.1f} blocks/s over {len(report.runs)} runs" if rate is not None else "-",
+    )
+    console.print(table)
+
+    shown = report.buckets if all_buckets else report.incomplete_buckets
+    if shown:
+        buckets = Table(title="Buckets", show_header=True, header_style="bold")
+        for column in ("Bucket", "Heights", "Block rows", "Files", "MB", "Complete"):
+            buckets.add_column(column)
+        for bucket in shown:
+            rows = bucket.block_rows
+            buckets.add_row(
+                str(bucket.bucket),
+                f"{bucket.heights_done:,}/{bucket.heights_expected:,}",
+                f"{rows:,}" if rows is not None else "-",
+                f"{sum(files for files, _, _ in bucket.parts.values()):,}",
+                f"{bucket.bytes / 1e6:,.1f}",
+                "yes" if bucket.complete else "[yellow]no[/yellow]",
+            )
+        console.print(buckets)
+    complete = len(report.buckets) - len(report.incomplete_buckets)
+    console.print(f"{complete:,} of {len(report.buckets):,} buckets complete")
+    if not report.catalog_complete:
+        console.print(
+            "[yellow]No complete part catalog; run `catalog --rebuild` for file figures.[/yellow]"
+        )
+
+
 @app.command()
 def progress(config_path: Optional[Path] = typer.Option(None, "--config", path_type=Path)) -> None:
     """Display blockchain ingestion progress."""
     from datetime import datetime
-    from .pipeline import ProcessedHeightIndex
+    from .state import ProcessedHeightIndex
     
     cfg = _config(config_path)
     
-    # Get processed height
-    idx = ProcessedHeightIndex(cfg.data_root)
-    max_height = idx.max_height()
+    # Get processed heights
+    with ProcessedHeightIndex(cfg.data_root) as idx:
+        markers = list(idx.heights())
     
     # Get blockchain tip
     try:
@@ -146,25 +653,9 @@ def progress(config_path: Optional[Path] = typer.Option(None, "--config", path_t
         console.print(f"[red]Failed to get blockchain tip:[/red] {exc}")
         raise typer.Exit(code=2) from exc
     
-    # Count marker files
-    marker_dir = cfg.data_root / "_markers"
-    if marker_dir.exists():
-        markers = sorted([
-            int(f.stem) for f in marker_dir.glob("*.done")
-            if f.stem.isdigit()
-        ])
-        processed_count = len(markers)
-        if markers:
-            min_height = min(markers)
-            max_marker = max(markers)
-        else:
-            min_height = -1
-            max_marker = -1
-    else:
-        processed_count = 0
-        min_height = -1
-        max_marker = -1
-        markers = []
+    processed_count = len(markers)
+    min_height = markers[0] if markers else -1
+    max_marker = markers[-1] if markers else -1
     
     # Check for gaps
     gaps = []
@@ -175,16 +666,25 @@ def progress(config_path: Optional[Path] = typer.Option(None, "--config", path_t
                 gaps.append((prev + 1, h - 1))
             prev = h
     
-    # Count data files
-    blocks_dir = cfg.data_root / "blocks"
-    tx_dir = cfg.data_root / "tx"
-    txin_dir = cfg.data_root / "txin"
-    txout_dir = cfg.data_root / "txout"
-    
-    block_files = len(list(blocks_dir.glob("**/*.parquet"))) if blocks_dir.exists() else 0
-    tx_files = len(list(tx_dir.glob("**/*.parquet"))) if tx_dir.exists() else 0
-    txin_files = len(list(txin_dir.glob("**/*.parquet"))) if txin_dir.exists() else 0
-    txout_files = len(list(txout_dir.glob("**/*.parquet"))) if txout_dir.exists() else 0
+    # Count data files; the part catalog answers without walking the dataset trees.
+    parts = PartCatalog.open_existing(cfg)
+    if parts is not None:
+        with parts:
+            totals = parts.totals()
+        block_files, tx_files, txin_files, txout_files = (
+            totals.get(dataset, (0, 0, 0))[0]
+            for dataset in ("blocks", "transactions", "txin", "txout")
+        )
+    else:
+        blocks_dir = cfg.data_root / "blocks"
+        tx_dir = cfg.data_root / "tx"
+        txin_dir = cfg.data_root / "txin"
+        txout_dir = cfg.data_root / "txout"
+
+        block_files = len(list(blocks_dir.glob("**/*.parquet"))) if blocks_dir.exists() else 0
+        tx_files = len(list(tx_dir.glob("**/*.parquet"))) if tx_dir.exists() else 0
+        txin_files = len(list(txin_dir.glob("**/*.parquet"))) if txin_dir.exists() else 0
+        txout_files = len(list(txout_dir.glob("**/*.parquet"))) if txout_dir.exists() else 0
     
     # Calculate progress
     total_blocks = tip + 1
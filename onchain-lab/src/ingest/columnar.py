@@ -0,0 +1,183 @@
+"""Column buffers for the ingest hot path.
+
+Parsers append values straight into per-dataset Python lists laid out by the
+Arrow schemas in :mod:`ingest.schemas`; each flush turns the lists into one
+``pa.RecordBatch`` and validates it with Arrow compute kernels. This replaces
+building a pydantic model per row, dumping it back to a dict and going through
+``pa.Table.from_pylist``. The pydantic models stay the reference row format
+(:meth:`BlockColumns.to_models` converts back for callers that need them).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import BaseModel
+
+from .hashes import hex_to_binary
+from .schemas import (
+    HASH_COLUMNS,
+    HASH_TYPE,
+    SCHEMA_VERSION,
+    Block,
+    Transaction,
+    TxIn,
+    TxOut,
+    schema_for,
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+DATASETS: Tuple[str, ...] = ("blocks", "transactions", "txin", "txout")
+
+_MODELS: Dict[str, type[BaseModel]] = {
+    "blocks": Block,
+    "transactions": Transaction,
+    "txin": TxIn,
+    "txout": TxOut,
+}
+
+# Columns the pydantic models allow to be ``None``; everything else must be set.
+_NULLABLE: Dict[str, frozenset[str]] = {
+    "blocks": frozenset(),
+    "transactions": frozenset(),
+    "txin": frozenset(
+        {"prev_txid", "prev_vout", "prev_value_sats", "prev_script_type", "prev_height"}
+    ),
+    "txout": frozenset({"address_ids"}),
+}
+
+_NON_NEGATIVE: Dict[str, Tuple[str, ...]] = {
+    "blocks": ("height", "size", "weight", "tx_count"),
+    "transactions": ("height", "size", "weight", "vin_count", "vout_count"),
+    "txin": ("idx",),
+    "txout": ("idx", "value_sats"),
+}
+
+
+class ColumnValidationError(ValueError):
+    """Raised when a flushed column batch violates the ingest schema."""
+
+
+class ParsedBlock(NamedTuple):
+    hash: str
+    time_utc: datetime
+    tx_count: int
+    vin_count: int
+    vout_count: int
+
+
+def epoch_micros(value: datetime) -> int:
+    """UTC microseconds since the epoch; naive datetimes are rejected like the models do."""
+    if not isinstance(value, datetime):
+        raise ColumnValidationError(f"Expected datetime in UTC, received {value!r}")
+    if value.tzinfo is None:
+        raise ColumnValidationError("Datetime must be timezone aware in UTC.")
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class DatasetColumns:
+    """Append-only column lists for one dataset, in schema field order.
+
+    Hash columns always buffer hex strings; ``ingest.v2`` batches pack them to
+    32-byte binary when the batch is built.
+    """
+
+    def __init__(self, dataset: str, schema_version: str = SCHEMA_VERSION) -> None:
+        self.dataset = dataset
+        self.schema: pa.Schema = schema_for(dataset, schema_version)
+        self.columns: Dict[str, List[object]] = {name: [] for name in self.schema.names}
+        self._first = self.columns[self.schema.names[0]]
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def clear(self) -> None:
+        for values in self.columns.values():
+            values.clear()
+
+    def to_record_batch(self) -> pa.RecordBatch:
+        arrays = [
+            hex_to_binary(pa.array(self.columns[field.name], type=pa.string()))
+            if field.type == HASH_TYPE and field.name in HASH_COLUMNS[self.dataset]
+            else pa.array(self.columns[field.name], type=field.type)
+            for field in self.schema
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        validate_batch(self.dataset, batch)
+        return batch
+
+    def rows(self) -> Iterator[Dict[str, object]]:
+        names = self.schema.names
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+def validate_batch(dataset: str, batch: pa.RecordBatch) -> None:
+    """Vectorized equivalent of the per-row pydantic checks."""
+    nullable = _NULLABLE[dataset]
+    for name in batch.schema.names:
+        if name in nullable:
+            continue
+        column = batch.column(name)
+        if column.null_count:
+            raise ColumnValidationError(
+                f"{dataset}.{name} has {column.null_count} missing values"
+            )
+    for name in _NON_NEGATIVE[dataset]:
+        column = batch.column(name)
+        if len(column) and pc.min(column).as_py() < 0:
+            raise ColumnValidationError(f"{dataset}.{name} contains negative values")
+
+
+class BlockColumns:
+    """Column buffers for the four ingest datasets."""
+
+    def __init__(self, schema_version: str = SCHEMA_VERSION) -> None:
+        self.schema_version = schema_version
+        self.blocks = DatasetColumns("blocks", schema_version)
+        self.transactions = DatasetColumns("transactions", schema_version)
+        self.txin = DatasetColumns("txin", schema_version)
+        self.txout = DatasetColumns("txout", schema_version)
+
+    def __getitem__(self, dataset: str) -> DatasetColumns:
+        return getattr(self, dataset)
+
+    def to_models(self) -> Tuple[Block, List[Transaction], List[TxIn], List[TxOut]]:
+        """Materialize the buffered rows as pydantic records (single block only)."""
+        if len(self.blocks) != 1:
+            raise ColumnValidationError("to_models expects exactly one buffered block")
+        converted: Dict[str, List[BaseModel]] = {}
+        for dataset in DATASETS:
+            model = _MODELS[dataset]
+            records: List[BaseModel] = []
+            for row in self[dataset].rows():
+                if "time_utc" in row:
+                    row["time_utc"] = _from_micros(int(row["time_utc"]))  # type: ignore[arg-type]
+                records.append(model(**row))
+            converted[dataset] = records
+        return (
+            converted["blocks"][0],  # type: ignore[return-value]
+            converted["transactions"],  # type: ignore[list-item]
+            converted["txin"],  # type: ignore[list-item]
+            converted["txout"],  # type: ignore[list-item]
+        )
+
+
+__all__ = [
+    "BlockColumns",
+    "ColumnValidationError",
+    "DATASETS",
+    "DatasetColumns",
+    "ParsedBlock",
+    "epoch_micros",
+    "validate_batch",
+]
@@ -0,0 +1,374 @@
+"""Rewrite height buckets into a few large, sorted, statistics-rich Parquet files.
+
+Each (dataset, bucket) directory is merged with an external DuckDB sort, so the
+memory used per bucket is capped by DuckDB's ``memory_limit`` and spills to
+``_compact/spill``. Every dataset but ``blocks`` is sorted by ``txid``, so each
+row group covers a narrow txid range and point lookups read one of them. The
+sorted rows stream into ``pq.ParquetWriter`` with column statistics, the page
+index and txid bloom filters (:func:`ingest.writer.lookup_write_options`),
+encoded as the dataset's writer profile says (``writer_profiles`` in the
+ingest config). The result is staged outside the
+dataset tree and swapped in with two directory renames. A swap record under
+``_compact/`` lets :func:`recover_swaps` finish a swap that was interrupted.
+
+Only buckets that are fully ingested, at least ``min_depth`` heights below the
+highest processed height and free of in-progress writer files are touched, so
+compaction never races ingest or reorg rollback.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow.lib import ArrowException
+
+from .catalog import bucket_directories, sync_directories
+from .config import IngestConfig
+from .hashes import source_sql, to_schema_version
+from .state import ProcessedHeightIndex
+from .writer import compacted_file_name, ensure_schema, lookup_write_options, profile_write_options
+
+SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "blocks": ("height",),
+    "transactions": ("txid",),
+    "txin": ("txid", "idx"),
+    "txout": ("txid", "idx"),
+}
+
+DEFAULT_ROW_GROUP_ROWS = 512 * 1024
+
+_IN_PROGRESS_SUFFIXES = (".inprogress", ".tmp")
+
+
+class CompactionError(RuntimeError):
+    """Raised when a bucket cannot be compacted."""
+
+
+class BucketResult(NamedTuple):
+    dataset: str
+    bucket: int
+    status: str
+    files_in: int = 0
+    files_out: int = 0
+    rows: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+class _MemoryBudget:
+    """Byte budget shared by compaction workers; oversized jobs run alone."""
+
+    def __init__(self, total: int) -> None:
+        self._total = total
+        self._available = total
+        self._condition = threading.Condition()
+
+    def acquire(self, amount: int) -> int:
+        amount = min(max(amount, 1), self._total)
+        with self._condition:
+            while self._available < amount:
+                self._condition.wait()
+            self._available -= amount
+        return amount
+
+    def release(self, amount: int) -> None:
+        with self._condition:
+            self._available += amount
+            self._condition.notify_all()
+
+
+def _skip_reason(
+    directory: Path,
+    dataset: str,
+    bucket: int,
+    *,
+    cfg: IngestConfig,
+    height_index: ProcessedHeightIndex,
+    safe_height: int,
+) -> Optional[str]:
+    bucket_end = bucket + cfg.height_bucket_size - 1
+    if bucket_end > safe_height:
+        return "within min_depth of the processed tip"
+    entries = list(directory.iterdir())
+    if any(entry.name.endswith(_IN_PROGRESS_SUFFIXES) for entry in entries):
+        return "writer files in progress"
+    parts = [entry for entry in entries if entry.suffix == ".parquet"]
+    if not parts:
+        return "empty"
+    compacted_prefix = f"part-{dataset}-c"
+    if all(entry.name.startswith(compacted_prefix) for entry in parts):
+        return "already compacted"
+    missing = next(
+        (height for height in range(bucket, bucket_end + 1) if not height_index.is_done(height)),
+        None,
+    )
+    if missing is not None:
+        return f"height {missing} not ingested"
+    return None
+
+
+def _uncompressed_bytes(paths: Sequence[Path]) -> int:
+    total = 0
+    for path in paths:
+        metadata = pq.read_metadata(path)
+        total += sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return total
+
+
+def _swap_record(cfg: IngestConfig, dataset: str, bucket: int) -> Path:
+    return cfg.data_root / "_compact" / f"swap-{dataset}-{bucket}.json"
+
+
+def _finish_swap(record: Path) -> Path:
+    """Complete the swap described by ``record``; returns the bucket directory."""
+    with record.open("r", encoding="utf-8") as handle:
+        state = json.load(handle)
+    target, staging, retired = (Path(state[key]) for key in ("target", "staging", "retired"))
+    if staging.exists():
+        if target.exists() and not retired.exists():
+            os.replace(target, retired)
+        if not target.exists():
+            os.replace(staging, target)
+    if retired.exists():
+        shutil.rmtree(retired)
+    record.unlink(missing_ok=True)
+    return target
+
+
+def recover_swaps(cfg: IngestConfig) -> int:
+    """Complete directory swaps left behind by an interrupted compaction."""
+    work_dir = cfg.data_root / "_compact"
+    if not work_dir.exists():
+        return 0
+    records = sorted(work_dir.glob("swap-*.json"))
+    for record in records:
+        dataset = record.stem[len("swap-"):].rpartition("-")[0]
+        sync_directories(cfg, dataset, [_finish_swap(record)])
+    return len(records)
+
+
+def compact_bucket(
+    cfg: IngestConfig,
+    dataset: str,
+    bucket: int,
+    directory: Path,
+    *,
+    memory_limit_bytes: int,
+    row_group_rows: int,
+    file_rows: int,
+) -> BucketResult:
+    """Merge every part file of one bucket into sorted files and swap them in."""
+    sources = sorted(directory.glob("*.parquet"))
+    schema = ensure_schema(dataset, cfg.schema_version)
+    work_dir = cfg.data_root / "_compact"
+    staging = work_dir / "staging" / f"{dataset}-{bucket}"
+    retired = work_dir / "retired" / f"{dataset}-{bucket}"
+    spill = work_dir / "spill" / f"{dataset}-{bucket}"
+    for path in (staging, retired, spill):
+        shutil.rmtree(path, ignore_errors=True)
+    staging.mkdir(parents=True)
+    spill.mkdir(parents=True)
+
+    order = ", ".join(f'"{name}"' for name in SORT_KEYS[dataset])
+    # Buckets may mix ingest.v1 and ingest.v2 files; output uses the configured version.
+    # Only quoted column names and file paths are interpolated.
+    query = f"SELECT * FROM ({source_sql(sources, dataset)}) ORDER BY {order}"  # noqa: S608
+
+    outputs: List[Path] = []
+    rows = 0
+    writer: pq.ParquetWriter | None = None
+    file_rows_written = 0
+    connection = duckdb.connect(database=":memory:")
+    try:
+        connection.execute("SET TimeZone = 'UTC'")
+        connection.execute("SET threads = 1")
+        connection.execute(f"SET memory_limit = '{max(memory_limit_bytes // (1024 * 1024), 64)}MB'")
+        connection.execute(f"SET temp_directory = '{str(spill).replace(chr(39), chr(39) * 2)}'")
+        connection.execute("SET preserve_insertion_order = false")
+        result = connection.execute(query)
+        # duckdb >= 1.4 renamed fetch_record_batch to to_arrow_reader.
+        open_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        reader = open_reader(row_group_rows)
+        for batch in _rebatch(reader, row_group_rows):
+            table = to_schema_version(pa.Table.from_batches([batch]), dataset, cfg.schema_version)
+            table = table.cast(schema)
+            if writer is None or file_rows_written >= file_rows:
+                if writer is not None:
+                    writer.close()
+                target = staging / compacted_file_name(dataset, bucket, len(outputs))
+                outputs.append(target)
+                writer = pq.ParquetWriter(
+                    target,
+                    schema,
+                    compression=cfg.compression,
+                    compression_level=cfg.zstd_level,
+                    coerce_timestamps="us",
+                    **profile_write_options(schema, cfg.writer_profiles.get(dataset)),
+                    **lookup_write_options(schema, row_group_rows),
+                )
+                file_rows_written = 0
+            writer.write_table(table, row_group_size=row_group_rows)
+            file_rows_written += table.num_rows
+            rows += table.num_rows
+        if writer is not None:
+            writer.close()
+            writer = None
+    except (duckdb.Error, ArrowException, OSError) as exc:
+        if writer is not None:
+            writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise CompactionError(f"Failed to compact {dataset} bucket {bucket}: {exc}") from exc
+    finally:
+        connection.close()
+        shutil.rmtree(spill, ignore_errors=True)
+
+    if sorted(directory.glob("*.parquet")) != sources:
+        shutil.rmtree(staging, ignore_errors=True)
+        return BucketResult(dataset, bucket, "skipped: changed during compaction")
+
+    bytes_in = sum(path.stat().st_size for path in sources)
+    bytes_out = sum(path.stat().st_size for path in outputs)
+    # Keep anything that is not a part file (e.g. sidecars) with the bucket.
+    for entry in directory.iterdir():
+        if entry.suffix != ".parquet":
+            shutil.copy2(entry, staging / entry.name)
+    record = _swap_record(cfg, dataset, bucket)
+    retired.parent.mkdir(parents=True, exist_ok=True)
+    temp_record = record.with_suffix(".tmp")
+    with temp_record.open("w", encoding="utf-8") as handle:
+        json.dump(
+            {"target": str(directory), "staging": str(staging), "retired": str(retired)}, handle
+        )
+    os.replace(temp_record, record)
+    _finish_swap(record)
+    sync_directories(cfg, dataset, [directory])
+    return BucketResult(
+        dataset,
+        bucket,
+        "compacted",
+        files_in=len(sources),
+        files_out=len(outputs),
+        rows=rows,
+        bytes_in=bytes_in,
+        bytes_out=bytes_out,
+    )
+
+
+def _rebatch(reader: pa.RecordBatchReader, rows: int) -> Iterable[pa.RecordBatch]:
+    """Regroup DuckDB's vector-sized batches into row-group-sized ones."""
+    buffered: List[pa.RecordBatch] = []
+    count = 0
+    for batch in reader:
+        buffered.append(batch)
+        count += batch.num_rows
+        if count >= rows:
+            combined = pa.Table.from_batches(buffered).combine_chunks()
+            yield from combined.to_batches(max_chunksize=rows)
+            buffered = []
+            count = 0
+    if buffered:
+        yield from pa.Table.from_batches(buffered).combine_chunks().to_batches(max_chunksize=rows)
+
+
+def compact_data_root(
+    cfg: IngestConfig,
+    *,
+    workers: int = 2,
+    memory_mb: int = 2048,
+    min_depth: int = 100,
+    row_group_rows: Optional[int] = None,
+    file_rows: int = 16 * 1024 * 1024,
+    datasets: Optional[Sequence[str]] = None,
+    dry_run: bool = False,
+) -> List[BucketResult]:
+    """Compact every eligible (dataset, bucket) under ``cfg.data_root``.
+
+    ``row_group_rows`` overrides the row-group size of every dataset; without
+    it each dataset uses its writer profile's, or ``DEFAULT_ROW_GROUP_ROWS``.
+    """
+    if workers < 1 or memory_mb < 1:
+        raise CompactionError("workers and memory_mb must be positive.")
+    selected = list(datasets or SORT_KEYS)
+    unknown = sorted(set(selected).difference(SORT_KEYS))
+    if unknown:
+        raise CompactionError(f"Unknown datasets {unknown}. Expected one of {sorted(SORT_KEYS)}.")
+
+    recover_swaps(cfg)
+    results: List[BucketResult] = []
+    jobs: List[Tuple[str, int, Path, List[Path]]] = []
+    with ProcessedHeightIndex(cfg.data_root) as height_index:
+        safe_height = height_index.max_height() - min_depth
+        for dataset in selected:
+            for bucket, directory in bucket_directories(cfg, dataset).items():
+                reason = _skip_reason(
+                    directory,
+                    dataset,
+                    bucket,
+                    cfg=cfg,
+                    height_index=height_index,
+                    safe_height=safe_height,
+                )
+                if reason is not None:
+                    results.append(BucketResult(dataset, bucket, f"skipped: {reason}"))
+                    continue
+                sources = sorted(directory.glob("*.parquet"))
+                if dry_run:
+                    results.append(
+                        BucketResult(
+                            dataset,
+                            bucket,
+                            "planned",
+                            files_in=len(sources),
+                            bytes_in=sum(path.stat().st_size for path in sources),
+                        )
+                    )
+                    continue
+                jobs.append((dataset, bucket, directory, sources))
+
+    total_budget = memory_mb * 1024 * 1024
+    budget = _MemoryBudget(total_budget)
+    per_job_limit = max(total_budget // workers, 64 * 1024 * 1024)
+
+    def run(job: Tuple[str, int, Path, List[Path]]) -> BucketResult:
+        dataset, bucket, directory, sources = job
+        profile = cfg.writer_profiles.get(dataset)
+        rows = row_group_rows or (profile and profile.row_group_rows) or DEFAULT_ROW_GROUP_ROWS
+        # DuckDB spills past its limit; the budget only keeps concurrent jobs under memory_mb.
+        reserved = budget.acquire(min(_uncompressed_bytes(sources), per_job_limit))
+        try:
+            return compact_bucket(
+                cfg,
+                dataset,
+                bucket,
+                directory,
+                memory_limit_bytes=reserved,
+                row_group_rows=rows,
+                file_rows=file_rows,
+            )
+        finally:
+            budget.release(reserved)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compact") as pool:
+        results.extend(pool.map(run, jobs))
+    return sorted(results, key=lambda result: (result.dataset, result.bucket))
+
+
+__all__ = [
+    "BucketResult",
+    "CompactionError",
+    "DEFAULT_ROW_GROUP_ROWS",
+    "SORT_KEYS",
+    "bucket_directories",
+    "compact_bucket",
+    "compact_data_root",
+    "recover_swaps",
+]
@@ -3,19 +3,24 @@ from __future__ import annotations
 import os
 from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
+import pyarrow as pa
 import yaml
 from pydantic import (
     BaseModel,
     Field,
+    NonNegativeInt,
     PositiveFloat,
     PositiveInt,
     ValidationError,
     field_validator,
+    model_validator,
 )
 from dotenv import load_dotenv
 
+from .schemas import SCHEMA_REGISTRIES
+
 _CONFIG_DEFAULT_PATH = Path("config/ingest.yaml")
 _ENV_LOADED = False
 
@@ -38,6 +43,7 @@ class RPCConfig(BaseModel):
     user_env: str = Field(alias="user_env")
     pass_env: str = Field(alias="pass_env")
     timeout_seconds: PositiveFloat = Field(default=120.0)
+    max_in_flight: PositiveInt = Field(default=8)
 
     model_config = {"populate_by_name": True}
 
@@ -54,6 +60,39 @@ class RPCConfig(BaseModel):
 class LimitsConfig(BaseModel):
     max_blocks_per_run: PositiveInt
     io_batch_size: PositiveInt
+    fetch_workers: PositiveInt = Field(default=1)
+    prefetch_depth: NonNegativeInt = Field(default=0)
+    rpc_batch_size: PositiveInt = Field(default=1)
+    row_group_bytes: PositiveInt = Field(default=64 * 1024 * 1024)
+    address_cache_size: PositiveInt = Field(default=1_000_000)
+    reorg_window: PositiveInt = Field(default=144)
+    utxo_undo_depth: PositiveInt = Field(default=1008)
+    memory_budget_bytes: Optional[PositiveInt] = Field(default=None)
+
+
+class FollowConfig(BaseModel):
+    zmq_endpoint: Optional[str] = Field(default=None)
+    poll_timeout_seconds: PositiveFloat = Field(default=30.0)
+
+    @field_validator("zmq_endpoint", mode="before")
+    @classmethod
+    def _blank_endpoint(cls, value: Optional[str]) -> Optional[str]:
+        if value in (None, ""):
+            return None
+        return value
+
+
+class TelemetryConfig(BaseModel):
+    metrics_textfile: Optional[Path] = Field(default=None)
+    progress_interval_seconds: PositiveFloat = Field(default=10.0)
+    log_heights: bool = Field(default=False)
+
+    @field_validator("metrics_textfile", mode="before")
+    @classmethod
+    def _expand_textfile(cls, value: str | Path | None) -> Path | None:
+        if value is None or value == "":
+            return None
+        return Path(value).expanduser().resolve()
 
 
 def _parse_date(value: str) -> date:
@@ -80,6 +119,60 @@ def _validate_golden_days(values: GoldenDayList) -> List[date]:
     return normalized
 
 
+# Parquet encodings a writer profile may pin, and the Arrow types each one can encode
+# such that DuckDB still reads the file (it rejects BYTE_STREAM_SPLIT on anything but floats).
+PARQUET_ENCODINGS: Dict[str, Callable[[pa.DataType], bool]] = {
+    "PLAIN": lambda arrow_type: True,
+    "RLE": pa.types.is_boolean,
+    "DELTA_BINARY_PACKED": lambda arrow_type: (
+        pa.types.is_integer(arrow_type) or pa.types.is_timestamp(arrow_type)
+    ),
+    "DELTA_LENGTH_BYTE_ARRAY": lambda arrow_type: (
+        pa.types.is_string(arrow_type) or pa.types.is_binary(arrow_type)
+    ),
+    "DELTA_BYTE_ARRAY": lambda arrow_type: (
+        pa.types.is_string(arrow_type)
+        or pa.types.is_binary(arrow_type)
+        or pa.types.is_fixed_size_binary(arrow_type)
+    ),
+    "BYTE_STREAM_SPLIT": pa.types.is_floating,
+}
+
+
+class WriterProfile(BaseModel):
+    """Parquet layout of one dataset; unset fields keep the writer defaults.
+
+    ``dictionary`` lists the columns to dictionary-encode (all of them when
+    unset). Columns in ``encodings`` are written with that encoding instead and
+    must not be listed in ``dictionary``.
+    """
+
+    dictionary: Optional[List[str]] = Field(default=None)
+    encodings: Dict[str, str] = Field(default_factory=dict)
+    row_group_rows: Optional[PositiveInt] = Field(default=None)
+    data_page_size: Optional[PositiveInt] = Field(default=None)
+
+    @field_validator("encodings")
+    @classmethod
+    def _validate_encodings(cls, mapping: Dict[str, str]) -> Dict[str, str]:
+        upper = {column: encoding.upper() for column, encoding in mapping.items()}
+        unknown = sorted(set(upper.values()).difference(PARQUET_ENCODINGS))
+        if unknown:
+            raise ConfigError(
+                f"Unsupported encodings {unknown}. Expected one of {sorted(PARQUET_ENCODINGS)}."
+            )
+        return upper
+
+    @model_validator(mode="after")
+    def _validate_overlap(self) -> "WriterProfile":
+        both = sorted(set(self.dictionary or ()).intersection(self.encodings))
+        if both:
+            raise ConfigError(
+                f"Columns {both} cannot be dictionary-encoded and have an explicit encoding."
+            )
+        return self
+
+
 class QAConfig(BaseModel):
     golden_days: List[date] = Field(default_factory=list)
     tolerance_pct: float
@@ -103,9 +196,95 @@ class IngestConfig(BaseModel):
     rpc: RPCConfig
     limits: LimitsConfig
     qa: QAConfig
+    follow: FollowConfig = Field(default_factory=FollowConfig)
+    telemetry: TelemetryConfig = Field(default_factory=TelemetryConfig)
+    block_format: str = Field(default="verbose")
+    network: str = Field(default="main")
+    blocks_dir: Optional[Path] = Field(default=None)
+    writer_mode: str = Field(default="per_height")
+    schema_version: str = Field(default="ingest.v1")
+    intern_addresses: bool = Field(default=False)
+    utxo_set: bool = Field(default=False)
+    writer_profiles: Dict[str, WriterProfile] = Field(default_factory=dict)
 
     model_config = {"arbitrary_types_allowed": True}
 
+    @model_validator(mode="after")
+    def _validate_utxo_set(self) -> "IngestConfig":
+        if not self.utxo_set:
+            return self
+        if not self.intern_addresses:
+            raise ConfigError("utxo_set keys outputs by address id and requires intern_addresses.")
+        if self.limits.utxo_undo_depth < self.limits.reorg_window:
+            raise ConfigError("limits.utxo_undo_depth must be at least limits.reorg_window.")
+        return self
+
+    @model_validator(mode="after")
+    def _validate_writer_profiles(self) -> "IngestConfig":
+        registry = SCHEMA_REGISTRIES[self.schema_version]
+        for dataset, profile in self.writer_profiles.items():
+            if dataset not in registry:
+                raise ConfigError(f"writer_profiles has unknown dataset '{dataset}'.")
+            schema = registry[dataset]
+            named = set(profile.dictionary or ()).union(profile.encodings)
+            unknown = sorted(named.difference(schema.names))
+            if unknown:
+                raise ConfigError(f"writer_profiles.{dataset} names unknown columns {unknown}.")
+            for column, encoding in profile.encodings.items():
+                arrow_type = schema.field(column).type
+                if pa.types.is_list(arrow_type):
+                    arrow_type = arrow_type.value_type
+                if not PARQUET_ENCODINGS[encoding](arrow_type):
+                    raise ConfigError(
+                        f"writer_profiles.{dataset}: {encoding} cannot encode {column} "
+                        f"({arrow_type}) in {self.schema_version}."
+                    )
+        return self
+
+    @field_validator("block_format")
+    @classmethod
+    def _validate_block_format(cls, value: str) -> str:
+        permitted = {"verbose", "prevout", "raw"}
+        lowered = value.lower()
+        if lowered not in permitted:
+            raise ConfigError(
+                f"Unsupported block_format '{value}'. Expected one of {sorted(permitted)}."
+            )
+        return lowered
+
+    @field_validator("network")
+    @classmethod
+    def _validate_network(cls, value: str) -> str:
+        permitted = {"main", "test", "signet", "regtest"}
+        lowered = value.lower()
+        if lowered not in permitted:
+            raise ConfigError(
+                f"Unsupported network '{value}'. Expected one of {sorted(permitted)}."
+            )
+        return lowered
+
+    @field_validator("writer_mode")
+    @classmethod
+    def _validate_writer_mode(cls, value: str) -> str:
+        permitted = {"per_height", "rolling"}
+        lowered = value.lower()
+        if lowered not in permitted:
+            raise ConfigError(
+                f"Unsupported writer_mode '{value}'. Expected one of {sorted(permitted)}."
+            )
+        return lowered
+
+    @field_validator("schema_version")
+    @classmethod
+    def _validate_schema_version(cls, value: str) -> str:
+        permitted = {"ingest.v1", "ingest.v2"}
+        lowered = value.lower()
+        if lowered not in permitted:
+            raise ConfigError(
+                f"Unsupported schema_version '{value}'. Expected one of {sorted(permitted)}."
+            )
+        return lowered
+
     @field_validator("compression")
     @classmethod
     def _validate_compression(cls, value: str) -> str:
@@ -136,6 +315,13 @@ class IngestConfig(BaseModel):
     def _expand_data_root(cls, value: str | Path) -> Path:
         return Path(value).resolve()
 
+    @field_validator("blocks_dir", mode="before")
+    @classmethod
+    def _expand_blocks_dir(cls, value: str | Path | None) -> Path | None:
+        if value is None or value == "":
+            return None
+        return Path(value).expanduser().resolve()
+
 
 def load_config(path: Optional[Path] = None, dotenv_path: Optional[Path] = None) -> IngestConfig:
     """Load ingest configuration from YAML and environment variables."""
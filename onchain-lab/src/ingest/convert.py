@@ -0,0 +1,131 @@
+"""Rewrite committed ingest files between the ingest.v1 and ingest.v2 layouts.
+
+Files are converted one row group at a time into a hidden temp file next to
+the original and swapped in with ``os.replace``, so an interrupted run leaves
+every file either fully old or fully new and can simply be restarted. Footer
+key-value metadata (e.g. the rolling writer's height offsets) is carried over.
+Files are encoded as the dataset's writer profile says; without one, hash
+columns are written without dictionary encoding: 32 random bytes never repeat
+often enough for a dictionary to pay off. Row groups are kept as they are.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+import pyarrow.parquet as pq
+from pyarrow.lib import ArrowException
+
+from .catalog import bucket_directories, sync_directories
+from .compact import SORT_KEYS, recover_swaps
+from .config import IngestConfig, WriterProfile
+from .hashes import to_schema_version
+from .schemas import HASH_COLUMNS, SCHEMA_VERSION_V2, SCHEMA_VERSIONS, schema_for, schema_version_of
+from .writer import lookup_write_options, profile_write_options
+
+
+class ConversionError(RuntimeError):
+    """Raised when a file cannot be converted to the requested schema version."""
+
+
+class ConversionResult(NamedTuple):
+    dataset: str
+    files: int
+    skipped: int
+    rows: int
+    bytes_in: int
+    bytes_out: int
+
+
+def _committed_files(directory: Path) -> List[Path]:
+    return sorted(
+        path
+        for path in directory.glob("*.parquet")
+        if not path.name.startswith(".")
+    )
+
+
+def convert_file(path: Path, dataset: str, version: str, *, cfg: IngestConfig) -> int:
+    """Rewrite ``path`` in the ``version`` layout; returns the number of rows."""
+    target = schema_for(dataset, version)
+    source = pq.ParquetFile(path)
+    metadata = dict(source.schema_arrow.metadata or {})
+    metadata.update(target.metadata or {})
+    schema = target.with_metadata(metadata)
+    temp_path = path.with_name(f".{path.name}.convert.tmp")
+    group_rows = max(
+        (source.metadata.row_group(index).num_rows for index in range(source.num_row_groups)),
+        default=1,
+    )
+    profile = cfg.writer_profiles.get(dataset) or WriterProfile(
+        dictionary=[name for name in schema.names if name not in HASH_COLUMNS[dataset]]
+    )
+    rows = 0
+    try:
+        with pq.ParquetWriter(
+            temp_path,
+            schema,
+            compression=cfg.compression,
+            compression_level=cfg.zstd_level,
+            coerce_timestamps="us",
+            **profile_write_options(schema, profile),
+            **lookup_write_options(schema, group_rows),
+        ) as writer:
+            for index in range(source.num_row_groups):
+                table = to_schema_version(source.read_row_group(index), dataset, version)
+                writer.write_table(table.cast(schema), row_group_size=max(table.num_rows, 1))
+                rows += table.num_rows
+        os.replace(temp_path, path)
+    except (OSError, ArrowException, ValueError) as exc:
+        temp_path.unlink(missing_ok=True)
+        raise ConversionError(f"Failed to convert {path} to {version}: {exc}") from exc
+    finally:
+        source.close()
+    return rows
+
+
+def convert_data_root(
+    cfg: IngestConfig,
+    *,
+    version: str = SCHEMA_VERSION_V2,
+    datasets: Optional[Sequence[str]] = None,
+    dry_run: bool = False,
+) -> List[ConversionResult]:
+    """Convert every committed file under ``cfg.data_root`` to ``version``."""
+    if version not in SCHEMA_VERSIONS:
+        raise ConversionError(
+            f"Unknown schema version '{version}'. Expected one of {list(SCHEMA_VERSIONS)}."
+        )
+    selected = list(datasets or SORT_KEYS)
+    unknown = sorted(set(selected).difference(SORT_KEYS))
+    if unknown:
+        raise ConversionError(f"Unknown datasets {unknown}. Expected one of {sorted(SORT_KEYS)}.")
+
+    recover_swaps(cfg)
+    results: List[ConversionResult] = []
+    for dataset in selected:
+        files = skipped = rows = bytes_in = bytes_out = 0
+        for directory in bucket_directories(cfg, dataset).values():
+            converted = files
+            for path in _committed_files(directory):
+                if schema_version_of(pq.read_schema(path)) == version:
+                    skipped += 1
+                    continue
+                files += 1
+                size = path.stat().st_size
+                bytes_in += size
+                if dry_run:
+                    rows += pq.read_metadata(path).num_rows
+                    bytes_out += size
+                    continue
+                rows += convert_file(path, dataset, version, cfg=cfg)
+                bytes_out += path.stat().st_size
+            if files > converted and not dry_run:
+                sync_directories(cfg, dataset, [directory])
+        results.append(ConversionResult(dataset, files, skipped, rows, bytes_in, bytes_out))
+    return results
+
+
+__all__ = ["ConversionError", "ConversionResult", "convert_data_root", "convert_file"]
@@ -0,0 +1,272 @@
+"""Tip-following ingest daemon behind ``onchain follow``.
+
+One long-running process keeps the RPC client, the block prefetcher, the
+height index and the writers open, and ingests each block as soon as the node
+announces it. New blocks are noticed through a ZMQ ``hashblock`` subscription
+when ``follow.zmq_endpoint`` is set, otherwise by long-polling
+``waitfornewblock`` (nodes without it are polled with ``getbestblockhash``).
+Every wake-up ends in ``getblockcount``, so a missed notification only delays
+a block until the next timeout.
+
+Reorgs are resolved against the ingestor's header ring (the last
+``limits.reorg_window`` headers): one batched ``getblockhash`` call over the
+ring finds the fork point, and only the heights above it are rolled back and
+re-ingested.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Protocol
+
+import httpx
+
+from .config import IngestConfig, load_config
+from .pipeline import (
+    BlockPrefetcher,
+    _create_rpc_client,
+    _memory_budget,
+    _RangeIngestor,
+    _rewind,
+    console,
+)
+from .rpc import BitcoinRPCClient, RPCError, RPCResponseError
+from .state import BlockHeader, ProcessedHeightIndex
+from .telemetry import IngestStats
+
+_METHOD_NOT_FOUND = -32601
+_RETRY_DELAY_SECONDS = 5.0
+
+
+class FollowError(RuntimeError):
+    """Raised when the tip follower cannot be started."""
+
+
+class TipNotifier(Protocol):
+    def wait(self, known_tip: Optional[str], timeout_seconds: float) -> None:
+        """Return once the node tip may differ from ``known_tip`` or the timeout passes."""
+
+    def close(self) -> None:
+        ...
+
+
+class RPCTipNotifier:
+    """Long-polls ``waitfornewblock``; polls ``getbestblockhash`` on nodes without it."""
+
+    def __init__(self, client: BitcoinRPCClient, *, poll_interval_seconds: float = 0.25) -> None:
+        self._client = client
+        self._poll_interval = poll_interval_seconds
+        self._long_poll = True
+
+    def wait(self, known_tip: Optional[str], timeout_seconds: float) -> None:
+        # waitfornewblock only reports changes after the call starts; check first.
+        if self._client.get_best_block_hash() != known_tip:
+            return
+        if self._long_poll:
+            try:
+                self._client.wait_for_new_block(timeout_seconds)
+                return
+            except RPCResponseError as exc:
+                if exc.code != _METHOD_NOT_FOUND:
+                    raise
+                console.log("Node has no waitfornewblock; polling getbestblockhash instead")
+                self._long_poll = False
+        deadline = time.monotonic() + timeout_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self._poll_interval)
+            if self._client.get_best_block_hash() != known_tip:
+                return
+
+    def close(self) -> None:
+        return None
+
+
+class ZMQTipNotifier:
+    """Waits for bitcoind ``-zmqpubhashblock`` messages."""
+
+    def __init__(self, endpoint: str) -> None:
+        try:
+            import zmq
+        except ImportError as exc:
+            raise FollowError(
+                "follow.zmq_endpoint requires the pyzmq package (install the 'zmq' extra)."
+            ) from exc
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.SUB)
+        self._socket.setsockopt(zmq.SUBSCRIBE, b"hashblock")
+        self._socket.connect(endpoint)
+
+    def wait(self, known_tip: Optional[str], timeout_seconds: float) -> None:
+        if self._socket.poll(int(timeout_seconds * 1000)):
+            # Several blocks may have queued up; one catch-up pass covers them all.
+            while self._socket.poll(0):
+                self._socket.recv_multipart()
+
+    def close(self) -> None:
+        self._socket.close(linger=0)
+        self._context.term()
+
+
+class TipFollower:
+    """Ingests up to the node tip on each :meth:`step`, handling reorgs incrementally."""
+
+    def __init__(
+        self,
+        cfg: IngestConfig,
+        client: BitcoinRPCClient,
+        height_index: ProcessedHeightIndex,
+        *,
+        stats: IngestStats | None = None,
+    ) -> None:
+        self._cfg = cfg
+        self._client = client
+        self.height_index = height_index
+        self.ingestor = _RangeIngestor(cfg, height_index, stats=stats)
+        self._prefetcher = BlockPrefetcher(
+            client,
+            depth=cfg.limits.prefetch_depth,
+            workers=cfg.limits.fetch_workers,
+            batch_size=cfg.limits.rpc_batch_size,
+            block_format=cfg.block_format,
+            budget=_memory_budget(cfg, self.ingestor.stats),
+        )
+
+    @property
+    def tip(self) -> Optional[BlockHeader]:
+        return self.ingestor.headers.tip
+
+    def _next_height(self) -> int:
+        tip = self.tip
+        return tip.height + 1 if tip else self.height_index.max_height() + 1
+
+    def step(self, max_blocks: Optional[int] = None) -> int:
+        """Ingest every block up to the node tip; returns how many were ingested."""
+        node_tip = self._client.get_block_count()
+        self.ingestor.stats.target = node_tip
+        top = self.tip
+        if top is not None and node_tip <= top.height:
+            # Nothing new above us, but the node may have switched to a shorter branch.
+            self._check_stale_tip(node_tip)
+        ingested = 0
+        height = self._next_height()
+        while height <= node_tip and (max_blocks is None or ingested < max_blocks):
+            _, block = self._prefetcher.fetch(height, end_height=node_tip)
+            resume_height = self._reorg_resume_height(height, block)
+            if resume_height is not None:
+                self._prefetcher.reset()
+                height = resume_height
+                continue
+            self.ingestor.ingest(height, block)
+            ingested += 1
+            height += 1
+        return ingested
+
+    def _check_stale_tip(self, node_tip: int) -> None:
+        if node_tip < 0:
+            return
+        node_hash = self._client.get_block_hashes([node_tip])[0]
+        stored = dict(self.ingestor.headers.newest_first(node_tip)).get(node_tip)
+        if node_hash == stored and node_tip == self.tip.height:  # type: ignore[union-attr]
+            return
+        console.log(f"Node tip moved to height {node_tip} on another branch")
+        self._rewind(node_tip)
+
+    def _reorg_resume_height(self, height: int, block: Dict[str, object]) -> Optional[int]:
+        top = self.tip
+        previous = block.get("previousblockhash")
+        if top is None or height == 0 or not isinstance(previous, str):
+            return None
+        if (top.height, top.hash) == (height - 1, previous):
+            return None
+        console.log(
+            f"Detected reorg at height {height}: stored tip {top.hash} != node parent {previous}"
+        )
+        return self._rewind(height - 1)
+
+    def _rewind(self, max_height: int) -> int:
+        return _rewind(
+            max_height,
+            client=self._client,
+            ingestor=self.ingestor,
+            step=self._cfg.limits.rpc_batch_size,
+        )
+
+    def close(self) -> None:
+        """Flush buffered rows and commit open files."""
+        try:
+            self.ingestor.finish()
+        finally:
+            self.ingestor.close()
+            self._prefetcher.close()
+
+
+def _notifier(cfg: IngestConfig, client: BitcoinRPCClient) -> TipNotifier:
+    if cfg.follow.zmq_endpoint:
+        return ZMQTipNotifier(cfg.follow.zmq_endpoint)
+    return RPCTipNotifier(client)
+
+
+def follow_tip(
+    *,
+    config: IngestConfig | None = None,
+    client: BitcoinRPCClient | None = None,
+    notifier: TipNotifier | None = None,
+    stop: threading.Event | None = None,
+    max_blocks: int | None = None,
+) -> Dict[str, int]:
+    """Follow the node tip until ``stop`` is set or ``max_blocks`` blocks are ingested.
+
+    RPC failures, including an unreachable node, are logged and retried; the
+    follower only exits on ``stop``, ``max_blocks`` or a non-RPC error.
+    """
+    cfg = config or load_config()
+    cfg.data_root.mkdir(parents=True, exist_ok=True)
+    stop = stop or threading.Event()
+    timeout = cfg.follow.poll_timeout_seconds
+    if cfg.writer_mode == "rolling":
+        console.log("writer_mode=rolling: followed blocks become visible when their bucket commits")
+
+    stats = IngestStats()
+    created_client = client or _create_rpc_client(cfg, stats)
+    own_client = client is None
+    created_notifier = notifier or _notifier(cfg, created_client)
+    own_notifier = notifier is None
+    height_index = ProcessedHeightIndex(cfg.data_root)
+    follower = TipFollower(cfg, created_client, height_index, stats=stats)
+    total = 0
+    try:
+        console.log(f"Following tip from height {follower._next_height() - 1}")
+        while not stop.is_set():
+            remaining = None if max_blocks is None else max_blocks - total
+            try:
+                ingested = follower.step(remaining)
+                total += ingested
+                if max_blocks is not None and total >= max_blocks:
+                    break
+                if not ingested:
+                    created_notifier.wait(follower.tip.hash if follower.tip else None, timeout)
+            # The client re-raises transport errors once its own retries run out.
+            except (RPCError, httpx.HTTPError) as exc:
+                console.log(f"RPC failure while following tip, retrying: {exc}")
+                stop.wait(min(_RETRY_DELAY_SECONDS, timeout))
+    finally:
+        try:
+            follower.close()
+        finally:
+            height_index.close()
+            if own_notifier:
+                created_notifier.close()
+            if own_client:
+                created_client.close()
+    return dict(follower.ingestor.counts)
+
+
+__all__ = [
+    "FollowError",
+    "RPCTipNotifier",
+    "TipFollower",
+    "TipNotifier",
+    "ZMQTipNotifier",
+    "follow_tip",
+]
@@ -0,0 +1,276 @@
+"""Hash column codecs and the reader shim between ingest.v1 and ingest.v2 files.
+
+v1 files store block hashes and txids as 64-char hex strings, v2 files as
+``fixed_size_binary(32)`` in display byte order. The codecs below convert whole
+Arrow arrays with numpy lookups instead of per-value ``bytes.fromhex`` calls.
+
+A data root may hold both versions while it is being converted, so readers go
+through :func:`read_dataset` (Arrow) or :func:`source_sql` (DuckDB), which read
+each version separately and present one schema. :func:`create_hex_views` adds
+``<view>_hex`` views that show the binary columns as lowercase hex. Columns
+appended to a schema later (:data:`ingest.schemas.ADDED_COLUMNS`) read as nulls
+from files written before them.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .schemas import (
+    ADDED_COLUMNS,
+    HASH_COLUMNS,
+    HASH_TYPE,
+    SCHEMA_VERSION,
+    SCHEMA_VERSION_V2,
+    schema_for,
+    schema_version_of,
+)
+
+_HASH_BYTES = 32
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_NIBBLES = np.full(256, 255, dtype=np.uint8)
+for _value, _char in enumerate(b"0123456789abcdef"):
+    _NIBBLES[_char] = _value
+for _value, _char in enumerate(b"ABCDEF", start=10):
+    _NIBBLES[_char] = _value
+# Keep every chunk's hex output below the int32 offset limit of pa.string().
+_MAX_CHUNK = (2**31 - 1) // (2 * _HASH_BYTES)
+# DuckDB types of ADDED_COLUMNS, for selecting them from files that predate them.
+_ADDED_SQL_TYPES = {
+    "address_ids": "UBIGINT[]",
+    "prev_value_sats": "BIGINT",
+    "prev_script_type": "VARCHAR",
+    "prev_height": "BIGINT",
+}
+
+
+def _validity(array: pa.Array) -> pa.Buffer | None:
+    if not array.null_count:
+        return None
+    return pc.is_valid(array).buffers()[1]
+
+
+def _hex_chunk(array: pa.Array) -> pa.Array:
+    length = len(array)
+    filled = pc.fill_null(array.cast(pa.string()), "0" * (2 * _HASH_BYTES))
+    if length and pc.min_max(pc.utf8_length(filled)).as_py() != {"min": 64, "max": 64}:
+        raise ValueError("Hash columns must hold 64 hex characters per value")
+    offsets = np.frombuffer(filled.buffers()[1], dtype=np.int32)[filled.offset :]
+    data = np.frombuffer(filled.buffers()[2], dtype=np.uint8)
+    chars = data[offsets[0] : offsets[length]].reshape(length, 2 * _HASH_BYTES)
+    nibbles = _NIBBLES[chars]
+    if length and nibbles.max() == 255:
+        raise ValueError("Hash columns must hold hex digits only")
+    packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return pa.Array.from_buffers(
+        HASH_TYPE,
+        length,
+        [_validity(array), pa.py_buffer(packed.tobytes())],
+        null_count=array.null_count,
+    )
+
+
+def _binary_chunk(array: pa.Array) -> pa.Array:
+    length = len(array)
+    start = array.offset * _HASH_BYTES
+    data = np.frombuffer(array.buffers()[1], dtype=np.uint8)[start : start + length * _HASH_BYTES]
+    raw = data.reshape(length, _HASH_BYTES)
+    chars = np.empty((length, 2 * _HASH_BYTES), dtype=np.uint8)
+    chars[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    chars[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    offsets = np.arange(0, (length + 1) * 2 * _HASH_BYTES, 2 * _HASH_BYTES, dtype=np.int32)
+    return pa.Array.from_buffers(
+        pa.string(),
+        length,
+        [_validity(array), pa.py_buffer(offsets.tobytes()), pa.py_buffer(chars.tobytes())],
+        null_count=array.null_count,
+    )
+
+
+def _map_chunks(
+    values: pa.Array | pa.ChunkedArray,
+    convert: Callable[[pa.Array], pa.Array],
+    output: pa.DataType,
+) -> pa.Array | pa.ChunkedArray:
+    chunks = values.chunks if isinstance(values, pa.ChunkedArray) else [values]
+    converted: List[pa.Array] = []
+    for chunk in chunks:
+        for start in range(0, len(chunk), _MAX_CHUNK):
+            converted.append(convert(chunk.slice(start, _MAX_CHUNK)))
+    if isinstance(values, pa.ChunkedArray):
+        return pa.chunked_array(converted, type=output)
+    if not converted:
+        return pa.array([], type=output)
+    return converted[0] if len(converted) == 1 else pa.concat_arrays(converted)
+
+
+def hex_to_binary(values: pa.Array | pa.ChunkedArray) -> pa.Array | pa.ChunkedArray:
+    """Hex string hashes to ``fixed_size_binary(32)``; nulls are preserved."""
+    return _map_chunks(values, _hex_chunk, HASH_TYPE)
+
+
+def binary_to_hex(values: pa.Array | pa.ChunkedArray) -> pa.Array | pa.ChunkedArray:
+    """``fixed_size_binary(32)`` hashes to lowercase hex strings; nulls are preserved."""
+    return _map_chunks(values, _binary_chunk, pa.string())
+
+
+def to_schema_version(table: pa.Table, dataset: str, version: str) -> pa.Table:
+    """Convert the hash columns of ``table`` to the layout of ``version``.
+
+    Accepts hex text, ``fixed_size_binary(32)`` or plain binary (as DuckDB returns BLOBs).
+    Added columns missing from older files are appended as nulls.
+    """
+    target = schema_for(dataset, version)
+    for name in HASH_COLUMNS[dataset]:
+        index = table.schema.get_field_index(name)
+        if index < 0:
+            continue
+        column = table.column(index)
+        wanted = target.field(name).type
+        if column.type == wanted:
+            continue
+        is_text = pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+        if wanted == HASH_TYPE:
+            converted = hex_to_binary(column) if is_text else column.cast(HASH_TYPE)
+        elif is_text:
+            converted = column.cast(wanted)
+        else:
+            converted = binary_to_hex(column.cast(HASH_TYPE))
+        table = table.set_column(index, target.field(name), converted)
+    for name in ADDED_COLUMNS[dataset]:
+        if table.schema.get_field_index(name) < 0:
+            field = target.field(name)
+            table = table.append_column(field, pa.nulls(table.num_rows, type=field.type))
+    metadata = dict(table.schema.metadata or {})
+    metadata.update(target.metadata or {})
+    return table.replace_schema_metadata(metadata)
+
+
+def file_version(path: str | Path) -> str:
+    return schema_version_of(pq.read_schema(path))
+
+
+def _schemas_by_version(
+    paths: Iterable[str | Path],
+    layouts: Optional[Mapping[str, Tuple[str, Sequence[str]]]] = None,
+) -> Dict[str, List[Tuple[str, Sequence[str]]]]:
+    """``{version: [(path, column names)]}``, from ``layouts`` where known, else the footers."""
+    groups: Dict[str, List[Tuple[str, Sequence[str]]]] = {SCHEMA_VERSION: [], SCHEMA_VERSION_V2: []}
+    for path in paths:
+        layout = layouts.get(str(path)) if layouts is not None else None
+        if layout is None:
+            schema = pq.read_schema(path)
+            layout = (schema_version_of(schema), schema.names)
+        version, names = layout
+        groups.setdefault(version, []).append((str(path), names))
+    return groups
+
+
+def split_by_version(paths: Iterable[str | Path]) -> Dict[str, List[str]]:
+    """Group Parquet files by the schema version recorded in their footers."""
+    return {
+        version: [path for path, _ in files]
+        for version, files in _schemas_by_version(paths).items()
+    }
+
+
+def read_dataset(
+    paths: Sequence[str | Path], dataset: str, *, version: str = SCHEMA_VERSION_V2
+) -> pa.Table:
+    """Read v1 and v2 files of one dataset as a single table in ``version`` layout."""
+    target = schema_for(dataset, version)
+    tables = [
+        to_schema_version(pq.read_table(path, partitioning=None), dataset, version).cast(target)
+        for path in paths
+    ]
+    if not tables:
+        return target.empty_table()
+    return pa.concat_tables(tables).combine_chunks()
+
+
+def _sql_list(paths: Sequence[str]) -> str:
+    return "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in paths) + "]"
+
+
+def _select_sql(
+    files: List[Tuple[str, Sequence[str]]], dataset: str, *, unhex: bool
+) -> str:
+    hashes = set(HASH_COLUMNS[dataset])
+    present = {name for _, names in files for name in names}
+    columns: List[str] = []
+    for name in schema_for(dataset).names:
+        if name not in present and name in ADDED_COLUMNS[dataset]:
+            columns.append(f'CAST(NULL AS {_ADDED_SQL_TYPES[name]}) AS "{name}"')
+        elif unhex and name in hashes:
+            columns.append(f'unhex("{name}") AS "{name}"')
+        else:
+            columns.append(f'"{name}"')
+    listing = _sql_list([path for path, _ in files])
+    # union_by_name fills added columns with NULL for the older files of a group.
+    # Only quoted column names and file paths are interpolated.
+    return (
+        f"SELECT {', '.join(columns)} FROM read_parquet({listing}, "  # noqa: S608
+        "hive_partitioning = false, union_by_name = true)"
+    )
+
+
+def source_sql(
+    paths: Sequence[str | Path],
+    dataset: str,
+    *,
+    layouts: Optional[Mapping[str, Tuple[str, Sequence[str]]]] = None,
+) -> str:
+    """DuckDB ``SELECT`` over mixed-version files with hash columns normalized.
+
+    Hashes come out as BLOB when any v2 file is present (v1 values go through
+    ``unhex``) and as hex text when every file is still v1. Hive partition
+    columns are disabled so ``height=<bucket>`` directories never shadow the
+    ``height`` column. ``layouts`` maps paths to their ``(schema version,
+    column names)`` as recorded in the part catalog; those footers are not read.
+    """
+    groups = _schemas_by_version(paths, layouts)
+    selects: List[str] = []
+    if groups[SCHEMA_VERSION_V2]:
+        selects.append(_select_sql(groups[SCHEMA_VERSION_V2], dataset, unhex=False))
+    if groups[SCHEMA_VERSION]:
+        convert = bool(groups[SCHEMA_VERSION_V2])
+        selects.append(_select_sql(groups[SCHEMA_VERSION], dataset, unhex=convert))
+    if not selects:
+        raise ValueError(f"No parquet files given for dataset '{dataset}'")
+    return " UNION ALL ".join(selects)
+
+
+def create_hex_views(connection: duckdb.DuckDBPyConnection, views: Dict[str, str]) -> None:
+    """Create ``<view>_hex`` for each ``{view: dataset}`` with hashes shown as hex text."""
+    for view, dataset in views.items():
+        columns = connection.execute(f'DESCRIBE "{view}"').fetchall()
+        types = {row[0]: row[1] for row in columns}
+        replaced = [
+            f'lower(hex("{name}")) AS "{name}"'
+            for name in HASH_COLUMNS[dataset]
+            if types.get(name) == "BLOB"
+        ]
+        select = f"* REPLACE ({', '.join(replaced)})" if replaced else "*"
+        # Only view and column names are interpolated.
+        connection.execute(
+            f'CREATE OR REPLACE VIEW "{view}_hex" AS SELECT {select} FROM "{view}"'  # noqa: S608
+        )
+
+
+__all__ = [
+    "binary_to_hex",
+    "create_hex_views",
+    "file_version",
+    "hex_to_binary",
+    "read_dataset",
+    "source_sql",
+    "split_by_version",
+    "to_schema_version",
+]
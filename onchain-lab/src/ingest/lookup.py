@@ -0,0 +1,303 @@
+"""Point lookups of one transaction or outpoint without scanning whole datasets.
+
+A lookup first narrows the files. ``transactions`` is searched everywhere. The
+``txin`` and ``txout`` rows of a transaction sit in the bucket of its height,
+and spends can only come at or after that height. Files come from the part
+catalog when it is complete, else from listing the bucket directories.
+
+Each file's footer is then checked: row groups whose ``txid`` (or
+``prev_txid``) statistics cannot hold the key are dropped, and files with no
+row group left are never opened by DuckDB. Compacted buckets are sorted by
+txid, so usually one row group per bucket survives. DuckDB reads the
+remaining files with the key as a literal, so its own statistics and bloom
+filter checks (:func:`ingest.writer.lookup_write_options`) skip most of what
+the footers could not rule out in freshly ingested, height-ordered files.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow.lib import ArrowException
+
+from .catalog import PartCatalog, bucket_directories
+from .config import IngestConfig
+from .hashes import to_schema_version
+from .schemas import SCHEMA_VERSION, SCHEMA_VERSION_V2, schema_version_of
+
+_TXID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class PointLookupError(RuntimeError):
+    """Raised when a lookup key is malformed or the datasets cannot be read."""
+
+
+class LookupScan(NamedTuple):
+    """Files and row groups one lookup considered, and how many it had to read."""
+
+    files: int = 0
+    files_read: int = 0
+    row_groups: int = 0
+    row_groups_read: int = 0
+
+    def __add__(self, other: object) -> "LookupScan":
+        if not isinstance(other, LookupScan):
+            return NotImplemented
+        return LookupScan(*(left + right for left, right in zip(self, other)))
+
+
+class TxLookup(NamedTuple):
+    txid: str
+    transaction: Optional[Dict[str, object]]
+    inputs: List[Dict[str, object]]
+    outputs: List[Dict[str, object]]
+    scans: Dict[str, LookupScan]
+
+
+class OutpointLookup(NamedTuple):
+    txid: str
+    vout: int
+    height: Optional[int]
+    output: Optional[Dict[str, object]]
+    spent_by: Optional[Dict[str, object]]
+    spent_height: Optional[int]
+    scans: Dict[str, LookupScan]
+
+
+def parse_txid(text: str) -> str:
+    txid = text.strip().lower()
+    if not _TXID.match(txid):
+        raise PointLookupError(f"'{text}' is not a 64 character hex txid.")
+    return txid
+
+
+def parse_outpoint(text: str) -> Tuple[str, int]:
+    """``<txid>:<vout>`` to ``(txid, vout)``."""
+    txid, separator, vout = text.strip().rpartition(":")
+    if not separator or not vout.isdigit():
+        raise PointLookupError(f"'{text}' is not an outpoint of the form <txid>:<vout>.")
+    return parse_txid(txid), int(vout)
+
+
+def dataset_files(
+    cfg: IngestConfig,
+    dataset: str,
+    first_height: Optional[int] = None,
+    last_height: Optional[int] = None,
+    *,
+    catalog: Optional[PartCatalog] = None,
+) -> List[str]:
+    """Files of ``dataset`` that may hold heights ``first_height..last_height``.
+
+    ``catalog`` is a complete catalog the caller already holds open.
+    """
+    if catalog is not None:
+        return catalog.files(dataset, first_height, last_height)
+    opened = PartCatalog.open_existing(cfg)
+    if opened is not None:
+        with opened:
+            return opened.files(dataset, first_height, last_height)
+    files: List[str] = []
+    for bucket, directory in bucket_directories(cfg, dataset).items():
+        if first_height is not None and bucket + cfg.height_bucket_size <= first_height:
+            continue
+        if last_height is not None and bucket > last_height:
+            continue
+        files.extend(str(path) for path in sorted(directory.glob("*.parquet")))
+    return files
+
+
+def _key_value(txid: str, field: pa.Field) -> object:
+    return txid if pa.types.is_string(field.type) else bytes.fromhex(txid)
+
+
+def _may_hold(statistics: object, key: object) -> bool:
+    if statistics is None or not statistics.has_min_max:  # type: ignore[attr-defined]
+        return True
+    return statistics.min <= key <= statistics.max  # type: ignore[attr-defined]
+
+
+def _prune(paths: Sequence[str], column: str, txid: str) -> Tuple[Dict[str, List[str]], LookupScan]:
+    """Surviving files grouped by schema version, and the row groups that survived."""
+    survivors: Dict[str, List[str]] = {}
+    row_groups = row_groups_read = 0
+    for path in paths:
+        try:
+            metadata = pq.read_metadata(path)
+        except (OSError, ArrowException) as exc:
+            raise PointLookupError(f"Failed to read the footer of {path}: {exc}") from exc
+        schema = metadata.schema.to_arrow_schema()
+        index = schema.get_field_index(column)
+        if index < 0:
+            continue
+        key = _key_value(txid, schema.field(index))
+        row_groups += metadata.num_row_groups
+        kept = sum(
+            _may_hold(metadata.row_group(group).column(index).statistics, key)
+            for group in range(metadata.num_row_groups)
+        )
+        if kept:
+            row_groups_read += kept
+            survivors.setdefault(schema_version_of(schema), []).append(path)
+    files_read = sum(len(group) for group in survivors.values())
+    return survivors, LookupScan(len(paths), files_read, row_groups, row_groups_read)
+
+
+def _sql_list(paths: Sequence[str]) -> str:
+    return "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in paths) + "]"
+
+
+def _hash_literal(txid: str, version: str) -> str:
+    # Keys are validated hex, so they can be inlined; literals reach the Parquet filters.
+    return f"'{txid}'" if version == SCHEMA_VERSION else f"from_hex('{txid}')"
+
+
+class PointLookup:
+    """Lookups against one data root over a single DuckDB connection.
+
+    Opening a connection costs more than a pruned lookup, so the connection and
+    the part catalog stay open until :meth:`close`. :func:`lookup_tx` and
+    :func:`lookup_outpoint` wrap one-off lookups.
+    """
+
+    def __init__(self, cfg: IngestConfig) -> None:
+        self._cfg = cfg
+        self._catalog = PartCatalog.open_existing(cfg)
+        try:
+            self._connection = duckdb.connect(database=":memory:")
+            self._connection.execute("SET TimeZone = 'UTC'")
+        except duckdb.Error as exc:
+            self._close_catalog()
+            raise PointLookupError(f"Failed to open DuckDB for lookups: {exc}") from exc
+
+    def __enter__(self) -> "PointLookup":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _close_catalog(self) -> None:
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+
+    def close(self) -> None:
+        self._close_catalog()
+        self._connection.close()
+
+    def _files(
+        self, dataset: str, first_height: Optional[int] = None, last_height: Optional[int] = None
+    ) -> List[str]:
+        return dataset_files(self._cfg, dataset, first_height, last_height, catalog=self._catalog)
+
+    def _scan(
+        self,
+        dataset: str,
+        paths: Sequence[str],
+        column: str,
+        txid: str,
+        *,
+        equals: Optional[Mapping[str, int]] = None,
+    ) -> Tuple[List[Dict[str, object]], LookupScan]:
+        """Rows of ``dataset`` in ``paths`` where ``column`` is ``txid`` (and ``equals`` holds)."""
+        survivors, scan = _prune(paths, column, txid)
+        rows: List[Dict[str, object]] = []
+        try:
+            for version, files in survivors.items():
+                if version not in (SCHEMA_VERSION, SCHEMA_VERSION_V2):
+                    raise PointLookupError(f"Unknown schema version '{version}' in {files[0]}.")
+                conditions = [f'"{column}" = {_hash_literal(txid, version)}']
+                conditions.extend(
+                    f'"{name}" = {int(value)}' for name, value in (equals or {}).items()
+                )
+                # Only quoted names, escaped paths, validated hex and integers are interpolated.
+                table = self._connection.execute(
+                    f"SELECT * FROM read_parquet({_sql_list(files)}, "  # noqa: S608
+                    "hive_partitioning = false, union_by_name = true) "
+                    f"WHERE {' AND '.join(conditions)}"
+                ).arrow().read_all()
+                rows.extend(to_schema_version(table, dataset, SCHEMA_VERSION).to_pylist())
+        except duckdb.Error as exc:
+            raise PointLookupError(f"Failed to read {dataset}: {exc}") from exc
+        if rows and "idx" in rows[0]:
+            rows.sort(key=lambda row: int(row["idx"]))  # type: ignore[arg-type]
+        return rows, scan
+
+    def _transaction(self, txid: str) -> Tuple[Optional[Dict[str, object]], LookupScan]:
+        rows, scan = self._scan("transactions", self._files("transactions"), "txid", txid)
+        return (rows[0] if rows else None), scan
+
+    def tx(self, txid: str) -> TxLookup:
+        """The ``transactions`` row of ``txid`` with its inputs and outputs."""
+        txid = parse_txid(txid)
+        transaction, scan = self._transaction(txid)
+        scans = {"transactions": scan}
+        if transaction is None:
+            return TxLookup(txid, None, [], [], scans)
+        height = int(transaction["height"])  # type: ignore[arg-type]
+        found: Dict[str, List[Dict[str, object]]] = {}
+        for dataset in ("txin", "txout"):
+            found[dataset], scans[dataset] = self._scan(
+                dataset, self._files(dataset, height, height), "txid", txid
+            )
+        return TxLookup(txid, transaction, found["txin"], found["txout"], scans)
+
+    def outpoint(self, txid: str, vout: int) -> OutpointLookup:
+        """The output ``txid:vout`` and the input that spends it, if any."""
+        txid = parse_txid(txid)
+        transaction, scan = self._transaction(txid)
+        scans = {"transactions": scan}
+        if transaction is None:
+            return OutpointLookup(txid, vout, None, None, None, None, scans)
+        height = int(transaction["height"])  # type: ignore[arg-type]
+        outputs, scans["txout"] = self._scan(
+            "txout", self._files("txout", height, height), "txid", txid, equals={"idx": vout}
+        )
+        # An output can only be spent at or above the height that created it.
+        spends, scans["txin"] = self._scan(
+            "txin", self._files("txin", height), "prev_txid", txid, equals={"prev_vout": vout}
+        )
+        spent_by = spends[0] if spends else None
+        spent_height: Optional[int] = None
+        if spent_by is not None:
+            spender, scan = self._transaction(str(spent_by["txid"]))
+            scans["transactions"] = scans["transactions"] + scan
+            if spender is not None:
+                spent_height = int(spender["height"])  # type: ignore[arg-type]
+        return OutpointLookup(
+            txid,
+            vout,
+            height,
+            outputs[0] if outputs else None,
+            spent_by,
+            spent_height,
+            scans,
+        )
+
+
+def lookup_tx(cfg: IngestConfig, txid: str) -> TxLookup:
+    with PointLookup(cfg) as session:
+        return session.tx(txid)
+
+
+def lookup_outpoint(cfg: IngestConfig, txid: str, vout: int) -> OutpointLookup:
+    with PointLookup(cfg) as session:
+        return session.outpoint(txid, vout)
+
+
+__all__ = [
+    "LookupScan",
+    "OutpointLookup",
+    "PointLookup",
+    "PointLookupError",
+    "TxLookup",
+    "dataset_files",
+    "lookup_outpoint",
+    "lookup_tx",
+    "parse_outpoint",
+    "parse_txid",
+]
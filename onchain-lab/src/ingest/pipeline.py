@@ -1,96 +1,264 @@
 from __future__ import annotations
 
-import json
+import asyncio
 from collections import defaultdict
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
-from typing import DefaultDict, Dict, List, MutableMapping, Tuple
+from typing import (
+    Callable,
+    DefaultDict,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Tuple,
+)
 
 from rich.console import Console
-from pydantic import BaseModel
 
-from .config import IngestConfig, load_config
-from .rpc import BitcoinRPCClient, RPCError
+from .addresses import AddressDictionary
+from .blkfiles import BlockFileError, BlockFileReader
+from .blockindex import BlockIndex, BlockIndexEntry
+from .budget import MemoryBudget, block_footprint
+from .catalog import PartCatalog
+from .columnar import DATASETS, BlockColumns, DatasetColumns, ParsedBlock, epoch_micros
+from .config import ConfigError, IngestConfig, load_config
+from .rawblock import decode_block_into, header_prev_hash
+from .rpc import AsyncBitcoinRPCClient, BitcoinRPCClient, RPCError
 from .schemas import Block, Transaction, TxIn, TxOut
-from .writer import WriterError, append_models, bucket_height, partition_path
+from .state import HeaderRing, IngestRun, ProcessedHeightIndex, StateStoreError
+from .telemetry import IngestStats, ProgressReporter
+from .utxoset import UtxoSet, block_changes
+from .writer import (
+    RollingBucketWriter,
+    WriterError,
+    append_batch,
+    bucket_height,
+    drop_heights_from,
+    partition_path,
+    stale_txids,
+)
 
 console = Console()
 
 
-class ProcessedHeightIndex:
-    def __init__(self, data_root: Path) -> None:
-        self._marker_dir = data_root / "_markers"
-        self._marker_dir.mkdir(parents=True, exist_ok=True)
-        self._state_path = self._marker_dir / "state.json"
-        self._state = self._read_state()
-
-    def _read_state(self) -> Dict[str, int]:
-        if not self._state_path.exists():
-            return {"max_height": -1}
-        with self._state_path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-
-    def _write_state(self) -> None:
-        with self._state_path.open("w", encoding="utf-8") as handle:
-            json.dump(self._state, handle)
-
-    def is_done(self, height: int) -> bool:
-        return self._marker_path(height).exists()
-
-    def hash_for(self, height: int) -> str | None:
-        marker = self._marker_path(height)
-        if not marker.exists():
-            return None
-        contents = marker.read_text(encoding="utf-8").strip()
-        return contents or None
-
-    def mark_done(self, height: int, block_hash: str) -> None:
-        marker = self._marker_path(height)
-        marker.write_text(block_hash, encoding="utf-8")
-        if height > self._state.get("max_height", -1):
-            self._state["max_height"] = height
-            self._write_state()
-
-    def max_height(self) -> int:
-        return self._state.get("max_height", -1)
-
-    def _marker_path(self, height: int) -> Path:
-        return self._marker_dir / f"{height}.done"
-
-    def clear_from(self, height: int) -> List[int]:
-        removed: List[int] = []
-        for marker_path in sorted(self._marker_dir.glob("*.done")):
-            stem = marker_path.stem
-            try:
-                marker_height = int(stem)
-            except ValueError:
-                continue
-            if marker_height >= height:
-                marker_path.unlink(missing_ok=True)
-                removed.append(marker_height)
-        if removed:
-            remaining = [
-                int(path.stem)
-                for path in self._marker_dir.glob("*.done")
-                if path.stem.isdigit()
-            ]
-            self._state["max_height"] = max(remaining) if remaining else -1
-            self._write_state()
-        return sorted(removed)
+def _create_rpc_client(config: IngestConfig, stats: IngestStats | None = None) -> BitcoinRPCClient:
+    user, password = config.rpc.credentials()
+    return BitcoinRPCClient(
+        config.rpc.host,
+        config.rpc.port,
+        user,
+        password,
+        timeout=config.rpc.timeout_seconds,
+        stats=stats,
+    )
+
 
+def _memory_budget(config: IngestConfig, stats: IngestStats | None = None) -> MemoryBudget | None:
+    limit = config.limits.memory_budget_bytes
+    return MemoryBudget(limit, stats=stats) if limit is not None else None
 
-def _create_rpc_client(config: IngestConfig) -> BitcoinRPCClient:
+
+def _create_async_rpc_client(
+    config: IngestConfig, stats: IngestStats | None = None
+) -> AsyncBitcoinRPCClient:
     user, password = config.rpc.credentials()
-    return BitcoinRPCClient(
+    return AsyncBitcoinRPCClient(
         config.rpc.host,
         config.rpc.port,
         user,
         password,
         timeout=config.rpc.timeout_seconds,
+        max_in_flight=config.rpc.max_in_flight,
+        stats=stats,
     )
 
 
+def _block_verbosity(block_format: str) -> int:
+    # verbosity=3 adds each input's ``prevout`` (value, scriptPubKey, height).
+    return {"raw": 0, "prevout": 3}.get(block_format, 2)
+
+
+def _raw_envelope(block_hash: str, raw_hex: str) -> Dict[str, object]:
+    """Wrap a serialized block with the header fields the ingest loop inspects."""
+    raw = bytes.fromhex(raw_hex)
+    return {"hash": block_hash, "previousblockhash": header_prev_hash(raw), "raw": raw}
+
+
+def _as_blocks(
+    block_hashes: List[str], payloads: List[object], verbosity: int
+) -> List[Dict[str, object]]:
+    if verbosity == 0:
+        return [
+            _raw_envelope(block_hash, str(payload))
+            for block_hash, payload in zip(block_hashes, payloads)
+        ]
+    return payloads  # type: ignore[return-value]
+
+
+def _landed(
+    heights: List[int],
+    block_hashes: List[str],
+    blocks: List[Dict[str, object]],
+    budget: MemoryBudget | None,
+) -> Dict[int, Tuple[str, Dict[str, object]]]:
+    if budget is not None:
+        budget.landed({height: block_footprint(block) for height, block in zip(heights, blocks)})
+    return {
+        height: (block_hash, block)
+        for height, block_hash, block in zip(heights, block_hashes, blocks)
+    }
+
+
+def _plan_chunks(
+    height: int,
+    *,
+    end_height: int,
+    depth: int,
+    batch_size: int,
+    scheduled_through: int,
+    pending: Mapping[int, object],
+    skip: Callable[[int], bool] | None,
+    budget: MemoryBudget | None = None,
+) -> Tuple[List[List[int]], int]:
+    """Return the fetch chunks needed to cover ``height + depth`` and the new horizon.
+
+    Chunks are always ``batch_size`` heights wide (except at ``end_height``) so a
+    sliding window never degrades into single-height requests. ``height`` itself
+    is always fetched; later heights already pending or skipped are left out.
+    Once ``height`` is covered, further chunks are only planned while ``budget``
+    admits them; the horizon stops there and the next call picks up again.
+    """
+    scheduled_through = max(scheduled_through, height - 1)
+    target = min(end_height, height + depth)
+    chunks: List[List[int]] = []
+    while scheduled_through < target:
+        chunk_start = scheduled_through + 1
+        chunk_end = min(end_height, chunk_start + batch_size - 1)
+        chunk = [
+            candidate
+            for candidate in range(chunk_start, chunk_end + 1)
+            if candidate == height
+            or (candidate not in pending and not (skip is not None and skip(candidate)))
+        ]
+        covered = height in pending or any(height in planned for planned in chunks)
+        if chunk and covered and budget is not None and not budget.admits(len(chunk)):
+            break
+        scheduled_through = chunk_end
+        if chunk:
+            if budget is not None:
+                budget.scheduled(chunk)
+            chunks.append(chunk)
+    if height not in pending and not any(height in chunk for chunk in chunks):
+        if budget is not None:
+            budget.scheduled([height])
+        chunks.append([height])
+    return chunks, scheduled_through
+
+
+class BlockPrefetcher:
+    """Fetch blocks ahead of the writer loop on a bounded worker pool.
+
+    Heights are fetched in chunks of ``batch_size``: one JSON-RPC batch resolves the
+    chunk's hashes and a second one returns its blocks. With ``depth == 0`` chunks
+    are fetched synchronously when the loop reaches them. Otherwise chunks covering
+    up to ``depth`` heights beyond the requested one are kept in flight; results are
+    always handed back in the order the caller asks for them, so parsing, writing
+    and marker updates stay ordered. A ``budget`` caps the bytes of fetched
+    blocks the caller has not taken yet (see :mod:`ingest.budget`).
+    """
+
+    def __init__(
+        self,
+        client: BitcoinRPCClient,
+        *,
+        depth: int = 0,
+        workers: int = 1,
+        batch_size: int = 1,
+        block_format: str = "verbose",
+        budget: MemoryBudget | None = None,
+    ) -> None:
+        self._client = client
+        self._depth = max(depth, 0)
+        self._batch_size = max(batch_size, 1)
+        self._verbosity = _block_verbosity(block_format)
+        self.budget = budget
+        self._executor: ThreadPoolExecutor | None = None
+        if self._depth > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(workers, 1), thread_name_prefix="ingest-fetch"
+            )
+        self._pending: Dict[int, Future[Dict[int, Tuple[str, Dict[str, object]]]]] = {}
+        self._scheduled_through = -1
+
+    def _fetch_chunk(self, heights: List[int]) -> Dict[int, Tuple[str, Dict[str, object]]]:
+        block_hashes = self._client.get_block_hashes(heights)
+        payloads = self._client.get_blocks(block_hashes, verbosity=self._verbosity)
+        blocks = _as_blocks(block_hashes, payloads, self._verbosity)
+        return _landed(heights, block_hashes, blocks, self.budget)
+
+    def _submit(self, heights: List[int]) -> None:
+        if self._executor is not None:
+            future = self._executor.submit(self._fetch_chunk, heights)
+        else:
+            future = Future()
+            try:
+                future.set_result(self._fetch_chunk(heights))
+            except BaseException as exc:
+                future.set_exception(exc)
+        for height in heights:
+            self._pending[height] = future
+
+    def fetch(
+        self,
+        height: int,
+        *,
+        end_height: int,
+        skip: Callable[[int], bool] | None = None,
+    ) -> Tuple[str, Dict[str, object]]:
+        """Return ``(hash, block)`` for ``height`` and schedule the heights after it."""
+        chunks, self._scheduled_through = _plan_chunks(
+            height,
+            end_height=end_height,
+            depth=self._depth,
+            batch_size=self._batch_size,
+            scheduled_through=self._scheduled_through,
+            pending=self._pending,
+            skip=skip,
+            budget=self.budget,
+        )
+        for chunk in chunks:
+            self._submit(chunk)
+        try:
+            result = self._pending.pop(height).result()[height]
+        except Exception:
+            # The chunk's other heights share the failed future; fetch them afresh.
+            self.reset()
+            raise
+        if self.budget is not None:
+            self.budget.consumed(height)
+        return result
+
+    def reset(self) -> None:
+        """Drop every in-flight fetch, e.g. after a reorg invalidated the window."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._scheduled_through = -1
+        if self.budget is not None:
+            self.budget.clear()
+
+    def close(self) -> None:
+        self.reset()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
 def _btc_to_sats(value: Decimal | float | str | int) -> int:
     decimal_value = Decimal(str(value))
     return int((decimal_value * Decimal("100000000")).to_integral_value())
@@ -189,6 +357,111 @@ def _parse_block(height: int, block: Dict[str, object]) -> Tuple[
     return block_record, transactions, txins, txouts
 
 
+def _parse_block_columns(height: int, block: Dict[str, object], sink: BlockColumns) -> ParsedBlock:
+    """Columnar twin of :func:`_parse_block` that appends rows to ``sink``."""
+    block_time = _ensure_datetime(block["time"])
+    block_micros = epoch_micros(block_time)
+    txs = block.get("tx", [])
+    if not isinstance(txs, list):
+        txs = []
+
+    tx_cols = sink.transactions.columns
+    tx_txid, tx_height, tx_time = tx_cols["txid"], tx_cols["height"], tx_cols["time_utc"]
+    tx_size, tx_weight, tx_version = tx_cols["size"], tx_cols["weight"], tx_cols["version"]
+    tx_locktime, tx_vin, tx_vout = tx_cols["locktime"], tx_cols["vin_count"], tx_cols["vout_count"]
+    in_cols = sink.txin.columns
+    in_txid, in_idx, in_coinbase = in_cols["txid"], in_cols["idx"], in_cols["coinbase"]
+    in_prev_txid, in_prev_vout, in_sequence = (
+        in_cols["prev_txid"],
+        in_cols["prev_vout"],
+        in_cols["sequence"],
+    )
+    in_prev_value, in_prev_type, in_prev_height = (
+        in_cols["prev_value_sats"],
+        in_cols["prev_script_type"],
+        in_cols["prev_height"],
+    )
+    out_cols = sink.txout.columns
+    out_txid, out_idx, out_value = out_cols["txid"], out_cols["idx"], out_cols["value_sats"]
+    out_type, out_addresses, out_spent = (
+        out_cols["script_type"],
+        out_cols["addresses"],
+        out_cols["is_spent"],
+    )
+
+    vin_total = 0
+    vout_total = 0
+    for tx in txs:
+        tx_moment = tx.get("time", block_time)
+        txid = str(tx.get("txid") or tx.get("hash"))
+        vins = tx.get("vin", [])
+        vouts = tx.get("vout", [])
+        tx_txid.append(txid)
+        tx_height.append(height)
+        tx_time.append(block_micros if tx_moment is block_time else epoch_micros(tx_moment))
+        tx_size.append(int(tx.get("size", 0)))
+        tx_weight.append(int(tx.get("weight", tx.get("size", 0) * 4)))
+        tx_version.append(int(tx.get("version", 0)))
+        tx_locktime.append(int(tx.get("locktime", 0)))
+        tx_vin.append(len(vins))
+        tx_vout.append(len(vouts))
+
+        for vin_idx, vin in enumerate(vins):
+            prev_txid = vin.get("txid")
+            prev_vout = vin.get("vout")
+            in_txid.append(txid)
+            in_idx.append(vin_idx)
+            in_coinbase.append("coinbase" in vin)
+            in_prev_txid.append(str(prev_txid) if prev_txid is not None else None)
+            in_prev_vout.append(int(prev_vout) if prev_vout is not None else None)
+            in_sequence.append(int(vin.get("sequence", 0)))
+            prevout = vin.get("prevout")
+            if isinstance(prevout, dict):
+                prev_script = prevout.get("scriptPubKey", {})
+                prev_height = prevout.get("height")
+                in_prev_value.append(_btc_to_sats(prevout.get("value", 0)))
+                in_prev_type.append(
+                    str(prev_script.get("type", "unknown"))
+                    if isinstance(prev_script, dict)
+                    else "unknown"
+                )
+                in_prev_height.append(int(prev_height) if prev_height is not None else None)
+            else:
+                in_prev_value.append(None)
+                in_prev_type.append(None)
+                in_prev_height.append(None)
+
+        for vout_idx, vout in enumerate(vouts):
+            script_pub_key = vout.get("scriptPubKey", {})
+            if not isinstance(script_pub_key, dict):
+                script_pub_key = {}
+            out_txid.append(txid)
+            out_idx.append(vout_idx)
+            out_value.append(_btc_to_sats(vout.get("value", 0)))
+            out_type.append(str(script_pub_key.get("type", "unknown")))
+            out_addresses.append(_extract_addresses(script_pub_key))
+            out_spent.append(bool(vout.get("spent", False)))
+        vin_total += len(vins)
+        vout_total += len(vouts)
+
+    # Filled in by the address dictionary when the ingestor interns addresses.
+    out_cols["address_ids"].extend([None] * vout_total)
+
+    block_hash = str(block["hash"])
+    block_cols = sink.blocks.columns
+    block_cols["height"].append(height)
+    block_cols["hash"].append(block_hash)
+    block_cols["time_utc"].append(block_micros)
+    block_cols["version"].append(int(block.get("version", 0)))
+    block_cols["merkleroot"].append(str(block.get("merkleroot", "")))
+    block_cols["nonce"].append(int(block.get("nonce", 0)))
+    block_cols["bits"].append(str(block.get("bits", "")))
+    block_cols["size"].append(int(block.get("size", 0)))
+    block_cols["weight"].append(int(block.get("weight", block.get("size", 0) * 4)))
+    block_cols["tx_count"].append(len(txs))
+    return ParsedBlock(block_hash, block_time, len(txs), vin_total, vout_total)
+
+
 def _marker_token(dataset: str, height: int) -> str:
     return f"{dataset}-h{height:012d}"
 
@@ -196,185 +469,602 @@ def _marker_token(dataset: str, height: int) -> str:
 def _flush_buffer(
     *,
     key: Tuple[str, int],
-    buffer: List[BaseModel],
+    buffer: DatasetColumns,
     config: IngestConfig,
     counts: MutableMapping[str, int],
+    stats: IngestStats,
+    parts: List[Tuple[str, Path]],
     marker: str | None = None,
 ) -> None:
     dataset, bucket = key
-    if not buffer:
+    if not len(buffer):
         return
-    append_models(
-        dataset,
-        buffer,
-        root=config.data_root,
-        partition_template=config.partitions[dataset],
-        height_bucket=bucket,
-        compression=config.compression,
-        zstd_level=config.zstd_level,
-        marker=marker,
-    )
-    counts[dataset] += len(buffer)
+    with stats.stage("arrow"):
+        batch = buffer.to_record_batch()
+    with stats.stage("write"):
+        path = append_batch(
+            dataset,
+            batch,
+            root=config.data_root,
+            partition_template=config.partitions[dataset],
+            height_bucket=bucket,
+            compression=config.compression,
+            zstd_level=config.zstd_level,
+            marker=marker,
+            profile=config.writer_profiles.get(dataset),
+        )
+    stats.count("arrow_bytes", batch.nbytes)
+    stats.count("parquet_bytes", path.stat().st_size)
+    counts[dataset] += batch.num_rows
+    parts.append((dataset, path))
     buffer.clear()
 
 
-def sync_range(
-    start_height: int,
-    end_height: int,
-    *,
-    config: IngestConfig | None = None,
-    client: BitcoinRPCClient | None = None,
-) -> Dict[str, int]:
-    if start_height > end_height:
-        raise ValueError("start_height must be <= end_height")
-    cfg = config or load_config()
-    cfg.data_root.mkdir(parents=True, exist_ok=True)
-    max_blocks = cfg.limits.max_blocks_per_run
-    if (end_height - start_height + 1) > max_blocks:
-        end_height = start_height + max_blocks - 1
+class _RangeIngestor:
+    """Ordered parse, buffer, write and marker stage shared by the ingest drivers.
 
-    created_client = client or _create_rpc_client(cfg)
-    own_client = client is None
-    height_index = ProcessedHeightIndex(cfg.data_root)
-    counts: MutableMapping[str, int] = {name: 0 for name in ("blocks", "transactions", "txin", "txout")}
-    buffers: DefaultDict[Tuple[str, int], List[BaseModel]] = defaultdict(list)
+    Drivers own block fetching and the node side of reorg handling; every call
+    into this class must happen in height order from a single thread. Stage
+    timings go to ``stats`` (shared with the driver's RPC client) and are
+    summarised by ``progress``.
+    """
 
-    def _handle_reorg(
+    def __init__(
+        self,
+        cfg: IngestConfig,
+        height_index: ProcessedHeightIndex,
         *,
-        height: int,
-        block: Dict[str, object],
-        client: BitcoinRPCClient,
-        counts_ref: MutableMapping[str, int],
-    ) -> int | None:
+        stats: IngestStats | None = None,
+    ) -> None:
+        self._cfg = cfg
+        self.height_index = height_index
+        self.stats = stats or IngestStats()
+        self.progress = ProgressReporter(
+            self.stats,
+            log=console.log,
+            interval=cfg.telemetry.progress_interval_seconds,
+            textfile=cfg.telemetry.metrics_textfile,
+        )
+        self.counts: MutableMapping[str, int] = {
+            name: 0 for name in ("blocks", "transactions", "txin", "txout")
+        }
+        self._started = datetime.now(timezone.utc)
+        self._run_recorded = False
+        self._buffers: DefaultDict[int, BlockColumns] = defaultdict(
+            lambda: BlockColumns(cfg.schema_version)
+        )
+        self.block_index = BlockIndex(cfg.data_root)
+        self.catalog = PartCatalog.for_config(cfg)
+        # Decided from the files on disk: backfill workers hold per-shard height indexes.
+        self.catalog.mark_complete_if_empty(cfg)
+        # Rolling mode: index rows waiting for their bucket to commit.
+        self._pending_index: Dict[int, BlockIndexEntry] = {}
+        self._locations: Dict[int, Dict[str, str]] = {}
+        self._rolling: RollingBucketWriter | None = None
+        # Opened once the rolling writer has replayed its journal and marked those heights.
+        self._utxos: UtxoSet | None = None
+        self._utxos_behind = False
+        if cfg.writer_mode == "rolling":
+            self._rolling = RollingBucketWriter(
+                root=cfg.data_root,
+                partitions=cfg.partitions,
+                bucket_size=cfg.height_bucket_size,
+                compression=cfg.compression,
+                zstd_level=cfg.zstd_level,
+                io_batch_size=cfg.limits.io_batch_size,
+                row_group_bytes=cfg.limits.row_group_bytes,
+                journal_path=height_index.state_dir / "rolling-journal.json",
+                on_commit=self._mark_committed,
+                on_publish=self._publish_parts,
+                schema_version=cfg.schema_version,
+                stats=self.stats,
+                profiles=cfg.writer_profiles,
+            )
+        self.headers = HeaderRing(height_index, cfg.limits.reorg_window)
+        self._addresses: AddressDictionary | None = None
+        if cfg.intern_addresses:
+            self._addresses = AddressDictionary(
+                cfg.data_root,
+                cache_size=cfg.limits.address_cache_size,
+                compression=cfg.compression,
+                zstd_level=cfg.zstd_level,
+            )
+        if cfg.utxo_set:
+            self._utxos = UtxoSet.for_config(cfg)
+            # Heights applied after the last commit died with the process that applied them.
+            self._utxos.reconcile(height_index.max_height())
+
+    def _mark_committed(self, heights: Mapping[int, str]) -> None:
+        with self.stats.stage("state"):
+            pending = self._pending_index
+            self.block_index.record(
+                pending.pop(height) for height in sorted(heights) if height in pending
+            )
+            for height in sorted(heights):
+                self.height_index.mark_done(height, heights[height])
+            if self._utxos is not None:
+                self._utxos.prune_undo(self.height_index.max_height())
+
+    def _publish_parts(self, published: Mapping[str, List[Path]]) -> None:
+        with self.stats.stage("state"):
+            self.catalog.add(
+                (dataset, path) for dataset, paths in published.items() for path in paths
+            )
+
+    def _index_entry(
+        self, height: int, bucket: int, parsed: ParsedBlock, block: Dict[str, object]
+    ) -> BlockIndexEntry:
+        locations = self._locations.get(bucket)
+        if locations is None:
+            cfg = self._cfg
+            locations = {
+                dataset: self.block_index.location(
+                    partition_path(cfg.data_root, cfg.partitions[dataset], height_bucket=bucket)
+                )
+                for dataset in DATASETS
+            }
+            self._locations[bucket] = locations
+        median_time = self.block_index.median_time_past(height, parsed.time_utc)
+        median = block.get("mediantime")
+        if isinstance(median, int) and not isinstance(median, bool):
+            median_time = datetime.fromtimestamp(median, tz=timezone.utc)
+        return BlockIndexEntry(
+            height=height,
+            hash=parsed.hash,
+            time_utc=parsed.time_utc,
+            median_time=median_time,
+            tx_count=parsed.tx_count,
+            vin_count=parsed.vin_count,
+            vout_count=parsed.vout_count,
+            locations=locations,
+        )
+
+    def trace(self, message: str) -> None:
+        """Log a per-height message; only with ``telemetry.log_heights``."""
+        if self._cfg.telemetry.log_heights:
+            console.log(message)
+
+    def _stored_hash(self, height: int) -> str | None:
+        if self._rolling is not None:
+            pending = self._rolling.pending_hash(height)
+            if pending is not None:
+                return pending
+        return self.height_index.hash_for(height)
+
+    def detect_reorg(self, height: int, block: Dict[str, object]) -> bool:
         prev_height = height - 1
         if prev_height < 0:
-            return None
+            return False
         expected_prev_hash = block.get("previousblockhash")
         if not isinstance(expected_prev_hash, str):
-            return None
-        stored_prev_hash = height_index.hash_for(prev_height)
+            return False
+        stored_prev_hash = self._stored_hash(prev_height)
         if stored_prev_hash is None or stored_prev_hash == expected_prev_hash:
-            return None
+            return False
         console.log(
             f"Detected reorg at height {height}: stored prev hash {stored_prev_hash} != node hash {expected_prev_hash}"
         )
-        rollback_cursor = prev_height
-        matching_height = -1
-        while rollback_cursor >= 0:
-            stored_hash = height_index.hash_for(rollback_cursor)
-            if stored_hash is None:
-                rollback_cursor -= 1
-                continue
-            node_hash = client.get_block_hash(rollback_cursor)
-            if node_hash == stored_hash:
-                matching_height = rollback_cursor
-                break
-            rollback_cursor -= 1
-        resume_height = max(matching_height + 1, 0)
-        removed_heights = height_index.clear_from(resume_height)
+        return True
+
+    def stored_window(self, cursor: int, step: int) -> List[Tuple[int, str]]:
+        """Stored hashes for ``cursor`` down to ``cursor - step + 1``, newest first."""
+        window = range(cursor, max(cursor - step, -1), -1)
+        stored = [(candidate, self._stored_hash(candidate)) for candidate in window]
+        return [(candidate, stored_hash) for candidate, stored_hash in stored if stored_hash]
+
+    def rollback(self, resume_height: int) -> None:
+        known_max_height = self.height_index.max_height()
+        removed_heights = self.height_index.clear_from(resume_height)
+        if self._rolling is not None:
+            discarded = self._rolling.discard_from(
+                resume_height, known_max_height=known_max_height
+            )
+            removed_heights = sorted(set(removed_heights).union(discarded))
+        self.headers.truncate(resume_height - 1)
+        self.block_index.truncate(resume_height)
+        for height in [height for height in self._pending_index if height >= resume_height]:
+            del self._pending_index[height]
+        if self._addresses is not None:
+            self._addresses.rollback(resume_height)
+        if self._utxos is not None and not self._utxos.rollback(resume_height):
+            console.log(
+                f"UTXO set emptied: its undo rows do not reach height {resume_height}; "
+                "rebuild it with `onchain utxo-set --sync`"
+            )
         if removed_heights:
-            for removed_height in removed_heights:
-                _delete_height_artifacts(removed_height, cfg)
+            changed = self._drop_heights_from(resume_height, removed_heights[-1])
             console.log(
-                f"Rolled back heights {removed_heights[0]}-{removed_heights[-1]} for reorg recovery"
+                f"Rolled back heights {removed_heights[0]}-{removed_heights[-1]} "
+                f"for reorg recovery ({changed} files removed or rewritten)"
             )
-            for key in counts_ref:
-                counts_ref[key] = 0
+            for key in self.counts:
+                self.counts[key] = 0
         else:
             console.log("Reorg detected but no processed heights to roll back.")
-        return resume_height
 
-    def _delete_height_artifacts(height: int, cfg: IngestConfig) -> None:
-        for dataset in ("blocks", "transactions", "txin", "txout"):
-            bucket = bucket_height(height, cfg.height_bucket_size)
-            output_dir = partition_path(cfg.data_root, cfg.partitions[dataset], height_bucket=bucket)
-            marker = _marker_token(dataset, height)
-            target = output_dir / f"part-{marker}.parquet"
-            target.unlink(missing_ok=True)
-
-    try:
-        height = start_height
-        while height <= end_height:
-            console.log(f"Processing height {height}")
-            if height_index.is_done(height):
-                console.log(f"Skipping height {height} (already processed)")
-                height += 1
-                continue
+    def _drop_heights_from(self, resume_height: int, max_height: int) -> int:
+        """Drop heights >= ``resume_height`` with one pass over each affected bucket."""
+        cfg = self._cfg
+        buckets = range(
+            bucket_height(resume_height, cfg.height_bucket_size),
+            bucket_height(max(max_height, resume_height), cfg.height_bucket_size) + 1,
+            cfg.height_bucket_size,
+        )
+        directories = {
+            dataset: [
+                partition_path(cfg.data_root, cfg.partitions[dataset], height_bucket=bucket)
+                for bucket in buckets
+            ]
+            for dataset in DATASETS
+        }
+        # txin and txout carry no height; their rows are matched through the dropped txids,
+        # so the transactions files are rewritten last.
+        txids = stale_txids(directories["transactions"], resume_height)
+        changed = 0
+        for dataset in ("txin", "txout", "transactions", "blocks"):
+            for output_dir in directories[dataset]:
+                changed += drop_heights_from(
+                    output_dir,
+                    dataset,
+                    resume_height,
+                    txids=txids,
+                    compression=cfg.compression,
+                    zstd_level=cfg.zstd_level,
+                    profile=cfg.writer_profiles.get(dataset),
+                )
+        # Rolling files cut back by the writer live in the same buckets.
+        for dataset, output_dirs in directories.items():
+            for output_dir in output_dirs:
+                self.catalog.sync_directory(dataset, output_dir)
+        return changed
 
-            try:
-                block_hash = created_client.get_block_hash(height)
-                console.log(f"Retrieved block hash {block_hash} for height {height}")
-                block = created_client.get_block(block_hash, verbosity=2)
-                console.log(f"Retrieved block data for height {height}")
-                resume_height = _handle_reorg(
-                    height=height,
-                    block=block,
-                    client=created_client,
-                    counts_ref=counts,
+    def ingest(self, height: int, block: Dict[str, object]) -> None:
+        cfg = self._cfg
+        counts = self.counts
+        bucket = bucket_height(height, cfg.height_bucket_size)
+        rolling = self._rolling
+        columns = rolling.columns(bucket) if rolling is not None else self._buffers[bucket]
+        first_output = len(columns.txout)
+        first_input = len(columns.txin)
+        stats = self.stats
+        raw = block.get("raw")
+        with stats.stage("parse"):
+            if isinstance(raw, (bytes, bytearray)):
+                parsed = decode_block_into(height, raw, columns, network=cfg.network)
+            else:
+                parsed = _parse_block_columns(height, block, columns)
+        if self._addresses is not None and parsed.vout_count:
+            txout = columns.txout.columns
+            with stats.stage("addresses"):
+                txout["address_ids"][first_output:] = self._addresses.intern(
+                    txout["addresses"][first_output:], height
                 )
-                if resume_height is not None and resume_height != height:
-                    height = resume_height
-                    continue
-                block_record, tx_records, txin_records, txout_records = _parse_block(height, block)
-            except Exception as e:
-                console.log(f"Error processing height {height}: {e}")
-                raise
-            bucket = bucket_height(height, cfg.height_bucket_size)
+        if self._utxos is not None:
+            self._apply_utxos(height, columns, first_output, first_input)
 
-            buffers[("blocks", bucket)].append(block_record)
-            buffers[("transactions", bucket)].extend(tx_records)
-            buffers[("txin", bucket)].extend(txin_records)
-            buffers[("txout", bucket)].extend(txout_records)
+        entry = self._index_entry(height, bucket, parsed, block)
+        if rolling is not None:
+            # Heights are marked done (and indexed) by the writer once their bucket is committed.
+            self._pending_index[height] = entry
+            for dataset, rows in rolling.end_height(height, parsed.hash).items():
+                counts[dataset] += rows
+            self._record_header(height, parsed, block)
+            self._log_height(height, parsed)
+            return
 
+        written: List[Tuple[str, Path]] = []
+        _flush_buffer(
+            key=("blocks", bucket),
+            buffer=columns.blocks,
+            config=cfg,
+            counts=counts,
+            stats=stats,
+            parts=written,
+            marker=_marker_token("blocks", height),
+        )
+        _flush_buffer(
+            key=("transactions", bucket),
+            buffer=columns.transactions,
+            config=cfg,
+            counts=counts,
+            stats=stats,
+            parts=written,
+            marker=_marker_token("transactions", height),
+        )
+
+        should_flush_txin = bool(parsed.vin_count) or (
+            len(columns.txin) >= cfg.limits.io_batch_size
+        )
+        if should_flush_txin:
             _flush_buffer(
-                key=("blocks", bucket),
-                buffer=buffers[("blocks", bucket)],
+                key=("txin", bucket),
+                buffer=columns.txin,
                 config=cfg,
                 counts=counts,
-                marker=_marker_token("blocks", height),
+                stats=stats,
+                parts=written,
+                marker=_marker_token("txin", height),
             )
+
+        should_flush_txout = bool(parsed.vout_count) or (
+            len(columns.txout) >= cfg.limits.io_batch_size
+        )
+        if should_flush_txout:
             _flush_buffer(
-                key=("transactions", bucket),
-                buffer=buffers[("transactions", bucket)],
+                key=("txout", bucket),
+                buffer=columns.txout,
                 config=cfg,
                 counts=counts,
-                marker=_marker_token("transactions", height),
+                stats=stats,
+                parts=written,
+                marker=_marker_token("txout", height),
             )
 
-            should_flush_txin = bool(txin_records) or (
-                len(buffers[("txin", bucket)]) >= cfg.limits.io_batch_size
-            )
-            if should_flush_txin:
-                _flush_buffer(
-                    key=("txin", bucket),
-                    buffer=buffers[("txin", bucket)],
-                    config=cfg,
-                    counts=counts,
-                    marker=_marker_token("txin", height),
+        with stats.stage("state"):
+            self.catalog.add(written)
+            self.block_index.record([entry])
+            self.height_index.mark_done(height, parsed.hash)
+            if self._utxos is not None:
+                self._utxos.prune_undo(height)
+        self._record_header(height, parsed, block)
+        self._log_height(height, parsed)
+
+    def _apply_utxos(
+        self, height: int, columns: BlockColumns, first_output: int, first_input: int
+    ) -> None:
+        utxos = self._utxos
+        assert utxos is not None
+        if height != utxos.next_height:
+            if not self._utxos_behind:
+                self._utxos_behind = True
+                console.log(
+                    f"UTXO set is at height {utxos.applied_height} and skips height {height}; "
+                    "catch it up with `onchain utxo-set --sync`"
                 )
+            return
+        with self.stats.stage("utxo"):
+            creates, spends = block_changes(
+                columns.txout.columns, columns.txin.columns, first_output, first_input
+            )
+            missing = utxos.apply_block(height, creates, spends)
+        if missing:
+            console.log(f"Height {height} spends {missing} outputs missing from the UTXO set")
+
+    def _record_header(self, height: int, parsed: ParsedBlock, block: Dict[str, object]) -> None:
+        prev_hash = block.get("previousblockhash")
+        with self.stats.stage("state"):
+            parent = prev_hash if isinstance(prev_hash, str) else None
+            self.headers.append(height, parsed.hash, parent)
 
-            should_flush_txout = bool(txout_records) or (
-                len(buffers[("txout", bucket)]) >= cfg.limits.io_batch_size
+    def _log_height(self, height: int, parsed: ParsedBlock) -> None:
+        stats = self.stats
+        stats.count("blocks")
+        stats.add_rows("blocks", 1)
+        stats.add_rows("transactions", parsed.tx_count)
+        stats.add_rows("txin", parsed.vin_count)
+        stats.add_rows("txout", parsed.vout_count)
+        stats.height = height
+        if self._cfg.telemetry.log_heights:
+            console.log(
+                f"Processed height {height}: blocks=1 tx={parsed.tx_count} "
+                f"vin={parsed.vin_count} vout={parsed.vout_count}"
             )
-            if should_flush_txout:
+            console.log(f"Block hash: {parsed.hash}, Block time: {parsed.time_utc}")
+        self.progress.update()
+
+    def finish(self) -> None:
+        written: List[Tuple[str, Path]] = []
+        for bucket, columns in list(self._buffers.items()):
+            for dataset in DATASETS:
                 _flush_buffer(
-                    key=("txout", bucket),
-                    buffer=buffers[("txout", bucket)],
-                    config=cfg,
-                    counts=counts,
-                    marker=_marker_token("txout", height),
+                    key=(dataset, bucket),
+                    buffer=columns[dataset],
+                    config=self._cfg,
+                    counts=self.counts,
+                    stats=self.stats,
+                    parts=written,
                 )
+        self.catalog.add(written)
+        if self._addresses is not None:
+            exported = self._addresses.export()
+            if exported:
+                console.log(f"Exported {exported} new addresses to {self._addresses.dataset_dir}")
+        rss = self.stats.peak_rss_summary()
+        if rss is not None:
+            console.log(rss)
+        self.close()
 
-            height_index.mark_done(height, block_record.hash)
-            console.log(
-                f"Processed height {height}: blocks=1 tx={len(tx_records)} vin={len(txin_records)} vout={len(txout_records)}"
-            )
-            console.log(f"Block hash: {block_record.hash}, Block time: {block_record.time_utc}")
+    def close(self) -> None:
+        """Commit open rolling files; safe to call repeatedly and after errors."""
+        if self._addresses is not None:
+            self._addresses.close()
+        if self._rolling is not None:
+            for dataset, rows in self._rolling.close().items():
+                self.counts[dataset] += rows
+        if self._utxos is not None:
+            self._utxos.close()
+        self._record_run()
+        self.block_index.close()
+        self.catalog.close()
+        self.progress.update(force=True)
+
+    def _record_run(self) -> None:
+        """Add this run to the height index's run history once, if it ingested anything."""
+        stats = self.stats
+        blocks = stats.counter("blocks")
+        if self._run_recorded or not blocks:
+            return
+        self._run_recorded = True
+        run = IngestRun(
+            started=self._started,
+            seconds=stats.elapsed,
+            blocks=blocks,
+            last_height=stats.height,
+            rows=sum(stats.rows().values()),
+            bytes=stats.counter("parquet_bytes"),
+        )
+        try:
+            self.height_index.record_run(run)
+        except StateStoreError as exc:
+            # The history only feeds `onchain status`; never fail a run over it.
+            console.log(f"Could not record the ingest run: {exc}")
+
+
+def _clamp_range(start_height: int, end_height: int, cfg: IngestConfig) -> int:
+    if start_height > end_height:
+        raise ValueError("start_height must be <= end_height")
+    max_blocks = cfg.limits.max_blocks_per_run
+    if (end_height - start_height + 1) > max_blocks:
+        end_height = start_height + max_blocks - 1
+    return end_height
+
+
+def _fork_candidates(
+    ingestor: _RangeIngestor, cursor: int, step: int
+) -> Iterator[List[Tuple[int, str]]]:
+    """Stored ``(height, hash)`` batches to compare with the node, newest first.
+
+    The first batch is the whole header ring, so a reorg shallower than
+    ``limits.reorg_window`` costs one RPC; deeper forks continue in windows of
+    ``step`` heights below it.
+    """
+    recent = ingestor.headers.newest_first(cursor)
+    if recent:
+        yield recent
+        cursor = min(cursor, recent[-1][0] - 1)
+    while cursor >= 0:
+        known = ingestor.stored_window(cursor, step)
+        if known:
+            yield known
+        cursor -= step
+
+
+def _matching_height(known: List[Tuple[int, str]], node_hashes: List[str]) -> int | None:
+    for (candidate, stored_hash), node_hash in zip(known, node_hashes):
+        if node_hash == stored_hash:
+            return candidate
+    return None
+
+
+def _fork_search(
+    ingestor: _RangeIngestor, cursor: int, step: int
+) -> Generator[List[int], List[str], int]:
+    """Walk back from ``cursor`` to the newest stored height the node agrees with.
+
+    Yields the heights it needs node hashes for and is sent those hashes, so the
+    sync and asyncio drivers share the walk and differ only in how they call
+    ``getblockhash``. Returns the height to resume from.
+    """
+    matching_height = -1
+    for known in _fork_candidates(ingestor, cursor, step):
+        node_hashes = yield [candidate for candidate, _ in known]
+        match = _matching_height(known, node_hashes)
+        if match is not None:
+            matching_height = match
+            break
+    return max(matching_height + 1, 0)
+
+
+def _handle_reorg(
+    *,
+    height: int,
+    block: Dict[str, object],
+    client: BitcoinRPCClient,
+    ingestor: _RangeIngestor,
+    step: int,
+) -> int | None:
+    if not ingestor.detect_reorg(height, block):
+        return None
+    return _rewind(height - 1, client=client, ingestor=ingestor, step=step)
+
+
+def _rewind(cursor: int, *, client: BitcoinRPCClient, ingestor: _RangeIngestor, step: int) -> int:
+    """Roll back above the newest height at or below ``cursor`` the node agrees with."""
+    search = _fork_search(ingestor, cursor, step)
+    try:
+        heights = next(search)
+        while True:
+            heights = search.send(client.get_block_hashes(heights))
+    except StopIteration as done:
+        resume_height = done.value
+    ingestor.rollback(resume_height)
+    return resume_height
+
+
+def sync_range(
+    start_height: int,
+    end_height: int,
+    *,
+    config: IngestConfig | None = None,
+    client: BitcoinRPCClient | None = None,
+    height_index: ProcessedHeightIndex | None = None,
+    handle_reorgs: bool = True,
+) -> Dict[str, int]:
+    """Ingest ``[start_height, end_height]`` in height order.
+
+    ``height_index`` defaults to the data root's shared index; callers passing
+    their own keep ownership of it. ``handle_reorgs=False`` skips the previous
+    hash check, which is only safe for heights buried well below the tip.
+    """
+    cfg = config or load_config()
+    end_height = _clamp_range(start_height, end_height, cfg)
+    cfg.data_root.mkdir(parents=True, exist_ok=True)
+
+    stats = IngestStats()
+    stats.target = end_height
+    created_client = client or _create_rpc_client(cfg, stats)
+    own_client = client is None
+    own_index = height_index is None
+    if height_index is None:
+        height_index = ProcessedHeightIndex(cfg.data_root)
+    else:
+        # Lookups do not re-check the file; pick up commits made since the caller opened it.
+        height_index.refresh()
+    ingestor = _RangeIngestor(cfg, height_index, stats=stats)
+    prefetcher = BlockPrefetcher(
+        created_client,
+        depth=cfg.limits.prefetch_depth,
+        workers=cfg.limits.fetch_workers,
+        batch_size=cfg.limits.rpc_batch_size,
+        block_format=cfg.block_format,
+        budget=_memory_budget(cfg, stats),
+    )
+
+    try:
+        height = start_height
+        while height <= end_height:
+            ingestor.trace(f"Processing height {height}")
+            if height_index.is_done(height):
+                ingestor.trace(f"Skipping height {height} (already processed)")
+                height += 1
+                continue
+
+            try:
+                block_hash, block = prefetcher.fetch(
+                    height, end_height=end_height, skip=height_index.is_done
+                )
+                ingestor.trace(f"Retrieved block {block_hash} for height {height}")
+                resume_height = None
+                if handle_reorgs:
+                    resume_height = _handle_reorg(
+                        height=height,
+                        block=block,
+                        client=created_client,
+                        ingestor=ingestor,
+                        step=cfg.limits.rpc_batch_size,
+                    )
+                if resume_height is not None and resume_height != height:
+                    # Blocks prefetched beyond the fork belong to the stale branch view.
+                    prefetcher.reset()
+                    height = resume_height
+                    continue
+                ingestor.ingest(height, block)
+            except Exception as e:
+                console.log(f"Error processing height {height}: {e}")
+                raise
             height += 1
 
-        # Final flush
-        for key, buffer in list(buffers.items()):
-            _flush_buffer(key=key, buffer=buffer, config=cfg, counts=counts)
+        ingestor.finish()
 
     except (RPCError, WriterError) as exc:
         console.log(f"Ingestion halted: {exc}")
@@ -383,10 +1073,269 @@ def sync_range(
         console.log(f"Unexpected error during ingestion: {e}")
         raise
     finally:
+        ingestor.close()
+        if own_index:
+            height_index.close()
+        prefetcher.close()
         if own_client:
             created_client.close()
 
-    return counts
+    return dict(ingestor.counts)
+
+
+def _files_fork_height(height: int, chain: List[str], height_index: ProcessedHeightIndex) -> int:
+    """Lowest height at or below ``height`` from which stored hashes disagree with ``chain``."""
+    cursor = height
+    while cursor >= 0:
+        stored = height_index.hash_for(cursor)
+        if stored is None or stored == chain[cursor]:
+            return cursor + 1
+        cursor -= 1
+    return 0
+
+
+def sync_blockfiles(
+    start_height: int,
+    end_height: int,
+    *,
+    config: IngestConfig | None = None,
+    reader: BlockFileReader | None = None,
+) -> Dict[str, int]:
+    """Ingest heights straight from ``blk*.dat`` files, bypassing RPC.
+
+    The active chain is rebuilt from the files themselves, so any stored heights
+    that disagree with it are rolled back and rewritten, like a reorg.
+    """
+    cfg = config or load_config()
+    end_height = _clamp_range(start_height, end_height, cfg)
+    cfg.data_root.mkdir(parents=True, exist_ok=True)
+
+    own_reader = reader is None
+    if reader is None:
+        if cfg.blocks_dir is None:
+            raise ConfigError("blocks_dir must be configured to ingest from block files.")
+        reader = BlockFileReader(cfg.blocks_dir, network=cfg.network)
+    height_index = ProcessedHeightIndex(cfg.data_root)
+    ingestor = _RangeIngestor(cfg, height_index)
+
+    try:
+        chain = reader.best_chain()
+        tip = len(chain) - 1
+        console.log(f"Indexed {len(chain)} active-chain blocks from block files (tip={tip})")
+        if end_height > tip:
+            console.log(f"Clamping end height {end_height} to block-file tip {tip}")
+            end_height = tip
+        ingestor.stats.target = end_height
+
+        height = start_height
+        while height <= end_height:
+            block_hash = chain[height]
+            if height_index.is_done(height):
+                if height_index.hash_for(height) == block_hash:
+                    ingestor.trace(f"Skipping height {height} (already processed)")
+                    height += 1
+                    continue
+                resume_height = _files_fork_height(height, chain, height_index)
+            else:
+                resume_height = _files_fork_height(height - 1, chain, height_index)
+            if resume_height < height:
+                console.log(f"Stored heights from {resume_height} are off the block-file chain")
+                ingestor.rollback(resume_height)
+                height = resume_height
+                continue
+            if resume_height == height and height_index.is_done(height):
+                ingestor.rollback(height)
+
+            with ingestor.stats.stage("read"):
+                raw = reader.read_block(block_hash)
+            block: Dict[str, object] = {
+                "hash": block_hash,
+                "previousblockhash": header_prev_hash(raw),
+                "raw": raw,
+            }
+            ingestor.ingest(height, block)
+            height += 1
+
+        ingestor.finish()
+    except (BlockFileError, WriterError) as exc:
+        console.log(f"Ingestion halted: {exc}")
+        raise
+    finally:
+        ingestor.close()
+        height_index.close()
+        if own_reader:
+            reader.close()
+
+    return dict(ingestor.counts)
+
+
+class _AsyncBlockPrefetcher:
+    """Asyncio variant of :class:`BlockPrefetcher`; chunks run as event-loop tasks."""
+
+    def __init__(
+        self,
+        client: AsyncBitcoinRPCClient,
+        *,
+        depth: int = 0,
+        batch_size: int = 1,
+        block_format: str = "verbose",
+        budget: MemoryBudget | None = None,
+    ) -> None:
+        self._client = client
+        self._depth = max(depth, 0)
+        self._batch_size = max(batch_size, 1)
+        self._verbosity = _block_verbosity(block_format)
+        self.budget = budget
+        self._pending: Dict[int, asyncio.Task[Dict[int, Tuple[str, Dict[str, object]]]]] = {}
+        self._scheduled_through = -1
+
+    async def _fetch_chunk(self, heights: List[int]) -> Dict[int, Tuple[str, Dict[str, object]]]:
+        block_hashes = await self._client.get_block_hashes(heights)
+        payloads = await self._client.get_blocks(block_hashes, verbosity=self._verbosity)
+        blocks = _as_blocks(block_hashes, payloads, self._verbosity)
+        return _landed(heights, block_hashes, blocks, self.budget)
+
+    async def fetch(
+        self,
+        height: int,
+        *,
+        end_height: int,
+        skip: Callable[[int], bool] | None = None,
+    ) -> Tuple[str, Dict[str, object]]:
+        chunks, self._scheduled_through = _plan_chunks(
+            height,
+            end_height=end_height,
+            depth=self._depth,
+            batch_size=self._batch_size,
+            scheduled_through=self._scheduled_through,
+            pending=self._pending,
+            skip=skip,
+            budget=self.budget,
+        )
+        for chunk in chunks:
+            task = asyncio.ensure_future(self._fetch_chunk(chunk))
+            for chunk_height in chunk:
+                self._pending[chunk_height] = task
+        try:
+            result = await self._pending.pop(height)
+        except Exception:
+            # The chunk's other heights share the failed task; fetch them afresh.
+            await self.reset()
+            raise
+        if self.budget is not None:
+            self.budget.consumed(height)
+        return result[height]
+
+    async def reset(self) -> None:
+        tasks = set(self._pending.values())
+        self._pending.clear()
+        self._scheduled_through = -1
+        if self.budget is not None:
+            self.budget.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _handle_reorg_async(
+    *,
+    height: int,
+    block: Dict[str, object],
+    client: AsyncBitcoinRPCClient,
+    ingestor: _RangeIngestor,
+    step: int,
+) -> int | None:
+    if not ingestor.detect_reorg(height, block):
+        return None
+    search = _fork_search(ingestor, height - 1, step)
+    try:
+        heights = next(search)
+        while True:
+            heights = search.send(await client.get_block_hashes(heights))
+    except StopIteration as done:
+        resume_height = done.value
+    ingestor.rollback(resume_height)
+    return resume_height
+
+
+async def sync_range_async(
+    start_height: int,
+    end_height: int,
+    *,
+    config: IngestConfig | None = None,
+    client: AsyncBitcoinRPCClient | None = None,
+) -> Dict[str, int]:
+    """Asyncio driver producing the same files, markers and counts as :func:`sync_range`.
+
+    Block fetches run as event-loop tasks while parsing and Parquet writes for the
+    current height run on a single writer thread, so network I/O for later heights
+    overlaps CPU and disk work without reordering any writes.
+    """
+    cfg = config or load_config()
+    end_height = _clamp_range(start_height, end_height, cfg)
+    cfg.data_root.mkdir(parents=True, exist_ok=True)
+
+    stats = IngestStats()
+    stats.target = end_height
+    created_client = client or _create_async_rpc_client(cfg, stats)
+    own_client = client is None
+    height_index = ProcessedHeightIndex(cfg.data_root)
+    ingestor = _RangeIngestor(cfg, height_index, stats=stats)
+    prefetcher = _AsyncBlockPrefetcher(
+        created_client,
+        depth=cfg.limits.prefetch_depth,
+        batch_size=cfg.limits.rpc_batch_size,
+        block_format=cfg.block_format,
+        budget=_memory_budget(cfg, stats),
+    )
+    loop = asyncio.get_running_loop()
+    writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-write")
+
+    try:
+        height = start_height
+        while height <= end_height:
+            if height_index.is_done(height):
+                ingestor.trace(f"Skipping height {height} (already processed)")
+                height += 1
+                continue
+
+            try:
+                block_hash, block = await prefetcher.fetch(
+                    height, end_height=end_height, skip=height_index.is_done
+                )
+                ingestor.trace(f"Retrieved block {block_hash} for height {height}")
+                resume_height = await _handle_reorg_async(
+                    height=height,
+                    block=block,
+                    client=created_client,
+                    ingestor=ingestor,
+                    step=cfg.limits.rpc_batch_size,
+                )
+                if resume_height is not None and resume_height != height:
+                    await prefetcher.reset()
+                    height = resume_height
+                    continue
+                await loop.run_in_executor(writer_pool, ingestor.ingest, height, block)
+            except Exception as e:
+                console.log(f"Error processing height {height}: {e}")
+                raise
+            height += 1
+
+        await loop.run_in_executor(writer_pool, ingestor.finish)
+
+    except (RPCError, WriterError) as exc:
+        console.log(f"Ingestion halted: {exc}")
+        raise
+    finally:
+        await prefetcher.reset()
+        await loop.run_in_executor(writer_pool, ingestor.close)
+        writer_pool.shutdown(wait=True)
+        height_index.close()
+        if own_client:
+            await created_client.aclose()
+
+    return dict(ingestor.counts)
 
 
 def sync_from_tip(
@@ -403,8 +1352,8 @@ def sync_from_tip(
 
     try:
         tip = created_client.get_block_count()
-        height_index = ProcessedHeightIndex(cfg.data_root)
-        start_height = height_index.max_height() + 1
+        with ProcessedHeightIndex(cfg.data_root) as height_index:
+            start_height = height_index.max_height() + 1
         if start_height > tip:
             console.log("Ledger already fully synced to tip.")
             return {name: 0 for name in ("blocks", "transactions", "txin", "txout")}
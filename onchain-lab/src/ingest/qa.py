@@ -2,15 +2,24 @@ from __future__ import annotations
 
 import glob
 import json
+import os
 import string
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime, time, timezone, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from .blockindex import BlockIndex
+from .catalog import PartCatalog
 from .config import IngestConfig, load_config
+from .hashes import create_hex_views, source_sql
+
+DAILY_STATS_DIR = "_qa"
+DAILY_STATS_FILE = "daily_ingest_stats.parquet"
 
 
 class QAError(RuntimeError):
@@ -25,6 +34,42 @@ class GoldenReference:
     tolerance_pct: Optional[float] = None
 
 
+@dataclass(frozen=True)
+class DailyStats:
+    """One row of ``daily_ingest_stats``: what the lake holds for a UTC day."""
+
+    day: date
+    blocks: int
+    transactions: int
+    coinbase_sats: int
+    first_height: int
+    last_height: int
+    last_hash: str
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "blocks": self.blocks,
+            "transactions": self.transactions,
+            "coinbase_sats": self.coinbase_sats,
+        }
+
+
+@dataclass
+class BatchQAResult:
+    """Outcome of :func:`run_batch_checks`.
+
+    ``scanned`` lists the days recomputed by this run (the rest were reused
+    from ``daily_ingest_stats``), ``changed`` the recomputed days whose numbers
+    differ from the stored ones, and ``failures`` the golden days outside
+    tolerance with the reason.
+    """
+
+    stats: Dict[date, DailyStats]
+    scanned: List[date] = field(default_factory=list)
+    changed: List[date] = field(default_factory=list)
+    failures: Dict[date, str] = field(default_factory=dict)
+
+
 def _load_golden_refs(path: Path) -> Dict[date, GoldenReference]:
     if not path.exists():
         raise QAError(f"Golden reference file missing: {path}")
@@ -71,6 +116,11 @@ def _template_glob(template: str) -> str:
 
 
 def _partition_files(config: IngestConfig, key: str) -> List[str]:
+    """Every file of dataset ``key``: from the part catalog, or by globbing without one."""
+    catalog = PartCatalog.open_existing(config)
+    if catalog is not None:
+        with catalog:
+            return catalog.files(key)
     template = config.partitions[key]
     fragment = _template_glob(template)
     base = Path(fragment)
@@ -86,6 +136,44 @@ def _partition_files(config: IngestConfig, key: str) -> List[str]:
     return sorted(matches)
 
 
+def _window_files(config: IngestConfig, start: datetime, end: datetime) -> Dict[str, List[str]]:
+    """Files for each dataset that can hold rows timed in ``[start, end)``.
+
+    The window resolves to heights through the block index (or the part
+    catalog's block time bounds), and from there to the catalogued parts
+    overlapping those heights or, without a catalog, the covering buckets.
+    When neither knows the window, every file of every dataset is returned.
+    """
+    datasets = ("blocks", "transactions", "txin", "txout")
+    heights: Optional[Tuple[int, int]] = None
+    index = BlockIndex.open_existing(config.data_root)
+    catalog = PartCatalog.open_existing(config)
+    try:
+        if index is not None:
+            heights = index.height_range(start, end)
+        if catalog is not None:
+            heights = heights or catalog.height_range(start, end)
+            if heights is not None:
+                return {dataset: catalog.files(dataset, *heights) for dataset in datasets}
+        elif index is not None and heights is not None:
+            return {dataset: index.files(dataset, *heights) for dataset in datasets}
+    finally:
+        if index is not None:
+            index.close()
+        if catalog is not None:
+            catalog.close()
+    return {key: _partition_files(config, key) for key in datasets}
+
+
+def _source_sql(config: IngestConfig, files: List[str], dataset: str) -> str:
+    """:func:`source_sql` over ``files``, with footers the part catalog knows left unread."""
+    catalog = PartCatalog.open_existing(config)
+    if catalog is None:
+        return source_sql(files, dataset)
+    with catalog:
+        return source_sql(files, dataset, layouts=catalog.layouts(dataset, files))
+
+
 def _format_timestamp(value: datetime) -> str:
     normalized = value.astimezone(timezone.utc).isoformat()
     normalized = normalized.replace("T", " ")
@@ -95,12 +183,14 @@ def _format_timestamp(value: datetime) -> str:
 def _register_view(
     connection: duckdb.DuckDBPyConnection,
     *,
+    config: IngestConfig,
     name: str,
+    dataset: str,
     files: List[str],
     start: datetime | None = None,
     end: datetime | None = None,
 ) -> None:
-    relation = connection.read_parquet(files)
+    relation = connection.sql(_source_sql(config, files, dataset))
     if start is not None and end is not None:
         start_text = _format_timestamp(start)
         end_text = _format_timestamp(end)
@@ -131,10 +221,11 @@ def run_golden_day_checks(
 
     start, end = _day_bounds(target)
     con = _duckdb_connect()
-    block_files = _partition_files(cfg, "blocks")
-    tx_files = _partition_files(cfg, "transactions")
-    txin_files = _partition_files(cfg, "txin")
-    txout_files = _partition_files(cfg, "txout")
+    files = _window_files(cfg, start, end)
+    block_files = files["blocks"]
+    tx_files = files["transactions"]
+    txin_files = files["txin"]
+    txout_files = files["txout"]
 
     if not block_files or not tx_files or not txin_files or not txout_files:
         raise QAError("Parquet datasets incomplete for QA check.")
@@ -142,12 +233,28 @@ def run_golden_day_checks(
     metrics = None
 
     try:
-        _register_view(con, name="day_blocks", files=block_files, start=start, end=end)
         _register_view(
-            con, name="day_transactions", files=tx_files, start=start, end=end
+            con,
+            config=cfg,
+            name="day_blocks",
+            dataset="blocks",
+            files=block_files,
+            start=start,
+            end=end,
+        )
+        _register_view(
+            con,
+            config=cfg,
+            name="day_transactions",
+            dataset="transactions",
+            files=tx_files,
+            start=start,
+            end=end,
         )
-        _register_view(con, name="all_txin", files=txin_files)
-        _register_view(con, name="all_txout", files=txout_files)
+        # Coinbase inputs and outputs sit in the same bucket as their transaction,
+        # so the window's buckets are enough for the joins below.
+        _register_view(con, config=cfg, name="all_txin", dataset="txin", files=txin_files)
+        _register_view(con, config=cfg, name="all_txout", dataset="txout", files=txout_files)
 
         con.execute(
             """
@@ -185,29 +292,16 @@ def run_golden_day_checks(
 
     block_count, tx_count, coinbase_sats = metrics
 
-    effective_tolerance = reference.tolerance_pct or cfg.qa.tolerance_pct
-
-    deltas = {
-        "blocks": _delta_pct(block_count, reference.blocks),
-        "transactions": _delta_pct(tx_count, reference.transactions),
-        "coinbase_sats": _delta_pct(coinbase_sats, reference.coinbase_sats),
-    }
-
-    violations = [name for name, delta in deltas.items() if delta > effective_tolerance]
-
-    if violations:
-        formatted = ", ".join(
-            f"{name} Δ={_format_pct(deltas[name])}" for name in violations
-        )
-        raise QAError(
-            f"Golden day {target.isoformat()} outside tolerance ({effective_tolerance}%): {formatted}"
-        )
-
-    return {
+    measured = {
         "blocks": int(block_count),
         "transactions": int(tx_count),
         "coinbase_sats": int(coinbase_sats),
     }
+    message = _compare(target, measured, reference, cfg.qa.tolerance_pct)
+    if message is not None:
+        raise QAError(message)
+
+    return measured
 
 
 def _delta_pct(measured: int, reference: int) -> float:
@@ -216,6 +310,271 @@ def _delta_pct(measured: int, reference: int) -> float:
     return abs(measured - reference) / reference * 100.0
 
 
+def _compare(
+    target: date, measured: Dict[str, int], reference: GoldenReference, default_tolerance: float
+) -> Optional[str]:
+    """Violation message for ``measured`` against ``reference``.
+
+    ``None`` when every metric is within tolerance.
+    """
+    tolerance = reference.tolerance_pct or default_tolerance
+    deltas = {
+        "blocks": _delta_pct(measured["blocks"], reference.blocks),
+        "transactions": _delta_pct(measured["transactions"], reference.transactions),
+        "coinbase_sats": _delta_pct(measured["coinbase_sats"], reference.coinbase_sats),
+    }
+    violations = [name for name, delta in deltas.items() if delta > tolerance]
+    if not violations:
+        return None
+    formatted = ", ".join(f"{name} Δ={_format_pct(deltas[name])}" for name in violations)
+    return f"Golden day {target.isoformat()} outside tolerance ({tolerance}%): {formatted}"
+
+
+def daily_stats_path(config: IngestConfig) -> Path:
+    return config.data_root / DAILY_STATS_DIR / DAILY_STATS_FILE
+
+
+def _daily_stats_schema() -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field("day", pa.date32(), nullable=False),
+            pa.field("blocks", pa.int64(), nullable=False),
+            pa.field("transactions", pa.int64(), nullable=False),
+            pa.field("coinbase_sats", pa.int64(), nullable=False),
+            pa.field("first_height", pa.int64(), nullable=False),
+            pa.field("last_height", pa.int64(), nullable=False),
+            pa.field("last_hash", pa.string(), nullable=False),
+        ]
+    )
+
+
+def load_daily_stats(path: Path) -> Dict[date, DailyStats]:
+    if not path.exists():
+        return {}
+    return {
+        row["day"]: DailyStats(**row)
+        for row in pq.read_table(path, schema=_daily_stats_schema()).to_pylist()
+    }
+
+
+def _write_daily_stats(path: Path, stats: Dict[date, DailyStats]) -> None:
+    schema = _daily_stats_schema()
+    rows = [stats[day] for day in sorted(stats)]
+    table = pa.Table.from_pydict(
+        {name: [getattr(row, name) for row in rows] for name in schema.names}, schema=schema
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, temp, compression="zstd")
+    os.replace(temp, path)
+
+
+def _signature(stats: DailyStats) -> Tuple[int, int, int, str]:
+    return stats.blocks, stats.first_height, stats.last_height, stats.last_hash
+
+
+def _scan_files(
+    config: IngestConfig, ranges: Optional[Sequence[Tuple[int, int]]]
+) -> Dict[str, List[str]]:
+    """Files covering the height ``ranges``, or every file when ``ranges`` is ``None``.
+
+    Ranges are pruned through the part catalog or the block index when present.
+    """
+    datasets = ("blocks", "transactions", "txin", "txout")
+    if ranges is not None:
+        catalog = PartCatalog.open_existing(config)
+        if catalog is not None:
+            with catalog:
+                return {
+                    dataset: sorted(
+                        {
+                            path
+                            for first, last in ranges
+                            for path in catalog.files(dataset, first, last)
+                        }
+                    )
+                    for dataset in datasets
+                }
+        index = BlockIndex.open_existing(config.data_root)
+        if index is not None:
+            with index:
+                return {
+                    dataset: sorted(
+                        {
+                            path
+                            for first, last in ranges
+                            for path in index.files(dataset, first, last)
+                        }
+                    )
+                    for dataset in datasets
+                }
+    return {dataset: _partition_files(config, dataset) for dataset in datasets}
+
+
+def _scan_days(
+    config: IngestConfig,
+    days: Optional[Iterable[date]],
+    ranges: Optional[Sequence[Tuple[int, int]]] = None,
+) -> Dict[date, DailyStats]:
+    """Per-day block, transaction and coinbase totals in one grouped pass.
+
+    ``days=None`` covers every day in the lake. ``ranges`` (height ranges from
+    the block index) limit the files read to the buckets that hold those days.
+    """
+    files = _scan_files(config, ranges)
+    if not all(files.values()):
+        raise QAError("Parquet datasets incomplete for QA check.")
+    where = ""
+    if days is not None:
+        wanted = sorted(set(days))
+        if not wanted:
+            return {}
+        listing = ", ".join(f"DATE '{day.isoformat()}'" for day in wanted)
+        where = f"WHERE CAST(DATE_TRUNC('day', time_utc) AS DATE) IN ({listing})"
+
+    con = _duckdb_connect()
+    try:
+        con.execute("SET TimeZone='UTC'")
+        for dataset, paths in files.items():
+            con.sql(_source_sql(config, paths, dataset)).create_view(dataset, replace=True)
+        create_hex_views(con, {"blocks": "blocks"})
+        # Only a list of DATE literals built from date objects is interpolated.
+        rows = con.execute(
+            f"""
+            WITH day_blocks AS (
+                SELECT
+                    CAST(DATE_TRUNC('day', time_utc) AS DATE) AS day,
+                    COUNT(*) AS blocks,
+                    MIN(height) AS first_height,
+                    MAX(height) AS last_height,
+                    arg_max(hash, height) AS last_hash
+                FROM blocks_hex
+                {where}
+                GROUP BY 1
+            ),
+            day_tx AS (
+                SELECT txid, CAST(DATE_TRUNC('day', time_utc) AS DATE) AS day
+                FROM transactions
+                {where}
+            ),
+            tx_counts AS (
+                SELECT day, COUNT(*) AS transactions FROM day_tx GROUP BY day
+            ),
+            coinbase AS (
+                SELECT c.day, SUM(o.value_sats) AS coinbase_sats
+                FROM (
+                    SELECT day, txid FROM day_tx
+                    WHERE txid IN (SELECT txid FROM txin WHERE coinbase)
+                ) AS c
+                INNER JOIN txout AS o ON o.txid = c.txid
+                GROUP BY c.day
+            )
+            SELECT
+                b.day,
+                b.blocks,
+                COALESCE(t.transactions, 0),
+                COALESCE(c.coinbase_sats, 0),
+                b.first_height,
+                b.last_height,
+                b.last_hash
+            FROM day_blocks AS b
+            LEFT JOIN tx_counts AS t ON t.day = b.day
+            LEFT JOIN coinbase AS c ON c.day = b.day
+            WHERE b.day IS NOT NULL
+            ORDER BY b.day
+            """  # noqa: S608
+        ).fetchall()
+    finally:
+        con.close()
+    return {
+        row[0]: DailyStats(
+            day=row[0],
+            blocks=int(row[1]),
+            transactions=int(row[2]),
+            coinbase_sats=int(row[3]),
+            first_height=int(row[4]),
+            last_height=int(row[5]),
+            last_hash=str(row[6]),
+        )
+        for row in rows
+    }
+
+
+def run_batch_checks(
+    *,
+    config: IngestConfig | None = None,
+    references_path: Path | None = None,
+    all_days: bool = False,
+    stats_path: Path | None = None,
+) -> BatchQAResult:
+    """Check every configured golden day (and optionally every day) in one scan.
+
+    Results are merged into ``daily_ingest_stats`` under the data root. When
+    the block index is present, days whose block count, height range and last
+    hash match the stored row are reused instead of rescanned, and the scan
+    reads only the buckets holding the remaining days.
+    """
+    cfg = config or load_config()
+    if not cfg.data_root.exists():
+        raise QAError(f"Data root does not exist: {cfg.data_root}")
+    references = _load_golden_refs(references_path or Path(__file__).with_name("golden_refs.json"))
+    path = stats_path or daily_stats_path(cfg)
+    stored = load_daily_stats(path)
+    golden = sorted(set(cfg.qa.golden_days))
+
+    summary: Optional[Dict[date, Tuple[int, int, int, str]]] = None
+    index = BlockIndex.open_existing(cfg.data_root)
+    if index is not None:
+        with index:
+            summary = index.day_summary() or None
+
+    days: Optional[List[date]]
+    ranges: Optional[List[Tuple[int, int]]] = None
+    if summary is None:
+        # No index: one full scan, grouped over every day or just the golden ones.
+        days = None if all_days else golden
+    else:
+        candidates = sorted(summary) if all_days else [day for day in golden if day in summary]
+        days = [
+            day
+            for day in candidates
+            if day not in stored or _signature(stored[day]) != summary[day]
+        ]
+        ranges = [(summary[day][1], summary[day][2]) for day in days]
+        if not all_days and any(day not in summary for day in golden):
+            # Golden days the index does not know about need the unpruned files.
+            days = days + [day for day in golden if day not in summary]
+            ranges = None
+
+    fresh = _scan_days(cfg, days, ranges) if days is None or days else {}
+    scanned = sorted(fresh) if days is None else sorted(days)
+    stats = {} if days is None else {day: row for day, row in stored.items() if day not in scanned}
+    stats.update(fresh)
+    changed = [
+        day
+        for day in sorted(fresh)
+        if day in stored and stored[day].metrics() != fresh[day].metrics()
+    ]
+    if stats != stored:
+        _write_daily_stats(path, stats)
+
+    failures: Dict[date, str] = {}
+    for day in golden:
+        if day not in references:
+            failures[day] = f"No golden reference stored for {day.isoformat()}"
+            continue
+        measured = (
+            stats[day].metrics()
+            if day in stats
+            else {"blocks": 0, "transactions": 0, "coinbase_sats": 0}
+        )
+        message = _compare(day, measured, references[day], cfg.qa.tolerance_pct)
+        if message is not None:
+            failures[day] = message
+
+    return BatchQAResult(stats=stats, scanned=scanned, changed=changed, failures=failures)
+
+
 def verify_date(arg: str, *, config: IngestConfig | None = None) -> Dict[str, int]:
     target_date = datetime.strptime(arg, "%Y-%m-%d").date()
     return run_golden_day_checks(target=target_date, config=config)
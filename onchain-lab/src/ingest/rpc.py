@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import httpx
 from tenacity import RetryError, retry, retry_if_exception, stop_after_attempt, wait_exponential
 
+from .telemetry import IngestStats
+
 
 class RPCError(RuntimeError):
     """Raised when an RPC request fails."""
@@ -32,6 +36,102 @@ def _is_retryable(exc: BaseException) -> bool:
     return False
 
 
+def _to_utc(epoch_seconds: Any) -> datetime:
+    if not isinstance(epoch_seconds, (int, float)):
+        raise RPCError(f"Expected epoch seconds, received {epoch_seconds!r}")
+    return datetime.fromtimestamp(int(epoch_seconds), tz=timezone.utc)
+
+
+def _normalize_block(block: Any) -> Any:
+    if not isinstance(block, dict):
+        # verbosity=0 returns the serialized block as a hex string.
+        return block
+    if "time" in block:
+        block["time"] = _to_utc(block["time"])
+    if "tx" in block:
+        for tx in block["tx"]:
+            if "time" in tx:
+                tx["time"] = _to_utc(tx["time"])
+    return block
+
+
+def _request_payload(method: str, params: Optional[list[Any]], request_id: Any) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": method,
+        "params": params or [],
+    }
+
+
+def _single_result(method: str, data: Dict[str, Any]) -> Any:
+    if "error" in data and data["error"]:
+        err_obj = data["error"] or {}
+        raise RPCResponseError(
+            method,
+            err_obj.get("code"),
+            err_obj.get("message"),
+        )
+    return data["result"]
+
+
+def _absorb_batch_reply(
+    calls: Sequence[Tuple[str, list[Any]]],
+    data: Any,
+    results: List[Any],
+    outstanding: set[int],
+) -> None:
+    """Store successful batch elements and raise if any element is still owed.
+
+    Elements failing with a retryable node error stay in ``outstanding`` so the
+    caller's retry loop re-sends only those; non-retryable errors raise at once.
+    """
+    if not isinstance(data, list):
+        err_obj = (data or {}).get("error") or {}
+        raise RPCResponseError("batch", err_obj.get("code"), err_obj.get("message"))
+
+    retryable: RPCResponseError | None = None
+    for entry in data:
+        index = entry.get("id")
+        if index not in outstanding:
+            continue
+        err_obj = entry.get("error")
+        if err_obj:
+            error = RPCResponseError(calls[index][0], err_obj.get("code"), err_obj.get("message"))
+            if not _is_retryable(error):
+                raise error
+            retryable = error
+            continue
+        results[index] = entry.get("result")
+        outstanding.discard(index)
+
+    if outstanding:
+        if retryable is not None:
+            raise retryable
+        missing = ", ".join(str(index) for index in sorted(outstanding))
+        raise RPCError(f"Batch response missing results for ids: {missing}")
+
+
+def _read_json(response: httpx.Response, started: float, stats: IngestStats | None) -> Any:
+    """Decode ``response``, recording transfer and JSON decode time when ``stats`` is set."""
+    response.raise_for_status()
+    if stats is None:
+        return response.json()
+    stats.add_seconds("rpc", time.perf_counter() - started)
+    stats.count("rpc_requests")
+    stats.count("rpc_bytes_received", len(response.content))
+    with stats.stage("json_decode"):
+        return response.json()
+
+
+def _batch_payload(
+    calls: Sequence[Tuple[str, list[Any]]], outstanding: set[int]
+) -> List[Dict[str, Any]]:
+    return [
+        _request_payload(calls[index][0], calls[index][1], index) for index in sorted(outstanding)
+    ]
+
+
 class BitcoinRPCClient:
     def __init__(
         self,
@@ -42,11 +142,13 @@ class BitcoinRPCClient:
         *,
         timeout: float = 30.0,
         max_attempts: int = 5,
+        stats: IngestStats | None = None,
     ) -> None:
         self._endpoint = f"http://{host}:{port}"
         self._auth = (user, password)
         self._client = httpx.Client(timeout=timeout)
         self._max_attempts = max_attempts
+        self.stats = stats
 
     def close(self) -> None:
         self._client.close()
@@ -62,35 +164,45 @@ class BitcoinRPCClient:
 
     def get_block(self, block_hash: str, verbosity: int = 2) -> Dict[str, Any]:
         block = self._call("getblock", [block_hash, verbosity])
-        if "time" in block:
-            block["time"] = self._to_utc(block["time"])
-        if "tx" in block:
-            for tx in block["tx"]:
-                if "time" in tx:
-                    tx["time"] = self._to_utc(tx["time"])
-        return block
+        return _normalize_block(block)
+
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        """Resolve many heights in a single JSON-RPC batch request."""
+        return self._call_batch([("getblockhash", [height]) for height in heights])
+
+    def get_blocks(self, block_hashes: Sequence[str], verbosity: int = 2) -> List[Dict[str, Any]]:
+        """Fetch many blocks in a single JSON-RPC batch request, preserving order."""
+        blocks = self._call_batch(
+            [("getblock", [block_hash, verbosity]) for block_hash in block_hashes]
+        )
+        return [_normalize_block(block) for block in blocks]
 
     def get_block_count(self) -> int:
         return self._call("getblockcount", [])
 
+    def get_best_block_hash(self) -> str:
+        return self._call("getbestblockhash", [])
+
+    def wait_for_new_block(self, timeout_seconds: float) -> Dict[str, Any]:
+        """Block until the node's tip changes or ``timeout_seconds`` pass.
+
+        Returns ``{hash, height}`` of the tip. The HTTP timeout of the client must
+        exceed ``timeout_seconds``.
+        """
+        # Idle waiting time, not transfer time, so it stays out of the rpc stage.
+        return self._call("waitfornewblock", [int(timeout_seconds * 1000)], observe=False)
+
     def get_raw_transaction(self, txid: str, verbose: bool = True) -> Dict[str, Any]:
         tx = self._call("getrawtransaction", [txid, int(verbose)])
         if "time" in tx:
-            tx["time"] = self._to_utc(tx["time"])
+            tx["time"] = _to_utc(tx["time"])
         return tx
 
-    def _to_utc(self, epoch_seconds: Any) -> datetime:
-        if not isinstance(epoch_seconds, (int, float)):
-            raise RPCError(f"Expected epoch seconds, received {epoch_seconds!r}")
-        return datetime.fromtimestamp(int(epoch_seconds), tz=timezone.utc)
-
-    def _call(self, method: str, params: Optional[list[Any]] = None) -> Any:
-        payload = {
-            "jsonrpc": "2.0",
-            "id": "onchain-ingest",
-            "method": method,
-            "params": params or [],
-        }
+    def _call(
+        self, method: str, params: Optional[list[Any]] = None, *, observe: bool = True
+    ) -> Any:
+        payload = _request_payload(method, params, "onchain-ingest")
+        stats = self.stats if observe else None
 
         @retry(
             stop=stop_after_attempt(self._max_attempts),
@@ -99,19 +211,148 @@ class BitcoinRPCClient:
             reraise=True,
         )
         def _do_call() -> Any:
+            started = time.perf_counter()
             response = self._client.post(self._endpoint, json=payload, auth=self._auth)
-            response.raise_for_status()
-            data = response.json()
-            if "error" in data and data["error"]:
-                err_obj = data["error"] or {}
-                raise RPCResponseError(
-                    method,
-                    err_obj.get("code"),
-                    err_obj.get("message"),
-                )
-            return data["result"]
+            return _single_result(method, _read_json(response, started, stats))
 
         try:
             return _do_call()
         except RetryError as exc:
             raise RPCError(f"RPC call failed for {method}: {exc}") from exc
+
+    def _call_batch(self, calls: Sequence[Tuple[str, list[Any]]]) -> List[Any]:
+        """Send ``calls`` as one JSON-RPC batch and return results in call order.
+
+        Elements failing with a retryable node error are re-sent on the next attempt
+        while completed elements are kept, so a single ``-28`` does not refetch the
+        whole batch. Non-retryable element errors are raised immediately.
+        """
+        if not calls:
+            return []
+        results: List[Any] = [None] * len(calls)
+        outstanding = set(range(len(calls)))
+
+        @retry(
+            stop=stop_after_attempt(self._max_attempts),
+            wait=wait_exponential(multiplier=0.5, min=1, max=10),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True,
+        )
+        def _do_batch() -> None:
+            payload = _batch_payload(calls, outstanding)
+            started = time.perf_counter()
+            response = self._client.post(self._endpoint, json=payload, auth=self._auth)
+            reply = _read_json(response, started, self.stats)
+            _absorb_batch_reply(calls, reply, results, outstanding)
+
+        try:
+            _do_batch()
+        except RetryError as exc:
+            raise RPCError(f"RPC batch call failed: {exc}") from exc
+        return results
+
+
+class AsyncBitcoinRPCClient:
+    """Asyncio counterpart of :class:`BitcoinRPCClient`.
+
+    Requests share one pooled ``httpx.AsyncClient`` and a semaphore caps how many
+    are in flight at once, so many concurrent fetches cannot overrun the node's
+    RPC work queue.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        *,
+        timeout: float = 30.0,
+        max_attempts: int = 5,
+        max_in_flight: int = 8,
+        stats: IngestStats | None = None,
+    ) -> None:
+        self._endpoint = f"http://{host}:{port}"
+        self._auth = (user, password)
+        limits = httpx.Limits(
+            max_connections=max_in_flight, max_keepalive_connections=max_in_flight
+        )
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits)
+        self._max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.stats = stats
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncBitcoinRPCClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def get_block_hash(self, height: int) -> str:
+        return await self._call("getblockhash", [height])
+
+    async def get_block(self, block_hash: str, verbosity: int = 2) -> Dict[str, Any]:
+        block = await self._call("getblock", [block_hash, verbosity])
+        return _normalize_block(block)
+
+    async def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return await self._call_batch([("getblockhash", [height]) for height in heights])
+
+    async def get_blocks(
+        self, block_hashes: Sequence[str], verbosity: int = 2
+    ) -> List[Dict[str, Any]]:
+        blocks = await self._call_batch(
+            [("getblock", [block_hash, verbosity]) for block_hash in block_hashes]
+        )
+        return [_normalize_block(block) for block in blocks]
+
+    async def get_block_count(self) -> int:
+        return await self._call("getblockcount", [])
+
+    async def _post(self, payload: Any) -> Any:
+        async with self._semaphore:
+            started = time.perf_counter()
+            response = await self._client.post(self._endpoint, json=payload, auth=self._auth)
+        return _read_json(response, started, self.stats)
+
+    async def _call(self, method: str, params: Optional[list[Any]] = None) -> Any:
+        payload = _request_payload(method, params, "onchain-ingest")
+
+        @retry(
+            stop=stop_after_attempt(self._max_attempts),
+            wait=wait_exponential(multiplier=0.5, min=1, max=10),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True,
+        )
+        async def _do_call() -> Any:
+            return _single_result(method, await self._post(payload))
+
+        try:
+            return await _do_call()
+        except RetryError as exc:
+            raise RPCError(f"RPC call failed for {method}: {exc}") from exc
+
+    async def _call_batch(self, calls: Sequence[Tuple[str, list[Any]]]) -> List[Any]:
+        if not calls:
+            return []
+        results: List[Any] = [None] * len(calls)
+        outstanding = set(range(len(calls)))
+
+        @retry(
+            stop=stop_after_attempt(self._max_attempts),
+            wait=wait_exponential(multiplier=0.5, min=1, max=10),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True,
+        )
+        async def _do_batch() -> None:
+            data = await self._post(_batch_payload(calls, outstanding))
+            _absorb_batch_reply(calls, data, results, outstanding)
+
+        try:
+            await _do_batch()
+        except RetryError as exc:
+            raise RPCError(f"RPC batch call failed: {exc}") from exc
+        return results
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import pyarrow as pa
 from pydantic import BaseModel, Field, field_validator
@@ -9,6 +9,24 @@ from pydantic import BaseModel, Field, field_validator
 SCHEMA_VERSION = "ingest.v1"
 SCHEMA_METADATA = {b"schema_version": SCHEMA_VERSION.encode("utf-8")}
 
+# ingest.v2 stores block hashes and txids as 32 raw bytes instead of 64 hex chars.
+SCHEMA_VERSION_V2 = "ingest.v2"
+SCHEMA_VERSIONS: Tuple[str, ...] = (SCHEMA_VERSION, SCHEMA_VERSION_V2)
+HASH_TYPE = pa.binary(32)
+HASH_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "blocks": ("hash", "merkleroot"),
+    "transactions": ("txid",),
+    "txin": ("txid", "prev_txid"),
+    "txout": ("txid",),
+}
+# Nullable columns appended to a schema after files were first written without
+# them; readers fill them with nulls for older files.
+ADDED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "blocks": (),
+    "transactions": (),
+    "txin": ("prev_value_sats", "prev_script_type", "prev_height"),
+    "txout": ("address_ids",),
+}
 
 def _ensure_utc(dt: datetime) -> datetime:
     if dt.tzinfo is None:
@@ -60,6 +78,9 @@ class TxIn(BaseModel):
     prev_txid: Optional[str]
     prev_vout: Optional[int]
     sequence: int
+    prev_value_sats: Optional[int] = None
+    prev_script_type: Optional[str] = None
+    prev_height: Optional[int] = None
 
 
 class TxOut(BaseModel):
@@ -69,6 +90,7 @@ class TxOut(BaseModel):
     script_type: str
     addresses: List[str] = Field(default_factory=list)
     is_spent: bool = False
+    address_ids: Optional[List[int]] = None
 
 
 def block_schema() -> pa.Schema:
@@ -115,6 +137,10 @@ def txin_schema() -> pa.Schema:
             pa.field("prev_txid", pa.string()).with_nullable(True),
             pa.field("prev_vout", pa.int32()).with_nullable(True),
             pa.field("sequence", pa.int64()),
+            # Spent output as reported by getblock verbosity=3; null otherwise.
+            pa.field("prev_value_sats", pa.int64()).with_nullable(True),
+            pa.field("prev_script_type", pa.string()).with_nullable(True),
+            pa.field("prev_height", pa.int64()).with_nullable(True),
         ],
         metadata=SCHEMA_METADATA,
     )
@@ -129,6 +155,8 @@ def txout_schema() -> pa.Schema:
             pa.field("script_type", pa.string()),
             pa.field("addresses", pa.list_(pa.string())),
             pa.field("is_spent", pa.bool_()),
+            # Ids from the address dictionary, aligned with ``addresses``; null when not interned.
+            pa.field("address_ids", pa.list_(pa.uint64())).with_nullable(True),
         ],
         metadata=SCHEMA_METADATA,
     )
@@ -142,6 +170,38 @@ SCHEMA_REGISTRY: Dict[str, pa.Schema] = {
 }
 
 
+def _binary_hashes(dataset: str, schema: pa.Schema) -> pa.Schema:
+    """The v2 layout of a v1 schema: hash columns become ``fixed_size_binary(32)``.
+
+    Bytes are kept in display order, so ``hex(column)`` matches what bitcoind prints.
+    """
+    fields = [
+        field.with_type(HASH_TYPE) if field.name in HASH_COLUMNS[dataset] else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata={b"schema_version": SCHEMA_VERSION_V2.encode("utf-8")})
+
+
+SCHEMA_REGISTRY_V2: Dict[str, pa.Schema] = {
+    dataset: _binary_hashes(dataset, schema) for dataset, schema in SCHEMA_REGISTRY.items()
+}
+
+SCHEMA_REGISTRIES: Dict[str, Dict[str, pa.Schema]] = {
+    SCHEMA_VERSION: SCHEMA_REGISTRY,
+    SCHEMA_VERSION_V2: SCHEMA_REGISTRY_V2,
+}
+
+
+def schema_for(dataset: str, version: str = SCHEMA_VERSION) -> pa.Schema:
+    return SCHEMA_REGISTRIES[version][dataset]
+
+
+def schema_version_of(schema: pa.Schema) -> str:
+    """Version recorded in a file schema; files without the key predate versioning (v1)."""
+    metadata = schema.metadata or {}
+    return metadata.get(b"schema_version", SCHEMA_VERSION.encode("utf-8")).decode("utf-8")
+
+
 def record_batch_from_models(models: Iterable[BaseModel], schema: pa.Schema) -> pa.Table:
     """Convert a sequence of pydantic models into an Arrow table enforcing schema."""
     rows = [model.model_dump() for model in models]
@@ -0,0 +1,450 @@
+"""Processed-height state for ingest, kept in one SQLite file.
+
+Every committed height is a row ``(height, hash)`` in ``_markers/state.sqlite``;
+block hashes are stored as 32-byte blobs. The table is loaded once into flat
+in-memory arrays (a done flag and a 32-byte slot per height) so ``is_done``,
+``hash_for`` and ``max_height`` never touch disk, and a rollback of ``k``
+heights is one ranged ``DELETE`` plus ``k`` slot resets.
+
+The database runs in WAL mode with ``synchronous=NORMAL``: each mark is visible
+to other readers as soon as it is written, while fsyncs are batched into WAL
+checkpoints instead of one per block. Lookups only see commits made through
+another connection after :meth:`ProcessedHeightIndex.refresh`, which compares
+``PRAGMA data_version`` and reloads the arrays if it moved. Drivers call it once
+per run or poll; a check costs a few microseconds, about twenty array lookups.
+
+Older data roots kept one ``<height>.done`` file per block plus ``state.json``;
+those are imported on first open and then removed.
+
+The same database holds a ``headers`` table of the last few ``(height, hash,
+prev_hash)`` headers, mirrored in memory by :class:`HeaderRing`, so reorg
+handling can find the fork point with one batched hash lookup, and a ``runs``
+table with one row per ingest run that wrote blocks (the last
+``RUN_HISTORY``), which ``onchain status`` turns into an ingest rate.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+STATE_FILE = "state.sqlite"
+RUN_HISTORY = 256
+
+_HASH_BYTES = 32
+_EMPTY_SLOT = bytes(_HASH_BYTES)
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS heights (height INTEGER PRIMARY KEY, hash BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS headers ("
+    "height INTEGER PRIMARY KEY, hash BLOB NOT NULL, prev_hash BLOB)",
+    "CREATE TABLE IF NOT EXISTS runs ("
+    "id INTEGER PRIMARY KEY, "
+    "started_utc INTEGER NOT NULL, "
+    "seconds REAL NOT NULL, "
+    "blocks INTEGER NOT NULL, "
+    "last_height INTEGER NOT NULL, "
+    "rows INTEGER NOT NULL, "
+    "bytes INTEGER NOT NULL)",
+)
+
+
+class StateStoreError(RuntimeError):
+    """Raised when the processed-height state cannot be read or migrated."""
+
+
+def _encode_hash(block_hash: str) -> bytes | str:
+    """Block hashes become 32-byte blobs; anything else is kept as text."""
+    if len(block_hash) == 2 * _HASH_BYTES:
+        try:
+            return bytes.fromhex(block_hash)
+        except ValueError:
+            pass
+    return block_hash
+
+
+def _decode_hash(value: bytes | str | None) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.hex() if len(value) == _HASH_BYTES else value.decode("utf-8")
+    return str(value)
+
+
+class IngestRun(NamedTuple):
+    started: datetime
+    seconds: float
+    blocks: int
+    last_height: int
+    rows: int
+    # Parquet bytes written by the run.
+    bytes: int
+
+
+class ProcessedHeightIndex:
+    """Heights whose rows are durably written, with the block hash for each."""
+
+    def __init__(self, data_root: Path, *, state_dir: Optional[Path] = None) -> None:
+        self._marker_dir = state_dir or data_root / "_markers"
+        self._marker_dir.mkdir(parents=True, exist_ok=True)
+        self.state_dir = self._marker_dir
+        self.path = self._marker_dir / STATE_FILE
+        self._lock = threading.Lock()
+        try:
+            # Drivers may hand the index to a writer thread; calls are serialized by the lock.
+            self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to open height state {self.path}: {exc}") from exc
+        self._done = bytearray()
+        self._hashes = bytearray()
+        # Non-hash identifiers (test fixtures, hand-edited state) do not fit a 32-byte slot.
+        self._text: Dict[int, str] = {}
+        self._max_height = -1
+        self._data_version = -1
+        self._migrate_markers()
+        self._load()
+
+    def __enter__(self) -> "ProcessedHeightIndex":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _load(self) -> None:
+        self._done.clear()
+        self._hashes.clear()
+        self._text.clear()
+        self._max_height = -1
+        with self._lock:
+            self._data_version = self._current_version()
+            rows = self._db.execute("SELECT height, hash FROM heights ORDER BY height").fetchall()
+        for height, value in rows:
+            self._store(int(height), value)
+
+    def _current_version(self) -> int:
+        return int(self._db.execute("PRAGMA data_version").fetchone()[0])
+
+    def refresh(self) -> bool:
+        """Reload if another connection committed since the last load; True if it did."""
+        try:
+            with self._lock:
+                changed = self._current_version() != self._data_version
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to read height state {self.path}: {exc}") from exc
+        if changed:
+            self._load()
+        return changed
+
+    def _migrate_markers(self) -> None:
+        markers: List[Tuple[int, Path]] = []
+        for marker_path in self._marker_dir.glob("*.done"):
+            if marker_path.stem.isdigit():
+                markers.append((int(marker_path.stem), marker_path))
+        if not markers:
+            return
+        rows = [
+            (height, marker_path.read_text(encoding="utf-8").strip())
+            for height, marker_path in markers
+        ]
+        self.mark_many(rows)
+        try:
+            with self._lock:
+                self._db.execute("PRAGMA wal_checkpoint(FULL)")
+        except sqlite3.Error as exc:
+            raise StateStoreError(
+                f"Failed to migrate height markers into {self.path}: {exc}"
+            ) from exc
+        for _, marker_path in markers:
+            marker_path.unlink(missing_ok=True)
+        (self._marker_dir / "state.json").unlink(missing_ok=True)
+
+    def _grow(self, height: int) -> None:
+        missing = height + 1 - len(self._done)
+        if missing > 0:
+            self._done.extend(bytes(missing))
+            self._hashes.extend(bytes(missing * _HASH_BYTES))
+
+    def _store(self, height: int, value: bytes | str) -> None:
+        self._grow(height)
+        self._done[height] = 1
+        offset = height * _HASH_BYTES
+        if isinstance(value, bytes) and len(value) == _HASH_BYTES:
+            self._hashes[offset : offset + _HASH_BYTES] = value
+            self._text.pop(height, None)
+        else:
+            self._hashes[offset : offset + _HASH_BYTES] = _EMPTY_SLOT
+            self._text[height] = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+        if height > self._max_height:
+            self._max_height = height
+
+    def _write(self, statement: str, params: Tuple[object, ...]) -> None:
+        try:
+            with self._lock:
+                self._db.execute(statement, params)
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to update height state {self.path}: {exc}") from exc
+
+    def _has(self, height: int) -> bool:
+        return 0 <= height < len(self._done) and bool(self._done[height])
+
+    def is_done(self, height: int) -> bool:
+        return self._has(height)
+
+    def hash_for(self, height: int) -> str | None:
+        if not self._has(height):
+            return None
+        text = self._text.get(height)
+        if text is not None:
+            return text or None
+        offset = height * _HASH_BYTES
+        return self._hashes[offset : offset + _HASH_BYTES].hex()
+
+    def mark_done(self, height: int, block_hash: str) -> None:
+        value = _encode_hash(block_hash)
+        self._write("INSERT OR REPLACE INTO heights VALUES (?, ?)", (height, value))
+        self._store(height, value)
+
+    def mark_many(self, rows: Iterable[Tuple[int, str]]) -> int:
+        """Record several ``(height, hash)`` pairs in one transaction."""
+        encoded = [(height, _encode_hash(block_hash)) for height, block_hash in rows]
+        if not encoded:
+            return 0
+        try:
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany("INSERT OR REPLACE INTO heights VALUES (?, ?)", encoded)
+                except sqlite3.Error:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to update height state {self.path}: {exc}") from exc
+        for height, value in encoded:
+            self._store(height, value)
+        return len(encoded)
+
+    def max_height(self) -> int:
+        return self._max_height
+
+    def heights(self) -> Iterator[int]:
+        """Processed heights in ascending order."""
+        return (height for height, flag in enumerate(self._done) if flag)
+
+    def count(self) -> int:
+        return self._done.count(1)
+
+    def clear_from(self, height: int) -> List[int]:
+        # The DELETE covers rows other connections wrote, so the arrays must too.
+        self.refresh()
+        height = max(height, 0)
+        removed = [
+            candidate for candidate in range(height, self._max_height + 1) if self._done[candidate]
+        ]
+        if not removed:
+            return []
+        self._write("DELETE FROM heights WHERE height >= ?", (height,))
+        for candidate in removed:
+            self._text.pop(candidate, None)
+        del self._done[height:]
+        del self._hashes[height * _HASH_BYTES :]
+        cursor = min(height, len(self._done)) - 1
+        while cursor >= 0 and not self._done[cursor]:
+            cursor -= 1
+        self._max_height = cursor
+        return removed
+
+    def record_run(self, run: IngestRun) -> None:
+        """Append ``run`` to the run history, keeping the newest ``RUN_HISTORY`` rows."""
+        try:
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.execute(
+                        "INSERT INTO runs (started_utc, seconds, blocks, last_height, rows, bytes) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            int(run.started.timestamp()),
+                            run.seconds,
+                            run.blocks,
+                            run.last_height,
+                            run.rows,
+                            run.bytes,
+                        ),
+                    )
+                    self._db.execute(
+                        "DELETE FROM runs WHERE id <= (SELECT MAX(id) FROM runs) - ?",
+                        (RUN_HISTORY,),
+                    )
+                except sqlite3.Error:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to record ingest run in {self.path}: {exc}") from exc
+
+    def recent_runs(self, limit: int) -> List[IngestRun]:
+        """The newest ``limit`` recorded runs, newest first."""
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT started_utc, seconds, blocks, last_height, rows, bytes FROM runs "
+                    "ORDER BY id DESC LIMIT ?",
+                    (limit,),
+                ).fetchall()
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to read ingest runs from {self.path}: {exc}") from exc
+        return [run_from_row(row) for row in rows]
+
+
+def run_from_row(row: Sequence[Any]) -> IngestRun:
+    """An :class:`IngestRun` from a ``runs`` row in column order."""
+    started, seconds, blocks, last_height, rows, size = row
+    return IngestRun(
+        started=datetime.fromtimestamp(int(started), tz=timezone.utc),
+        seconds=float(seconds),
+        blocks=int(blocks),
+        last_height=int(last_height),
+        rows=int(rows),
+        bytes=int(size),
+    )
+
+
+class BlockHeader(NamedTuple):
+    height: int
+    hash: str
+    # Unknown for headers seeded from the height index.
+    prev_hash: Optional[str]
+
+
+class HeaderRing:
+    """The last ``capacity`` ingested headers, forming one linked chain up to the tip.
+
+    Appends and truncations are written through to the ``headers`` table in the
+    height index's database, trimmed to ``capacity`` rows. On open, only rows
+    whose hash still matches the index are trusted, and heights the table lacks
+    (older data roots, rows lost to a crash) are seeded from index hashes.
+    """
+
+    def __init__(self, index: ProcessedHeightIndex, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._index = index
+        self._capacity = capacity
+        self._entries: Deque[BlockHeader] = deque(maxlen=capacity)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def tip(self) -> Optional[BlockHeader]:
+        return self._entries[-1] if self._entries else None
+
+    def _execute(self, statements: Iterable[Tuple[str, Tuple[object, ...]]]) -> None:
+        index = self._index
+        try:
+            with index._lock:
+                index._db.execute("BEGIN")
+                try:
+                    for statement, params in statements:
+                        index._db.execute(statement, params)
+                except sqlite3.Error:
+                    index._db.execute("ROLLBACK")
+                    raise
+                index._db.execute("COMMIT")
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to update headers in {index.path}: {exc}") from exc
+
+    def _load(self) -> None:
+        index = self._index
+        self._entries.clear()
+        top = index.max_height()
+        low = max(top - self._capacity + 1, 0)
+        try:
+            with index._lock:
+                rows = index._db.execute(
+                    "SELECT height, hash, prev_hash FROM headers WHERE height >= ?", (low,)
+                ).fetchall()
+        except sqlite3.Error as exc:
+            raise StateStoreError(f"Failed to read headers from {index.path}: {exc}") from exc
+        parents = {
+            int(height): _decode_hash(prev_hash)
+            for height, block_hash, prev_hash in rows
+            if _decode_hash(block_hash) == index.hash_for(int(height))
+        }
+        for height in range(low, top + 1):
+            block_hash = index.hash_for(height)
+            prev_hash = parents.get(height)
+            tip = self.tip
+            # Only a contiguous, linked run ending at the top can anchor fork searches.
+            if block_hash is None or (tip is not None and prev_hash not in (None, tip.hash)):
+                self._entries.clear()
+            if block_hash is not None:
+                self._entries.append(BlockHeader(height, block_hash, prev_hash))
+
+    def append(self, height: int, block_hash: str, prev_hash: Optional[str]) -> None:
+        """Record the header just ingested at ``height``.
+
+        Heights at or below the tip (gap fills) are ignored; a header that does
+        not extend the tip starts a new chain.
+        """
+        tip = self.tip
+        if tip is not None and height <= tip.height:
+            return
+        statements: List[Tuple[str, Tuple[object, ...]]] = []
+        if tip is None or height != tip.height + 1 or prev_hash not in (None, tip.hash):
+            self._entries.clear()
+            statements.append(("DELETE FROM headers", ()))
+        self._entries.append(BlockHeader(height, block_hash, prev_hash))
+        statements.append(
+            (
+                "INSERT OR REPLACE INTO headers VALUES (?, ?, ?)",
+                (
+                    height,
+                    _encode_hash(block_hash),
+                    None if prev_hash is None else _encode_hash(prev_hash),
+                ),
+            )
+        )
+        statements.append(("DELETE FROM headers WHERE height <= ?", (height - self._capacity,)))
+        self._execute(statements)
+
+    def truncate(self, height: int) -> None:
+        """Forget headers above ``height``; an emptied ring is reseeded from the index."""
+        while self._entries and self._entries[-1].height > height:
+            self._entries.pop()
+        self._execute([("DELETE FROM headers WHERE height > ?", (height,))])
+        if not self._entries:
+            self._load()
+
+    def newest_first(self, max_height: Optional[int] = None) -> List[Tuple[int, str]]:
+        """``(height, hash)`` pairs at or below ``max_height``, newest first."""
+        return [
+            (header.height, header.hash)
+            for header in reversed(self._entries)
+            if max_height is None or header.height <= max_height
+        ]
+
+
+__all__ = [
+    "BlockHeader",
+    "HeaderRing",
+    "IngestRun",
+    "ProcessedHeightIndex",
+    "RUN_HISTORY",
+    "STATE_FILE",
+    "StateStoreError",
+    "run_from_row",
+]
@@ -0,0 +1,256 @@
+"""Ingest status from the state store and the part catalog, without touching the datasets.
+
+``onchain status`` has to answer on a full-chain data root in well under a
+second, so it never lists bucket directories or opens a Parquet footer. Every
+figure comes from read-only queries on two SQLite sidecars:
+
+* ``_markers/state.sqlite``: processed heights, holes (gaps-and-islands over
+  the ``heights`` primary key), heights done per bucket, and the ``runs``
+  history behind the ingest rate.
+* ``_catalog/parts.sqlite``: files, rows and bytes per dataset and bucket.
+
+A bucket is complete when every height it should hold up to the highest
+processed height is marked, and the catalog's ``blocks`` rows match the marked
+heights. Per-bucket file figures are only reported from a complete catalog;
+otherwise ``catalog --rebuild`` has to run first.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .catalog import DATASETS, CatalogError, PartCatalog
+from .config import IngestConfig
+from .state import STATE_FILE, IngestRun, run_from_row
+
+DEFAULT_RUNS = 10
+
+
+class StatusError(RuntimeError):
+    """Raised when the ingest state or catalog cannot be read."""
+
+
+class HeightHole(NamedTuple):
+    first: int
+    last: int
+
+    @property
+    def size(self) -> int:
+        return self.last - self.first + 1
+
+
+class BucketStatus(NamedTuple):
+    bucket: int
+    heights_done: int
+    heights_expected: int
+    # ``{dataset: (files, rows, bytes)}``; empty without a complete catalog.
+    parts: Dict[str, Tuple[int, int, int]]
+
+    @property
+    def bytes(self) -> int:
+        return sum(size for _, _, size in self.parts.values())
+
+    @property
+    def block_rows(self) -> Optional[int]:
+        entry = self.parts.get("blocks")
+        return entry[1] if entry is not None else (0 if self.parts else None)
+
+    @property
+    def complete(self) -> bool:
+        rows = self.block_rows
+        if self.heights_done != self.heights_expected:
+            return False
+        return rows is None or rows == self.heights_done
+
+
+@dataclass
+class IngestStatus:
+    data_root: Path
+    bucket_size: int
+    processed: int
+    min_height: int
+    max_height: int
+    max_contiguous: int
+    holes: List[HeightHole]
+    buckets: List[BucketStatus]
+    catalog_complete: bool
+    datasets: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)
+    runs: List[IngestRun] = field(default_factory=list)
+
+    @property
+    def blocks_per_second(self) -> Optional[float]:
+        """Blocks over wall seconds across ``runs``."""
+        seconds = sum(run.seconds for run in self.runs)
+        return sum(run.blocks for run in self.runs) / seconds if seconds > 0 else None
+
+    @property
+    def incomplete_buckets(self) -> List[BucketStatus]:
+        return [bucket for bucket in self.buckets if not bucket.complete]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "data_root": str(self.data_root),
+            "bucket_size": self.bucket_size,
+            "heights": {
+                "processed": self.processed,
+                "min": self.min_height,
+                "max": self.max_height,
+                "max_contiguous": self.max_contiguous,
+                "missing": sum(hole.size for hole in self.holes),
+                "holes": [[hole.first, hole.last] for hole in self.holes],
+            },
+            "catalog_complete": self.catalog_complete,
+            "datasets": {
+                name: {"files": files, "rows": rows, "bytes": size}
+                for name, (files, rows, size) in sorted(self.datasets.items())
+            },
+            "buckets": [
+                {
+                    "bucket": bucket.bucket,
+                    "heights_done": bucket.heights_done,
+                    "heights_expected": bucket.heights_expected,
+                    "complete": bucket.complete,
+                    "bytes": bucket.bytes,
+                    "datasets": {
+                        name: {"files": files, "rows": rows, "bytes": size}
+                        for name, (files, rows, size) in sorted(bucket.parts.items())
+                    },
+                }
+                for bucket in self.buckets
+            ],
+            "runs": [
+                {
+                    "started": run.started.isoformat(),
+                    "seconds": round(run.seconds, 3),
+                    "blocks": run.blocks,
+                    "last_height": run.last_height,
+                    "rows": run.rows,
+                    "bytes": run.bytes,
+                }
+                for run in self.runs
+            ],
+            "blocks_per_second": self.blocks_per_second,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+
+def _holes(db: sqlite3.Connection, min_height: int) -> List[HeightHole]:
+    holes = [HeightHole(0, min_height - 1)] if min_height > 0 else []
+    rows = db.execute(
+        "SELECT height + 1, next - 1 FROM ("
+        "SELECT height, LEAD(height) OVER (ORDER BY height) AS next FROM heights"
+        ") WHERE next > height + 1"
+    ).fetchall()
+    holes.extend(HeightHole(int(first), int(last)) for first, last in rows)
+    return holes
+
+
+def _read_state(
+    path: Path, bucket_size: int, runs: int
+) -> Tuple[int, int, int, List[HeightHole], Dict[int, int], List[IngestRun]]:
+    if not path.exists():
+        return 0, -1, -1, [], {}, []
+    try:
+        db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            count, low, high = db.execute(
+                "SELECT COUNT(*), MIN(height), MAX(height) FROM heights"
+            ).fetchone()
+            low = -1 if low is None else int(low)
+            high = -1 if high is None else int(high)
+            holes = _holes(db, low) if count else []
+            done = {
+                int(bucket) * bucket_size: int(heights)
+                for bucket, heights in db.execute(
+                    "SELECT height / ? AS bucket, COUNT(*) FROM heights GROUP BY bucket",
+                    (bucket_size,),
+                )
+            }
+            has_runs = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'runs'"
+            ).fetchone()
+            history = (
+                [
+                    run_from_row(row)
+                    for row in db.execute(
+                        "SELECT started_utc, seconds, blocks, last_height, rows, bytes FROM runs "
+                        "ORDER BY id DESC LIMIT ?",
+                        (runs,),
+                    )
+                ]
+                if has_runs
+                else []
+            )
+        finally:
+            db.close()
+    except sqlite3.Error as exc:
+        raise StatusError(f"Failed to read height state {path}: {exc}") from exc
+    return int(count), low, high, holes, done, history
+
+
+def ingest_status(cfg: IngestConfig, *, runs: int = DEFAULT_RUNS) -> IngestStatus:
+    """Status of ``cfg.data_root`` from its height state and part catalog."""
+    size = cfg.height_bucket_size
+    processed, low, high, holes, done, history = _read_state(
+        cfg.data_root / "_markers" / STATE_FILE, size, runs
+    )
+    datasets: Dict[str, Tuple[int, int, int]] = {}
+    per_bucket: Dict[str, Dict[int, Tuple[int, int, int]]] = {}
+    catalog_complete = False
+    try:
+        catalog = PartCatalog.open_existing(cfg)
+        if catalog is not None:
+            with catalog:
+                catalog_complete = True
+                datasets = catalog.totals()
+                per_bucket = catalog.bucket_totals()
+    except CatalogError as exc:
+        raise StatusError(str(exc)) from exc
+
+    starts = set(done) | {bucket for buckets in per_bucket.values() for bucket in buckets}
+    buckets = []
+    for start in sorted(starts):
+        parts = {
+            dataset: per_bucket[dataset][start]
+            for dataset in DATASETS
+            if start in per_bucket.get(dataset, {})
+        }
+        if catalog_complete and not parts:
+            parts = {dataset: (0, 0, 0) for dataset in DATASETS}
+        buckets.append(
+            BucketStatus(
+                bucket=start,
+                heights_done=done.get(start, 0),
+                heights_expected=max(min(start + size - 1, high) - start + 1, 0),
+                parts=parts,
+            )
+        )
+    return IngestStatus(
+        data_root=cfg.data_root,
+        bucket_size=size,
+        processed=processed,
+        min_height=low,
+        max_height=high,
+        max_contiguous=holes[0].first - 1 if holes else high,
+        holes=holes,
+        buckets=buckets,
+        catalog_complete=catalog_complete,
+        datasets=datasets,
+        runs=history,
+    )
+
+
+__all__ = [
+    "BucketStatus",
+    "DEFAULT_RUNS",
+    "HeightHole",
+    "IngestStatus",
+    "StatusError",
+    "ingest_status",
+]
@@ -0,0 +1,298 @@
+"""Stage timers, counters and progress reporting for ingest runs.
+
+:class:`IngestStats` accumulates busy time per stage (``rpc``, ``json_decode``,
+``read`` for block files, ``parse``, ``addresses``, ``utxo``, ``arrow``,
+``write``, ``state``), RPC traffic, rows per dataset and the Arrow/Parquet byte counts
+behind the compression ratio. Stage times are summed over threads, so with
+several fetch workers ``rpc`` can exceed wall time. RPC stages are only
+recorded for clients built with the run's stats object.
+
+:class:`ProgressReporter` turns those counters into a rate-limited summary line
+(blocks/s, per-block stage cost, ETA to the target height) and rewrites the
+Prometheus textfile (``telemetry.metrics_textfile``) on the same cadence, so a
+node_exporter textfile collector can scrape a running ingest.
+
+Where ``/proc/self/statm`` exists, the process RSS is sampled as each stage
+ends and the highest value per stage is kept, so a memory blow-up can be
+pinned on the stage that was running when it happened.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, DefaultDict, Dict, Iterator, Optional
+
+STAGES = ("rpc", "json_decode", "read", "parse", "addresses", "utxo", "arrow", "write", "state")
+_SUMMARY_STAGES = ("rpc", "parse", "write")
+_PREFIX = "onchain_ingest"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Windows
+    _PAGE_SIZE = 4096
+
+
+def _read_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or ``None`` off Linux."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            resident_pages = int(handle.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * _PAGE_SIZE
+
+
+_DEFAULT_RSS = _read_rss if os.path.exists("/proc/self/statm") else None
+
+
+class IngestStats:
+    """Thread-safe per-stage timers and counters for one ingest run."""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.perf_counter,
+        *,
+        rss: Callable[[], Optional[int]] | None = _DEFAULT_RSS,
+    ) -> None:
+        self._clock = clock
+        self._rss = rss
+        self._lock = threading.Lock()
+        self.started = clock()
+        self._seconds: DefaultDict[str, float] = defaultdict(float)
+        self._counters: DefaultDict[str, int] = defaultdict(int)
+        self._rows: DefaultDict[str, int] = defaultdict(int)
+        self._stage_rss: Dict[str, int] = {}
+        self._peaks: Dict[str, int] = {}
+        self.height = -1
+        self.target: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.add_seconds(name, self._clock() - started)
+            resident = self._rss() if self._rss is not None else None
+            if resident is not None:
+                with self._lock:
+                    if resident > self._stage_rss.get(name, 0):
+                        self._stage_rss[name] = resident
+
+    def add_seconds(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._seconds[stage] += seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def add_rows(self, dataset: str, rows: int) -> None:
+        with self._lock:
+            self._rows[dataset] += rows
+
+    def seconds(self, stage: str) -> float:
+        with self._lock:
+            return self._seconds.get(stage, 0.0)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started."""
+        return self._clock() - self.started
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def rows(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._rows)
+
+    def observe_peak(self, name: str, value: int) -> None:
+        """Keep the highest ``value`` seen for gauge ``<name>_peak_bytes``."""
+        with self._lock:
+            if value > self._peaks.get(name, 0):
+                self._peaks[name] = value
+
+    def peak(self, name: str) -> int:
+        with self._lock:
+            return self._peaks.get(name, 0)
+
+    def stage_peak_rss(self) -> Dict[str, int]:
+        """Highest RSS sampled at the end of each stage, in bytes."""
+        with self._lock:
+            return dict(self._stage_rss)
+
+    def peak_rss_summary(self) -> Optional[str]:
+        stage_rss = self.stage_peak_rss()
+        if not stage_rss:
+            return None
+        parts = " ".join(
+            f"{stage}={stage_rss[stage] / 1e6:.0f}MB" for stage in STAGES if stage in stage_rss
+        )
+        return f"Peak RSS by stage: {parts}"
+
+    @property
+    def compression_ratio(self) -> Optional[float]:
+        """In-memory Arrow bytes per Parquet byte written, once anything was written."""
+        with self._lock:
+            written = self._counters.get("parquet_bytes", 0)
+            arrow = self._counters.get("arrow_bytes", 0)
+        return arrow / written if written else None
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            seconds = dict(self._seconds)
+            counters = dict(self._counters)
+            rows = dict(self._rows)
+            stage_rss = dict(self._stage_rss)
+            peaks = dict(self._peaks)
+        lines = [
+            f"# HELP {_PREFIX}_stage_seconds_total "
+            "Busy time per ingest stage, summed over threads.",
+            f"# TYPE {_PREFIX}_stage_seconds_total counter",
+        ]
+        for stage in sorted(set(STAGES).union(seconds)):
+            busy = seconds.get(stage, 0.0)
+            lines.append(f'{_PREFIX}_stage_seconds_total{{stage="{stage}"}} {busy:.6f}')
+        lines += [
+            f"# HELP {_PREFIX}_rows_total Rows produced per dataset.",
+            f"# TYPE {_PREFIX}_rows_total counter",
+        ]
+        for dataset in sorted(rows):
+            lines.append(f'{_PREFIX}_rows_total{{dataset="{dataset}"}} {rows[dataset]}')
+        for name, help_text in (
+            ("blocks", "Blocks ingested."),
+            ("rpc_requests", "JSON-RPC HTTP requests sent (a batch counts once)."),
+            ("rpc_bytes_received", "JSON-RPC response body bytes received."),
+            ("arrow_bytes", "In-memory Arrow bytes handed to the Parquet writer."),
+            ("parquet_bytes", "Parquet bytes written to disk."),
+        ):
+            lines += [
+                f"# HELP {_PREFIX}_{name}_total {help_text}",
+                f"# TYPE {_PREFIX}_{name}_total counter",
+                f"{_PREFIX}_{name}_total {counters.get(name, 0)}",
+            ]
+        if stage_rss:
+            lines += [
+                f"# HELP {_PREFIX}_stage_peak_rss_bytes "
+                "Highest process RSS sampled at the end of each stage.",
+                f"# TYPE {_PREFIX}_stage_peak_rss_bytes gauge",
+            ]
+            for stage, rss in sorted(stage_rss.items()):
+                lines.append(f'{_PREFIX}_stage_peak_rss_bytes{{stage="{stage}"}} {rss}')
+        for name in sorted(peaks):
+            lines += [
+                f"# HELP {_PREFIX}_{name}_peak_bytes Highest {name.replace('_', ' ')} bytes seen.",
+                f"# TYPE {_PREFIX}_{name}_peak_bytes gauge",
+                f"{_PREFIX}_{name}_peak_bytes {peaks[name]}",
+            ]
+        ratio = self.compression_ratio
+        gauges = [
+            ("height", "Last height ingested.", self.height),
+            ("target_height", "Height the run is working towards.", self.target),
+            ("compression_ratio", "Arrow bytes per Parquet byte written.", ratio),
+            ("elapsed_seconds", "Seconds since the run started.", self.elapsed),
+        ]
+        for name, help_text, value in gauges:
+            if value is None:
+                continue
+            lines += [
+                f"# HELP {_PREFIX}_{name} {help_text}",
+                f"# TYPE {_PREFIX}_{name} gauge",
+                f"{_PREFIX}_{name} {value:g}"
+                if isinstance(value, float)
+                else f"{_PREFIX}_{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """Atomically replace ``path`` so a scraper never reads a partial file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            temp.write_text(self.render_prometheus(), encoding="utf-8")
+            os.replace(temp, path)
+        finally:
+            temp.unlink(missing_ok=True)
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d{hours:02d}h{minutes:02d}m"
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+class ProgressReporter:
+    """Logs a throughput summary and rewrites the metrics textfile.
+
+    Both happen at most every ``interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        stats: IngestStats,
+        *,
+        log: Callable[[str], None],
+        interval: float,
+        textfile: Optional[Path] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._stats = stats
+        self._log = log
+        self._interval = interval
+        self._textfile = textfile
+        self._clock = clock
+        self._last_report = clock()
+        self._last_blocks = 0
+        self._last_seconds = {stage: 0.0 for stage in _SUMMARY_STAGES}
+
+    def update(self, *, force: bool = False) -> None:
+        now = self._clock()
+        elapsed = now - self._last_report
+        if not force and elapsed < self._interval:
+            return
+        stats = self._stats
+        blocks = stats.counter("blocks")
+        delta = blocks - self._last_blocks
+        if delta:
+            self._log(self._summary(delta, elapsed))
+        self._last_report = now
+        self._last_blocks = blocks
+        self._last_seconds = {stage: stats.seconds(stage) for stage in _SUMMARY_STAGES}
+        if self._textfile is not None:
+            stats.write_textfile(self._textfile)
+
+    def _summary(self, blocks: int, elapsed: float) -> str:
+        stats = self._stats
+        rate = blocks / elapsed if elapsed > 0 else 0.0
+        parts = [f"height {stats.height}", f"{rate:.1f} blocks/s"]
+        if blocks:
+            spent = {
+                stage: stats.seconds(stage) - self._last_seconds[stage] for stage in _SUMMARY_STAGES
+            }
+            costs = " ".join(
+                f"{stage}={seconds * 1000 / blocks:.1f}ms" for stage, seconds in spent.items()
+            )
+            parts.append(f"per block {costs}")
+        ratio = stats.compression_ratio
+        if ratio is not None:
+            parts.append(f"compression {ratio:.1f}x")
+        if stats.target is not None:
+            remaining = max(stats.target - stats.height, 0)
+            eta = _format_eta(remaining / rate) if rate > 0 else "?"
+            parts.append(f"ETA to {stats.target} {eta}")
+        return "Progress: " + ", ".join(parts)
+
+
+__all__ = ["IngestStats", "ProgressReporter", "STAGES"]
@@ -0,0 +1,5 @@
+"""Test and benchmark helpers for ingest; excluded from the wheel.
+
+Modules here import ``ingest`` by its top-level name, as the tests and
+benchmarks do with ``src`` on ``sys.path``.
+"""
@@ -0,0 +1,539 @@
+"""Local stand-in for the subset of bitcoind JSON-RPC used by ingest.
+
+The server answers ``getblockhash``, ``getblock``, ``getblockcount``,
+``getbestblockhash`` and ``waitfornewblock`` (single calls or JSON-RPC batch
+arrays) from an in-memory block corpus so ingest throughput can be measured end
+to end without a live node. Blocks are stored
+in the same shape bitcoind returns for ``getblock <hash> 2`` (epoch-second
+``time`` fields, BTC-denominated values); an optional ``hex`` key holds the
+serialized block served for ``verbosity=0``. ``verbosity=3`` adds a ``prevout``
+to every input whose funding output is in the corpus.
+
+Tests script chain growth and reorgs with :meth:`FakeBitcoind.set_chain`, which
+also wakes pending ``waitfornewblock`` calls, or queue them with
+:meth:`FakeBitcoind.schedule_chain` to fire after a number of HTTP requests.
+Node-side failures are injected with :meth:`FakeBitcoind.inject_fault`;
+``warmup_requests`` answers the first requests with ``-28`` like a node that is
+still loading its block index. :func:`record_corpus` captures real blocks from
+a node for replay.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ingest.rawblock import double_sha256, hash_hex
+
+if TYPE_CHECKING:
+    from ingest.rpc import BitcoinRPCClient
+
+_GENESIS_TIME = 1231006505
+
+
+def _digest(*parts: object) -> str:
+    payload = "|".join(str(part) for part in parts).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _varint(value: int) -> bytes:
+    if value < 0xFD:
+        return bytes([value])
+    if value <= 0xFFFF:
+        return b"\xfd" + struct.pack("<H", value)
+    if value <= 0xFFFFFFFF:
+        return b"\xfe" + struct.pack("<I", value)
+    return b"\xff" + struct.pack("<Q", value)
+
+
+class SerializedTx(NamedTuple):
+    raw: bytes
+    base: bytes
+
+    @property
+    def txid(self) -> str:
+        return hash_hex(double_sha256(self.base))
+
+
+def serialize_tx(
+    *,
+    inputs: Sequence[Tuple[Optional[str], int, bytes, int]],
+    outputs: Sequence[Tuple[int, bytes]],
+    version: int = 2,
+    locktime: int = 0,
+    witnesses: Optional[Sequence[Sequence[bytes]]] = None,
+) -> SerializedTx:
+    """Serialize a transaction; ``inputs`` are ``(prev_txid|None, vout, script_sig, sequence)``."""
+    body = bytearray(_varint(len(inputs)))
+    for prev_txid, prev_vout, script_sig, sequence in inputs:
+        prev = bytes(32) if prev_txid is None else bytes.fromhex(prev_txid)[::-1]
+        body += prev + struct.pack("<I", prev_vout) + _varint(len(script_sig)) + script_sig
+        body += struct.pack("<I", sequence)
+    body += _varint(len(outputs))
+    for value, script in outputs:
+        body += struct.pack("<Q", value) + _varint(len(script)) + script
+    head = struct.pack("<i", version)
+    tail = struct.pack("<I", locktime)
+    base = head + bytes(body) + tail
+    if not witnesses:
+        return SerializedTx(base, base)
+    witness = bytearray()
+    for stack in witnesses:
+        witness += _varint(len(stack))
+        for item in stack:
+            witness += _varint(len(item)) + item
+    return SerializedTx(head + b"\x00\x01" + bytes(body) + bytes(witness) + tail, base)
+
+
+def _merkle_root(txids: List[bytes]) -> bytes:
+    level = list(txids)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [double_sha256(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def serialize_block(
+    txs: Sequence[SerializedTx],
+    *,
+    prev_hash: Optional[str],
+    time_epoch: int,
+    version: int = 0x20000000,
+    bits: int = 0x207FFFFF,
+    nonce: int = 0,
+) -> bytes:
+    merkle = _merkle_root([double_sha256(tx.base) for tx in txs])
+    prev = bytes(32) if prev_hash is None else bytes.fromhex(prev_hash)[::-1]
+    header = (
+        struct.pack("<i", version) + prev + merkle + struct.pack("<III", time_epoch, bits, nonce)
+    )
+    return header + _varint(len(txs)) + b"".join(tx.raw for tx in txs)
+
+
+def write_block_files(
+    blocks_dir: Path,
+    raw_blocks: Sequence[bytes],
+    *,
+    magic: bytes,
+    xor_key: Optional[bytes] = None,
+    blocks_per_file: int = 0,
+    padding: int = 0,
+) -> List[Path]:
+    """Lay ``raw_blocks`` out as ``blk*.dat`` records the way bitcoind stores them.
+
+    ``blocks_per_file`` > 0 rolls over to a new file; ``padding`` appends the
+    zero-filled preallocation tail; ``xor_key`` also writes ``xor.dat``.
+    """
+    blocks_dir.mkdir(parents=True, exist_ok=True)
+    key = xor_key or bytes(8)
+    if xor_key is not None:
+        (blocks_dir / "xor.dat").write_bytes(xor_key)
+    per_file = blocks_per_file or max(len(raw_blocks), 1)
+    paths: List[Path] = []
+    for file_number, start in enumerate(range(0, len(raw_blocks), per_file)):
+        payload = bytearray()
+        for raw in raw_blocks[start : start + per_file]:
+            payload += magic + struct.pack("<I", len(raw)) + raw
+        payload += bytes(padding)
+        obfuscated = bytes(byte ^ key[offset % 8] for offset, byte in enumerate(payload))
+        path = blocks_dir / f"blk{file_number:05d}.dat"
+        path.write_bytes(obfuscated)
+        paths.append(path)
+    return paths
+
+
+def synthetic_block(
+    height: int,
+    previous_hash: str | None,
+    *,
+    tx_count: int = 4,
+    vin_per_tx: int = 2,
+    vout_per_tx: int = 2,
+    variant: str = "main",
+) -> Dict[str, Any]:
+    """Build a deterministic verbose block with ``tx_count`` transactions."""
+    block_hash = _digest("block", variant, height)
+    block_time = _GENESIS_TIME + height * 600
+    txs: List[Dict[str, Any]] = []
+    for tx_idx in range(max(tx_count, 1)):
+        txid = _digest("tx", variant, height, tx_idx)
+        if tx_idx == 0:
+            vin: List[Dict[str, Any]] = [
+                {"coinbase": "03" + f"{height:06x}", "sequence": 4294967295}
+            ]
+        else:
+            vin = [
+                {
+                    "txid": _digest("tx", variant, max(height - 1, 0), vin_idx),
+                    "vout": vin_idx,
+                    "sequence": 4294967293,
+                }
+                for vin_idx in range(vin_per_tx)
+            ]
+        vout = [
+            {
+                "value": round(0.0001 * (vout_idx + 1) + 0.5 * (tx_idx == 0), 8),
+                "n": vout_idx,
+                "scriptPubKey": {
+                    "type": "witness_v0_keyhash",
+                    "address": f"bcrt1q{_digest('addr', variant, height, tx_idx, vout_idx)[:38]}",
+                },
+            }
+            for vout_idx in range(vout_per_tx)
+        ]
+        txs.append(
+            {
+                "txid": txid,
+                "hash": txid,
+                "size": 110 + 68 * len(vin) + 31 * len(vout),
+                "weight": 4 * (110 + 68 * len(vin) + 31 * len(vout)),
+                "version": 2,
+                "locktime": 0,
+                "vin": vin,
+                "vout": vout,
+            }
+        )
+    size = 80 + sum(int(tx["size"]) for tx in txs)
+    block: Dict[str, Any] = {
+        "hash": block_hash,
+        "height": height,
+        "time": block_time,
+        "version": 0x20000000,
+        "merkleroot": _digest("merkle", variant, height),
+        "nonce": height,
+        "bits": "207fffff",
+        "size": size,
+        "weight": size * 4,
+        "tx": txs,
+    }
+    if previous_hash is not None:
+        block["previousblockhash"] = previous_hash
+    return block
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "timestamp"):
+        return int(value.timestamp())
+    raise TypeError(f"Unserializable corpus value {value!r}")
+
+
+def save_corpus(directory: Path, blocks: Sequence[Dict[str, Any]]) -> None:
+    """Write blocks as ``<height>.json`` files; a ``hex`` key keeps the raw block."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for block in blocks:
+        target = directory / f"{int(block['height']):08d}.json"
+        target.write_text(json.dumps(block, default=_json_default), encoding="utf-8")
+
+
+def load_corpus(directory: Path) -> List[Dict[str, Any]]:
+    """Load a corpus written by :func:`save_corpus`, ordered by height."""
+    blocks = [
+        json.loads(path.read_text(encoding="utf-8")) for path in sorted(directory.glob("*.json"))
+    ]
+    return sorted(blocks, key=lambda block: int(block["height"]))
+
+
+def record_corpus(
+    client: "BitcoinRPCClient",
+    start_height: int,
+    end_height: int,
+    directory: Path,
+    *,
+    raw: bool = True,
+    batch_size: int = 16,
+) -> int:
+    """Save ``[start_height, end_height]`` from a live node with :func:`save_corpus`.
+
+    ``raw`` also records each block's ``verbosity=0`` hex so the corpus can be
+    replayed with ``block_format: raw``. Returns the number of blocks written.
+    """
+    written = 0
+    for chunk_start in range(start_height, end_height + 1, batch_size):
+        heights = list(range(chunk_start, min(chunk_start + batch_size, end_height + 1)))
+        block_hashes = client.get_block_hashes(heights)
+        blocks = client.get_blocks(block_hashes, verbosity=2)
+        if raw:
+            for block, hex_block in zip(blocks, client.get_blocks(block_hashes, verbosity=0)):
+                block["hex"] = hex_block
+        for height, block in zip(heights, blocks):
+            block.setdefault("height", height)
+        save_corpus(directory, blocks)
+        written += len(blocks)
+    return written
+
+
+def synthetic_chain(length: int, **block_kwargs: Any) -> List[Dict[str, Any]]:
+    """Return ``length`` linked synthetic blocks starting at height 0."""
+    blocks: List[Dict[str, Any]] = []
+    previous: str | None = None
+    for height in range(length):
+        block = synthetic_block(height, previous, **block_kwargs)
+        blocks.append(block)
+        previous = block["hash"]
+    return blocks
+
+
+class FakeBitcoind:
+    """Threaded HTTP JSON-RPC server serving a fixed block corpus.
+
+    ``base_height`` is the height of the first block, so a recorded slice of
+    mainnet keeps its real heights.
+    """
+
+    def __init__(
+        self,
+        blocks: Sequence[Dict[str, Any]],
+        *,
+        latency_seconds: float = 0.0,
+        warmup_requests: int = 0,
+        base_height: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency_seconds = latency_seconds
+        self.base_height = base_height
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._faults: List[_Fault] = []
+        self._scheduled: List[Tuple[int, Sequence[Dict[str, Any]]]] = []
+        if warmup_requests > 0:
+            self.inject_fault(-28, "Loading block index...", count=warmup_requests)
+        self._tip_changed = threading.Condition(self._lock)
+        self._blocks: List[Dict[str, Any]] = []
+        self._by_hash: Dict[str, Dict[str, Any]] = {}
+        self._raw_by_hash: Dict[str, str] = {}
+        self._outputs: Dict[str, Tuple[int, bool, List[Dict[str, Any]]]] = {}
+        self.set_chain(blocks)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    def set_chain(self, blocks: Sequence[Dict[str, Any]]) -> None:
+        """Make ``blocks`` the active chain (growth or reorg).
+
+        Blocks dropped from the chain stay fetchable by hash.
+        """
+        active = [{key: value for key, value in block.items() if key != "hex"} for block in blocks]
+        for block, source in zip(active, blocks):
+            self._by_hash[block["hash"]] = block
+            if "hex" in source:
+                self._raw_by_hash[block["hash"]] = source["hex"]
+            for tx in block.get("tx", []):
+                coinbase = any("coinbase" in vin for vin in tx.get("vin", []))
+                outputs = tx.get("vout", [])
+                self._outputs[str(tx["txid"])] = (int(block["height"]), coinbase, outputs)
+        with self._tip_changed:
+            self._blocks = active
+            self._tip_changed.notify_all()
+
+    def schedule_chain(self, blocks: Sequence[Dict[str, Any]], *, after_requests: int) -> None:
+        """Switch to ``blocks`` once ``after_requests`` more HTTP requests have been served."""
+        with self._lock:
+            self._scheduled.append((self.request_count + after_requests, blocks))
+            self._scheduled.sort(key=lambda item: item[0])
+
+    def inject_fault(
+        self, code: int, message: str, *, count: int = 1, method: Optional[str] = None
+    ) -> None:
+        """Answer the next ``count`` calls (of ``method``, or any method) with an RPC error.
+
+        Inside a batch each element is a call, so a fault fails single elements
+        the way bitcoind does.
+        """
+        with self._lock:
+            self._faults.append(_Fault(code, message, method, count))
+
+    def _take_fault(self, method: str) -> Optional["_RPCFault"]:
+        with self._lock:
+            for fault in self._faults:
+                if fault.method is None or fault.method == method:
+                    fault.remaining -= 1
+                    if fault.remaining <= 0:
+                        self._faults.remove(fault)
+                    return _RPCFault(fault.code, fault.message)
+        return None
+
+    def _due_chain(self) -> Optional[Sequence[Dict[str, Any]]]:
+        with self._lock:
+            self.request_count += 1
+            due = None
+            while self._scheduled and self._scheduled[0][0] <= self.request_count:
+                due = self._scheduled.pop(0)[1]
+            return due
+
+    def _tip(self) -> Dict[str, Any]:
+        tip = self._blocks[-1]
+        return {"hash": tip["hash"], "height": self.base_height + len(self._blocks) - 1}
+
+    def _wait_for_new_block(self, timeout_ms: int) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms > 0 else None
+        with self._tip_changed:
+            start = self._blocks[-1]["hash"]
+            while self._blocks[-1]["hash"] == start:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._tip_changed.wait(remaining)
+            return self._tip()
+
+    @property
+    def host(self) -> str:
+        return str(self._server.server_address[0])
+
+    @property
+    def port(self) -> int:
+        return int(self._server.server_address[1])
+
+    def start(self) -> "FakeBitcoind":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-bitcoind", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeBitcoind":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def dispatch(self, method: str, params: List[Any]) -> Any:
+        """Resolve one RPC call; raises ``_RPCFault`` for node-side errors."""
+        fault = self._take_fault(method)
+        if fault is not None:
+            raise fault
+        if method == "getblockcount":
+            return self.base_height + len(self._blocks) - 1
+        if method == "getbestblockhash":
+            return self._blocks[-1]["hash"]
+        if method == "waitfornewblock":
+            return self._wait_for_new_block(int(params[0]) if params else 0)
+        if method == "getblockhash":
+            index = int(params[0]) - self.base_height
+            if index < 0 or index >= len(self._blocks):
+                raise _RPCFault(-8, "Block height out of range")
+            return self._blocks[index]["hash"]
+        if method == "getblock":
+            block_hash = str(params[0])
+            verbosity = int(params[1]) if len(params) > 1 else 1
+            block = self._by_hash.get(block_hash)
+            if block is None:
+                raise _RPCFault(-5, "Block not found")
+            if verbosity == 0:
+                raw = self._raw_by_hash.get(block_hash)
+                if raw is None:
+                    raise _RPCFault(-1, "Raw block not recorded in corpus")
+                return raw
+            if verbosity >= 3:
+                return self._with_prevouts(block)
+            return block
+        raise _RPCFault(-32601, "Method not found")
+
+    def _with_prevouts(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        txs = []
+        for tx in block.get("tx", []):
+            vins = []
+            for vin in tx.get("vin", []):
+                funding = self._outputs.get(str(vin.get("txid")))
+                vout = vin.get("vout")
+                if funding is not None and isinstance(vout, int) and vout < len(funding[2]):
+                    height, coinbase, outputs = funding
+                    spent = outputs[vout]
+                    vin = {
+                        **vin,
+                        "prevout": {
+                            "generated": coinbase,
+                            "height": height,
+                            "value": spent["value"],
+                            "scriptPubKey": spent["scriptPubKey"],
+                        },
+                    }
+                vins.append(vin)
+            txs.append({**tx, "vin": vins})
+        return {**block, "tx": txs}
+
+    def _handle_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = payload.get("id")
+        try:
+            result = self.dispatch(str(payload.get("method")), list(payload.get("params") or []))
+        except _RPCFault as fault:
+            return {
+                "result": None,
+                "error": {"code": fault.code, "message": fault.message},
+                "id": request_id,
+            }
+        return {"result": result, "error": None, "id": request_id}
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        node = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                due = node._due_chain()
+                if due is not None:
+                    node.set_chain(due)
+                if node.latency_seconds > 0:
+                    time.sleep(node.latency_seconds)
+                if isinstance(payload, list):
+                    reply: Any = [node._handle_payload(item) for item in payload]
+                else:
+                    reply = node._handle_payload(payload)
+                body = json.dumps(reply).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        return _Handler
+
+
+class _Fault:
+    def __init__(self, code: int, message: str, method: Optional[str], count: int) -> None:
+        self.code = code
+        self.message = message
+        self.method = method
+        self.remaining = count
+
+
+class _RPCFault(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+__all__ = [
+    "FakeBitcoind",
+    "SerializedTx",
+    "load_corpus",
+    "record_corpus",
+    "save_corpus",
+    "serialize_block",
+    "serialize_tx",
+    "synthetic_block",
+    "synthetic_chain",
+    "write_block_files",
+]
@@ -0,0 +1,431 @@
+"""Live UTXO set: the unspent outputs as of the last applied height.
+
+The set lives in ``_utxo_set/utxo.sqlite`` under the data root. Table
+``utxos(txid, vout, value_sats, height, script_type, address_id)`` is keyed by
+the outpoint, with txids stored as 32-byte BLOBs. ``address_id`` is the
+dictionary id of the output's first address, so the set needs
+``intern_addresses``. Blocks are applied strictly in height order from genesis.
+Each block is one transaction that inserts its outputs and then deletes the
+outputs its inputs spend. The deleted rows go to ``undo(height, ...)`` keyed by
+the spending height. Rolling back to height ``h`` deletes outputs created at or
+above ``h`` and restores undo rows spent at or above ``h`` that were created
+below it. The same rows give the state at any height the undo window still
+covers, which is how the lifecycle snapshots of past days read it
+(``utxo.liveset``).
+
+Undo rows are kept for ``limits.utxo_undo_depth`` heights below the highest
+committed height. The rolling writer commits a whole bucket at a time, so the
+set may run ahead of the committed heights. When an ingestor opens a set that
+is ahead (the process died before its bucket committed), it rolls the set back
+first. A reorg deeper than the undo window empties the set.
+
+Heights the set is not ready for are skipped rather than applied. That covers a
+set enabled on an existing data root, heights ingested out of order, and
+parallel backfill shards, which never touch it. :func:`catch_up` replays the
+missing heights from the Parquet datasets. ``onchain utxo-set --sync`` and
+the backfill coordinator both call it. ``meta`` keeps output and value totals
+up to date, so :meth:`UtxoSet.status` answers without a scan.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import duckdb
+
+from .catalog import PartCatalog
+from .config import IngestConfig
+from .hashes import create_hex_views, source_sql
+from .lookup import dataset_files
+from .state import ProcessedHeightIndex
+
+UTXO_SET_DIR = "_utxo_set"
+UTXO_SET_FILE = "utxo.sqlite"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS utxos ("
+    "txid BLOB NOT NULL, "
+    "vout INTEGER NOT NULL, "
+    "value_sats INTEGER NOT NULL, "
+    "height INTEGER NOT NULL, "
+    "script_type TEXT NOT NULL, "
+    "address_id INTEGER, "
+    "PRIMARY KEY (txid, vout)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS utxos_height ON utxos (height)",
+    "CREATE TABLE IF NOT EXISTS undo ("
+    "height INTEGER NOT NULL, "
+    "txid BLOB NOT NULL, "
+    "vout INTEGER NOT NULL, "
+    "value_sats INTEGER NOT NULL, "
+    "created_height INTEGER NOT NULL, "
+    "script_type TEXT NOT NULL, "
+    "address_id INTEGER)",
+    "CREATE INDEX IF NOT EXISTS undo_height ON undo (height)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+_META_DEFAULTS = {"applied_height": -1, "undo_from": 0, "outputs": 0, "value_sats": 0}
+
+# (txid hex, vout, value_sats, script_type, address_id) and (prev txid hex, prev vout).
+Create = Tuple[str, int, int, str, Optional[int]]
+Spend = Tuple[str, int]
+
+
+class UtxoSetError(RuntimeError):
+    """Raised when the UTXO set cannot be read, updated or rebuilt."""
+
+
+class Utxo(NamedTuple):
+    txid: str
+    vout: int
+    value_sats: int
+    height: int
+    script_type: str
+    address_id: Optional[int]
+
+
+class UtxoSetStatus(NamedTuple):
+    applied_height: int
+    undo_from: int
+    outputs: int
+    value_sats: int
+
+
+def utxo_set_path(data_root: Path) -> Path:
+    return data_root / UTXO_SET_DIR / UTXO_SET_FILE
+
+
+def block_changes(
+    txout: Dict[str, list], txin: Dict[str, list], first_output: int, first_input: int
+) -> Tuple[List[Create], List[Spend]]:
+    """Outputs created and outpoints spent by the block appended at the given column offsets."""
+    address_ids = txout["address_ids"][first_output:]
+    creates = [
+        (txid, int(vout), int(value), str(script_type), ids[0] if ids else None)
+        for txid, vout, value, script_type, ids in zip(
+            txout["txid"][first_output:],
+            txout["idx"][first_output:],
+            txout["value_sats"][first_output:],
+            txout["script_type"][first_output:],
+            address_ids,
+        )
+    ]
+    spends = [
+        (prev_txid, int(prev_vout))
+        for prev_txid, prev_vout, coinbase in zip(
+            txin["prev_txid"][first_input:],
+            txin["prev_vout"][first_input:],
+            txin["coinbase"][first_input:],
+        )
+        if not coinbase and prev_txid is not None and prev_vout is not None
+    ]
+    return creates, spends
+
+
+class UtxoSet:
+    """Outpoint -> output store of one data root, applied block by block."""
+
+    def __init__(self, data_root: Path, *, undo_depth: int = 1008) -> None:
+        if undo_depth <= 0:
+            raise ValueError("undo_depth must be positive")
+        self.path = utxo_set_path(data_root)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._undo_depth = undo_depth
+        self._closed = False
+        try:
+            self._db = sqlite3.connect(
+                self.path, isolation_level=None, timeout=60.0, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+            self._meta_values = {key: self._meta(key) for key in _META_DEFAULTS}
+        except sqlite3.Error as exc:
+            raise UtxoSetError(f"Failed to open UTXO set {self.path}: {exc}") from exc
+
+    @classmethod
+    def for_config(cls, cfg: IngestConfig) -> "UtxoSet":
+        return cls(cfg.data_root, undo_depth=cfg.limits.utxo_undo_depth)
+
+    @classmethod
+    def open_existing(cls, cfg: IngestConfig) -> Optional["UtxoSet"]:
+        """The data root's UTXO set, or ``None`` when none was ever created."""
+        if not utxo_set_path(cfg.data_root).exists():
+            return None
+        return cls.for_config(cfg)
+
+    def __enter__(self) -> "UtxoSet":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._db.close()
+
+    def _meta(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else _META_DEFAULTS[key]
+
+    def _set_meta(self, **values: int) -> None:
+        self._db.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            list(values.items()),
+        )
+
+    @property
+    def applied_height(self) -> int:
+        return self._meta_values["applied_height"]
+
+    @property
+    def next_height(self) -> int:
+        return self.applied_height + 1
+
+    def status(self) -> UtxoSetStatus:
+        return UtxoSetStatus(*(self._meta_values[key] for key in _META_DEFAULTS))
+
+    @contextmanager
+    def _transaction(self, work: str) -> Iterator[sqlite3.Connection]:
+        db = self._db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            raise UtxoSetError(f"Failed to {work}: {exc}") from exc
+
+    def _totals(self, query: str, params: Tuple[int, ...]) -> Tuple[int, int]:
+        count, value = self._db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(value_sats), 0) {query}", params
+        ).fetchone()
+        return int(count), int(value)
+
+    def apply_block(self, height: int, creates: Sequence[Create], spends: Sequence[Spend]) -> int:
+        """Add the outputs of block ``height`` and remove what it spends.
+
+        Returns how many spent outpoints were not in the set; a set applied
+        from genesis over a valid chain has none.
+        """
+        if height != self.next_height:
+            raise UtxoSetError(
+                f"UTXO set is at height {self.applied_height}; cannot apply {height}."
+            )
+        meta = self._meta_values
+        with self._transaction(f"apply height {height} to the UTXO set") as db:
+            # BIP30 duplicate coinbases keep the first output, like the node's UTXO set.
+            db.executemany(
+                "INSERT INTO utxos (txid, vout, value_sats, height, script_type, address_id) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(txid, vout) DO NOTHING",
+                [
+                    (bytes.fromhex(txid), vout, value, height, script_type, address_id)
+                    for txid, vout, value, script_type, address_id in creates
+                ],
+            )
+            created, created_value = self._totals("FROM utxos WHERE height = ?", (height,))
+            # An outpoint spent twice in one block is only removed (and undone) once.
+            keys = list(dict.fromkeys((bytes.fromhex(txid), vout) for txid, vout in spends))
+            db.executemany(
+                "INSERT INTO undo "
+                "(height, txid, vout, value_sats, created_height, script_type, address_id) "
+                "SELECT ?, txid, vout, value_sats, height, script_type, address_id FROM utxos "
+                "WHERE txid = ? AND vout = ?",
+                [(height, txid, vout) for txid, vout in keys],
+            )
+            db.executemany("DELETE FROM utxos WHERE txid = ? AND vout = ?", keys)
+            spent, spent_value = self._totals("FROM undo WHERE height = ?", (height,))
+            changes = {
+                "applied_height": height,
+                "outputs": meta["outputs"] + created - spent,
+                "value_sats": meta["value_sats"] + created_value - spent_value,
+            }
+            self._set_meta(**changes)
+        meta.update(changes)
+        return len(keys) - spent
+
+    def rollback(self, height: int) -> bool:
+        """Undo heights at or above ``height``.
+
+        Returns ``False`` when the undo rows no longer reach down to ``height``;
+        the set is then emptied and has to be rebuilt with :func:`catch_up`.
+        """
+        if height > self.applied_height:
+            return True
+        if height < self._meta_values["undo_from"]:
+            self.reset()
+            return False
+        meta = self._meta_values
+        with self._transaction(f"roll the UTXO set back to height {height}") as db:
+            removed, removed_value = self._totals("FROM utxos WHERE height >= ?", (height,))
+            restored, restored_value = self._totals(
+                "FROM undo WHERE height >= ? AND created_height < ?", (height, height)
+            )
+            db.execute("DELETE FROM utxos WHERE height >= ?", (height,))
+            db.execute(
+                "INSERT INTO utxos (txid, vout, value_sats, height, script_type, address_id) "
+                "SELECT txid, vout, value_sats, created_height, script_type, address_id FROM undo "
+                "WHERE height >= ? AND created_height < ?",
+                (height, height),
+            )
+            db.execute("DELETE FROM undo WHERE height >= ?", (height,))
+            changes = {
+                "applied_height": height - 1,
+                "outputs": meta["outputs"] - removed + restored,
+                "value_sats": meta["value_sats"] - removed_value + restored_value,
+            }
+            self._set_meta(**changes)
+        meta.update(changes)
+        return True
+
+    def reset(self) -> None:
+        """Empty the set; the next height it accepts is genesis."""
+        with self._transaction(f"reset the UTXO set {self.path}") as db:
+            db.execute("DELETE FROM utxos")
+            db.execute("DELETE FROM undo")
+            self._set_meta(**_META_DEFAULTS)
+        self._meta_values = dict(_META_DEFAULTS)
+
+    def prune_undo(self, committed_height: int) -> int:
+        """Drop undo rows more than ``undo_depth`` heights below ``committed_height``."""
+        below = min(committed_height, self.applied_height) - self._undo_depth + 1
+        if below <= self._meta_values["undo_from"]:
+            return 0
+        with self._transaction(f"prune UTXO undo rows below height {below}") as db:
+            removed = db.execute("DELETE FROM undo WHERE height < ?", (below,)).rowcount
+            self._set_meta(undo_from=below)
+        self._meta_values["undo_from"] = below
+        return int(removed)
+
+    def reconcile(self, committed_height: int) -> None:
+        """Roll back heights applied beyond ``committed_height`` that never became durable."""
+        if self.applied_height > committed_height:
+            self.rollback(committed_height + 1)
+
+    def get(self, txid: str, vout: int) -> Optional[Utxo]:
+        """The unspent output ``txid:vout``, or ``None`` when spent or unknown."""
+        try:
+            row = self._db.execute(
+                "SELECT value_sats, height, script_type, address_id FROM utxos "
+                "WHERE txid = ? AND vout = ?",
+                (bytes.fromhex(txid), vout),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            raise UtxoSetError(f"Failed to read {txid}:{vout} from the UTXO set: {exc}") from exc
+        if row is None:
+            return None
+        return Utxo(txid.lower(), vout, int(row[0]), int(row[1]), str(row[2]), row[3])
+
+
+def _ready_through(height_index: ProcessedHeightIndex, start: int, last: Optional[int]) -> int:
+    """Last height of the processed run beginning at ``start`` (``start - 1`` if none)."""
+    height = start
+    while (last is None or height <= last) and height_index.is_done(height):
+        height += 1
+    return height - 1
+
+
+def _bucket_changes(
+    connection: duckdb.DuckDBPyConnection,
+    cfg: IngestConfig,
+    catalog: Optional[PartCatalog],
+    first: int,
+    last: int,
+) -> Dict[int, Tuple[List[Create], List[Spend]]]:
+    """Creates and spends per height for ``first..last`` read back from the datasets."""
+    datasets = ("transactions", "txin", "txout")
+    for dataset in datasets:
+        files = dataset_files(cfg, dataset, first, last, catalog=catalog)
+        if not files:
+            raise UtxoSetError(f"No {dataset} files hold heights {first}-{last}.")
+        layouts = catalog.layouts(dataset, files) if catalog is not None else None
+        view = connection.sql(source_sql(files, dataset, layouts=layouts))
+        view.create_view(dataset, replace=True)
+    # Hex views join buckets whose datasets were converted to ingest.v2 at different times.
+    create_hex_views(connection, {dataset: dataset for dataset in datasets})
+    connection.execute(
+        "CREATE OR REPLACE TEMP TABLE heights AS SELECT txid, height FROM transactions_hex "
+        "WHERE height BETWEEN ? AND ?",
+        [first, last],
+    )
+    changes: Dict[int, Tuple[List[Create], List[Spend]]] = {
+        height: ([], []) for height in range(first, last + 1)
+    }
+    outputs = connection.execute(
+        "SELECT h.height, o.txid, o.idx, o.value_sats, o.script_type, o.address_ids[1] "
+        "FROM txout_hex o JOIN heights h ON o.txid = h.txid"
+    ).arrow().read_all()
+    for height, *create in zip(*(column.to_pylist() for column in outputs.columns)):
+        changes[height][0].append(tuple(create))  # type: ignore[arg-type]
+    inputs = connection.execute(
+        "SELECT h.height, i.prev_txid, i.prev_vout "
+        "FROM txin_hex i JOIN heights h ON i.txid = h.txid "
+        "WHERE NOT i.coinbase AND i.prev_txid IS NOT NULL"
+    ).arrow().read_all()
+    for height, prev_txid, prev_vout in zip(*(column.to_pylist() for column in inputs.columns)):
+        changes[height][1].append((prev_txid, prev_vout))
+    return changes
+
+
+def catch_up(
+    cfg: IngestConfig,
+    height_index: ProcessedHeightIndex,
+    *,
+    through: Optional[int] = None,
+    utxos: Optional[UtxoSet] = None,
+) -> Tuple[int, int]:
+    """Apply processed heights the set has not seen yet, read from the Parquet datasets.
+
+    Stops at the first height that is not processed (or at ``through``). Returns
+    ``(applied heights, spends of unknown outpoints)``.
+    """
+    owned = utxos is None
+    store = utxos if utxos is not None else UtxoSet.for_config(cfg)
+    catalog = PartCatalog.open_existing(cfg)
+    connection = duckdb.connect(database=":memory:")
+    applied = missing = 0
+    try:
+        store.reconcile(height_index.max_height())
+        last = _ready_through(height_index, store.next_height, through)
+        bucket_size = cfg.height_bucket_size
+        while store.next_height <= last:
+            first = store.next_height
+            bucket_last = min(last, (first // bucket_size + 1) * bucket_size - 1)
+            changes = _bucket_changes(connection, cfg, catalog, first, bucket_last)
+            for height in range(first, bucket_last + 1):
+                creates, spends = changes[height]
+                missing += store.apply_block(height, creates, spends)
+                applied += 1
+            store.prune_undo(height_index.max_height())
+    except duckdb.Error as exc:
+        raise UtxoSetError(
+            f"Failed to read heights {store.next_height}+ from the datasets: {exc}"
+        ) from exc
+    finally:
+        connection.close()
+        if catalog is not None:
+            catalog.close()
+        if owned:
+            store.close()
+    return applied, missing
+
+
+__all__ = [
+    "UTXO_SET_DIR",
+    "UTXO_SET_FILE",
+    "Utxo",
+    "UtxoSet",
+    "UtxoSetError",
+    "UtxoSetStatus",
+    "block_changes",
+    "catch_up",
+    "utxo_set_path",
+]
@@ -1,23 +1,109 @@
 from __future__ import annotations
 
+import json
+import logging
 import os
+import re
 import uuid
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 from pyarrow.lib import ArrowException
 
 from pydantic import BaseModel
 
-from .schemas import SCHEMA_REGISTRY, record_batch_from_models
+from .columnar import DATASETS, BlockColumns, DatasetColumns
+from .config import WriterProfile
+from .hashes import binary_to_hex, hex_to_binary
+from .schemas import HASH_TYPE, SCHEMA_REGISTRIES, SCHEMA_VERSION, record_batch_from_models
+from .telemetry import IngestStats
 
 
 class WriterError(RuntimeError):
     """Raised when parquet writing fails."""
 
 
+logger = logging.getLogger(__name__)
+
+# Columns that point lookups (``ingest lookup``) filter on.
+LOOKUP_COLUMNS = ("txid", "prev_txid")
+_BLOOM_FPP = 0.01
+_warned_binary_blooms = False
+# Any txid-carrying row takes at least this many bytes in Arrow, which bounds the rows per
+# rolling row group when sizing its bloom filters.
+_MIN_ROW_BYTES = 64
+
+
+def lookup_write_options(schema: pa.Schema, rows: int) -> Dict[str, object]:
+    """``ParquetWriter`` options that let lookups prune row groups on the txid columns.
+
+    Column statistics and the page index are always written. Bloom filters sized
+    for ``rows`` distinct values per row group are added to text (ingest.v1) txid
+    columns only. pyarrow hashes binary values as the Parquet spec says, but
+    DuckDB (1.5) probes BLOB columns with a different hash and drops row groups
+    that hold the key, so a filter on an ingest.v2 column would make plain
+    DuckDB queries miss rows. Those files rely on statistics and the page index;
+    a warning says so once per process.
+    """
+    global _warned_binary_blooms
+    options: Dict[str, object] = {"write_statistics": True, "write_page_index": True}
+    present = [name for name in LOOKUP_COLUMNS if name in schema.names]
+    blooms = {
+        name: {"ndv": max(rows, 1), "fpp": _BLOOM_FPP}
+        for name in present
+        if pa.types.is_string(schema.field(name).type)
+    }
+    if blooms:
+        options["bloom_filter_options"] = blooms
+    if len(blooms) < len(present) and not _warned_binary_blooms:
+        _warned_binary_blooms = True
+        logger.warning(
+            "Bloom filters are not written for binary txid columns (ingest.v2): DuckDB "
+            "misreads them. Lookups prune on column statistics and the page index only."
+        )
+    return options
+
+
+def _leaf_path(field: pa.Field) -> str:
+    """Parquet column path of ``field``; pyarrow matches per-column options on leaf paths."""
+    if pa.types.is_list(field.type):
+        # Lists are written in the compliant ``<name>.list.element`` layout.
+        return f"{field.name}.list.element"
+    return field.name
+
+
+def profile_write_options(schema: pa.Schema, profile: WriterProfile | None) -> Dict[str, object]:
+    """``ParquetWriter`` dictionary, encoding and page options for a dataset's writer profile.
+
+    Without a profile every column is dictionary-encoded. Profile entries for
+    columns ``schema`` lacks are ignored, so one profile serves files written
+    before a column was added.
+    """
+    if profile is None:
+        return {"use_dictionary": True}
+    encodings = {
+        column: encoding for column, encoding in profile.encodings.items() if column in schema.names
+    }
+    dictionary = schema.names if profile.dictionary is None else profile.dictionary
+    options: Dict[str, object] = {
+        "use_dictionary": [
+            _leaf_path(schema.field(column))
+            for column in dictionary
+            if column in schema.names and column not in encodings
+        ]
+    }
+    if encodings:
+        options["column_encoding"] = {
+            _leaf_path(schema.field(column)): encoding for column, encoding in encodings.items()
+        }
+    if profile.data_page_size is not None:
+        options["data_page_size"] = profile.data_page_size
+    return options
+
+
 def bucket_height(height: int, bucket_size: int) -> int:
     if bucket_size <= 0:
         raise WriterError("bucket_size must be positive")
@@ -29,9 +115,13 @@ def partition_path(root: Path, template: str, *, height_bucket: int) -> Path:
     return (root / relative).resolve()
 
 
-def ensure_schema(dataset: str) -> pa.Schema:
+def ensure_schema(dataset: str, version: str = SCHEMA_VERSION) -> pa.Schema:
     try:
-        return SCHEMA_REGISTRY[dataset]
+        registry = SCHEMA_REGISTRIES[version]
+    except KeyError as exc:
+        raise WriterError(f"Unknown schema version '{version}'") from exc
+    try:
+        return registry[dataset]
     except KeyError as exc:
         raise WriterError(f"Unknown dataset '{dataset}'") from exc
 
@@ -49,6 +139,7 @@ def write_table(
     file_stem: str,
     compression: str = "zstd",
     zstd_level: int = 6,
+    profile: WriterProfile | None = None,
 ) -> Path:
     output_dir.mkdir(parents=True, exist_ok=True)
     filename = f"{file_stem}.parquet"
@@ -60,10 +151,12 @@ def write_table(
         pq.write_table(
             table,
             temp_path,
+            row_group_size=profile.row_group_rows if profile is not None else None,
             compression=compression,
             compression_level=zstd_level,
-            use_dictionary=True,
             coerce_timestamps="us",
+            **profile_write_options(table.schema, profile),
+            **lookup_write_options(table.schema, table.num_rows),
         )
         os.replace(temp_path, target)
     except (OSError, ArrowException) as exc:
@@ -74,9 +167,9 @@ def write_table(
     return target
 
 
-def append_models(
+def append_batch(
     dataset: str,
-    models: Sequence[BaseModel],
+    batch: pa.RecordBatch | pa.Table,
     *,
     root: Path,
     partition_template: str,
@@ -84,18 +177,620 @@ def append_models(
     compression: str,
     zstd_level: int,
     marker: str | None = None,
+    profile: WriterProfile | None = None,
 ) -> Path:
-    if not models:
+    if batch.num_rows == 0:
         raise WriterError("No records to write.")
-    table = models_to_table(dataset, models)
+    table = pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
     output_dir = partition_path(root, partition_template, height_bucket=height_bucket)
     token = marker or uuid.uuid4().hex[:10]
-    file_stem = f"part-{token}"
     return write_table(
         dataset,
         table,
         output_dir=output_dir,
-        file_stem=file_stem,
+        file_stem=f"part-{token}",
         compression=compression,
         zstd_level=zstd_level,
+        profile=profile,
     )
+
+
+def append_models(
+    dataset: str,
+    models: Sequence[BaseModel],
+    *,
+    root: Path,
+    partition_template: str,
+    height_bucket: int,
+    compression: str,
+    zstd_level: int,
+    marker: str | None = None,
+    profile: WriterProfile | None = None,
+) -> Path:
+    if not models:
+        raise WriterError("No records to write.")
+    return append_batch(
+        dataset,
+        models_to_table(dataset, models),
+        root=root,
+        partition_template=partition_template,
+        height_bucket=height_bucket,
+        compression=compression,
+        zstd_level=zstd_level,
+        marker=marker,
+        profile=profile,
+    )
+
+
+HEIGHT_ROWS_KEY = b"ingest.height_rows"
+_ROLLING_FILE = re.compile(
+    r"^part-(?P<dataset>[a-z_]+)-h(?P<first>\d{12})-(?P<last>\d{12})\.parquet$"
+)
+_HEIGHT_FILE = re.compile(r"^part-(?P<dataset>[a-z_]+)-h(?P<height>\d{12})\.parquet$")
+
+
+def compacted_file_name(dataset: str, bucket: int, sequence: int) -> str:
+    return f"part-{dataset}-c{bucket:012d}-{sequence:04d}.parquet"
+
+
+def has_compacted_files(output_dir: Path, dataset: str) -> bool:
+    return output_dir.exists() and any(output_dir.glob(f"part-{dataset}-c*.parquet"))
+
+
+def rolling_file_name(dataset: str, first_height: int, last_height: int) -> str:
+    return f"part-{dataset}-h{first_height:012d}-{last_height:012d}.parquet"
+
+
+def file_heights(name: str, dataset: str) -> Optional[Tuple[int, int]]:
+    """First and last height encoded in a rolling or per-height part file name."""
+    rolling = _ROLLING_FILE.match(name)
+    if rolling is not None and rolling.group("dataset") == dataset:
+        return int(rolling.group("first")), int(rolling.group("last"))
+    per_height = _HEIGHT_FILE.match(name)
+    if per_height is not None and per_height.group("dataset") == dataset:
+        height = int(per_height.group("height"))
+        return height, height
+    return None
+
+
+def read_height_rows(path: Path) -> List[Tuple[int, int]]:
+    """``(height, cumulative_rows)`` pairs recorded in a rolling file's footer."""
+    metadata = pq.read_metadata(path).metadata or {}
+    payload = metadata.get(HEIGHT_ROWS_KEY)
+    if payload is None:
+        raise WriterError(f"{path} has no {HEIGHT_ROWS_KEY.decode()} footer entry")
+    return [(int(height), int(rows)) for height, rows in json.loads(payload)]
+
+
+class _Segment:
+    """An uncommitted rolling file for one (dataset, bucket)."""
+
+    def __init__(self, dataset: str, bucket: int, output_dir: Path) -> None:
+        self.dataset = dataset
+        self.bucket = bucket
+        self.output_dir = output_dir
+        self.temp_path = output_dir / f".part-{dataset}-b{bucket}.{uuid.uuid4().hex}.inprogress"
+        self.writer: pq.ParquetWriter | None = None
+        self.staged: List[pa.RecordBatch] = []
+        self.staged_bytes = 0
+        self.rows_written = 0
+        self.height_rows: List[Tuple[int, int]] = []
+
+    @property
+    def first_height(self) -> int:
+        return self.height_rows[0][0]
+
+    @property
+    def last_height(self) -> int:
+        return self.height_rows[-1][0]
+
+
+class RollingBucketWriter:
+    """Append rows to one open ``ParquetWriter`` per (dataset, height bucket).
+
+    Rows are staged as record batches of ``io_batch_size`` rows and written as a
+    row group once the staged batches reach ``row_group_bytes``, or the
+    ``row_group_rows`` of the dataset's writer profile in ``profiles``. Files live under
+    a hidden ``.inprogress`` name until the bucket is committed, which closes
+    them, renames them to ``part-<dataset>-h<first>-<last>.parquet`` and hands the
+    committed heights to ``on_commit`` (the processed-height index), after the
+    published files went to ``on_publish`` (the part catalog). A JSON
+    journal records open files and the commit in flight so :meth:`recover` can
+    finish an interrupted commit and discard uncommitted files after a crash.
+    Each file's footer maps heights to row offsets so heights can be dropped
+    again on reorg rollback.
+    """
+
+    def __init__(
+        self,
+        *,
+        root: Path,
+        partitions: Mapping[str, str],
+        bucket_size: int,
+        compression: str,
+        zstd_level: int,
+        io_batch_size: int,
+        row_group_bytes: int,
+        journal_path: Path,
+        on_commit: Callable[[Dict[int, str]], None],
+        on_publish: Callable[[Dict[str, List[Path]]], None] | None = None,
+        schema_version: str = SCHEMA_VERSION,
+        stats: IngestStats | None = None,
+        profiles: Mapping[str, WriterProfile] | None = None,
+    ) -> None:
+        self._root = root
+        self._stats = stats or IngestStats()
+        self._schema_version = schema_version
+        self._partitions = dict(partitions)
+        self._bucket_size = bucket_size
+        self._compression = compression
+        self._zstd_level = zstd_level
+        self._io_batch_size = io_batch_size
+        self._row_group_bytes = row_group_bytes
+        self._profiles = dict(profiles or {})
+        self._journal_path = journal_path
+        self._on_commit = on_commit
+        self._on_publish = on_publish
+        self._columns: Dict[int, BlockColumns] = {}
+        self._segments: Dict[Tuple[str, int], _Segment] = {}
+        self._pending: Dict[int, str] = {}
+        self._pending_bucket: Dict[int, int] = {}
+        self.recover()
+
+    # --- journal -----------------------------------------------------------------
+
+    def _read_journal(self) -> Dict[str, object]:
+        if not self._journal_path.exists():
+            return {"open": [], "commit": None}
+        with self._journal_path.open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _write_journal(self, commit: Optional[Dict[str, object]] = None) -> None:
+        state = {
+            "open": [str(segment.temp_path) for segment in self._segments.values()],
+            "commit": commit,
+        }
+        self._journal_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._journal_path.with_suffix(".tmp")
+        with temp.open("w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(temp, self._journal_path)
+
+    def recover(self) -> None:
+        """Roll an interrupted commit forward and drop files that were never committed."""
+        state = self._read_journal()
+        commit = state.get("commit")
+        if isinstance(commit, dict):
+            for temp, final in commit.get("files", []):
+                if Path(temp).exists():
+                    os.replace(temp, final)
+            self._publish([final for _, final in commit.get("files", [])])
+            heights = {
+                int(height): str(digest) for height, digest in commit.get("heights", {}).items()
+            }
+            if heights:
+                self._on_commit(heights)
+        committed = (
+            {temp for temp, _ in commit.get("files", [])} if isinstance(commit, dict) else set()
+        )
+        for temp in state.get("open", []):
+            if temp not in committed:
+                Path(temp).unlink(missing_ok=True)
+        self._write_journal()
+
+    # --- appending ---------------------------------------------------------------
+
+    def columns(self, bucket: int) -> BlockColumns:
+        """Column buffers the next height of ``bucket`` should be parsed into."""
+        buffers = self._columns.get(bucket)
+        if buffers is None:
+            buffers = self._columns[bucket] = BlockColumns(self._schema_version)
+        return buffers
+
+    def pending_hash(self, height: int) -> str | None:
+        return self._pending.get(height)
+
+    def end_height(self, height: int, block_hash: str) -> Dict[str, int]:
+        """Record that ``height`` is fully buffered; commits earlier buckets."""
+        bucket = bucket_height(height, self._bucket_size)
+        committed = self.commit(before_bucket=bucket)
+        buffers = self.columns(bucket)
+        for dataset in DATASETS:
+            segment = self._segment(dataset, bucket)
+            buffer = buffers[dataset]
+            staged_rows = sum(batch.num_rows for batch in segment.staged)
+            segment.height_rows.append((height, segment.rows_written + staged_rows + len(buffer)))
+            if len(buffer) >= self._io_batch_size:
+                self._stage(segment, buffer)
+            if segment.staged_bytes >= self._row_group_bytes or self._row_group_full(segment):
+                self._write_row_group(segment)
+        self._pending[height] = block_hash
+        self._pending_bucket[height] = bucket
+        return committed
+
+    def _segment(self, dataset: str, bucket: int) -> _Segment:
+        key = (dataset, bucket)
+        segment = self._segments.get(key)
+        if segment is None:
+            output_dir = partition_path(self._root, self._partitions[dataset], height_bucket=bucket)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            segment = self._segments[key] = _Segment(dataset, bucket, output_dir)
+            self._write_journal()
+        return segment
+
+    def _stage(self, segment: _Segment, buffer: DatasetColumns) -> None:
+        if not len(buffer):
+            return
+        with self._stats.stage("arrow"):
+            batch = buffer.to_record_batch()
+        buffer.clear()
+        segment.staged.append(batch)
+        segment.staged_bytes += batch.nbytes
+
+    def _row_group_full(self, segment: _Segment) -> bool:
+        profile = self._profiles.get(segment.dataset)
+        if profile is None or profile.row_group_rows is None:
+            return False
+        return sum(batch.num_rows for batch in segment.staged) >= profile.row_group_rows
+
+    def _write_row_group(self, segment: _Segment) -> None:
+        if not segment.staged:
+            return
+        table = pa.Table.from_batches(segment.staged)
+        try:
+            with self._stats.stage("write"):
+                if segment.writer is None:
+                    segment.writer = self._open_writer(segment.temp_path, segment.dataset)
+                segment.writer.write_table(table, row_group_size=table.num_rows)
+        except (OSError, ArrowException) as exc:
+            raise WriterError(
+                f"Failed to write row group for dataset '{segment.dataset}': {exc}"
+            ) from exc
+        self._stats.count("arrow_bytes", segment.staged_bytes)
+        segment.rows_written += table.num_rows
+        segment.staged.clear()
+        segment.staged_bytes = 0
+
+    def _open_writer(self, path: Path, dataset: str) -> pq.ParquetWriter:
+        schema = ensure_schema(dataset, self._schema_version)
+        profile = self._profiles.get(dataset)
+        rows = self._row_group_bytes // _MIN_ROW_BYTES
+        if profile is not None and profile.row_group_rows is not None:
+            rows = min(rows, profile.row_group_rows)
+        return pq.ParquetWriter(
+            path,
+            schema,
+            compression=self._compression,
+            compression_level=self._zstd_level,
+            coerce_timestamps="us",
+            **profile_write_options(schema, profile),
+            **lookup_write_options(schema, rows),
+        )
+
+    def _close_segment(self, segment: _Segment) -> int:
+        """Flush everything buffered for ``segment`` and close its file; returns its row count."""
+        buffers = self._columns.get(segment.bucket)
+        if buffers is not None:
+            buffer = buffers[segment.dataset]
+            expected = segment.height_rows[-1][1] if segment.height_rows else 0
+            surplus = segment.rows_written + sum(b.num_rows for b in segment.staged) + len(buffer)
+            if surplus > expected:
+                # Rows of a height that failed part-way through parsing.
+                keep = len(buffer) - (surplus - expected)
+                for values in buffer.columns.values():
+                    del values[keep:]
+            self._stage(segment, buffer)
+        self._write_row_group(segment)
+        if segment.writer is None:
+            if not segment.height_rows:
+                return 0
+            # Heights without rows for this dataset still produce an (empty) file.
+            segment.writer = self._open_writer(segment.temp_path, segment.dataset)
+        payload = json.dumps(segment.height_rows).encode("utf-8")
+        with self._stats.stage("write"):
+            segment.writer.add_key_value_metadata({HEIGHT_ROWS_KEY: payload})
+            segment.writer.close()
+        segment.writer = None
+        self._stats.count("parquet_bytes", segment.temp_path.stat().st_size)
+        return segment.rows_written
+
+    # --- commit / rollback -------------------------------------------------------
+
+    def commit(self, *, before_bucket: int | None = None) -> Dict[str, int]:
+        """Atomically publish every open bucket (or those below ``before_bucket``)."""
+        keys = [
+            key
+            for key in self._segments
+            if before_bucket is None or key[1] < before_bucket
+        ]
+        if not keys:
+            return {}
+        try:
+            rows, files = self._close_segments(keys)
+            buckets = {key[1] for key in keys}
+            heights = {
+                height: digest
+                for height, digest in self._pending.items()
+                if self._pending_bucket[height] in buckets
+            }
+            commit = {"files": files, "heights": {str(h): d for h, d in heights.items()}}
+            self._write_journal(commit)
+            for temp, final in files:
+                os.replace(temp, final)
+            self._publish([final for _, final in files])
+        except Exception:
+            # The journal still lists this commit (or its open files); recover() settles it
+            # on the next start, so forget the in-memory state instead of retrying here.
+            self._segments.clear()
+            self._columns.clear()
+            self._pending.clear()
+            self._pending_bucket.clear()
+            raise
+        for key in keys:
+            del self._segments[key]
+        for bucket in buckets:
+            self._columns.pop(bucket, None)
+        for height in heights:
+            del self._pending[height]
+            del self._pending_bucket[height]
+        if heights:
+            self._on_commit(heights)
+        self._write_journal()
+        return rows
+
+    def _publish(self, finals: Iterable[str]) -> None:
+        if self._on_publish is None:
+            return
+        published: Dict[str, List[Path]] = {}
+        for final in finals:
+            path = Path(final)
+            match = _ROLLING_FILE.match(path.name)
+            if match is not None and path.exists():
+                published.setdefault(match.group("dataset"), []).append(path)
+        if published:
+            self._on_publish(published)
+
+    def _close_segments(
+        self, keys: List[Tuple[str, int]]
+    ) -> Tuple[Dict[str, int], List[List[str]]]:
+        rows: Dict[str, int] = {dataset: 0 for dataset in DATASETS}
+        files: List[List[str]] = []
+        for key in keys:
+            segment = self._segments[key]
+            count = self._close_segment(segment)
+            if not segment.height_rows:
+                continue
+            rows[segment.dataset] += count
+            final = segment.output_dir / rolling_file_name(
+                segment.dataset, segment.first_height, segment.last_height
+            )
+            files.append([str(segment.temp_path), str(final)])
+        return rows, files
+
+    def close(self) -> Dict[str, int]:
+        return self.commit()
+
+    def discard_from(self, height: int, *, known_max_height: int) -> List[int]:
+        """Drop every row for heights >= ``height`` from open and committed files.
+
+        Returns the uncommitted heights that were discarded.
+        """
+        for key, segment in list(self._segments.items()):
+            if not segment.height_rows or segment.last_height < height:
+                continue
+            self._close_segment(segment)
+            keep = [(h, rows) for h, rows in segment.height_rows if h < height]
+            if keep:
+                table = pq.read_table(segment.temp_path, partitioning=None).slice(0, keep[-1][1])
+                segment.temp_path.unlink(missing_ok=True)
+                replacement = _Segment(segment.dataset, segment.bucket, segment.output_dir)
+                replacement.staged = table.to_batches()
+                replacement.staged_bytes = table.nbytes
+                replacement.height_rows = keep
+                self._segments[key] = replacement
+            else:
+                segment.temp_path.unlink(missing_ok=True)
+                del self._segments[key]
+        discarded = sorted(h for h in self._pending if h >= height)
+        for pending in discarded:
+            del self._pending[pending]
+            del self._pending_bucket[pending]
+        self._write_journal()
+
+        last_bucket = bucket_height(max(known_max_height, height), self._bucket_size)
+        bucket = bucket_height(height, self._bucket_size)
+        while bucket <= last_bucket:
+            for dataset, template in self._partitions.items():
+                output_dir = partition_path(self._root, template, height_bucket=bucket)
+                if not output_dir.exists():
+                    continue
+                for path in sorted(output_dir.glob(f"part-{dataset}-h*-*.parquet")):
+                    match = _ROLLING_FILE.match(path.name)
+                    if match is None or match.group("dataset") != dataset:
+                        continue
+                    if int(match.group("last")) >= height:
+                        truncate_rolling_file(
+                            path,
+                            dataset,
+                            height,
+                            compression=self._compression,
+                            zstd_level=self._zstd_level,
+                            profile=self._profiles.get(dataset),
+                        )
+            bucket += self._bucket_size
+        return discarded
+
+
+def _replace_table(
+    path: Path,
+    table: pa.Table,
+    *,
+    compression: str,
+    zstd_level: int,
+    metadata: Optional[Dict[bytes, bytes]] = None,
+    profile: WriterProfile | None = None,
+) -> None:
+    temp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with pq.ParquetWriter(
+            temp,
+            table.schema,
+            compression=compression,
+            compression_level=zstd_level,
+            coerce_timestamps="us",
+            **profile_write_options(table.schema, profile),
+            **lookup_write_options(table.schema, table.num_rows),
+        ) as writer:
+            writer.write_table(
+                table, row_group_size=profile.row_group_rows if profile is not None else None
+            )
+            if metadata:
+                writer.add_key_value_metadata(metadata)
+        # Replace in place first so a crash never leaves both versions visible.
+        os.replace(temp, path)
+    except (OSError, ArrowException) as exc:
+        temp.unlink(missing_ok=True)
+        raise WriterError(f"Failed to rewrite {path}: {exc}") from exc
+
+
+def truncate_rolling_file(
+    path: Path,
+    dataset: str,
+    height: int,
+    *,
+    compression: str,
+    zstd_level: int,
+    profile: WriterProfile | None = None,
+) -> None:
+    """Cut a committed rolling file back to the heights below ``height``."""
+    offsets = read_height_rows(path)
+    keep = [(h, rows) for h, rows in offsets if h < height]
+    if not keep:
+        path.unlink(missing_ok=True)
+        return
+    table = pq.read_table(path, partitioning=None).slice(0, keep[-1][1])
+    _replace_table(
+        path,
+        table,
+        compression=compression,
+        zstd_level=zstd_level,
+        metadata={HEIGHT_ROWS_KEY: json.dumps(keep).encode("utf-8")},
+        profile=profile,
+    )
+    renamed = path.with_name(rolling_file_name(dataset, keep[0][0], keep[-1][0]))
+    if renamed != path:
+        os.replace(path, renamed)
+
+
+def _max_height(path: Path) -> Optional[int]:
+    """Largest ``height`` in a file according to its row-group statistics."""
+    metadata = pq.read_metadata(path)
+    names = metadata.schema.names
+    if "height" not in names:
+        return None
+    column = names.index("height")
+    highest = -1
+    for index in range(metadata.num_row_groups):
+        statistics = metadata.row_group(index).column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            return None
+        highest = max(highest, int(statistics.max))
+    return highest
+
+
+def _bucket_files(output_dir: Path, dataset: str, height: int) -> List[Path]:
+    """Parquet files in a bucket directory that may hold rows at ``height`` or above."""
+    if not output_dir.exists():
+        return []
+    candidates: List[Path] = []
+    for path in sorted(output_dir.glob("*.parquet")):
+        per_height = _HEIGHT_FILE.match(path.name)
+        rolling = _ROLLING_FILE.match(path.name)
+        if per_height and per_height.group("dataset") == dataset:
+            if int(per_height.group("height")) < height:
+                continue
+        elif rolling and rolling.group("dataset") == dataset:
+            if int(rolling.group("last")) < height:
+                continue
+        candidates.append(path)
+    return candidates
+
+
+def stale_txids(output_dirs: Iterable[Path], height: int) -> pa.Array:
+    """Txids of ``transactions`` rows at ``height`` or above, as hex strings."""
+    chunks: List[pa.Array] = []
+    for output_dir in output_dirs:
+        for path in _bucket_files(output_dir, "transactions", height):
+            highest = _max_height(path)
+            if highest is not None and highest < height:
+                continue
+            table = pq.read_table(path, columns=["txid", "height"], partitioning=None)
+            txids = table.filter(pc.greater_equal(table.column("height"), height)).column("txid")
+            if txids.type == HASH_TYPE:
+                txids = binary_to_hex(txids)
+            chunks.extend(txids.chunks)
+    return pa.concat_arrays(chunks) if chunks else pa.array([], type=pa.string())
+
+
+def drop_heights_from(
+    output_dir: Path,
+    dataset: str,
+    height: int,
+    *,
+    txids: pa.Array,
+    compression: str,
+    zstd_level: int,
+    profile: WriterProfile | None = None,
+) -> int:
+    """Remove the rows of heights >= ``height`` from one bucket directory in one pass.
+
+    Per-height files are unlinked by name and rolling files are cut at their
+    footer offsets. Any other file (compacted output, unmarked flushes) is
+    rewritten once without the dropped rows, selected by ``height`` where the
+    dataset has that column and by membership in ``txids`` (see
+    :func:`stale_txids`) for ``txin`` and ``txout``. Returns the files changed.
+    """
+    changed = 0
+    for path in _bucket_files(output_dir, dataset, height):
+        if _HEIGHT_FILE.match(path.name):
+            path.unlink(missing_ok=True)
+            changed += 1
+            continue
+        if _ROLLING_FILE.match(path.name):
+            truncate_rolling_file(
+                path,
+                dataset,
+                height,
+                compression=compression,
+                zstd_level=zstd_level,
+                profile=profile,
+            )
+            changed += 1
+            continue
+        highest = _max_height(path)
+        if highest is not None and highest < height:
+            continue
+        table = pq.read_table(path, partitioning=None)
+        if "height" in table.column_names:
+            stale = pc.greater_equal(table.column("height"), height)
+        else:
+            if not len(txids):
+                continue
+            binary = table.schema.field("txid").type == HASH_TYPE
+            value_set = hex_to_binary(txids) if binary else txids
+            stale = pc.is_in(table.column("txid"), value_set=value_set)
+        dropped = pc.sum(stale).as_py() or 0
+        if not dropped:
+            continue
+        if dropped == table.num_rows:
+            path.unlink(missing_ok=True)
+        else:
+            _replace_table(
+                path,
+                table.filter(pc.invert(stale)),
+                compression=compression,
+                zstd_level=zstd_level,
+                profile=profile,
+            )
+        changed += 1
+    return changed
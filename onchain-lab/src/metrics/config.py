@@ -40,6 +40,9 @@ class DataConfig(BaseModel):
     output_root: Path
     symbol: str = Field(min_length=1)
     frequency: str = Field(min_length=1)
+    # Ingest block index (``<data_root>/_block_index/index.sqlite``); narrows day lookups
+    # to a height range.
+    block_index: Optional[Path] = Field(default=None)
 
     model_config = {"arbitrary_types_allowed": True}
 
@@ -48,6 +51,13 @@ class DataConfig(BaseModel):
     def _root_path(cls, value: str | Path) -> Path:
         return Path(value).resolve()
 
+    @field_validator("block_index", mode="before")
+    @classmethod
+    def _index_path(cls, value: Optional[str | Path]) -> Optional[Path]:
+        if value in (None, "", "null"):
+            return None
+        return Path(value).resolve()
+
 
 class EngineConfig(BaseModel):
     mvrv_window_days: PositiveInt
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import glob
 import json
+import sqlite3
 from dataclasses import dataclass
-from datetime import date, datetime, time, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
 from typing import Any, Iterable, Optional
 
@@ -173,6 +174,26 @@ def _inspect_snapshots(
     return records, totals
 
 
+def _day_heights(cfg: MetricsConfig, target_date: date) -> Optional[tuple[int, int]]:
+    """Height range of blocks timed on ``target_date`` according to the ingest block index."""
+    path = cfg.data.block_index
+    if path is None or not path.exists():
+        return None
+    start = datetime.combine(target_date, time.min, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    try:
+        low, high = conn.execute(
+            "SELECT MIN(height), MAX(height) FROM blocks WHERE time_utc >= ? AND time_utc < ?",
+            (int(start.timestamp()), int(end.timestamp())),
+        ).fetchone()
+    finally:
+        conn.close()
+    if low is None:
+        return None
+    return int(low), int(high)
+
+
 def _inspect_spent(
     cfg: MetricsConfig, target_date: date, limit: int, offset: int
 ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
@@ -191,7 +212,14 @@ def _inspect_spent(
         "spend_price_close",
         "creation_price_close",
     ]
-    table = pq.read_table(path, columns=columns)
+    # Spent rows are sorted by spend_height, so a height filter skips most row groups.
+    heights = _day_heights(cfg, target_date)
+    filters = (
+        [("spend_height", ">=", heights[0]), ("spend_height", "<=", heights[1])]
+        if heights is not None
+        else None
+    )
+    table = pq.read_table(path, columns=columns, filters=filters)
     frame = table.to_pandas()
     frame["spend_time"] = pd.to_datetime(frame["spend_time"], utc=True)
     day_rows = frame[frame["spend_time"].dt.date == target_date].copy()
@@ -3,7 +3,9 @@ from __future__ import annotations
 import ast
 import glob
 import os
+import sqlite3
 from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -29,11 +31,57 @@ from .linker import (
     compute_lineage_id,
 )
 
+# ingest.v2 files store these columns as 32-byte binary instead of hex text.
+_INGEST_V2 = b"ingest.v2"
+_INGEST_HASH_COLUMNS = {
+    "transactions": ("txid",),
+    "txin": ("txid", "prev_txid"),
+    "txout": ("txid",),
+}
+
 
 class SourceDataError(RuntimeError):
     """Raised when lifecycle source data is missing or inconsistent."""
 
 
+def _catalog_parts(
+    catalog: Optional[str], dataset: str
+) -> Optional[list[tuple[str, str, list[str]]]]:
+    """``(path, schema_version, columns)`` per file of ``dataset`` from the ingest part catalog.
+
+    ``None`` when no catalog is configured or it is not complete yet; callers glob instead.
+    """
+    if catalog is None or not Path(catalog).exists():
+        return None
+    data_root = Path(catalog).resolve().parent.parent
+    try:
+        conn = sqlite3.connect(f"{Path(catalog).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            complete = conn.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+            if complete is None or complete[0] != "1":
+                return None
+            rows = conn.execute(
+                "SELECT path, schema_version, columns FROM parts WHERE dataset = ? ORDER BY path",
+                (dataset,),
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        raise SourceDataError(f"Failed to read ingest part catalog {catalog}: {exc}") from exc
+    return [
+        (str(data_root / path), str(version), str(columns).split(","))
+        for path, version, columns in rows
+    ]
+
+
+def _ingest_files(catalog: Optional[str], dataset: str, pattern: str) -> list[str]:
+    """Files of an ingest dataset, listed by the part catalog or matched by ``pattern``."""
+    parts = _catalog_parts(catalog, dataset)
+    if parts is not None:
+        return [path for path, _, _ in parts]
+    return sorted(glob.glob(pattern, recursive=True))
+
+
 @dataclass
 class LifecycleBuildResult:
     artifacts: LifecycleArtifacts
@@ -44,13 +92,16 @@ class LifecycleBuilder:
     def __init__(self, config: LifecycleConfig) -> None:
         self._config = config
 
-    def build(self, *, persist: bool = True) -> LifecycleBuildResult:
+    def build(self, *, persist: bool = True, until: date | None = None) -> LifecycleBuildResult:
+        """Build the lifecycle tables, from blocks timed up to and including ``until`` if given."""
         use_legacy = os.getenv("UTXO_LIFECYCLE_LEGACY", "0") == "1"
         if use_legacy:
+            if until is not None:
+                raise SourceDataError("Date-restricted builds require the streaming assembler")
             frames = self._load_source_frames()
             lifecycle = build_lifecycle_frames(frames)
         else:
-            lifecycle = self._build_streaming_frames()
+            lifecycle = self._build_streaming_frames(until)
         created_table = pa.Table.from_pandas(
             lifecycle.created, schema=CREATED_SCHEMA, preserve_index=False
         )
@@ -77,9 +128,11 @@ class LifecycleBuilder:
 
         return LifecycleBuildResult(artifacts=artifacts, frames=lifecycle)
 
-    def _build_streaming_frames(self) -> LifecycleFrames:
-        self._ensure_dataset_exists(self._config.data.ingest.blocks)
-        assembler = _StreamingLifecycleAssembler(self._config, self._load_entity_lookup)
+    def _build_streaming_frames(self, until: date | None = None) -> LifecycleFrames:
+        self._ensure_dataset_exists(self._config.data.ingest.blocks, "blocks")
+        assembler = _StreamingLifecycleAssembler(
+            self._config, self._load_entity_lookup, until=until
+        )
         return assembler.run()
 
     def _load_source_frames(self) -> SourceFrames:
@@ -87,10 +140,10 @@ class LifecycleBuilder:
         price_cfg = self._config.data.price
 
         # Ensure block dataset exists even though the lifecycle pipeline does not yet consume it.
-        self._ensure_dataset_exists(ingest.blocks)
-        txout = self._read_dataset(ingest.txout)
-        txin = self._read_dataset(ingest.txin)
-        transactions = self._read_dataset(ingest.transactions)
+        self._ensure_dataset_exists(ingest.blocks, "blocks")
+        txout = self._read_dataset(ingest.txout, "txout")
+        txin = self._read_dataset(ingest.txin, "txin")
+        transactions = self._read_dataset(ingest.transactions, "transactions")
         prices = self._read_dataset(price_cfg.parquet)
         entities = self._load_entity_lookup()
 
@@ -112,15 +165,39 @@ class LifecycleBuilder:
             entity_lookup=entities,
         )
 
-    def _read_dataset(self, pattern: str) -> pa.Table:
-        matches = sorted(glob.glob(pattern, recursive=True))
+    def _read_dataset(self, pattern: str, dataset: Optional[str] = None) -> pa.Table:
+        if dataset is None:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = _ingest_files(self._config.data.ingest.catalog, dataset, pattern)
         if not matches:
             raise SourceDataError(f"No parquet files matched pattern: {pattern}")
-        tables = [pq.ParquetFile(match).read() for match in matches]
+        tables = [self._hex_keys(pq.ParquetFile(match).read()) for match in matches]
         table = pa.concat_tables(tables, promote=True) if len(tables) > 1 else tables[0]
         return table.combine_chunks()
 
-    def _ensure_dataset_exists(self, pattern: str) -> None:
+    @staticmethod
+    def _hex_keys(table: pa.Table) -> pa.Table:
+        """Turn ingest.v2 binary txids back into the hex text the pandas linker joins on."""
+        if (table.schema.metadata or {}).get(b"schema_version") != _INGEST_V2:
+            return table
+        for index, field in enumerate(table.schema):
+            if pa.types.is_fixed_size_binary(field.type):
+                values = [
+                    None if value is None else value.hex()
+                    for value in table.column(index).to_pylist()
+                ]
+                table = table.set_column(
+                    index, field.with_type(pa.string()), pa.array(values, pa.string())
+                )
+        return table
+
+    def _ensure_dataset_exists(self, pattern: str, dataset: str) -> None:
+        parts = _catalog_parts(self._config.data.ingest.catalog, dataset)
+        if parts is not None:
+            if not parts:
+                raise SourceDataError(f"The ingest part catalog lists no {dataset} files")
+            return
         if not any(glob.iglob(pattern, recursive=True)):
             raise SourceDataError(f"No parquet files matched pattern: {pattern}")
 
@@ -145,11 +222,12 @@ class LifecycleBuilder:
 class _StreamingLifecycleAssembler:
     _CREATED_QUERY = """
         SELECT
-            c.txid,
+            {created_txid} AS txid,
             c.vout,
             c.value_sats,
             c.script_type,
             c.addresses,
+            c.address_ids,
             c.created_height,
             c.created_time,
             c.created_date,
@@ -158,7 +236,7 @@ class _StreamingLifecycleAssembler:
             c.creation_price_source,
             c.creation_price_hash,
             c.creation_price_pipeline,
-            h.spend_txid AS spend_txid_hint,
+            {spend_hint} AS spend_txid_hint,
             h.spend_height AS spend_height_hint,
             h.spend_time AS spend_time_hint,
             h.spend_txid IS NOT NULL AS is_spent
@@ -169,9 +247,9 @@ class _StreamingLifecycleAssembler:
 
     _SPENT_QUERY = """
         SELECT
-            s.source_txid,
+            {source_txid} AS source_txid,
             s.source_vout,
-            s.spend_txid,
+            {spend_txid} AS spend_txid,
             COALESCE(c.value_sats, 0) AS value_sats,
             c.created_height,
             c.created_time,
@@ -201,13 +279,75 @@ class _StreamingLifecycleAssembler:
             ON s.source_txid = c.txid AND s.source_vout = c.vout
     """
 
+    # txin rows ingested with getblock verbosity=3 already carry the spent value
+    # and creation height, so the spent side only needs block times and prices.
+    _PREVOUT_SPENT_QUERY = """
+        WITH block_times AS (
+            SELECT height, MIN(time_utc) AS time_utc
+            FROM transactions
+            GROUP BY height
+        ),
+        creation AS (
+            SELECT
+                b.height,
+                b.time_utc,
+                dp.close,
+                dp.ts,
+                dp.source
+            FROM block_times b
+            LEFT JOIN daily_prices dp ON CAST(DATE_TRUNC('day', b.time_utc) AS DATE) = dp.price_date
+        )
+        SELECT
+            {source_txid} AS source_txid,
+            s.source_vout,
+            {spend_txid} AS spend_txid,
+            s.prev_value_sats AS value_sats,
+            s.prev_height AS created_height,
+            c.time_utc AS created_time,
+            s.spend_height,
+            s.spend_time,
+            CAST(
+                COALESCE(DATEDIFF('second', c.time_utc, s.spend_time), 0) AS DOUBLE
+            ) AS holding_seconds,
+            CAST(
+                COALESCE(DATEDIFF('second', c.time_utc, s.spend_time), 0) AS DOUBLE
+            ) / 86400.0 AS holding_days,
+            c.close AS creation_price_close,
+            c.ts AS creation_price_ts,
+            c.source AS creation_price_source,
+            s.spend_price_close,
+            s.spend_price_ts,
+            s.spend_price_source,
+            CASE
+                WHEN s.spend_price_close IS NULL THEN NULL
+                ELSE (CAST(s.prev_value_sats AS DOUBLE) / 1e8) * s.spend_price_close
+            END AS realized_value_usd,
+            CASE
+                WHEN s.spend_price_close IS NULL OR c.close IS NULL THEN NULL
+                ELSE (CAST(s.prev_value_sats AS DOUBLE) / 1e8) * (s.spend_price_close - c.close)
+            END AS realized_profit_usd,
+            c.height IS NULL AS is_orphan
+        FROM spend_with_price s
+        LEFT JOIN creation c ON s.prev_height = c.height
+    """
+
     def __init__(
         self,
         config: LifecycleConfig,
         entity_loader: Callable[[], Optional[pd.DataFrame]],
+        *,
+        until: date | None = None,
     ) -> None:
         self._config = config
         self._entity_loader = entity_loader
+        self._cutoff = (
+            datetime.combine(until + timedelta(days=1), time.min, tzinfo=timezone.utc)
+            if until is not None
+            else None
+        )
+        self._binary_keys = False
+        self._txout_address_ids = False
+        self._txin_prevouts = False
 
     @staticmethod
     def _escape(value: str) -> str:
@@ -222,15 +362,27 @@ class _StreamingLifecycleAssembler:
         conn = duckdb.connect(database=":memory:")
         try:
             self._register_views(conn)
-            created_arrow = conn.execute(self._CREATED_QUERY).arrow()
+            created_query = self._CREATED_QUERY.format(
+                created_txid=self._key_text("c.txid"), spend_hint=self._key_text("h.spend_txid")
+            )
+            spent_template = (
+                self._PREVOUT_SPENT_QUERY if self._prevouts_complete(conn) else self._SPENT_QUERY
+            )
+            spent_query = spent_template.format(
+                source_txid=self._key_text("s.source_txid"),
+                spend_txid=self._key_text("s.spend_txid"),
+            )
+            created_arrow = conn.execute(created_query).arrow()
             created_df = created_arrow.read_all().to_pandas()
-            spent_arrow = conn.execute(self._SPENT_QUERY).arrow()
+            spent_arrow = conn.execute(spent_query).arrow()
             spent_df = spent_arrow.read_all().to_pandas()
+            lookup = self._entity_loader()
+            address_index = self._address_index(conn, lookup)
         except duckdb.Error as exc:  # pragma: no cover - passthrough
             raise SourceDataError(f"DuckDB lifecycle assembly failed: {exc}") from exc
         finally:
             conn.close()
-        created_df = self._finalize_created(created_df)
+        created_df = self._finalize_created(created_df, lookup, address_index)
         spent_df = self._finalize_spent(spent_df, created_df)
         sort_created = ["created_height", "txid", "vout"]
         existing_created = [col for col in sort_created if col in created_df.columns]
@@ -242,10 +394,128 @@ class _StreamingLifecycleAssembler:
             spent_df = spent_df.sort_values(existing_spent).reset_index(drop=True)
         return LifecycleFrames(created=created_df, spent=spent_df)
 
-    def _register_views(self, conn: duckdb.DuckDBPyConnection) -> None:
+    def _key_text(self, column: str) -> str:
+        return f"lower(hex({column}))" if self._binary_keys else column
+
+    def _later_directories(self) -> dict[str, set[Path]]:
+        """Bucket directories the ingest block index places wholly after the cutoff.
+
+        Only directories the index knows about are pruned, so data ingested
+        before the index existed is still read (and filtered by time).
+        """
+        path = self._config.data.ingest.block_index
+        pruned: dict[str, set[Path]] = {"transactions": set(), "txin": set(), "txout": set()}
+        if self._cutoff is None or path is None or not Path(path).exists():
+            return pruned
+        data_root = Path(path).resolve().parent.parent
+        cutoff = int(self._cutoff.timestamp())
+        try:
+            conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                last = conn.execute(
+                    "SELECT MAX(height) FROM blocks WHERE time_utc < ?", (cutoff,)
+                ).fetchone()[0]
+                last = -1 if last is None else int(last)
+                for dataset in pruned:
+                    # Only the fixed dataset names of the index columns are interpolated.
+                    query = (
+                        f"SELECT {dataset}_dir FROM blocks "  # noqa: S608
+                        f"GROUP BY {dataset}_dir HAVING MIN(height) > ?"
+                    )
+                    for (directory,) in conn.execute(
+                        query,
+                        (last,),
+                    ):
+                        pruned[dataset].add((data_root / directory).resolve())
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            raise SourceDataError(f"Failed to read ingest block index {path}: {exc}") from exc
+        return pruned
+
+    def _ingest_sources(self) -> dict[str, str]:
+        """SQL sources for the ingest datasets with txid columns in one join type.
+
+        Joins run on 32-byte BLOBs as soon as any ingest.v2 file is present (v1
+        hex values are ``unhex``-ed to match) and on text for all-v1 inputs.
+        Date-restricted builds skip buckets the block index places after the cutoff.
+        """
         ingest = self._config.data.ingest
+        pruned = self._later_directories()
+        files: dict[str, dict[bool, list[str]]] = {}
+        for dataset, pattern in (
+            ("transactions", ingest.transactions),
+            ("txin", ingest.txin),
+            ("txout", ingest.txout),
+        ):
+            groups: dict[bool, list[str]] = {False: [], True: []}
+            parts = _catalog_parts(ingest.catalog, dataset)
+            if parts is None:
+                # No catalog: glob and read every footer for its version and columns.
+                parts = []
+                for match in sorted(glob.glob(pattern, recursive=True)):
+                    schema = pq.read_schema(match)
+                    version = (schema.metadata or {}).get(b"schema_version", b"").decode("utf-8")
+                    parts.append((match, version, schema.names))
+            for match, version, names in parts:
+                if pruned[dataset] and Path(match).resolve().parent in pruned[dataset]:
+                    continue
+                groups[version.encode("utf-8") == _INGEST_V2].append(match)
+                if dataset == "txout" and "address_ids" in names:
+                    self._txout_address_ids = True
+                if dataset == "txin" and "prev_value_sats" in names:
+                    self._txin_prevouts = True
+            if not groups[False] and not groups[True]:
+                raise SourceDataError(f"No parquet files matched pattern: {pattern}")
+            files[dataset] = groups
+        self._binary_keys = any(groups[True] for groups in files.values())
+
+        sources: dict[str, str] = {}
+        for dataset, groups in files.items():
+            selects = []
+            for is_v2, matches in groups.items():
+                if not matches:
+                    continue
+                listing = ", ".join(f"'{self._path_literal(match)}'" for match in matches)
+                replaced = ""
+                if self._binary_keys and not is_v2:
+                    converted = ", ".join(
+                        f"unhex({name}) AS {name}" for name in _INGEST_HASH_COLUMNS[dataset]
+                    )
+                    replaced = f" REPLACE ({converted})"
+                # Bucket directories (height=<bucket>) must not shadow the height column;
+                # union_by_name reads columns added later (address_ids) as NULL from older files.
+                # Only column names and escaped file paths are interpolated.
+                selects.append(
+                    f"SELECT *{replaced} FROM read_parquet([{listing}], "  # noqa: S608
+                    "hive_partitioning = false, union_by_name = true)"
+                )
+            sources[dataset] = "(" + " UNION ALL BY NAME ".join(selects) + ")"
+        return sources
+
+    def _prevouts_complete(self, conn: duckdb.DuckDBPyConnection) -> bool:
+        """True when every non-coinbase input carries its prevout value and height."""
+        if not self._txin_prevouts:
+            return False
+        missing = conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM txin_view
+            WHERE NOT coinbase AND (prev_value_sats IS NULL OR prev_height IS NULL)
+            """
+        ).fetchone()[0]
+        return int(missing) == 0
+
+    def _register_views(self, conn: duckdb.DuckDBPyConnection) -> None:
         price_cfg = self._config.data.price
+        sources = self._ingest_sources()
         conn.execute("SET TimeZone='UTC'")
+        cutoff = ""
+        in_window = ""
+        if self._cutoff is not None:
+            cutoff = f"WHERE time_utc < TIMESTAMPTZ '{self._cutoff.isoformat(sep=' ')}'"
+            # txin/txout carry no time; keep rows of transactions inside the window.
+            in_window = "WHERE txid IN (SELECT txid FROM transactions)"
         conn.execute(
             f"""
             CREATE OR REPLACE VIEW transactions AS
@@ -254,9 +524,32 @@ class _StreamingLifecycleAssembler:
                 height,
                 time_utc,
                 CAST(DATE_TRUNC('day', time_utc) AS DATE) AS time_date
-            FROM read_parquet('{self._path_literal(ingest.transactions)}')
+            FROM {sources["transactions"]}
+            {cutoff}
             """
         )
+        address_ids = (
+            "address_ids" if self._txout_address_ids else "CAST(NULL AS UBIGINT[]) AS address_ids"
+        )
+        prevouts = (
+            "prev_value_sats, prev_height"
+            if self._txin_prevouts
+            else "CAST(NULL AS BIGINT) AS prev_value_sats, CAST(NULL AS BIGINT) AS prev_height"
+        )
+        # Only column lists, file sources and a fixed WHERE clause are interpolated.
+        conn.execute(
+            f"""
+            CREATE OR REPLACE VIEW txin_view AS
+            SELECT
+                txid,
+                prev_txid,
+                prev_vout,
+                coinbase,
+                {prevouts}
+            FROM {sources["txin"]}
+            {in_window}
+            """  # noqa: S608
+        )
         conn.execute(
             f"""
             CREATE OR REPLACE VIEW txout_view AS
@@ -265,8 +558,10 @@ class _StreamingLifecycleAssembler:
                 idx AS vout,
                 value_sats,
                 script_type,
-                addresses
-            FROM read_parquet('{self._path_literal(ingest.txout)}')
+                addresses,
+                {address_ids}
+            FROM {sources["txout"]}
+            {in_window}
             """
         )
         conn.execute(
@@ -309,10 +604,12 @@ class _StreamingLifecycleAssembler:
                 i.prev_txid AS source_txid,
                 i.prev_vout AS source_vout,
                 i.txid AS spend_txid,
+                i.prev_value_sats,
+                i.prev_height,
                 t.height AS spend_height,
                 t.time_utc AS spend_time,
                 CAST(DATE_TRUNC('day', t.time_utc) AS DATE) AS spend_date
-            FROM read_parquet('{self._path_literal(ingest.txin)}') i
+            FROM txin_view i
             LEFT JOIN transactions t ON i.txid = t.txid
             WHERE NOT i.coinbase
             """
@@ -338,6 +635,7 @@ class _StreamingLifecycleAssembler:
                 o.value_sats,
                 o.script_type,
                 o.addresses,
+                o.address_ids,
                 t.height AS created_height,
                 t.time_utc AS created_time,
                 t.time_date AS created_date,
@@ -352,8 +650,42 @@ class _StreamingLifecycleAssembler:
             """
         )
 
-    def _finalize_created(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _address_index(
+        self, conn: duckdb.DuckDBPyConnection, lookup: Optional[pd.DataFrame]
+    ) -> Optional[pd.DataFrame]:
+        """``(address_id, address)`` rows of the address dictionary for looked-up addresses.
+
+        Only entity addresses are pulled from the dictionary, so attribution of
+        every output afterwards is an integer lookup on ``address_ids``.
+        """
+        pattern = self._config.data.ingest.addresses
+        if pattern is None or lookup is None or lookup.empty or not self._txout_address_ids:
+            return None
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            return None
+        keys = pd.DataFrame(
+            {"address_key": lookup["address"].astype(str).str.strip().str.lower().unique()}
+        )
+        conn.register("entity_address_keys", keys)
+        listing = ", ".join(f"'{self._path_literal(match)}'" for match in matches)
+        # Only escaped file paths are interpolated.
+        return conn.execute(
+            f"""
+            SELECT a.address_id, a.address
+            FROM read_parquet([{listing}], hive_partitioning = false) a
+            SEMI JOIN entity_address_keys k ON lower(trim(a.address)) = k.address_key
+            """  # noqa: S608
+        ).df()
+
+    def _finalize_created(
+        self,
+        df: pd.DataFrame,
+        lookup: Optional[pd.DataFrame],
+        address_index: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
         if df.empty:
+            df = df.drop(columns=["address_ids"], errors="ignore")
             df["addresses"] = pd.Series(dtype=object)
             df["entity_id"] = pd.Series(dtype=object)
             df["entity_type"] = pd.Series(dtype=object)
@@ -374,8 +706,8 @@ class _StreamingLifecycleAssembler:
             df["is_spent"].fillna(False).apply(lambda value: bool(value)).astype(object)
         )
 
-        lookup = self._entity_loader()
-        df = attach_entity_metadata(df, lookup)
+        df = attach_entity_metadata(df, lookup, address_index)
+        df = df.drop(columns=["address_ids"], errors="ignore")
         df["addresses"] = df["addresses"].apply(self._normalize_addresses)
         df["lineage_id"] = df.apply(
             lambda row: compute_lineage_id(row["txid"], str(row["vout"])),
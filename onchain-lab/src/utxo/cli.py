@@ -13,7 +13,7 @@ from .builder import LifecycleBuilder
 from .config import ConfigError, LifecycleConfig, load_config
 from .datasets import pipeline_version, read_created, read_spent, snapshot_path
 from .qa import LifecycleQA
-from .snapshots import SnapshotBuilder
+from .snapshots import SnapshotBuilder, SnapshotError
 
 app = typer.Typer(help="UTXO lifecycle pipeline CLI")
 console = Console()
@@ -28,10 +28,13 @@ def _load_config(path: Optional[Path]) -> LifecycleConfig:
 
 
 @app.command("build-lifecycle")
-def build_lifecycle(config: Optional[Path] = typer.Option(None, "--config", help="Path to utxo.yaml")) -> None:
+def build_lifecycle(
+    config: Optional[Path] = typer.Option(None, "--config", help="Path to utxo.yaml"),
+    until: Optional[str] = typer.Option(None, help="Only blocks up to this date (YYYY-MM-DD)"),
+) -> None:
     cfg = _load_config(config)
     builder = LifecycleBuilder(cfg)
-    result = builder.build(persist=True)
+    result = builder.build(persist=True, until=date.fromisoformat(until) if until else None)
 
     console.print(
         f"[green]Lifecycle build complete[/green] (created={result.artifacts.created.num_rows} rows, "
@@ -44,14 +47,26 @@ def build_snapshots(
     config: Optional[Path] = typer.Option(None, "--config", help="Path to utxo.yaml"),
     start: Optional[str] = typer.Option(None, help="Start date (YYYY-MM-DD)"),
     end: Optional[str] = typer.Option(None, help="End date (YYYY-MM-DD)"),
+    live: bool = typer.Option(
+        False, "--live", help="Read the ingest live UTXO set instead of the lifecycle tables"
+    ),
 ) -> None:
     cfg = _load_config(config)
-    created = read_created(cfg.data.lifecycle_root)
-    spent = read_spent(cfg.data.lifecycle_root)
     builder = SnapshotBuilder(cfg)
     start_date = date.fromisoformat(start) if start else None
     end_date = date.fromisoformat(end) if end else None
-    snapshots = builder.build(created, spent, start_date=start_date, end_date=end_date, persist=True)
+    if live:
+        try:
+            snapshots = builder.build_live(start_date=start_date, end_date=end_date, persist=True)
+        except SnapshotError as exc:
+            typer.secho(str(exc), err=True, fg=typer.colors.RED)
+            raise typer.Exit(code=1) from exc
+    else:
+        created = read_created(cfg.data.lifecycle_root)
+        spent = read_spent(cfg.data.lifecycle_root)
+        snapshots = builder.build(
+            created, spent, start_date=start_date, end_date=end_date, persist=True
+        )
     console.print(f"[green]Generated {len(snapshots)} snapshot days[/green]")
 
 
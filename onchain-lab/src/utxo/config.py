@@ -28,6 +28,16 @@ class IngestPaths(BaseModel):
     transactions: str
     txin: str
     txout: str
+    # Glob of the ingest address dictionary export; enables joins on txout.address_ids.
+    addresses: Optional[str] = Field(default=None)
+    # Ingest block index (``<data_root>/_block_index/index.sqlite``); prunes buckets in
+    # date-restricted builds.
+    block_index: Optional[str] = Field(default=None)
+    # Ingest part catalog (``<data_root>/_catalog/parts.sqlite``); lists files instead of globbing.
+    catalog: Optional[str] = Field(default=None)
+    # Live UTXO set (``<data_root>/_utxo_set/utxo.sqlite``); `build-snapshots --live` reads it
+    # instead of the lifecycle tables.
+    utxo_set: Optional[str] = Field(default=None)
 
 
 class PriceConfig(BaseModel):
@@ -255,8 +255,16 @@ def build_lifecycle_frames(frames: SourceFrames) -> LifecycleFrames:
 
 
 def attach_entity_metadata(
-    created: pd.DataFrame, entity_lookup: Optional[pd.DataFrame]
+    created: pd.DataFrame,
+    entity_lookup: Optional[pd.DataFrame],
+    address_index: Optional[pd.DataFrame] = None,
 ) -> pd.DataFrame:
+    """Resolve each output's first address with an entity.
+
+    ``address_index`` holds ``(address_id, address)`` rows of the ingest address
+    dictionary; rows with ``address_ids`` are then resolved by integer id and only
+    outputs without ids fall back to matching address text.
+    """
     result = created.copy()
     result["entity_id"] = pd.NA
     result["entity_type"] = pd.NA
@@ -274,7 +282,14 @@ def attach_entity_metadata(
     id_map = lookup.set_index("_addr_key")["entity_id"].to_dict()
     type_map = lookup.set_index("_addr_key")["entity_type"].astype(str).str.lower().to_dict()
 
-    def resolve(addresses: list[str]) -> tuple[Optional[str], Optional[str]]:
+    entity_by_id: dict[int, tuple[Optional[str], Optional[str]]] = {}
+    if address_index is not None and "address_ids" in result.columns:
+        for address_id, address in zip(address_index["address_id"], address_index["address"]):
+            key = str(address).strip().lower()
+            if key in id_map or key in type_map:
+                entity_by_id[int(address_id)] = (id_map.get(key), type_map.get(key))
+
+    def resolve_text(addresses: list[str]) -> tuple[Optional[str], Optional[str]]:
         for raw in addresses:
             if raw is None:
                 continue
@@ -287,7 +302,28 @@ def attach_entity_metadata(
                 return entity_id, entity_type
         return None, None
 
-    resolved = result["addresses"].apply(resolve)
+    def resolve_ids(
+        address_ids: object, addresses: list[str]
+    ) -> tuple[Optional[str], Optional[str]]:
+        if not hasattr(address_ids, "__len__") or len(address_ids) == 0:  # type: ignore[arg-type]
+            return resolve_text(addresses)
+        for address_id in address_ids:  # type: ignore[union-attr]
+            match = entity_by_id.get(int(address_id))
+            if match is not None:
+                return match
+        return None, None
+
+    if address_index is not None and "address_ids" in result.columns:
+        resolved = pd.Series(
+            [
+                resolve_ids(address_ids, addresses)
+                for address_ids, addresses in zip(result["address_ids"], result["addresses"])
+            ],
+            index=result.index,
+            dtype=object,
+        )
+    else:
+        resolved = result["addresses"].apply(resolve_text)
     result["entity_id"] = resolved.apply(lambda x: x[0])
     result["entity_type"] = resolved.apply(lambda x: x[1])
     return result
@@ -0,0 +1,140 @@
+"""Reads of the live UTXO set that ingest maintains (``ingest.utxoset``).
+
+``data.ingest.utxo_set`` points at ``<data_root>/_utxo_set/utxo.sqlite``. The
+set holds the outputs unspent as of its applied height. Its undo rows (outputs
+spent within the last ``limits.utxo_undo_depth`` heights) let the state at any
+recent height be rebuilt without touching the Parquet history. Reading one
+height costs O(UTXO set); block times come from the ingest block index.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import pyarrow as pa
+
+_BATCH = 262_144
+
+LIVE_SET_SCHEMA = pa.schema(
+    [
+        pa.field("txid", pa.string()),
+        pa.field("vout", pa.int32()),
+        pa.field("value_sats", pa.int64()),
+        pa.field("created_height", pa.int64()),
+        pa.field("script_type", pa.string()),
+        pa.field("address_id", pa.uint64()).with_nullable(True),
+    ]
+)
+
+
+class LiveSetError(RuntimeError):
+    """Raised when the live UTXO set or block index cannot be read."""
+
+
+class LiveSetInfo(NamedTuple):
+    applied_height: int
+    undo_from: int
+
+    def covers(self, height: int) -> bool:
+        """True when the state at ``height`` can be rebuilt from the set and its undo rows."""
+        return self.undo_from <= height + 1 and height <= self.applied_height
+
+
+def _connect(path: str | Path) -> sqlite3.Connection:
+    if not Path(path).exists():
+        raise LiveSetError(f"Live UTXO set not found at {path}")
+    try:
+        return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error as exc:
+        raise LiveSetError(f"Failed to open live UTXO set {path}: {exc}") from exc
+
+
+def live_set_info(path: str | Path) -> LiveSetInfo:
+    conn = _connect(path)
+    try:
+        values = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.Error as exc:
+        raise LiveSetError(f"Failed to read live UTXO set {path}: {exc}") from exc
+    finally:
+        conn.close()
+    return LiveSetInfo(int(values.get("applied_height", -1)), int(values.get("undo_from", 0)))
+
+
+def unspent_at(path: str | Path, height: int) -> pa.Table:
+    """Outputs unspent after block ``height``.
+
+    That is the current set minus later creates plus later spends.
+    """
+    info = live_set_info(path)
+    if not info.covers(height):
+        raise LiveSetError(
+            f"Live UTXO set covers heights {info.undo_from - 1}-{info.applied_height}; "
+            f"cannot rebuild height {height}"
+        )
+    conn = _connect(path)
+    columns: Dict[str, list] = {name: [] for name in LIVE_SET_SCHEMA.names}
+    try:
+        cursor = conn.execute(
+            "SELECT txid, vout, value_sats, height, script_type, address_id FROM utxos "
+            "WHERE height <= ? "
+            "UNION ALL "
+            "SELECT txid, vout, value_sats, created_height, script_type, address_id FROM undo "
+            "WHERE height > ? AND created_height <= ?",
+            (height, height, height),
+        )
+        while True:
+            rows = cursor.fetchmany(_BATCH)
+            if not rows:
+                break
+            for name, values in zip(LIVE_SET_SCHEMA.names, zip(*rows)):
+                columns[name].extend(values)
+    except sqlite3.Error as exc:
+        raise LiveSetError(f"Failed to read live UTXO set {path}: {exc}") from exc
+    finally:
+        conn.close()
+    columns["txid"] = [bytes(txid).hex() for txid in columns["txid"]]
+    return pa.Table.from_pydict(columns, schema=LIVE_SET_SCHEMA)
+
+
+def block_times(block_index: str | Path, last_height: int) -> Dict[int, datetime]:
+    """UTC block time per height up to ``last_height`` from the ingest block index."""
+    if not Path(block_index).exists():
+        raise LiveSetError(f"Ingest block index not found at {block_index}")
+    try:
+        conn = sqlite3.connect(f"{Path(block_index).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT height, time_utc FROM blocks WHERE height <= ?", (last_height,)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as exc:
+        raise LiveSetError(f"Failed to read ingest block index {block_index}: {exc}") from exc
+    return {
+        int(height): datetime.fromtimestamp(int(seconds), tz=timezone.utc)
+        for height, seconds in rows
+    }
+
+
+def height_before(times: Dict[int, datetime], boundary: datetime) -> Optional[int]:
+    """Highest height timed before ``boundary``.
+
+    Block times are not monotonic, so a few blocks below that height may be
+    timed after it; callers filter outputs by creation time as well.
+    """
+    heights = [height for height, moment in times.items() if moment < boundary]
+    return max(heights) if heights else None
+
+
+__all__ = [
+    "LIVE_SET_SCHEMA",
+    "LiveSetError",
+    "LiveSetInfo",
+    "block_times",
+    "height_before",
+    "live_set_info",
+    "unspent_at",
+]
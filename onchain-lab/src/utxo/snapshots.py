@@ -12,6 +12,8 @@ import pyarrow.parquet as pq
 
 from .config import LifecycleConfig
 from .datasets import SNAPSHOT_SCHEMA, pipeline_version, write_snapshot
+from .linker import attach_entity_metadata
+from .liveset import LiveSetError, block_times, height_before, live_set_info, unspent_at
 
 
 class SnapshotError(RuntimeError):
@@ -89,37 +91,150 @@ class SnapshotBuilder:
             )
             active = created_df[active_mask].copy()
 
-            if active.empty:
-                table = SNAPSHOT_SCHEMA.empty_table()
-                snapshots[day] = table
-                if persist:
-                    write_snapshot(
-                        table,
-                        self._config.data.lifecycle_root,
-                        day,
-                        compression=self._config.writer.compression,
-                        compression_level=self._config.writer.zstd_level,
-                    )
-                continue
+            snapshots[day] = self._snapshot(
+                active, day, boundary_utc, price_daily.get(day), persist
+            )
+
+        return snapshots
+
+    def build_live(
+        self,
+        *,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        persist: bool = True,
+    ) -> Dict[date, pa.Table]:
+        """Snapshots read from the live UTXO set that ingest maintains.
+
+        Each day costs one pass over the set instead of the whole lifecycle
+        history. Only days whose close falls inside the set's undo window can
+        be built; by default that is the last day closed before the newest
+        applied block.
+        """
+        ingest = self._config.data.ingest
+        if ingest.utxo_set is None or ingest.block_index is None:
+            raise SnapshotError(
+                "Live snapshots need data.ingest.utxo_set and data.ingest.block_index"
+            )
+        try:
+            info = live_set_info(ingest.utxo_set)
+            times = block_times(ingest.block_index, info.applied_height)
+        except LiveSetError as exc:
+            raise SnapshotError(str(exc)) from exc
+        if not times:
+            return {}
+
+        zone = self._config.snapshot.zoneinfo()
+        close_time = self._config.snapshot.close_time()
+
+        def boundary(day: date) -> datetime:
+            closing_local = datetime.combine(day, close_time, tzinfo=zone) + timedelta(days=1)
+            return closing_local.astimezone(timezone.utc)
 
+        if end_date is None:
+            newest = max(times.values())
+            end_date = newest.astimezone(zone).date()
+            while boundary(end_date) > newest:
+                end_date -= timedelta(days=1)
+        if start_date is None:
+            start_date = end_date
+
+        price_daily = self._load_daily_prices(min(times.values()).date(), end_date)
+        lookup = self._load_entity_lookup()
+        snapshots: Dict[date, pa.Table] = {}
+        for current_date in pd.date_range(start_date, end_date, freq="D"):
+            day = current_date.date()
+            boundary_utc = boundary(day)
+            height = height_before(times, boundary_utc)
+            if height is None or not info.covers(height):
+                raise SnapshotError(
+                    f"The live UTXO set cannot rebuild {day}: it covers heights "
+                    f"{info.undo_from - 1}-{info.applied_height}"
+                )
+            try:
+                unspent = unspent_at(ingest.utxo_set, height).to_pandas()
+            except LiveSetError as exc:
+                raise SnapshotError(str(exc)) from exc
+            active = self._live_outputs(unspent, times, price_daily, lookup)
+            active = active[active["created_time"] < boundary_utc].copy()
+            snapshots[day] = self._snapshot(
+                active, day, boundary_utc, price_daily.get(day), persist
+            )
+        return snapshots
+
+    def _snapshot(
+        self,
+        active: pd.DataFrame,
+        day: date,
+        boundary_utc: datetime,
+        price_info: dict | None,
+        persist: bool,
+    ) -> pa.Table:
+        if active.empty:
+            table = SNAPSHOT_SCHEMA.empty_table()
+        else:
             active["age_days"] = (
                 boundary_utc - active["created_time"]
             ).dt.total_seconds() / 86400.0
-
-            bucketed_records = self._aggregate_active(active, day, price_daily.get(day))
+            bucketed_records = self._aggregate_active(active, day, price_info)
             table = pa.Table.from_pandas(bucketed_records, schema=SNAPSHOT_SCHEMA, preserve_index=False)
-            snapshots[day] = table
-
-            if persist:
-                write_snapshot(
-                    table,
-                    self._config.data.lifecycle_root,
-                    day,
-                    compression=self._config.writer.compression,
-                    compression_level=self._config.writer.zstd_level,
-                )
 
-        return snapshots
+        if persist:
+            write_snapshot(
+                table,
+                self._config.data.lifecycle_root,
+                day,
+                compression=self._config.writer.compression,
+                compression_level=self._config.writer.zstd_level,
+            )
+        return table
+
+    def _live_outputs(
+        self,
+        unspent: pd.DataFrame,
+        times: Dict[int, datetime],
+        price_daily: Dict[date, dict],
+        lookup: pd.DataFrame | None,
+    ) -> pd.DataFrame:
+        """Live set rows with the creation time, price, address and entity snapshots group by."""
+        unspent["created_time"] = pd.to_datetime(unspent["created_height"].map(times), utc=True)
+        created_dates = unspent["created_time"].dt.date
+        unspent["creation_price_close"] = created_dates.map(
+            lambda day: (price_daily.get(day) or {}).get("close")
+        )
+        addresses = self._live_addresses(unspent["address_id"].dropna().astype("uint64").unique())
+        unspent["addresses"] = [
+            [addresses[int(address_id)]]
+            if pd.notna(address_id) and int(address_id) in addresses
+            else []
+            for address_id in unspent["address_id"]
+        ]
+        # The live set keeps an output's first address, the one its snapshot group is keyed on.
+        return attach_entity_metadata(unspent, lookup)
+
+    def _live_addresses(self, address_ids: Sequence[int]) -> Dict[int, str]:
+        if not len(address_ids):
+            return {}
+        pattern = self._config.data.ingest.addresses
+        matches = sorted(glob.glob(pattern, recursive=True)) if pattern is not None else []
+        if not matches:
+            raise SnapshotError(
+                "Live snapshots need the exported addresses dataset (data.ingest.addresses)"
+            )
+        table = pq.read_table(
+            matches,
+            columns=["address_id", "address"],
+            filters=[("address_id", "in", [int(address_id) for address_id in address_ids])],
+        )
+        return dict(
+            zip(table.column("address_id").to_pylist(), table.column("address").to_pylist())
+        )
+
+    def _load_entity_lookup(self) -> pd.DataFrame | None:
+        entities_cfg = getattr(self._config.data, "entities", None)
+        if not entities_cfg or entities_cfg.lookup is None or not entities_cfg.lookup.exists():
+            return None
+        return pq.read_table(entities_cfg.lookup).to_pandas()
 
     def _load_daily_prices(self, start_date: date, end_date: date) -> Dict[date, dict]:
         price_cfg = self._config.data.price
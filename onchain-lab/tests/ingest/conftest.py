@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind  # type: ignore  # noqa: E402
+
+
+@pytest.fixture()
+def make_config() -> Callable[..., IngestConfig]:
+    """Factory for small ingest configs rooted at a test directory.
+
+    ``node`` points RPC at a running :class:`FakeBitcoind`, ``limits`` overrides
+    single :class:`LimitsConfig` fields and any other keyword replaces an
+    :class:`IngestConfig` field.
+    """
+
+    def make(
+        data_root: Path,
+        *,
+        node: Optional[FakeBitcoind] = None,
+        limits: Optional[Dict[str, Any]] = None,
+        **overrides: Any,
+    ) -> IngestConfig:
+        settings: Dict[str, Any] = {
+            "data_root": data_root,
+            "partitions": {
+                "blocks": "blocks/height={height_bucket}",
+                "transactions": "tx/height={height_bucket}",
+                "txin": "txin/height={height_bucket}",
+                "txout": "txout/height={height_bucket}",
+            },
+            "height_bucket_size": 100,
+            "compression": "zstd",
+            "zstd_level": 3,
+            "rpc": RPCConfig(
+                host=node.host if node is not None else "localhost",
+                port=node.port if node is not None else 8332,
+                user_env="BTC_USER",
+                pass_env="BTC_PASS",
+            ),
+            "limits": LimitsConfig(
+                **{"max_blocks_per_run": 100, "io_batch_size": 16, **(limits or {})}
+            ),
+            "qa": QAConfig(golden_days=[], tolerance_pct=1.0),
+        }
+        settings.update(overrides)
+        return IngestConfig(**settings)
+
+    return make
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+from typing import Callable, Dict, Iterable, List
+
+import duckdb
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.addresses import AddressDictionary  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.hashes import source_sql  # type: ignore  # noqa: E402
+from ingest.pipeline import sync_range  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import synthetic_chain  # type: ignore  # noqa: E402
+
+
+class _ChainClient:
+    def __init__(self, blocks: List[Dict[str, object]]) -> None:
+        self._by_hash = {block["hash"]: block for block in blocks}
+        self._hashes = [str(block["hash"]) for block in blocks]
+
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return [self._hashes[height] for height in heights]
+
+    def get_blocks(
+        self, block_hashes: Iterable[str], verbosity: int = 2
+    ) -> List[Dict[str, object]]:
+        return [_normalize_block(dict(self._by_hash[item])) for item in block_hashes]
+
+    def close(self) -> None:
+        return None
+
+
+def test_intern_assigns_stable_ids_through_a_small_cache(tmp_path: Path) -> None:
+    with AddressDictionary(tmp_path, cache_size=2) as dictionary:
+        first = dictionary.intern([["a", "b"], ["c"], ["a"], []], height=5)
+        second = dictionary.intern([["d"], ["a", "c"]], height=6)
+        assert len(dictionary._cache) == 2
+
+    assert first == [[1, 2], [3], [1], []]
+    assert second == [[4], [1, 3]]
+    with AddressDictionary(tmp_path) as reopened:
+        assert reopened.intern([["b", "e"]], height=7) == [[2, 5]]
+        assert reopened.lookup("d") == 4 and reopened.lookup("zz") is None
+
+
+def test_rollback_drops_addresses_and_exported_parts(tmp_path: Path) -> None:
+    with AddressDictionary(tmp_path) as dictionary:
+        dictionary.intern([["a"], ["b"]], height=1)
+        assert dictionary.export() == 2
+        dictionary.intern([["c"]], height=2)
+        dictionary.intern([["d"]], height=3)
+        assert dictionary.export() == 2
+        assert dictionary.export() == 0
+
+        assert dictionary.rollback(3) == 1
+        # The id of the rolled-back "d" is not handed out again.
+        assert dictionary.intern([["e"], ["c"]], height=3) == [[5], [3]]
+        assert dictionary.export() == 2
+
+    parts = sorted(path.name for path in (tmp_path / "addresses").glob("*.parquet"))
+    assert parts == [
+        "part-addresses-000000000001-000000000002.parquet",
+        "part-addresses-000000000003-000000000005.parquet",
+    ]
+    table = pq.read_table(tmp_path / "addresses" / parts[1])
+    assert table.to_pylist() == [
+        {"address_id": 3, "address": "c", "first_seen_height": 2},
+        {"address_id": 5, "address": "e", "first_seen_height": 3},
+    ]
+
+
+def test_rollback_keeps_ids_a_lagging_shard_referenced_below_it(tmp_path: Path) -> None:
+    with AddressDictionary(tmp_path) as ahead, AddressDictionary(tmp_path) as behind:
+        assert ahead.intern([["a", "b"]], height=150) == [[1, 2]]
+        # The lagging shard meets "a" at a lower height, and later a cached "b" too.
+        assert behind.intern([["a"]], height=50) == [[1]]
+        assert ahead.intern([["b"]], height=151) == [[2]]
+        assert behind.intern([["b"]], height=60) == [[2]]
+
+        assert ahead.rollback(100) == 0
+        assert ahead.lookup("a") == 1 and ahead.lookup("b") == 2
+        assert ahead.rollback(55) == 1
+        assert ahead.lookup("b") is None
+        assert behind.intern([["b"]], height=55) == [[3]]
+
+
+def test_ingest_fills_address_ids_and_reads_older_files(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    pipeline.console.quiet = True
+    chain = synthetic_chain(6, tx_count=2)
+    client = _ChainClient(chain)
+    limits = {"address_cache_size": 4}
+    sync_range(0, 2, config=make_config(tmp_path, limits=limits), client=client)
+    interned = make_config(tmp_path, limits=limits, intern_addresses=True)
+    sync_range(3, 5, config=interned, client=client)
+
+    files = sorted((tmp_path / "txout").rglob("*.parquet"))
+    null_ids = pq.read_table(files[0]).column("address_ids").null_count
+    assert null_ids == pq.read_metadata(files[0]).num_rows
+    # Files written before the column existed lack it entirely.
+    pq.write_table(pq.read_table(files[0]).drop_columns(["address_ids"]), files[0])
+
+    connection = duckdb.connect()
+    connection.execute(f"CREATE VIEW txout AS {source_sql(files, 'txout')}")
+    connection.execute(
+        # Only the temporary directory path is interpolated.
+        "CREATE VIEW addresses AS SELECT * FROM read_parquet("  # noqa: S608
+        f"'{(tmp_path / 'addresses').as_posix()}/*.parquet')"
+    )
+    counts = connection.execute(
+        """
+        SELECT
+            COUNT(*) FILTER (WHERE address_ids IS NULL),
+            COUNT(*) FILTER (WHERE len(address_ids) = len(addresses))
+        FROM txout
+        """
+    ).fetchone()
+    mismatched = connection.execute(
+        """
+        SELECT COUNT(*)
+        FROM (SELECT addresses[1] AS address, address_ids[1] AS address_id FROM txout
+              WHERE address_ids IS NOT NULL) o
+        JOIN addresses a USING (address_id)
+        WHERE a.address <> o.address
+        """
+    ).fetchone()[0]
+    first_seen = connection.execute("SELECT MIN(first_seen_height) FROM addresses").fetchone()[0]
+    connection.close()
+
+    interned = sum(pq.read_metadata(path).num_rows for path in files[3:])
+    assert interned > 0
+    assert counts == (sum(pq.read_metadata(path).num_rows for path in files[:3]), interned)
+    assert mismatched == 0
+    assert first_seen == 3
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+from typing import Callable, Dict, List
+
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.backfill import Shard, backfill_parallel, plan_shards, recover_shards  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.pipeline import sync_range  # type: ignore  # noqa: E402
+from ingest.state import ProcessedHeightIndex  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+def _rows(root: Path, dataset: str) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    for path in sorted((root / dataset).rglob("*.parquet")):
+        rows.extend(pq.read_table(path, partitioning=None).to_pylist())
+    return sorted(rows, key=lambda row: sorted((key, str(value)) for key, value in row.items()))
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "quiet", True)
+
+
+def test_plan_shards_follows_bucket_boundaries() -> None:
+    shards = plan_shards(2, 13, bucket_size=4)
+    assert shards == [Shard(2, 3), Shard(4, 7), Shard(8, 11), Shard(12, 13)]
+    assert plan_shards(4, 4, bucket_size=4) == [Shard(4, 4)]
+
+
+def test_parallel_backfill_matches_serial_ingest(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(14, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        serial_cfg = make_config(tmp_path / "serial", node=node, height_bucket_size=4)
+        parallel_cfg = make_config(tmp_path / "parallel", node=node, height_bucket_size=4)
+        serial = sync_range(0, 13, config=serial_cfg)
+        parallel = backfill_parallel(
+            0, 50, workers=2, config=parallel_cfg, min_depth=3, merge_interval_seconds=0.1
+        )
+
+    assert parallel == serial
+    for dataset in ("blocks", "tx", "txin", "txout"):
+        assert _rows(parallel_cfg.data_root, dataset) == _rows(serial_cfg.data_root, dataset)
+    with ProcessedHeightIndex(parallel_cfg.data_root) as index:
+        hashes = [index.hash_for(height) for height in range(14)]
+        assert hashes == [block["hash"] for block in chain]
+        runs = index.recent_runs(10)
+    # The pool is one run in the shared history, the near-tip tail another.
+    assert [run.last_height for run in runs] == [13, 10]
+    assert sum(run.blocks for run in runs) == 14 and all(run.bytes > 0 for run in runs)
+    assert not list((parallel_cfg.data_root / "_markers" / "shards").iterdir())
+
+
+def test_recover_shards_merges_leftover_progress(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(4)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(tmp_path, node=node, height_bucket_size=4)
+    state_dir = tmp_path / "_markers" / "shards" / "4-7"
+    with ProcessedHeightIndex(tmp_path, state_dir=state_dir) as shard_index:
+        shard_index.mark_many([(4, "a" * 64), (5, "b" * 64)])
+
+    with ProcessedHeightIndex(tmp_path) as shared:
+        assert recover_shards(cfg, shared) == 2
+        assert shared.hash_for(5) == "b" * 64
+    assert not state_dir.exists()
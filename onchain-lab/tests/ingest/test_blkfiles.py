@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+from typing import Callable, Dict, List, Optional
+
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.blkfiles import MAGIC, BlockFileError, BlockFileReader  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.pipeline import ProcessedHeightIndex, sync_blockfiles  # type: ignore  # noqa: E402
+from ingest.rawblock import block_hash  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    serialize_block,
+    serialize_tx,
+    write_block_files,
+)
+
+P2WPKH = bytes.fromhex("0014751e76e8199196d454941c45d1b3a323f1433bd6")
+XOR_KEY = bytes.fromhex("5a17c0de0badf00d")
+
+
+def _regtest_chain(
+    length: int, *, prev: Optional[str] = None, start: int = 0, tag: int = 0
+) -> List[bytes]:
+    blocks: List[bytes] = []
+    for height in range(start, start + length):
+        coinbase = serialize_tx(
+            inputs=[(None, 0xFFFFFFFF, bytes([2, height & 0xFF, tag]), 0xFFFFFFFF)],
+            outputs=[(5_000_000_000, P2WPKH)],
+        )
+        spend = serialize_tx(
+            inputs=[("33" * 32, height, b"", 0xFFFFFFFD)],
+            outputs=[(1_000, P2WPKH), (2_000, P2WPKH)],
+            witnesses=[[b"\x30" * 71, b"\x02" * 33]],
+        )
+        raw = serialize_block(
+            [coinbase, spend], prev_hash=prev, time_epoch=1296688602 + height * 600
+        )
+        blocks.append(raw)
+        prev = block_hash(raw)
+    return blocks
+
+
+@pytest.fixture
+def regtest_files(tmp_path: Path) -> Dict[str, object]:
+    main = _regtest_chain(6)
+    stale = _regtest_chain(2, prev=block_hash(main[2]), start=3, tag=1)
+    # Arrival order as seen during headers-first sync: children before parents and a stale branch.
+    on_disk = [main[0], main[2], main[1], stale[0], main[4], main[3], stale[1], main[5]]
+    blocks_dir = tmp_path / "blocks"
+    write_block_files(
+        blocks_dir, on_disk, magic=MAGIC["regtest"], xor_key=XOR_KEY, blocks_per_file=3, padding=64
+    )
+    return {"dir": blocks_dir, "main": main, "stale": stale}
+
+
+def test_reader_rebuilds_active_chain(regtest_files: Dict[str, object]) -> None:
+    main: List[bytes] = regtest_files["main"]  # type: ignore[assignment]
+    with BlockFileReader(regtest_files["dir"], network="regtest") as reader:  # type: ignore[arg-type]
+        assert reader.scan() == 8
+        assert reader.best_chain() == [block_hash(raw) for raw in main]
+        heights = [(height, raw) for height, _, raw in reader.iter_chain(1, 99)]
+    assert heights == list(enumerate(main))[1:]
+
+
+def test_reader_rejects_wrong_network(regtest_files: Dict[str, object]) -> None:
+    with BlockFileReader(regtest_files["dir"], network="main") as reader:  # type: ignore[arg-type]
+        with pytest.raises(BlockFileError):
+            reader.scan()
+
+
+def test_sync_blockfiles_writes_partitions(
+    tmp_path: Path, regtest_files: Dict[str, object], make_config: Callable[..., IngestConfig]
+) -> None:
+    main: List[bytes] = regtest_files["main"]  # type: ignore[assignment]
+    cfg = make_config(tmp_path / "data", network="regtest", blocks_dir=regtest_files["dir"])
+
+    counts = sync_blockfiles(0, 50, config=cfg)
+
+    assert counts == {"blocks": 6, "transactions": 12, "txin": 12, "txout": 18}
+    index = ProcessedHeightIndex(cfg.data_root)
+    assert [index.hash_for(height) for height in range(6)] == [block_hash(raw) for raw in main]
+    txin = pq.read_table(cfg.data_root / "txin" / "height=0").to_pydict()
+    assert sorted(prev for prev in txin["prev_vout"] if prev is not None) == [0, 1, 2, 3, 4, 5]
+
+    again = sync_blockfiles(0, 50, config=cfg)
+    assert again == {"blocks": 0, "transactions": 0, "txin": 0, "txout": 0}
+
+
+def test_sync_blockfiles_rewrites_heights_off_the_file_chain(
+    tmp_path: Path, regtest_files: Dict[str, object], make_config: Callable[..., IngestConfig]
+) -> None:
+    main: List[bytes] = regtest_files["main"]  # type: ignore[assignment]
+    stale: List[bytes] = regtest_files["stale"]  # type: ignore[assignment]
+    cfg = make_config(tmp_path / "data", network="regtest", blocks_dir=regtest_files["dir"])
+    index = ProcessedHeightIndex(cfg.data_root)
+    index.mark_done(3, block_hash(stale[0]))
+    index.mark_done(4, block_hash(stale[1]))
+
+    sync_blockfiles(0, 5, config=cfg)
+
+    index.refresh()
+    assert [index.hash_for(height) for height in range(6)] == [block_hash(raw) for raw in main]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.blockindex import BlockIndex  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.qa import _window_files  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    synthetic_block,
+    synthetic_chain,
+)
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+@pytest.mark.parametrize("writer_mode", ["per_height", "rolling"])
+def test_sync_records_one_row_per_height(
+    tmp_path: Path, writer_mode: str, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(15, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=5,
+            limits={"rpc_batch_size": 4},
+            writer_mode=writer_mode,
+        )
+        pipeline.sync_range(0, 14, config=cfg)
+
+    with BlockIndex(cfg.data_root) as index:
+        assert len(index) == 15
+        entry = index.entry(12)
+        assert entry is not None
+        assert entry.hash == chain[12]["hash"]
+        assert entry.time_utc == datetime.fromtimestamp(chain[12]["time"], tz=timezone.utc)
+        assert (entry.tx_count, entry.vin_count, entry.vout_count) == (3, 5, 6)
+        assert entry.locations["txout"] == "txout/height=10"
+        # Synthetic blocks carry no mediantime; it is derived from heights 2-12.
+        assert entry.median_time == datetime.fromtimestamp(chain[7]["time"], tz=timezone.utc)
+        median = index.entry(5).median_time  # type: ignore[union-attr]
+        assert median == datetime.fromtimestamp(chain[3]["time"], tz=timezone.utc)
+
+
+def test_window_resolves_to_covering_buckets(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(15, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, height_bucket_size=5, limits={"rpc_batch_size": 4}
+        )
+        pipeline.sync_range(0, 14, config=cfg)
+
+    start = datetime.fromtimestamp(chain[6]["time"], tz=timezone.utc)
+    with BlockIndex(cfg.data_root) as index:
+        assert index.height_range(start, start + timedelta(minutes=25)) == (6, 8)
+        assert index.directories("transactions", 6, 8) == [cfg.data_root / "tx" / "height=5"]
+        assert index.height_range(start - timedelta(days=30), start - timedelta(days=29)) is None
+
+    files = _window_files(cfg, start, start + timedelta(minutes=25))
+    assert files["txin"] and all("height=5" in path for path in files["txin"])
+    # Windows the index cannot resolve fall back to every file.
+    everything = _window_files(cfg, start - timedelta(days=30), start - timedelta(days=29))
+    buckets = {Path(path).parent.name for path in everything["blocks"]}
+    assert buckets == {"height=0", "height=5", "height=10"}
+
+
+def test_reorg_rollback_replaces_index_rows(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(8, tx_count=1)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, height_bucket_size=5, limits={"rpc_batch_size": 4}
+        )
+        pipeline.sync_range(0, 7, config=cfg)
+        fork = chain[:6] + [synthetic_block(6, str(chain[5]["hash"]), tx_count=1, variant="fork")]
+        fork.append(synthetic_block(7, str(fork[6]["hash"]), tx_count=1, variant="fork"))
+        fork.append(synthetic_block(8, str(fork[7]["hash"]), tx_count=1, variant="fork"))
+        node.schedule_chain(fork, after_requests=0)
+        pipeline.sync_range(8, 8, config=cfg)
+
+    with BlockIndex(cfg.data_root) as index:
+        assert [entry.hash for entry in index.entries(5, 8)] == [
+            chain[5]["hash"],
+            fork[6]["hash"],
+            fork[7]["hash"],
+            fork[8]["hash"],
+        ]
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.blockindex import BlockIndex  # type: ignore  # noqa: E402
+from ingest.budget import MemoryBudget, block_footprint  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, TelemetryConfig  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+def _plan(
+    height: int, budget: MemoryBudget, scheduled_through: int = -1, pending: range = range(0)
+):
+    return pipeline._plan_chunks(
+        height,
+        end_height=99,
+        depth=32,
+        batch_size=4,
+        scheduled_through=scheduled_through,
+        pending=dict.fromkeys(pending),
+        skip=None,
+        budget=budget,
+    )
+
+
+def test_budget_narrows_prefetch_window_to_what_fits() -> None:
+    budget = MemoryBudget(10_000)
+    chunks, horizon = _plan(0, budget)
+    # Nothing has landed yet, so only the chunk holding the wanted height is planned.
+    assert chunks == [[0, 1, 2, 3]] and horizon == 3
+
+    budget.landed({height: 1_000 for height in range(4)})
+    assert budget.held_bytes == 4_000
+    chunks, horizon = _plan(0, budget, scheduled_through=horizon, pending=range(4))
+    assert chunks == [[4, 5, 6, 7]] and horizon == 7
+
+    for height in range(4):
+        budget.consumed(height)
+    budget.landed({height: 1_000 for height in range(4, 8)})
+    chunks, horizon = _plan(4, budget, scheduled_through=horizon, pending=range(4, 8))
+    # 4 KB held plus 4 KB projected for 8-11; a third chunk would overshoot.
+    assert chunks == [[8, 9, 10, 11]] and horizon == 11
+
+
+def test_stale_landings_after_clear_are_ignored() -> None:
+    budget = MemoryBudget(10_000)
+    budget.scheduled([0, 1])
+    budget.clear()
+    budget.landed({0: 5_000, 1: 5_000})
+    assert budget.held_bytes == 0 and budget.peak_bytes == 0
+    assert block_footprint({"raw": b"\x00" * 80}) == 80
+    assert block_footprint({"size": 300, "tx": []}) == 3_000
+
+
+@pytest.mark.parametrize("prefetch_depth", [0, 8])
+def test_sync_under_tight_budget_completes_and_exports_peaks(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_config: Callable[..., IngestConfig],
+    prefetch_depth: int,
+) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+    chain = synthetic_chain(20, tx_count=3)
+    textfile = tmp_path / "metrics" / "ingest.prom"
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=10,
+            limits={
+                "rpc_batch_size": 2,
+                "prefetch_depth": prefetch_depth,
+                "memory_budget_bytes": 1,
+            },
+            telemetry=TelemetryConfig(metrics_textfile=textfile, progress_interval_seconds=3600.0),
+        )
+        pipeline.sync_range(0, 19, config=cfg)
+
+    with BlockIndex(cfg.data_root) as index:
+        assert [entry.hash for entry in index.entries(0, 19)] == [block["hash"] for block in chain]
+    text = textfile.read_text(encoding="utf-8")
+    assert "onchain_ingest_prefetch_held_peak_bytes" in text
+    assert 'onchain_ingest_stage_peak_rss_bytes{stage="parse"}' in text
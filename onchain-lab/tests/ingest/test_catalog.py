@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.backfill import backfill_parallel  # type: ignore  # noqa: E402
+from ingest.catalog import CATALOG_DIR, PartCatalog  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.qa import _partition_files  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    synthetic_block,
+    synthetic_chain,
+)
+
+
+def _on_disk(cfg: IngestConfig, dataset: str) -> list[str]:
+    directory = cfg.partitions[dataset].split("/")[0]
+    return sorted(str(path) for path in (cfg.data_root / directory).glob("*/*.parquet"))
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+@pytest.mark.parametrize("writer_mode", ["per_height", "rolling"])
+def test_writers_register_every_committed_file(
+    tmp_path: Path, writer_mode: str, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(12, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=5,
+            limits={"rpc_batch_size": 4},
+            writer_mode=writer_mode,
+        )
+        pipeline.sync_range(0, 11, config=cfg)
+
+    catalog = PartCatalog.open_existing(cfg)
+    assert catalog is not None
+    with catalog:
+        for dataset in ("blocks", "transactions", "txin", "txout"):
+            assert catalog.files(dataset) == _on_disk(cfg, dataset)
+        totals = catalog.totals()
+        assert totals["blocks"][1] == 12
+        assert totals["transactions"][1] == 36
+        # txin carries no height column; its parts are bounded by file name or bucket.
+        window = catalog.files("txin", 6, 7)
+        assert window and all("height=5" in path for path in window)
+        assert all(
+            entry.min_height is not None and entry.min_height <= 7 and entry.max_height >= 6  # type: ignore[operator]
+            for entry in catalog.parts("txin", 6, 7)
+        )
+        outputs = catalog.files("txout", 6, 7)
+        layouts = catalog.layouts("txout", outputs)
+        assert outputs and set(layouts) == set(outputs)
+        assert all("address_ids" in columns for _, columns in layouts.values())
+        assert catalog.verify() == []
+        # Same size, different footer: caught without rereading the data pages.
+        damaged = Path(outputs[0])
+        payload = bytearray(damaged.read_bytes())
+        payload[-9] ^= 0xFF
+        damaged.write_bytes(bytes(payload))
+        relative = damaged.relative_to(cfg.data_root).as_posix()
+        assert catalog.verify() == [f"{relative}: footer checksum mismatch"]
+
+
+def test_rollback_keeps_catalog_in_step_with_buckets(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(8, tx_count=1)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=5,
+            limits={"rpc_batch_size": 4},
+            writer_mode="rolling",
+        )
+        pipeline.sync_range(0, 7, config=cfg)
+        fork = chain[:6] + [synthetic_block(6, str(chain[5]["hash"]), tx_count=1, variant="fork")]
+        fork.append(synthetic_block(7, str(fork[6]["hash"]), tx_count=1, variant="fork"))
+        fork.append(synthetic_block(8, str(fork[7]["hash"]), tx_count=1, variant="fork"))
+        node.schedule_chain(fork, after_requests=0)
+        pipeline.sync_range(8, 8, config=cfg)
+
+    with PartCatalog.for_config(cfg) as catalog:
+        assert catalog.files("transactions") == _on_disk(cfg, "transactions")
+        assert catalog.verify() == []
+        # Nothing left for a rebuild to fix.
+        assert sum(catalog.rebuild(cfg).values()) == 0
+        assert catalog.totals()["blocks"][1] == 9
+
+
+def test_existing_data_root_is_globbed_until_rebuilt(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(6, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, height_bucket_size=5, limits={"rpc_batch_size": 4}
+        )
+        pipeline.sync_range(0, 3, config=cfg)
+        shutil.rmtree(cfg.data_root / CATALOG_DIR)
+        # A catalog created over already ingested heights only sees the new files.
+        pipeline.sync_range(4, 5, config=cfg)
+
+    assert PartCatalog.open_existing(cfg) is None
+    assert _partition_files(cfg, "blocks") == _on_disk(cfg, "blocks")
+
+    with PartCatalog.for_config(cfg) as catalog:
+        assert len(catalog.files("blocks")) == 2
+        changed = catalog.rebuild(cfg)
+        assert changed["blocks"] == 4
+        assert catalog.complete
+    assert _partition_files(cfg, "blocks") == _on_disk(cfg, "blocks")
+
+
+def test_backfill_workers_do_not_complete_a_catalog_over_older_files(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(12, tx_count=1)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(tmp_path / "data", node=node, height_bucket_size=4)
+        pipeline.sync_range(0, 7, config=cfg)
+        shutil.rmtree(cfg.data_root / CATALOG_DIR)
+        # Each worker sees only its own shard's heights, none of the older files.
+        backfill_parallel(
+            0, 11, workers=2, config=cfg, min_depth=0, merge_interval_seconds=0.1
+        )
+
+    assert PartCatalog.open_existing(cfg) is None
+    assert _partition_files(cfg, "blocks") == _on_disk(cfg, "blocks")
@@ -0,0 +1,50 @@
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import schemas  # type: ignore  # noqa: E402
+from ingest.columnar import BlockColumns, ColumnValidationError, DATASETS  # type: ignore  # noqa: E402
+from ingest.pipeline import _parse_block, _parse_block_columns  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import synthetic_block  # type: ignore  # noqa: E402
+
+
+def test_columnar_batches_match_model_tables() -> None:
+    block = _normalize_block(synthetic_block(7, "ab" * 32, tx_count=5))
+    columns = BlockColumns()
+    parsed = _parse_block_columns(7, block, columns)
+    block_record, txs, txins, txouts = _parse_block(7, block)
+
+    assert parsed.hash == block_record.hash
+    assert (parsed.tx_count, parsed.vin_count, parsed.vout_count) == (5, 9, 10)
+    expected = {"blocks": [block_record], "transactions": txs, "txin": txins, "txout": txouts}
+    for dataset in DATASETS:
+        schema = schemas.SCHEMA_REGISTRY[dataset]
+        table = schemas.record_batch_from_models(expected[dataset], schema)
+        assert columns[dataset].to_record_batch().equals(table.to_batches()[0])
+    assert columns.to_models() == (block_record, txs, txins, txouts)
+
+
+def test_columnar_validation_rejects_bad_rows() -> None:
+    block = _normalize_block(synthetic_block(1, None, tx_count=1))
+    columns = BlockColumns()
+    _parse_block_columns(1, block, columns)
+    columns.txout.columns["value_sats"][0] = -5
+    with pytest.raises(ColumnValidationError, match="value_sats"):
+        columns.txout.to_record_batch()
+    columns.txin.columns["txid"][0] = None
+    with pytest.raises(ColumnValidationError, match="txid"):
+        columns.txin.to_record_batch()
+
+
+def test_columnar_rejects_naive_block_time() -> None:
+    block = _normalize_block(synthetic_block(1, None, tx_count=1))
+    block["time"] = datetime(2020, 1, 1)
+    with pytest.raises(ColumnValidationError):
+        _parse_block_columns(1, block, BlockColumns())
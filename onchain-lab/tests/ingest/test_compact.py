@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+from typing import Callable, Dict, Iterable, List
+
+import duckdb
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.compact import compact_data_root  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.pipeline import ProcessedHeightIndex, _RangeIngestor, sync_range  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import synthetic_chain  # type: ignore  # noqa: E402
+
+
+class _ChainClient:
+    def __init__(self, blocks: List[Dict[str, object]]) -> None:
+        self._blocks = blocks
+
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return [str(self._blocks[height]["hash"]) for height in heights]
+
+    def get_blocks(
+        self, block_hashes: Iterable[str], verbosity: int = 2
+    ) -> List[Dict[str, object]]:
+        by_hash = {block["hash"]: block for block in self._blocks}
+        return [_normalize_block(dict(by_hash[item])) for item in block_hashes]
+
+    def close(self) -> None:
+        return None
+
+
+@pytest.fixture
+def ingested(tmp_path: Path, make_config: Callable[..., IngestConfig]) -> IngestConfig:
+    cfg = make_config(tmp_path, height_bucket_size=4)
+    sync_range(0, 9, config=cfg, client=_ChainClient(synthetic_chain(10, tx_count=3)))
+    return cfg
+
+
+def _rows(directory: Path) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    for path in sorted(directory.glob("*.parquet")):
+        rows.extend(pq.read_table(path, partitioning=None).to_pylist())
+    return rows
+
+
+def _sorted_by(rows: List[Dict[str, object]], key: str) -> List[Dict[str, object]]:
+    return sorted(rows, key=lambda row: (row[key], row.get("idx", 0)))
+
+
+def test_compact_merges_completed_buckets(ingested: IngestConfig) -> None:
+    root = ingested.data_root
+    before = {name: _rows(root / name / "height=4") for name in ("blocks", "tx", "txin", "txout")}
+
+    results = compact_data_root(ingested, workers=2, memory_mb=256, min_depth=2)
+
+    statuses = {(result.dataset, result.bucket): result.status for result in results}
+    assert statuses[("txin", 0)] == "compacted"
+    assert statuses[("txin", 4)] == "compacted"
+    assert statuses[("txin", 8)].startswith("skipped")
+    assert [path.name for path in (root / "txin" / "height=4").iterdir()] == [
+        "part-txin-c000000000004-0000.parquet"
+    ]
+    assert len(list((root / "txin" / "height=8").glob("*.parquet"))) == 2
+
+    txin = _rows(root / "txin" / "height=4")
+    assert [(row["txid"], row["idx"]) for row in txin] == sorted(
+        (row["txid"], row["idx"]) for row in before["txin"]
+    )
+    tx = _rows(root / "tx" / "height=4")
+    assert [row["txid"] for row in tx] == sorted(row["txid"] for row in before["tx"])
+    for name in ("blocks", "txout"):
+        key = "height" if name == "blocks" else "txid"
+        assert _sorted_by(_rows(root / name / "height=4"), key) == _sorted_by(before[name], key)
+
+    compacted_path = root / "tx" / "height=4" / "part-transactions-c000000000004-0000.parquet"
+    compacted = pq.ParquetFile(compacted_path)
+    column = compacted.metadata.row_group(0).column(0)
+    assert column.has_column_index and column.has_offset_index and column.is_stats_set
+    assert column.path_in_schema == "txid"
+    (bloom_length,) = duckdb.execute(
+        "SELECT bloom_filter_length FROM parquet_metadata(?) "
+        "WHERE row_group_id = 0 AND path_in_schema = 'txid'",
+        [str(compacted_path)],
+    ).fetchone()
+    assert bloom_length and bloom_length > 0
+    assert compacted.schema_arrow.metadata[b"schema_version"] == b"ingest.v1"
+    assert not (root / "_compact" / "staging" / "txin-4").exists()
+
+    again = compact_data_root(ingested, workers=1, memory_mb=256, min_depth=2)
+    statuses_again = {result.status for result in again if result.bucket == 4}
+    assert statuses_again == {"skipped: already compacted"}
+
+
+def test_compact_skips_buckets_being_written(ingested: IngestConfig) -> None:
+    busy = ingested.data_root / "txout" / "height=0" / ".part-txout-b0.abc.inprogress"
+    busy.write_bytes(b"")
+
+    results = compact_data_root(ingested, min_depth=0, datasets=["txout"])
+
+    statuses = {result.bucket: result.status for result in results}
+    assert statuses[0] == "skipped: writer files in progress"
+    assert statuses[4] == "compacted"
+
+
+def test_rollback_rewrites_compacted_buckets(ingested: IngestConfig) -> None:
+    root = ingested.data_root
+    compact_data_root(ingested, min_depth=2)
+    before = {name: _rows(root / name / "height=4") for name in ("blocks", "tx", "txin", "txout")}
+    kept_txids = {row["txid"] for row in before["tx"] if row["height"] < 6}
+
+    with ProcessedHeightIndex(root) as index:
+        _RangeIngestor(ingested, index).rollback(6)
+        assert index.max_height() == 5
+
+    after = {name: _rows(root / name / "height=4") for name in ("blocks", "tx", "txin", "txout")}
+    assert [row["height"] for row in after["blocks"]] == [4, 5]
+    assert {row["txid"] for row in after["tx"]} == kept_txids
+    for name in ("txin", "txout"):
+        assert after[name] == [row for row in before[name] if row["txid"] in kept_txids]
+    assert list((root / "txin" / "height=4").glob("part-txin-c*.parquet"))
+    assert not list((root / "blocks" / "height=8").glob("*.parquet"))
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.rpc import BitcoinRPCClient, RPCResponseError  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    load_corpus,
+    record_corpus,
+    synthetic_block,
+    synthetic_chain,
+)
+
+
+def test_injected_faults_fail_single_batch_elements() -> None:
+    chain = synthetic_chain(4, tx_count=1)
+    with FakeBitcoind(chain) as node:
+        node.inject_fault(-5, "Block not found", method="getblock")
+        with BitcoinRPCClient(node.host, node.port, "u", "p", max_attempts=1) as client:
+            with pytest.raises(RPCResponseError) as excinfo:
+                client.get_blocks([block["hash"] for block in chain[:2]])
+            assert excinfo.value.code == -5
+            # The fault was consumed by the first element; the node answers normally again.
+            fetched = client.get_blocks([chain[0]["hash"]])
+            assert [block["hash"] for block in fetched] == [chain[0]["hash"]]
+
+
+def test_warmup_requests_answer_minus_28_until_ready() -> None:
+    with FakeBitcoind(synthetic_chain(3, tx_count=1), warmup_requests=1) as node:
+        with BitcoinRPCClient(node.host, node.port, "u", "p") as client:
+            assert client.get_block_count() == 2
+        assert node.request_count == 2
+
+
+def test_scheduled_chain_switches_after_requests() -> None:
+    main = synthetic_chain(3, tx_count=1)
+    fork = main[:2] + [synthetic_block(2, str(main[1]["hash"]), tx_count=1, variant="fork")]
+    with FakeBitcoind(main) as node:
+        node.schedule_chain(fork, after_requests=2)
+        with BitcoinRPCClient(node.host, node.port, "u", "p") as client:
+            assert client.get_block_hash(2) == main[2]["hash"]
+            assert client.get_block_hash(2) == fork[2]["hash"]
+            # Stale blocks stay fetchable by hash, like on a real node.
+            assert client.get_block(str(main[2]["hash"]))["hash"] == main[2]["hash"]
+
+
+def test_record_corpus_round_trips_with_base_height(tmp_path: Path) -> None:
+    chain = synthetic_chain(6, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        with BitcoinRPCClient(node.host, node.port, "u", "p") as client:
+            assert record_corpus(client, 3, 5, tmp_path, raw=False, batch_size=2) == 3
+
+    corpus = load_corpus(tmp_path)
+    assert [block["hash"] for block in corpus] == [block["hash"] for block in chain[3:]]
+    assert corpus[0]["time"] == chain[3]["time"]
+    with FakeBitcoind(corpus, base_height=3) as node:
+        with BitcoinRPCClient(node.host, node.port, "u", "p") as client:
+            assert client.get_block_count() == 5
+            assert client.get_block_hashes([3, 5]) == [chain[3]["hash"], chain[5]["hash"]]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import FollowConfig, IngestConfig  # type: ignore  # noqa: E402
+from ingest.follow import TipFollower, follow_tip  # type: ignore  # noqa: E402
+from ingest.rpc import BitcoinRPCClient, RPCResponseError  # type: ignore  # noqa: E402
+from ingest.state import ProcessedHeightIndex  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    synthetic_block,
+    synthetic_chain,
+)
+
+
+def _branch(
+    base: List[Dict[str, object]], fork_height: int, length: int, variant: str
+) -> List[Dict[str, object]]:
+    blocks = list(base[: fork_height + 1])
+    while len(blocks) < length:
+        parent = str(blocks[-1]["hash"])
+        blocks.append(synthetic_block(len(blocks), parent, tx_count=2, variant=variant))
+    return blocks
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 10.0) -> float:
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+    return time.monotonic() - started
+
+
+def _stored_hashes(root: Path) -> List[str | None]:
+    with ProcessedHeightIndex(root) as index:
+        return [index.hash_for(height) for height in range(index.max_height() + 1)]
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "quiet", True)
+
+
+def test_follow_ingests_new_blocks_and_reorgs(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    main = synthetic_chain(6, tx_count=2)
+    with FakeBitcoind(main[:3]) as node:
+        cfg = make_config(
+            tmp_path,
+            node=node,
+            limits={"reorg_window": 4},
+            follow=FollowConfig(poll_timeout_seconds=0.5),
+        )
+        stop = threading.Event()
+        result: Dict[str, object] = {}
+        worker = threading.Thread(
+            target=lambda: result.update(follow_tip(config=cfg, stop=stop)), daemon=True
+        )
+        worker.start()
+        try:
+            _wait_for(lambda: len(_stored_hashes(tmp_path)) == 3)
+
+            node.set_chain(main[:4])
+            latency = _wait_for(lambda: len(_stored_hashes(tmp_path)) == 4)
+            assert latency < 1.0
+
+            alt = _branch(main, 1, 6, "alt")
+            node.set_chain(alt)
+            _wait_for(lambda: _stored_hashes(tmp_path) == [block["hash"] for block in alt])
+
+            # The node switches back to a branch with fewer blocks than ours.
+            node.set_chain(main[:5])
+            _wait_for(lambda: _stored_hashes(tmp_path) == [block["hash"] for block in main[:5]])
+        finally:
+            stop.set()
+            worker.join(timeout=10)
+
+    assert not worker.is_alive()
+    txids = {
+        row["txid"]
+        for path in (tmp_path / "tx").rglob("*.parquet")
+        for row in pq.read_table(path, columns=["txid"], partitioning=None).to_pylist()
+    }
+    expected = {tx["txid"] for block in main[:5] for tx in block["tx"]}  # type: ignore[index]
+    assert txids == expected
+    assert not list((tmp_path / "blocks").rglob("part-blocks-h000000000005.parquet"))
+
+
+def test_step_after_a_failed_chunk_refetches_the_whole_chunk(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(6, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(tmp_path, node=node, limits={"rpc_batch_size": 2})
+        client = BitcoinRPCClient(node.host, node.port, "user", "pass", max_attempts=1)
+        with client, ProcessedHeightIndex(tmp_path) as index:
+            follower = TipFollower(cfg, client, index)
+            try:
+                node.inject_fault(-5, "Block not found", method="getblock")
+                with pytest.raises(RPCResponseError):
+                    follower.step()
+                # The fault failed the chunk of heights 0-1; height 1 must not re-raise it.
+                assert follower.step() == len(chain)
+            finally:
+                follower.close()
+    assert _stored_hashes(tmp_path) == [block["hash"] for block in chain]
+
+
+def test_follow_survives_an_unreachable_node(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(3, tx_count=2)
+    with FakeBitcoind(chain) as probe:
+        host, port = probe.host, probe.port
+    # Nothing listens on the port until the node comes back below.
+    cfg = make_config(tmp_path, follow=FollowConfig(poll_timeout_seconds=0.1))
+    stop = threading.Event()
+    with BitcoinRPCClient(host, port, "user", "pass", max_attempts=1) as client:
+        worker = threading.Thread(
+            target=lambda: follow_tip(config=cfg, client=client, stop=stop), daemon=True
+        )
+        worker.start()
+        try:
+            time.sleep(0.5)
+            assert worker.is_alive()
+            with FakeBitcoind(chain, host=host, port=port):
+                _wait_for(lambda: len(_stored_hashes(tmp_path)) == 3)
+                stop.set()
+                worker.join(timeout=10)
+        finally:
+            stop.set()
+            worker.join(timeout=10)
+    assert not worker.is_alive()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+import sys
+from typing import Callable, Dict, Iterable, List
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.convert import convert_data_root  # type: ignore  # noqa: E402
+from ingest.hashes import (  # type: ignore  # noqa: E402
+    binary_to_hex,
+    create_hex_views,
+    file_version,
+    hex_to_binary,
+    read_dataset,
+    source_sql,
+)
+from ingest.pipeline import sync_range  # type: ignore  # noqa: E402
+from ingest.rpc import _normalize_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import synthetic_chain  # type: ignore  # noqa: E402
+
+
+class _ChainClient:
+    def __init__(self, blocks: List[Dict[str, object]]) -> None:
+        self._by_hash = {block["hash"]: block for block in blocks}
+        self._hashes = [str(block["hash"]) for block in blocks]
+
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return [self._hashes[height] for height in heights]
+
+    def get_blocks(
+        self, block_hashes: Iterable[str], verbosity: int = 2
+    ) -> List[Dict[str, object]]:
+        return [_normalize_block(dict(self._by_hash[item])) for item in block_hashes]
+
+    def close(self) -> None:
+        return None
+
+
+def _files(root: Path, dataset: str) -> List[Path]:
+    return sorted((root / dataset).rglob("*.parquet"))
+
+
+@pytest.fixture
+def mixed_root(tmp_path: Path, make_config: Callable[..., IngestConfig]) -> IngestConfig:
+    pipeline.console.quiet = True
+    chain = synthetic_chain(6, tx_count=3)
+    client = _ChainClient(chain)
+    sync_range(0, 2, config=make_config(tmp_path, schema_version="ingest.v1"), client=client)
+    cfg = make_config(tmp_path, schema_version="ingest.v2")
+    sync_range(3, 5, config=cfg, client=client)
+    return cfg
+
+
+def test_hex_codecs_round_trip_with_nulls() -> None:
+    values = [hashlib.sha256(bytes([index])).hexdigest() for index in range(5)] + [None]
+    chunked = pa.chunked_array([pa.array(values), pa.array(values[2:])])
+
+    packed = hex_to_binary(chunked)
+
+    assert packed.type == pa.binary(32)
+    assert packed.null_count == 2
+    assert packed.chunk(0)[1].as_py() == bytes.fromhex(values[1])
+    assert binary_to_hex(packed).to_pylist() == values + values[2:]
+    with pytest.raises(ValueError):
+        hex_to_binary(pa.array(["xyz"]))
+
+
+def test_v2_ingest_writes_binary_hashes(mixed_root: IngestConfig) -> None:
+    txin_files = _files(mixed_root.data_root, "txin")
+    assert [file_version(path) for path in txin_files] == ["ingest.v1"] * 3 + ["ingest.v2"] * 3
+    schema = pq.read_schema(txin_files[-1])
+    assert schema.field("txid").type == pa.binary(32)
+    assert schema.field("prev_txid").type == pa.binary(32)
+
+    v1 = read_dataset(txin_files, "txin", version="ingest.v1")
+    v2 = read_dataset(txin_files, "txin", version="ingest.v2")
+    assert v1.num_rows == v2.num_rows == 6 * (1 + 2 * 2)
+    assert binary_to_hex(v2.column("prev_txid")).to_pylist() == v1.column("prev_txid").to_pylist()
+
+
+def test_mixed_versions_join_in_duckdb(mixed_root: IngestConfig) -> None:
+    root = mixed_root.data_root
+    connection = duckdb.connect()
+    connection.execute(f"CREATE VIEW tx AS {source_sql(_files(root, 'tx'), 'transactions')}")
+    connection.execute(f"CREATE VIEW txin AS {source_sql(_files(root, 'txin'), 'txin')}")
+    create_hex_views(connection, {"tx": "transactions", "txin": "txin"})
+
+    spends = connection.execute(
+        "SELECT COUNT(*) FROM txin i JOIN tx t ON i.prev_txid = t.txid"
+    ).fetchone()[0]
+    heights = connection.execute("SELECT DISTINCT height FROM tx ORDER BY height").fetchall()
+    sample = connection.execute("SELECT txid FROM tx_hex WHERE height = 4 LIMIT 1").fetchone()[0]
+    connection.close()
+
+    assert spends == 6 * 2 * 2
+    assert [row[0] for row in heights] == list(range(6))
+    assert isinstance(sample, str) and len(sample) == 64
+
+
+def test_convert_data_root_rewrites_v1_files(mixed_root: IngestConfig) -> None:
+    root = mixed_root.data_root
+    before = read_dataset(_files(root, "txout"), "txout", version="ingest.v1")
+
+    results = {result.dataset: result for result in convert_data_root(mixed_root)}
+
+    assert results["txout"].files == 3 and results["txout"].skipped == 3
+    versions = {
+        file_version(path)
+        for dataset in ("blocks", "tx", "txin", "txout")
+        for path in _files(root, dataset)
+    }
+    assert versions == {"ingest.v2"}
+    after = read_dataset(_files(root, "txout"), "txout", version="ingest.v1")
+    assert after.to_pylist() == before.to_pylist()
+    assert all(result.files == 0 for result in convert_data_root(mixed_root))
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import duckdb
+import pytest
+from typer.testing import CliRunner
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import cli, pipeline, writer  # type: ignore  # noqa: E402
+from ingest.compact import compact_data_root  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.lookup import (  # type: ignore  # noqa: E402
+    PointLookupError,
+    lookup_outpoint,
+    lookup_tx,
+    parse_outpoint,
+)
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+def _ingest(
+    tmp_path: Path, make_config: Callable[..., IngestConfig], schema_version: str
+) -> Tuple[IngestConfig, List[Dict[str, object]]]:
+    # Two transactions per block: every outpoint is spent at most once.
+    chain = synthetic_chain(30, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=10,
+            writer_mode="rolling",
+            schema_version=schema_version,
+            limits={"rpc_batch_size": 4},
+        )
+        pipeline.sync_range(0, 29, config=cfg)
+    return cfg, chain
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+def _bloom_filters(path: Path) -> Dict[str, List[int]]:
+    """Bloom filter lengths per column and row group, as the file footer records them."""
+    rows = duckdb.execute(
+        "SELECT path_in_schema, COALESCE(bloom_filter_length, 0) FROM parquet_metadata(?) "
+        "ORDER BY row_group_id",
+        [str(path)],
+    ).fetchall()
+    lengths: Dict[str, List[int]] = {}
+    for name, length in rows:
+        lengths.setdefault(name, []).append(int(length))
+    return lengths
+
+
+@pytest.mark.parametrize("schema_version", ["ingest.v1", "ingest.v2"])
+def test_bloom_filters_are_written_for_text_txid_columns(
+    tmp_path: Path,
+    make_config: Callable[..., IngestConfig],
+    schema_version: str,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(writer, "_warned_binary_blooms", False)
+    cfg, _ = _ingest(tmp_path, make_config, schema_version)
+    files = sorted((cfg.data_root / "txin").rglob("*.parquet"))
+    assert files
+    for path in files:
+        lengths = _bloom_filters(path)
+        for name in ("txid", "prev_txid"):
+            if schema_version == "ingest.v1":
+                assert all(length > 0 for length in lengths[name])
+            else:
+                assert set(lengths[name]) == {0}
+        assert set(lengths["idx"]) == {0}
+    warned = [record for record in caplog.records if "Bloom filters" in record.getMessage()]
+    assert len(warned) == (1 if schema_version == "ingest.v2" else 0)
+
+
+@pytest.mark.parametrize("schema_version", ["ingest.v1", "ingest.v2"])
+def test_lookups_read_one_row_group_per_compacted_bucket(
+    tmp_path: Path, make_config: Callable[..., IngestConfig], schema_version: str
+) -> None:
+    cfg, chain = _ingest(tmp_path, make_config, schema_version)
+    compact_data_root(cfg, workers=1, memory_mb=256, min_depth=0, row_group_rows=4)
+
+    tx = chain[17]["tx"][1]
+    result = lookup_tx(cfg, str(tx["txid"]).upper())
+    assert result.transaction is not None and result.transaction["height"] == 17
+    assert [row["prev_txid"] for row in result.inputs] == [vin["txid"] for vin in tx["vin"]]
+    assert [row["value_sats"] for row in result.outputs] == [
+        round(vout["value"] * 100_000_000) for vout in tx["vout"]
+    ]
+    # Txid-sorted buckets leave at most one candidate row group each.
+    transactions = result.scans["transactions"]
+    assert transactions.row_groups >= 15 and transactions.row_groups_read <= 3
+    assert result.scans["txin"].files == 1 and result.scans["txin"].row_groups_read == 1
+
+    vin = chain[21]["tx"][1]["vin"][1]
+    spent = lookup_outpoint(cfg, vin["txid"], vin["vout"])
+    assert spent.output is not None and spent.spent_by is not None
+    assert spent.height == 20
+    assert (spent.spent_height, spent.spent_by["txid"]) == (21, chain[21]["tx"][1]["txid"])
+
+    last = chain[29]["tx"][-1]
+    unspent = lookup_outpoint(cfg, str(last["txid"]), 0)
+    assert unspent.height == 29 and unspent.output is not None and unspent.spent_by is None
+    assert lookup_tx(cfg, "0" * 64).transaction is None
+
+
+def test_lookup_commands_report_rows_and_pruning(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., IngestConfig]
+) -> None:
+    cfg, chain = _ingest(tmp_path, make_config, "ingest.v1")
+    monkeypatch.setattr(cli, "_config", lambda path: cfg)
+    runner = CliRunner()
+
+    txid = str(chain[5]["tx"][1]["txid"])
+    result = runner.invoke(cli.app, ["lookup", "tx", txid])
+    assert result.exit_code == 0, result.output
+    assert "Inputs" in result.output and "row groups" in result.output
+
+    missing = runner.invoke(cli.app, ["lookup", "outpoint", f"{'f' * 64}:0"])
+    assert missing.exit_code == 1
+    malformed = runner.invoke(cli.app, ["lookup", "outpoint", txid])
+    assert malformed.exit_code == 2
+    with pytest.raises(PointLookupError):
+        parse_outpoint(f"{txid}:x")
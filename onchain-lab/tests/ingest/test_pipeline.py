@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import sys
-from typing import Dict
+from typing import Callable, Dict, Iterable, List
 
 import pyarrow.parquet as pq
 import pytest
@@ -14,8 +15,9 @@ SRC_PATH = ROOT / "src"
 if str(SRC_PATH) not in sys.path:
     sys.path.append(str(SRC_PATH))
 
-from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
-from ingest.pipeline import ProcessedHeightIndex, sync_range  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.pipeline import ProcessedHeightIndex, sync_range, sync_range_async  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
 
 
 @dataclass
@@ -86,27 +88,31 @@ class FakeBitcoinRPCClient:
     def get_block(self, block_hash: str, verbosity: int = 2) -> Dict[str, object]:
         return self._hash_lookup[block_hash]
 
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return [self.get_block_hash(height) for height in heights]
+
+    def get_blocks(
+        self, block_hashes: Iterable[str], verbosity: int = 2
+    ) -> List[Dict[str, object]]:
+        return [self.get_block(block_hash, verbosity) for block_hash in block_hashes]
+
     def close(self) -> None:
         self.closed = True
 
 
 @pytest.fixture
-def ingest_config(tmp_path: Path) -> IngestConfig:
+def ingest_config(tmp_path: Path, make_config: Callable[..., IngestConfig]) -> IngestConfig:
     partitions = {
         "blocks": "blocks/height={height_bucket}",
         "transactions": "transactions/height={height_bucket}",
         "txin": "txin/height={height_bucket}",
         "txout": "txout/height={height_bucket}",
     }
-    return IngestConfig(
-        data_root=tmp_path,
+    return make_config(
+        tmp_path,
         partitions=partitions,
         height_bucket_size=1024,
-        compression="zstd",
-        zstd_level=3,
-        rpc=RPCConfig(host="localhost", port=8332, user_env="BTC_USER", pass_env="BTC_PASS", timeout_seconds=120.0),
-        limits=LimitsConfig(max_blocks_per_run=500, io_batch_size=16),
-        qa=QAConfig(golden_days=[], tolerance_pct=1.0),
+        limits={"max_blocks_per_run": 500},
     )
 
 
@@ -177,4 +183,277 @@ def test_sync_range_recovers_from_reorg(tmp_path: Path, ingest_config: IngestCon
 
     block_path_h2 = _dataset_file(ingest_config.data_root, "blocks", 2)
     table_h2 = pq.ParquetFile(block_path_h2).read()
-    assert table_h1.schema == table_h2.schema
\ No newline at end of file
+    assert table_h1.schema == table_h2.schema
+
+
+def _prefetch_config(config: IngestConfig, *, depth: int, workers: int = 3) -> IngestConfig:
+    limits = config.limits.model_copy(update={"prefetch_depth": depth, "fetch_workers": workers})
+    return config.model_copy(update={"limits": limits})
+
+
+def test_sync_range_prefetch_matches_sequential(
+    tmp_path: Path, ingest_config: IngestConfig
+) -> None:
+    chain = {0: _block(0, None, "a")}
+    for height in range(1, 12):
+        chain[height] = _block(height, f"block-a-{height - 1}", "a")
+
+    sequential_cfg = ingest_config.model_copy(update={"data_root": tmp_path / "sequential"})
+    prefetch_cfg = _prefetch_config(
+        ingest_config.model_copy(update={"data_root": tmp_path / "prefetch"}), depth=4
+    )
+
+    sequential_counts = sync_range(0, 11, config=sequential_cfg, client=FakeBitcoinRPCClient(chain))
+    prefetch_counts = sync_range(0, 11, config=prefetch_cfg, client=FakeBitcoinRPCClient(chain))
+
+    assert prefetch_counts == sequential_counts
+    index = ProcessedHeightIndex(prefetch_cfg.data_root)
+    assert index.max_height() == 11
+    assert [index.hash_for(height) for height in range(12)] == [chain[h].hash for h in range(12)]
+
+
+def test_sync_range_prefetch_recovers_from_reorg(
+    tmp_path: Path, ingest_config: IngestConfig
+) -> None:
+    cfg = _prefetch_config(ingest_config, depth=8)
+    original_chain = {
+        0: _block(0, None, "a"),
+        1: _block(1, "block-a-0", "a"),
+        2: _block(2, "block-a-1", "a"),
+    }
+    client = FakeBitcoinRPCClient(original_chain)
+    sync_range(0, 2, config=cfg, client=client)
+
+    reorg_chain = {0: original_chain[0], 1: _block(1, "block-a-0", "b")}
+    for height in range(2, 6):
+        reorg_chain[height] = _block(height, f"block-b-{height - 1}", "b")
+    client.update_chain(reorg_chain)
+
+    sync_range(3, 5, config=cfg, client=client)
+
+    index = ProcessedHeightIndex(cfg.data_root)
+    stored = [index.hash_for(height) for height in range(6)]
+    assert stored == [reorg_chain[h].hash for h in range(6)]
+
+
+def test_sync_range_batched_fetch_recovers_from_deep_reorg(
+    tmp_path: Path, ingest_config: IngestConfig
+) -> None:
+    limits = ingest_config.limits.model_copy(update={"rpc_batch_size": 4})
+    cfg = ingest_config.model_copy(update={"limits": limits})
+    original_chain = {0: _block(0, None, "a")}
+    for height in range(1, 10):
+        original_chain[height] = _block(height, f"block-a-{height - 1}", "a")
+    client = FakeBitcoinRPCClient(original_chain)
+    sync_range(0, 9, config=cfg, client=client)
+
+    reorg_chain = {height: original_chain[height] for height in range(3)}
+    reorg_chain[3] = _block(3, "block-a-2", "b")
+    for height in range(4, 12):
+        reorg_chain[height] = _block(height, f"block-b-{height - 1}", "b")
+    client.update_chain(reorg_chain)
+
+    sync_range(10, 11, config=cfg, client=client)
+
+    index = ProcessedHeightIndex(cfg.data_root)
+    stored = [index.hash_for(height) for height in range(12)]
+    assert stored == [reorg_chain[h].hash for h in range(12)]
+
+
+class FakeAsyncBitcoinRPCClient:
+    def __init__(self, inner: FakeBitcoinRPCClient) -> None:
+        self._inner = inner
+
+    async def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        await asyncio.sleep(0)
+        return self._inner.get_block_hashes(heights)
+
+    async def get_blocks(
+        self, block_hashes: Iterable[str], verbosity: int = 2
+    ) -> List[Dict[str, object]]:
+        await asyncio.sleep(0)
+        return self._inner.get_blocks(block_hashes, verbosity)
+
+
+def _layout(root: Path) -> List[str]:
+    return sorted(str(path.relative_to(root)) for path in root.rglob("*.parquet"))
+
+
+def test_sync_range_async_matches_sync_layout(tmp_path: Path, ingest_config: IngestConfig) -> None:
+    chain = {0: _block(0, None, "a")}
+    for height in range(1, 8):
+        chain[height] = _block(height, f"block-a-{height - 1}", "a")
+
+    sync_cfg = ingest_config.model_copy(update={"data_root": tmp_path / "sync"})
+    async_cfg = _prefetch_config(
+        ingest_config.model_copy(update={"data_root": tmp_path / "async"}), depth=3
+    )
+
+    sync_counts = sync_range(0, 7, config=sync_cfg, client=FakeBitcoinRPCClient(chain))
+    async_client = FakeAsyncBitcoinRPCClient(FakeBitcoinRPCClient(chain))
+    async_counts = asyncio.run(sync_range_async(0, 7, config=async_cfg, client=async_client))
+
+    assert async_counts == sync_counts
+    assert _layout(async_cfg.data_root) == _layout(sync_cfg.data_root)
+
+
+def test_sync_range_async_recovers_from_reorg(tmp_path: Path, ingest_config: IngestConfig) -> None:
+    original_chain = {
+        0: _block(0, None, "a"),
+        1: _block(1, "block-a-0", "a"),
+        2: _block(2, "block-a-1", "a"),
+    }
+    inner = FakeBitcoinRPCClient(original_chain)
+    client = FakeAsyncBitcoinRPCClient(inner)
+    asyncio.run(sync_range_async(0, 2, config=ingest_config, client=client))
+
+    reorg_chain = {
+        0: original_chain[0],
+        1: _block(1, "block-a-0", "b"),
+        2: _block(2, "block-b-1", "b"),
+        3: _block(3, "block-b-2", "b"),
+    }
+    inner.update_chain(reorg_chain)
+    asyncio.run(sync_range_async(3, 3, config=ingest_config, client=client))
+
+    index = ProcessedHeightIndex(ingest_config.data_root)
+    stored = [index.hash_for(height) for height in range(4)]
+    assert stored == [reorg_chain[h].hash for h in range(4)]
+
+
+def _rolling_config(config: IngestConfig, root: Path) -> IngestConfig:
+    limits = config.limits.model_copy(update={"io_batch_size": 2, "row_group_bytes": 1})
+    return config.model_copy(
+        update={
+            "data_root": root,
+            "writer_mode": "rolling",
+            "height_bucket_size": 4,
+            "limits": limits,
+        }
+    )
+
+
+def _dataset_rows(root: Path, dataset: str) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    for path in sorted((root / dataset).rglob("*.parquet")):
+        rows.extend(pq.read_table(path, partitioning=None).to_pylist())
+    return sorted(rows, key=lambda row: sorted((key, str(value)) for key, value in row.items()))
+
+
+def _linear_chain(length: int, variant: str = "a") -> Dict[int, FakeBlock]:
+    chain = {0: _block(0, None, variant)}
+    for height in range(1, length):
+        chain[height] = _block(height, f"block-{variant}-{height - 1}", variant)
+    return chain
+
+
+def test_rolling_writer_commits_one_file_per_bucket(
+    tmp_path: Path, ingest_config: IngestConfig
+) -> None:
+    chain = _linear_chain(10)
+    per_height_cfg = ingest_config.model_copy(update={"data_root": tmp_path / "per_height"})
+    rolling_cfg = _rolling_config(ingest_config, tmp_path / "rolling")
+
+    expected = sync_range(0, 9, config=per_height_cfg, client=FakeBitcoinRPCClient(chain))
+    counts = sync_range(0, 9, config=rolling_cfg, client=FakeBitcoinRPCClient(chain))
+
+    assert counts == expected
+    assert _layout(rolling_cfg.data_root / "txin") == [
+        "height=0/part-txin-h000000000000-000000000003.parquet",
+        "height=4/part-txin-h000000000004-000000000007.parquet",
+        "height=8/part-txin-h000000000008-000000000009.parquet",
+    ]
+    blocks_dir = rolling_cfg.data_root / "blocks" / "height=0"
+    first_blocks = blocks_dir / "part-blocks-h000000000000-000000000003.parquet"
+    assert pq.ParquetFile(first_blocks).num_row_groups == 2
+    for dataset in ("blocks", "transactions", "txin", "txout"):
+        rows = _dataset_rows(rolling_cfg.data_root, dataset)
+        assert rows == _dataset_rows(per_height_cfg.data_root, dataset)
+    index = ProcessedHeightIndex(rolling_cfg.data_root)
+    assert [index.hash_for(height) for height in range(10)] == [chain[h].hash for h in range(10)]
+    assert not list(rolling_cfg.data_root.rglob("*.inprogress"))
+
+
+def test_rolling_writer_rolls_back_committed_and_open_heights(
+    tmp_path: Path, ingest_config: IngestConfig
+) -> None:
+    cfg = _rolling_config(ingest_config, tmp_path / "rolling")
+    original_chain = _linear_chain(7)
+    client = FakeBitcoinRPCClient(original_chain)
+    sync_range(0, 6, config=cfg, client=client)
+
+    reorg_chain = {height: original_chain[height] for height in range(3)}
+    reorg_chain[3] = _block(3, "block-a-2", "b")
+    for height in range(4, 10):
+        reorg_chain[height] = _block(height, f"block-b-{height - 1}", "b")
+    client.update_chain(reorg_chain)
+    sync_range(7, 9, config=cfg, client=client)
+
+    reference_cfg = ingest_config.model_copy(update={"data_root": tmp_path / "reference"})
+    sync_range(0, 9, config=reference_cfg, client=FakeBitcoinRPCClient(reorg_chain))
+    for dataset in ("blocks", "transactions", "txin", "txout"):
+        rows = _dataset_rows(cfg.data_root, dataset)
+        assert rows == _dataset_rows(reference_cfg.data_root, dataset)
+    index = ProcessedHeightIndex(cfg.data_root)
+    stored = [index.hash_for(height) for height in range(10)]
+    assert stored == [reorg_chain[h].hash for h in range(10)]
+
+
+def test_rolling_writer_recovers_interrupted_commit(
+    tmp_path: Path, ingest_config: IngestConfig, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from ingest import writer  # type: ignore
+
+    cfg = _rolling_config(ingest_config, tmp_path / "rolling")
+    chain = _linear_chain(3)
+    real_replace = writer.os.replace
+    published: List[str] = []
+
+    def flaky_replace(src: object, dst: object) -> None:
+        if str(dst).endswith(".parquet") and not str(dst).endswith(".tmp"):
+            if published:
+                raise OSError("simulated crash during commit")
+            published.append(str(dst))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(writer.os, "replace", flaky_replace)
+    with pytest.raises(OSError):
+        sync_range(0, 2, config=cfg, client=FakeBitcoinRPCClient(chain))
+    monkeypatch.setattr(writer.os, "replace", real_replace)
+    assert ProcessedHeightIndex(cfg.data_root).max_height() == -1
+
+    sync_range(0, 2, config=cfg, client=FakeBitcoinRPCClient(chain))
+
+    index = ProcessedHeightIndex(cfg.data_root)
+    assert [index.hash_for(height) for height in range(3)] == [chain[h].hash for h in range(3)]
+    assert len(_dataset_rows(cfg.data_root, "blocks")) == 3
+    assert not list(cfg.data_root.rglob("*.inprogress"))
+
+
+def test_prevout_block_format_records_spent_outputs(
+    tmp_path: Path, ingest_config: IngestConfig, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    chain = synthetic_chain(3, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        rpc = ingest_config.rpc.model_copy(update={"host": node.host, "port": node.port})
+        cfg = ingest_config.model_copy(update={"rpc": rpc, "block_format": "prevout"})
+        sync_range(0, 2, config=cfg)
+
+    txin = pq.read_table(_dataset_file(tmp_path, "txin", 2), partitioning=None).to_pylist()
+    txout = {
+        (row["txid"], row["idx"]): row
+        for height in range(3)
+        for row in pq.read_table(
+            _dataset_file(tmp_path, "txout", height), partitioning=None
+        ).to_pylist()
+    }
+    spends = [row for row in txin if not row["coinbase"]]
+    assert spends and all(row["prev_height"] == 1 for row in spends)
+    for row in spends:
+        funding = txout[(row["prev_txid"], row["prev_vout"])]
+        assert row["prev_value_sats"] == funding["value_sats"]
+        assert row["prev_script_type"] == funding["script_type"]
+    coinbase = [row for row in txin if row["coinbase"]]
+    assert coinbase[0]["prev_value_sats"] is None and coinbase[0]["prev_height"] is None
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import duckdb
+import pyarrow.parquet as pq
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.compact import compact_data_root  # type: ignore  # noqa: E402
+from ingest.config import ConfigError, IngestConfig  # type: ignore  # noqa: E402
+from ingest.convert import convert_data_root  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+TXOUT_PROFILE = {
+    "dictionary": ["script_type", "addresses"],
+    "encodings": {"idx": "delta_binary_packed", "value_sats": "DELTA_BINARY_PACKED"},
+    "row_group_rows": 8,
+    "data_page_size": 4096,
+}
+# Small batches so the rolling writer flushes several row groups per bucket.
+LIMITS = {"io_batch_size": 4, "rpc_batch_size": 4}
+
+
+def _layout(directory: Path) -> Tuple[List[int], Dict[str, Tuple[str, ...]]]:
+    """Row-group sizes and per-column encodings of every file under ``directory``."""
+    sizes: List[int] = []
+    encodings: Dict[str, Tuple[str, ...]] = {}
+    for path in sorted(directory.rglob("*.parquet")):
+        metadata = pq.read_metadata(path)
+        for index in range(metadata.num_row_groups):
+            group = metadata.row_group(index)
+            sizes.append(group.num_rows)
+            for column in range(group.num_columns):
+                chunk = group.column(column)
+                encodings[chunk.path_in_schema] = chunk.encodings
+    return sizes, encodings
+
+
+def _txouts(cfg: IngestConfig) -> List[Tuple[object, ...]]:
+    pattern = str(cfg.data_root / "txout" / "**" / "*.parquet")
+    return duckdb.sql(
+        # Only the temporary directory path is interpolated.
+        "SELECT txid, idx, value_sats, script_type, addresses "  # noqa: S608
+        f"FROM read_parquet('{pattern}') ORDER BY txid, idx"
+    ).fetchall()
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+@pytest.mark.parametrize("writer_mode", ["per_height", "rolling"])
+def test_ingest_writes_each_dataset_with_its_profile(
+    tmp_path: Path, writer_mode: str, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(12, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        plain = make_config(
+            tmp_path / "plain",
+            node=node,
+            height_bucket_size=10,
+            limits=LIMITS,
+            writer_mode=writer_mode,
+        )
+        tuned = make_config(
+            tmp_path / "tuned",
+            node=node,
+            height_bucket_size=10,
+            limits=LIMITS,
+            writer_mode=writer_mode,
+            writer_profiles={"txout": TXOUT_PROFILE},
+        )
+        pipeline.sync_range(0, 11, config=plain)
+        pipeline.sync_range(0, 11, config=tuned)
+
+    sizes, encodings = _layout(tuned.data_root / "txout")
+    assert "DELTA_BINARY_PACKED" in encodings["idx"]
+    assert "DELTA_BINARY_PACKED" in encodings["value_sats"]
+    assert "RLE_DICTIONARY" in encodings["script_type"]
+    assert "RLE_DICTIONARY" in encodings["addresses.list.element"]
+    assert "RLE_DICTIONARY" not in encodings["txid"]
+    assert "RLE_DICTIONARY" not in encodings["is_spent"]
+    if writer_mode == "rolling":
+        assert max(sizes) <= TXOUT_PROFILE["row_group_rows"] + plain.limits.io_batch_size * 2
+    # Datasets without a profile keep dictionary encoding everywhere.
+    assert "RLE_DICTIONARY" in _layout(tuned.data_root / "tx")[1]["txid"]
+    assert _txouts(tuned) == _txouts(plain)
+
+
+def test_compaction_and_conversion_follow_the_profile(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(12, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path,
+            node=node,
+            height_bucket_size=10,
+            limits=LIMITS,
+            writer_profiles={"txout": TXOUT_PROFILE},
+        )
+        pipeline.sync_range(0, 11, config=cfg)
+    expected = _txouts(cfg)
+
+    compact_data_root(cfg, workers=1, memory_mb=256, min_depth=0, datasets=["txout"])
+    sizes, encodings = _layout(cfg.data_root / "txout" / "height=0")
+    assert max(sizes) == TXOUT_PROFILE["row_group_rows"]
+    assert "DELTA_BINARY_PACKED" in encodings["idx"]
+    assert _txouts(cfg) == expected
+
+    converted = cfg.model_copy(update={"writer_profiles": {}})
+    convert_data_root(converted, datasets=["txout"])
+    _, encodings = _layout(cfg.data_root / "txout")
+    # Without a profile, conversion still dictionary-encodes list leaves but not hashes.
+    assert "RLE_DICTIONARY" in encodings["addresses.list.element"]
+    assert "RLE_DICTIONARY" not in encodings["txid"]
+
+
+@pytest.mark.parametrize(
+    "profiles",
+    [
+        {"outputs": {"row_group_rows": 8}},
+        {"txout": {"dictionary": ["script"]}},
+        {"txout": {"encodings": {"idx": "GORILLA"}}},
+        {"txout": {"encodings": {"script_type": "DELTA_BINARY_PACKED"}}},
+        # DuckDB cannot read BYTE_STREAM_SPLIT integers.
+        {"txout": {"encodings": {"value_sats": "BYTE_STREAM_SPLIT"}}},
+        {"txout": {"dictionary": ["idx"], "encodings": {"idx": "DELTA_BINARY_PACKED"}}},
+    ],
+)
+def test_invalid_writer_profiles_are_rejected(
+    tmp_path: Path, profiles: Dict[str, object], make_config: Callable[..., IngestConfig]
+) -> None:
+    with pytest.raises(ConfigError):
+        make_config(tmp_path, writer_profiles=profiles)
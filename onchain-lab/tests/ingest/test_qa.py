@@ -4,7 +4,9 @@ import json
 from datetime import date, datetime, timezone
 from pathlib import Path
 import sys
+from typing import Callable
 
+import pyarrow as pa
 import pyarrow.parquet as pq
 import pytest
 
@@ -12,8 +14,15 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT / "src") not in sys.path:
     sys.path.append(str(ROOT / "src"))
 
-from ingest.config import IngestConfig, LimitsConfig, QAConfig, RPCConfig  # type: ignore  # noqa: E402
-from ingest.qa import QAError, run_golden_day_checks  # type: ignore  # noqa: E402
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, QAConfig  # type: ignore  # noqa: E402
+from ingest.qa import (  # type: ignore  # noqa: E402
+    QAError,
+    daily_stats_path,
+    load_daily_stats,
+    run_batch_checks,
+    run_golden_day_checks,
+)
 from ingest.schemas import (  # type: ignore  # noqa: E402
     Block,
     Transaction,
@@ -25,12 +34,13 @@ from ingest.schemas import (  # type: ignore  # noqa: E402
     txin_schema,
     txout_schema,
 )
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
 
 
 @pytest.fixture()
-def sample_config(tmp_path: Path) -> IngestConfig:
-    return IngestConfig(
-        data_root=tmp_path,
+def sample_config(tmp_path: Path, make_config: Callable[..., IngestConfig]) -> IngestConfig:
+    return make_config(
+        tmp_path,
         partitions={
             "blocks": "blocks/height={height_bucket}/",
             "transactions": "tx/height={height_bucket}/",
@@ -38,10 +48,8 @@ def sample_config(tmp_path: Path) -> IngestConfig:
             "txout": "txout/height={height_bucket}/",
         },
         height_bucket_size=10000,
-        compression="zstd",
         zstd_level=6,
-        rpc=RPCConfig(host="localhost", port=8332, user_env="USER", pass_env="PASS"),
-        limits=LimitsConfig(max_blocks_per_run=1000, io_batch_size=50),
+        limits={"max_blocks_per_run": 1000, "io_batch_size": 50},
         qa=QAConfig(golden_days=[date(2020, 5, 11)], tolerance_pct=0.1),
     )
 
@@ -150,9 +158,11 @@ def test_golden_day_out_of_tolerance(
         )
 
 
-def test_golden_day_uses_partition_templates(tmp_path: Path, golden_ref_path: Path) -> None:
-    config = IngestConfig(
-        data_root=tmp_path,
+def test_golden_day_uses_partition_templates(
+    tmp_path: Path, golden_ref_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    config = make_config(
+        tmp_path,
         partitions={
             "blocks": "custom/blocks/height={height_bucket}/part-*.parquet",
             "transactions": "custom/tx/height={height_bucket}/part-*.parquet",
@@ -160,10 +170,8 @@ def test_golden_day_uses_partition_templates(tmp_path: Path, golden_ref_path: Pa
             "txout": "custom/txout/height={height_bucket}/part-*.parquet",
         },
         height_bucket_size=10000,
-        compression="zstd",
         zstd_level=6,
-        rpc=RPCConfig(host="localhost", port=8332, user_env="USER", pass_env="PASS"),
-        limits=LimitsConfig(max_blocks_per_run=1000, io_batch_size=50),
+        limits={"max_blocks_per_run": 1000, "io_batch_size": 50},
         qa=QAConfig(golden_days=[date(2020, 5, 11)], tolerance_pct=0.1),
     )
 
@@ -217,3 +225,83 @@ def test_golden_day_uses_partition_templates(tmp_path: Path, golden_ref_path: Pa
         "transactions": 3,
         "coinbase_sats": 1250000000,
     }
+
+
+def test_batch_checks_match_single_day_and_store_stats(
+    sample_config: IngestConfig, sample_lake: Path, golden_ref_path: Path
+) -> None:
+    result = run_batch_checks(config=sample_config, references_path=golden_ref_path, all_days=True)
+
+    assert result.failures == {}
+    assert result.stats[date(2020, 5, 11)].metrics() == {
+        "blocks": 2,
+        "transactions": 3,
+        "coinbase_sats": 1250000000,
+    }
+    assert load_daily_stats(daily_stats_path(sample_config)) == result.stats
+
+
+def test_batch_checks_skip_blocks_without_timestamp(
+    sample_config: IngestConfig, sample_lake: Path, golden_ref_path: Path
+) -> None:
+    untimed = {
+        "height": 630002,
+        "hash": "hash2",
+        "time_utc": None,
+        "version": 1,
+        "merkleroot": "root2",
+        "nonce": 2,
+        "bits": "1d00ffff",
+        "size": 800,
+        "weight": 3200,
+        "tx_count": 0,
+    }
+    pq.write_table(
+        pa.Table.from_pylist([untimed], schema=block_schema()),
+        sample_lake / "blocks" / "height=0" / "part-untimed.parquet",
+    )
+
+    result = run_batch_checks(config=sample_config, references_path=golden_ref_path, all_days=True)
+
+    assert result.failures == {}
+    assert list(result.stats) == [date(2020, 5, 11)]
+    assert result.stats[date(2020, 5, 11)].metrics()["blocks"] == 2
+
+
+def test_batch_checks_reuse_unchanged_days(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., IngestConfig]
+) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+    # Six-hour blocks spread the chain over three days.
+    chain = synthetic_chain(12, tx_count=2)
+    genesis_day = int(datetime(2009, 1, 3, tzinfo=timezone.utc).timestamp())
+    for height, block in enumerate(chain):
+        block["time"] = genesis_day + height * 6 * 3600
+    with FakeBitcoind(chain) as node:
+        config = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=4,
+            qa=QAConfig(golden_days=[date(2009, 1, 4)], tolerance_pct=0.1),
+        )
+        pipeline.sync_range(0, 7, config=config)
+        refs = tmp_path / "refs.json"
+        refs.write_text(
+            json.dumps(
+                {"2009-01-04": {"blocks": 4, "transactions": 8, "coinbase_sats": 400120000}}
+            ),
+            encoding="utf-8",
+        )
+
+        first = run_batch_checks(config=config, references_path=refs, all_days=True)
+        assert first.failures == {}
+        assert first.scanned == [date(2009, 1, 3), date(2009, 1, 4)]
+
+        pipeline.sync_range(8, 11, config=config)
+        second = run_batch_checks(config=config, references_path=refs, all_days=True)
+
+    assert second.scanned == [date(2009, 1, 5)]
+    assert sorted(second.stats) == [date(2009, 1, 3), date(2009, 1, 4), date(2009, 1, 5)]
+    assert second.stats[date(2009, 1, 5)].first_height == 8
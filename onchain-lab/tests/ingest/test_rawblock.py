@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+from typing import Callable, Dict, Iterable, List
+
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.pipeline import _parse_block, sync_range  # type: ignore  # noqa: E402
+from ingest.rawblock import block_hash, classify_script, decode_block  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import serialize_block, serialize_tx  # type: ignore  # noqa: E402
+
+GENESIS_COINBASE_SCRIPT = bytes.fromhex(
+    "04ffff001d0104455468652054696d65732030332f4a616e2f32303039204368616e63656c6c6f72"
+    "206f6e206272696e6b206f66207365636f6e64206261696c6f757420666f722062616e6b73"
+)
+GENESIS_PUBKEY_SCRIPT = bytes.fromhex(
+    "4104678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f"
+    "35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac"
+)
+P2PKH = bytes.fromhex("76a91462e907b15cbf27d5425399ebf6f0fb50ebb88f1888ac")
+P2WPKH = bytes.fromhex("0014751e76e8199196d454941c45d1b3a323f1433bd6")
+P2WSH = bytes.fromhex("00201863143c14c5166804bd19203356da136c985678cd4d27a1b8c6329604903262")
+NULLDATA = bytes.fromhex("6a0b68656c6c6f20776f726c64")
+
+
+def _genesis() -> bytes:
+    coinbase = serialize_tx(
+        version=1,
+        inputs=[(None, 0xFFFFFFFF, GENESIS_COINBASE_SCRIPT, 0xFFFFFFFF)],
+        outputs=[(50 * 100_000_000, GENESIS_PUBKEY_SCRIPT)],
+    )
+    return serialize_block(
+        [coinbase],
+        prev_hash=None,
+        time_epoch=1231006505,
+        version=1,
+        bits=0x1D00FFFF,
+        nonce=2083236893,
+    )
+
+
+def test_decode_genesis_matches_verbose_json() -> None:
+    raw = _genesis()
+    assert block_hash(raw) == "000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f"
+    genesis_time = datetime(2009, 1, 3, 18, 15, 5, tzinfo=timezone.utc)
+    txid = "4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b"
+    verbose = {
+        "hash": "000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f",
+        "time": genesis_time,
+        "version": 1,
+        "merkleroot": txid,
+        "nonce": 2083236893,
+        "bits": "1d00ffff",
+        "size": 285,
+        "weight": 1140,
+        "tx": [
+            {
+                "txid": txid,
+                "size": 204,
+                "weight": 816,
+                "version": 1,
+                "locktime": 0,
+                "vin": [{"coinbase": GENESIS_COINBASE_SCRIPT.hex(), "sequence": 4294967295}],
+                "vout": [{"value": 50.0, "scriptPubKey": {"type": "pubkey"}}],
+            }
+        ],
+    }
+    assert decode_block(0, raw) == _parse_block(0, verbose)
+
+
+def test_decode_segwit_block_matches_verbose_json() -> None:
+    coinbase = serialize_tx(
+        inputs=[(None, 0xFFFFFFFF, b"\x03\x01\x00\x00", 0xFFFFFFFF)],
+        outputs=[(625_000_000, P2WPKH), (0, NULLDATA)],
+        witnesses=[[bytes(32)]],
+    )
+    spend = serialize_tx(
+        inputs=[("11" * 32, 1, b"", 0xFFFFFFFD), ("22" * 32, 0, b"", 0xFFFFFFFE)],
+        outputs=[(1_500, P2PKH), (2_500, P2WSH)],
+        locktime=840_000,
+        witnesses=[[b"\x30" * 71, b"\x02" * 33], []],
+    )
+    block_time = 1713571767
+    raw = serialize_block([coinbase, spend], prev_hash="ab" * 32, time_epoch=block_time, nonce=7)
+
+    def weight(tx) -> int:  # type: ignore[no-untyped-def]
+        return len(tx.base) * 3 + len(tx.raw)
+
+    verbose: Dict[str, object] = {
+        "hash": block_hash(raw),
+        "previousblockhash": "ab" * 32,
+        "time": datetime.fromtimestamp(block_time, tz=timezone.utc),
+        "version": 0x20000000,
+        "merkleroot": raw[36:68][::-1].hex(),
+        "nonce": 7,
+        "bits": "207fffff",
+        "size": len(raw),
+        "weight": (81 + len(coinbase.base) + len(spend.base)) * 3 + len(raw),
+        "tx": [
+            {
+                "txid": coinbase.txid,
+                "size": len(coinbase.raw),
+                "weight": weight(coinbase),
+                "version": 2,
+                "locktime": 0,
+                "vin": [{"coinbase": "03010000", "sequence": 4294967295}],
+                "vout": [
+                    {
+                        "value": 6.25,
+                        "scriptPubKey": {
+                            "type": "witness_v0_keyhash",
+                            "address": "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4",
+                        },
+                    },
+                    {"value": 0.0, "scriptPubKey": {"type": "nulldata"}},
+                ],
+            },
+            {
+                "txid": spend.txid,
+                "size": len(spend.raw),
+                "weight": weight(spend),
+                "version": 2,
+                "locktime": 840_000,
+                "vin": [
+                    {"txid": "11" * 32, "vout": 1, "sequence": 0xFFFFFFFD},
+                    {"txid": "22" * 32, "vout": 0, "sequence": 0xFFFFFFFE},
+                ],
+                "vout": [
+                    {
+                        "value": 0.000015,
+                        "scriptPubKey": {
+                            "type": "pubkeyhash",
+                            "address": "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa",
+                        },
+                    },
+                    {
+                        "value": 0.000025,
+                        "scriptPubKey": {
+                            "type": "witness_v0_scripthash",
+                            "address": (
+                                "bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3"
+                            ),
+                        },
+                    },
+                ],
+            },
+        ],
+    }
+    assert decode_block(840_000, raw) == _parse_block(840_000, verbose)
+
+
+def test_classify_script_witness_versions() -> None:
+    taproot_like = bytes.fromhex("5128" + "751e76e8199196d454941c45d1b3a323f1433bd6" * 2)
+    assert classify_script(taproot_like) == (
+        "witness_unknown",
+        ["bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y"],
+    )
+    assert classify_script(P2WPKH, "regtest")[1][0].startswith("bcrt1q")
+    assert classify_script(bytes.fromhex("51024e73")) == ("anchor", ["bc1pfeessrawgf"])
+
+
+class _RawClient:
+    def __init__(self, blocks: List[bytes]) -> None:
+        self._by_hash = {block_hash(raw): raw for raw in blocks}
+        self._hashes = [block_hash(raw) for raw in blocks]
+
+    def get_block_hashes(self, heights: Iterable[int]) -> List[str]:
+        return [self._hashes[height] for height in heights]
+
+    def get_blocks(self, block_hashes: Iterable[str], verbosity: int = 2) -> List[object]:
+        assert verbosity == 0
+        return [self._by_hash[item].hex() for item in block_hashes]
+
+    def close(self) -> None:
+        return None
+
+
+def test_sync_range_raw_block_format(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    blocks: List[bytes] = []
+    prev = None
+    for height in range(3):
+        coinbase = serialize_tx(
+            inputs=[(None, 0xFFFFFFFF, bytes([1, height]), 0xFFFFFFFF)],
+            outputs=[(5_000_000_000, P2WPKH)],
+        )
+        raw = serialize_block([coinbase], prev_hash=prev, time_epoch=1296688602 + height)
+        blocks.append(raw)
+        prev = block_hash(raw)
+
+    config = make_config(
+        tmp_path,
+        limits={"max_blocks_per_run": 10, "rpc_batch_size": 2},
+        block_format="raw",
+        network="regtest",
+    )
+    counts = sync_range(0, 2, config=config, client=_RawClient(blocks))
+    assert counts == {"blocks": 3, "transactions": 3, "txin": 3, "txout": 3}
+
+    txout = pq.read_table(tmp_path / "txout" / "height=0").to_pydict()
+    assert set(txout["script_type"]) == {"witness_v0_keyhash"}
+    assert all(addresses[0].startswith("bcrt1q") for addresses in txout["addresses"])
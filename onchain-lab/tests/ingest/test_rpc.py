@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+import sys
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.rpc import AsyncBitcoinRPCClient, BitcoinRPCClient, RPCResponseError  # type: ignore  # noqa: E402
+
+
+def _client_with_handler(handler: Any) -> BitcoinRPCClient:
+    client = BitcoinRPCClient("localhost", 8332, "user", "pass", max_attempts=3)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.fixture(autouse=True)
+def _no_retry_sleep(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("tenacity.nap.time.sleep", lambda _seconds: None)
+
+
+def test_get_block_hashes_returns_results_in_request_order() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        assert isinstance(payload, list)
+        replies = [
+            {"id": item["id"], "result": f"hash-{item['params'][0]}", "error": None}
+            for item in reversed(payload)
+        ]
+        return httpx.Response(200, json=replies)
+
+    with _client_with_handler(handler) as client:
+        assert client.get_block_hashes([5, 6, 7]) == ["hash-5", "hash-6", "hash-7"]
+
+
+def test_batch_retries_only_failed_elements() -> None:
+    sent: List[List[int]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        sent.append([item["params"][0] for item in payload])
+        replies: List[Dict[str, Any]] = []
+        for item in payload:
+            height = item["params"][0]
+            if height == 2 and len(sent) == 1:
+                replies.append(
+                    {"id": item["id"], "result": None, "error": {"code": -28, "message": "Loading"}}
+                )
+            else:
+                replies.append({"id": item["id"], "result": f"hash-{height}", "error": None})
+        return httpx.Response(200, json=replies)
+
+    with _client_with_handler(handler) as client:
+        assert client.get_block_hashes([1, 2, 3]) == ["hash-1", "hash-2", "hash-3"]
+    assert sent == [[1, 2, 3], [2]]
+
+
+def test_batch_raises_non_retryable_element_error() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        replies = [
+            {"id": item["id"], "result": None, "error": {"code": -5, "message": "Block not found"}}
+            for item in payload
+        ]
+        return httpx.Response(200, json=replies)
+
+    with _client_with_handler(handler) as client:
+        with pytest.raises(RPCResponseError) as excinfo:
+            client.get_blocks(["deadbeef"])
+    assert excinfo.value.code == -5
+
+
+def test_async_client_batches_and_orders_results() -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        replies = [
+            {"id": item["id"], "result": f"hash-{item['params'][0]}", "error": None}
+            for item in reversed(payload)
+        ]
+        return httpx.Response(200, json=replies)
+
+    async def run() -> List[str]:
+        client = AsyncBitcoinRPCClient("localhost", 8332, "user", "pass", max_in_flight=2)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            return await client.get_block_hashes([3, 4, 5])
+
+    assert asyncio.run(run()) == ["hash-3", "hash-4", "hash-5"]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest.state import STATE_FILE, HeaderRing, ProcessedHeightIndex  # type: ignore  # noqa: E402
+
+
+def _hash(height: int) -> str:
+    return f"{height:064x}"
+
+
+def test_marks_persist_across_reopen(tmp_path: Path) -> None:
+    with ProcessedHeightIndex(tmp_path) as index:
+        for height in (0, 1, 2, 5):
+            index.mark_done(height, _hash(height))
+        index.mark_done(6, "block-main-6")
+
+    with ProcessedHeightIndex(tmp_path) as index:
+        assert index.max_height() == 6
+        assert list(index.heights()) == [0, 1, 2, 5, 6]
+        assert index.count() == 5
+        assert index.is_done(5) and not index.is_done(3) and not index.is_done(99)
+        assert index.hash_for(2) == _hash(2)
+        assert index.hash_for(6) == "block-main-6"
+        assert index.hash_for(4) is None
+    assert (tmp_path / "_markers" / STATE_FILE).exists()
+
+
+def test_clear_from_removes_only_the_tail(tmp_path: Path) -> None:
+    with ProcessedHeightIndex(tmp_path) as index:
+        for height in (0, 1, 2, 5, 6):
+            index.mark_done(height, _hash(height))
+        assert index.clear_from(4) == [5, 6]
+        assert index.max_height() == 2
+        assert index.clear_from(10) == []
+        index.mark_done(3, _hash(33))
+
+    with ProcessedHeightIndex(tmp_path) as index:
+        assert list(index.heights()) == [0, 1, 2, 3]
+        assert index.hash_for(3) == _hash(33)
+        assert index.hash_for(5) is None
+
+
+def test_commits_from_another_connection_show_after_refresh(tmp_path: Path) -> None:
+    with ProcessedHeightIndex(tmp_path) as reader, ProcessedHeightIndex(tmp_path) as writer:
+        writer.mark_many([(height, _hash(height)) for height in range(3)])
+        # Lookups stay in memory until the reader checks the file again.
+        assert reader.max_height() == -1 and not reader.is_done(1)
+        assert reader.refresh()
+        assert reader.max_height() == 2 and reader.hash_for(1) == _hash(1)
+        assert not reader.refresh()
+
+        writer.mark_done(3, _hash(3))
+        assert reader.clear_from(2) == [2, 3]
+        writer.refresh()
+        assert list(writer.heights()) == [0, 1]
+
+
+def test_migrates_legacy_marker_files(tmp_path: Path) -> None:
+    marker_dir = tmp_path / "_markers"
+    marker_dir.mkdir()
+    for height in range(4):
+        (marker_dir / f"{height}.done").write_text(_hash(height), encoding="utf-8")
+    (marker_dir / "state.json").write_text(json.dumps({"max_height": 3}), encoding="utf-8")
+    (marker_dir / "rolling-journal.json").write_text("{}", encoding="utf-8")
+
+    with ProcessedHeightIndex(tmp_path) as index:
+        assert index.max_height() == 3
+        assert [index.hash_for(height) for height in range(4)] == [_hash(h) for h in range(4)]
+
+    assert not list(marker_dir.glob("*.done"))
+    assert not (marker_dir / "state.json").exists()
+    assert (marker_dir / "rolling-journal.json").exists()
+    with ProcessedHeightIndex(tmp_path) as index:
+        assert index.count() == 4
+
+
+def test_header_ring_persists_a_linked_window(tmp_path: Path) -> None:
+    with ProcessedHeightIndex(tmp_path) as index:
+        # Heights ingested before the ring existed are seeded from the index.
+        index.mark_many([(height, _hash(height)) for height in range(3)])
+        ring = HeaderRing(index, capacity=4)
+        assert ring.newest_first() == [(2, _hash(2)), (1, _hash(1)), (0, _hash(0))]
+        for height in range(3, 7):
+            index.mark_done(height, _hash(height))
+            ring.append(height, _hash(height), _hash(height - 1))
+        ring.append(4, _hash(44), _hash(3))
+        assert [height for height, _ in ring.newest_first()] == [6, 5, 4, 3]
+        assert ring.newest_first(max_height=4) == [(4, _hash(4)), (3, _hash(3))]
+
+        index.clear_from(5)
+        ring.truncate(4)
+        # A crash between the state write and the header write leaves a stale row behind.
+        index.mark_done(5, _hash(55))
+
+    with ProcessedHeightIndex(tmp_path) as index:
+        ring = HeaderRing(index, capacity=4)
+        assert ring.tip is not None and ring.tip.prev_hash is None
+        assert ring.newest_first() == [(5, _hash(55)), (4, _hash(4)), (3, _hash(3)), (2, _hash(2))]
+        index.clear_from(2)
+        ring.truncate(1)
+        assert ring.newest_first() == [(1, _hash(1)), (0, _hash(0))]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from typer.testing import CliRunner
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import cli, pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig  # type: ignore  # noqa: E402
+from ingest.state import ProcessedHeightIndex  # type: ignore  # noqa: E402
+from ingest.status import HeightHole, ingest_status  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+def test_status_reports_contiguous_progress_and_runs(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(25, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=10,
+            limits={"rpc_batch_size": 4},
+            writer_mode="rolling",
+        )
+        pipeline.sync_range(0, 14, config=cfg)
+        pipeline.sync_range(15, 24, config=cfg)
+        # Nothing left to ingest: the run is not recorded.
+        pipeline.sync_range(0, 24, config=cfg)
+
+    status = ingest_status(cfg)
+    assert (status.processed, status.min_height, status.max_height) == (25, 0, 24)
+    assert status.max_contiguous == 24 and status.holes == []
+    assert status.catalog_complete and status.datasets["blocks"][1] == 25
+    expected = [(bucket.bucket, bucket.heights_expected) for bucket in status.buckets]
+    assert expected == [(0, 10), (10, 10), (20, 5)]
+    for bucket in status.buckets:
+        assert bucket.complete and bucket.block_rows == bucket.heights_done
+    assert [(run.blocks, run.last_height) for run in status.runs] == [(10, 24), (15, 14)]
+    assert status.blocks_per_second is not None and status.blocks_per_second > 0
+    assert len(ingest_status(cfg, runs=1).runs) == 1
+
+
+def test_status_finds_holes_and_buckets_out_of_step_with_the_catalog(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(16, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=10,
+            limits={"rpc_batch_size": 4},
+            writer_mode="per_height",
+        )
+        pipeline.sync_range(2, 4, config=cfg)
+        pipeline.sync_range(8, 15, config=cfg)
+    with ProcessedHeightIndex(cfg.data_root) as height_index:
+        # Files stay behind while their heights are forgotten.
+        height_index.clear_from(14)
+
+    status = ingest_status(cfg)
+    assert status.holes == [HeightHole(0, 1), HeightHole(5, 7)]
+    assert status.max_contiguous == -1 and status.max_height == 13
+    first, second = status.buckets
+    assert (first.heights_done, first.heights_expected, first.complete) == (5, 10, False)
+    assert (second.heights_done, second.heights_expected, second.block_rows) == (4, 4, 6)
+    assert not second.complete
+
+    payload = json.loads(status.to_json())
+    assert payload["heights"]["missing"] == 5 and payload["heights"]["holes"] == [[0, 1], [5, 7]]
+    assert [bucket["complete"] for bucket in payload["buckets"]] == [False, False]
+
+
+def test_status_command_emits_json(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., IngestConfig]
+) -> None:
+    runner = CliRunner()
+    chain = synthetic_chain(12, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            height_bucket_size=10,
+            limits={"rpc_batch_size": 4},
+            writer_mode="rolling",
+        )
+        monkeypatch.setattr(cli, "_config", lambda path: cfg)
+        empty = runner.invoke(cli.app, ["status", "--json"])
+        assert empty.exit_code == 0, empty.output
+        assert json.loads(empty.output)["heights"]["max"] == -1
+        pipeline.sync_range(0, 11, config=cfg)
+    result = runner.invoke(cli.app, ["status", "--json"])
+    assert result.exit_code == 0, result.output
+    payload = json.loads(result.output)
+    assert payload["heights"]["max_contiguous"] == 11
+    assert payload["datasets"]["txout"]["rows"] == 12 * 2 * 2
+    tables = runner.invoke(cli.app, ["status", "--buckets"])
+    assert tables.exit_code == 0, tables.output
+    assert "2 of 2 buckets complete" in tables.output
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import IngestConfig, TelemetryConfig  # type: ignore  # noqa: E402
+from ingest.telemetry import IngestStats, ProgressReporter  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import FakeBitcoind, synthetic_chain  # type: ignore  # noqa: E402
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _metric(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.split()[-1])
+    raise AssertionError(f"{name} missing from textfile")
+
+
+def test_reporter_is_rate_limited_and_writes_textfile(tmp_path: Path) -> None:
+    clock = _Clock()
+    stats = IngestStats(clock=clock)
+    stats.target = 100
+    lines: List[str] = []
+    textfile = tmp_path / "metrics" / "ingest.prom"
+    reporter = ProgressReporter(
+        stats, log=lines.append, interval=10.0, textfile=textfile, clock=clock
+    )
+
+    for height in range(20):
+        with stats.stage("parse"):
+            clock.now += 0.25
+        stats.count("blocks")
+        stats.height = height
+        reporter.update()
+    assert len(lines) == 0 and not textfile.exists()
+
+    for height in range(20, 40):
+        clock.now += 0.25
+        stats.count("blocks")
+        stats.height = height
+        reporter.update()
+    assert lines == [
+        "Progress: height 39, 4.0 blocks/s, "
+        "per block rpc=0.0ms parse=125.0ms write=0.0ms, ETA to 100 0:00:15"
+    ]
+
+    stats.count("arrow_bytes", 3000)
+    stats.count("parquet_bytes", 1000)
+    reporter.update(force=True)
+    assert len(lines) == 1  # nothing new since the last summary
+    text = textfile.read_text(encoding="utf-8")
+    assert _metric(text, 'onchain_ingest_stage_seconds_total{stage="parse"}') == pytest.approx(5.0)
+    assert _metric(text, "onchain_ingest_blocks_total") == 40
+    assert _metric(text, "onchain_ingest_compression_ratio") == pytest.approx(3.0)
+    assert _metric(text, "onchain_ingest_target_height") == 100
+
+
+def test_sync_range_exports_stage_metrics(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    make_config: Callable[..., IngestConfig],
+) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    logged: List[str] = []
+    monkeypatch.setattr(
+        pipeline.console, "log", lambda message, *args, **kwargs: logged.append(str(message))
+    )
+    textfile = tmp_path / "ingest.prom"
+    with FakeBitcoind(synthetic_chain(5, tx_count=3)) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            limits={"rpc_batch_size": 2},
+            telemetry=TelemetryConfig(metrics_textfile=textfile, progress_interval_seconds=3600.0),
+        )
+        pipeline.sync_range(0, 4, config=cfg)
+
+    assert not any(message.startswith("Processed height") for message in logged)
+    assert any(message.startswith("Progress: height 4,") for message in logged)
+    text = textfile.read_text(encoding="utf-8")
+    assert _metric(text, 'onchain_ingest_rows_total{dataset="blocks"}') == 5
+    assert _metric(text, 'onchain_ingest_rows_total{dataset="transactions"}') == 15
+    assert _metric(text, "onchain_ingest_rpc_bytes_received_total") > 0
+    assert _metric(text, 'onchain_ingest_stage_seconds_total{stage="rpc"}') > 0
+    assert _metric(text, "onchain_ingest_compression_ratio") > 0
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT / "src") not in sys.path:
+    sys.path.append(str(ROOT / "src"))
+
+from ingest import pipeline  # type: ignore  # noqa: E402
+from ingest.config import ConfigError, IngestConfig  # type: ignore  # noqa: E402
+from ingest.state import ProcessedHeightIndex  # type: ignore  # noqa: E402
+from ingest.testing.fakenode import (  # type: ignore  # noqa: E402
+    FakeBitcoind,
+    synthetic_block,
+    synthetic_chain,
+)
+from ingest.utxoset import UtxoSet, catch_up  # type: ignore  # noqa: E402
+from utxo.builder import LifecycleBuilder  # type: ignore  # noqa: E402
+from utxo.config import LifecycleConfig  # type: ignore  # noqa: E402
+from utxo.snapshots import SnapshotBuilder, SnapshotError  # type: ignore  # noqa: E402
+
+# Addresses must be interned for the UTXO set; callers pick writer_mode and utxo_set.
+_SETTINGS: Dict[str, object] = {
+    "height_bucket_size": 10,
+    "intern_addresses": True,
+    "limits": {"rpc_batch_size": 4},
+}
+
+
+def _expected(chain: List[Dict[str, object]]) -> Dict[Tuple[str, int], int]:
+    """Outputs left unspent by ``chain``, applying each block's creates before its spends."""
+    unspent: Dict[Tuple[str, int], int] = {}
+    for block in chain:
+        for tx in block["tx"]:  # type: ignore[union-attr]
+            for vout, output in enumerate(tx["vout"]):
+                unspent[(tx["txid"], vout)] = round(output["value"] * 100_000_000)
+        for tx in block["tx"]:  # type: ignore[union-attr]
+            for vin in tx["vin"]:
+                if "coinbase" not in vin:
+                    unspent.pop((vin["txid"], vin["vout"]), None)
+    return unspent
+
+
+def _assert_matches(utxos: UtxoSet, chain: List[Dict[str, object]]) -> None:
+    expected = _expected(chain)
+    status = utxos.status()
+    assert status.applied_height == len(chain) - 1
+    assert (status.outputs, status.value_sats) == (len(expected), sum(expected.values()))
+    for (txid, vout), value in list(expected.items())[:: max(len(expected) // 10, 1)]:
+        found = utxos.get(txid, vout)
+        assert found is not None and found.value_sats == value and found.address_id is not None
+
+
+@pytest.fixture(autouse=True)
+def _credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BTC_USER", "user")
+    monkeypatch.setenv("BTC_PASS", "pass")
+    monkeypatch.setattr(pipeline.console, "log", lambda *args, **kwargs: None)
+
+
+@pytest.mark.parametrize("writer_mode", ["per_height", "rolling"])
+def test_ingest_maintains_the_set_block_by_block(
+    tmp_path: Path, writer_mode: str, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(25, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, writer_mode=writer_mode, utxo_set=True, **_SETTINGS
+        )
+        pipeline.sync_range(0, 24, config=cfg)
+
+    with UtxoSet.for_config(cfg) as utxos:
+        _assert_matches(utxos, chain)
+        spent = chain[10]["tx"][1]["vin"][0]
+        assert utxos.get(spent["txid"], spent["vout"]) is None
+        coinbase = utxos.get(chain[24]["tx"][0]["txid"], 0)
+        assert coinbase is not None and coinbase.height == 24
+        assert coinbase.script_type == "witness_v0_keyhash"
+
+
+def test_reorg_restores_outputs_spent_on_the_stale_branch(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(8, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, writer_mode="rolling", utxo_set=True, **_SETTINGS
+        )
+        pipeline.sync_range(0, 7, config=cfg)
+        fork = chain[:6]
+        for height in range(6, 9):
+            fork.append(synthetic_block(height, str(fork[-1]["hash"]), tx_count=2, variant="fork"))
+        node.schedule_chain(fork, after_requests=0)
+        pipeline.sync_range(8, 8, config=cfg)
+
+    with UtxoSet.for_config(cfg) as utxos:
+        _assert_matches(utxos, fork)
+        assert utxos.get(str(chain[7]["tx"][0]["txid"]), 0) is None
+
+
+def test_rollback_below_the_undo_window_empties_the_set(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(12, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, writer_mode="per_height", utxo_set=True, **_SETTINGS
+        )
+        limits = cfg.limits.model_copy(update={"reorg_window": 3, "utxo_undo_depth": 4})
+        cfg = cfg.model_copy(update={"limits": limits})
+        pipeline.sync_range(0, 11, config=cfg)
+
+    with UtxoSet.for_config(cfg) as utxos:
+        assert utxos.status().undo_from == 8
+        assert utxos.rollback(9)
+        _assert_matches(utxos, chain[:9])
+        assert not utxos.rollback(5)
+        assert utxos.status() == (-1, 0, 0, 0)
+
+
+@pytest.mark.parametrize("schema_version", ["ingest.v1", "ingest.v2"])
+def test_catch_up_replays_ingested_heights(
+    tmp_path: Path, schema_version: str, make_config: Callable[..., IngestConfig]
+) -> None:
+    chain = synthetic_chain(25, tx_count=3)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data",
+            node=node,
+            writer_mode="rolling",
+            schema_version=schema_version,
+            **_SETTINGS,
+        )
+        pipeline.sync_range(0, 24, config=cfg)
+        cfg = cfg.model_copy(update={"utxo_set": True})
+
+    with ProcessedHeightIndex(cfg.data_root) as height_index:
+        with UtxoSet.for_config(cfg) as utxos:
+            assert utxos.applied_height == -1
+            assert catch_up(cfg, height_index, through=12, utxos=utxos)[0] == 13
+            _assert_matches(utxos, chain[:13])
+        assert catch_up(cfg, height_index) == (12, 0)
+    with UtxoSet.for_config(cfg) as utxos:
+        _assert_matches(utxos, chain)
+
+
+def test_utxo_set_requires_interned_addresses(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    with pytest.raises(ConfigError):
+        make_config(tmp_path, utxo_set=True)
+
+
+def _lifecycle_config(tmp_path: Path, cfg: IngestConfig) -> LifecycleConfig:
+    root = cfg.data_root
+    prices = tmp_path / "prices" / "prices.parquet"
+    prices.parent.mkdir(parents=True)
+    pd.DataFrame(
+        {
+            "symbol": ["BTCUSDT", "BTCUSDT"],
+            "freq": ["1d", "1d"],
+            "ts": [pd.Timestamp("2009-01-03T00:00:00Z"), pd.Timestamp("2009-01-04T00:00:00Z")],
+            "close": [1.0, 2.0],
+            "source": ["test", "test"],
+            "raw_file_hash": ["hash", "hash"],
+            "pipeline_version": ["prices.v1", "prices.v1"],
+        }
+    ).to_parquet(prices, index=False)
+    return LifecycleConfig.model_validate(
+        {
+            "data": {
+                "ingest": {
+                    "blocks": str(root / "blocks" / "**" / "*.parquet"),
+                    "transactions": str(root / "tx" / "**" / "*.parquet"),
+                    "txin": str(root / "txin" / "**" / "*.parquet"),
+                    "txout": str(root / "txout" / "**" / "*.parquet"),
+                    "addresses": str(root / "addresses" / "*.parquet"),
+                    "block_index": str(root / "_block_index" / "index.sqlite"),
+                    "utxo_set": str(root / "_utxo_set" / "utxo.sqlite"),
+                },
+                "price": {"parquet": str(prices), "symbol": "BTCUSDT", "freq": "1d"},
+                "lifecycle_root": str(tmp_path / "lifecycle"),
+            },
+            "snapshot": {"timezone": "UTC", "daily_close_hhmm": "00:00"},
+            "writer": {"compression": "zstd", "zstd_level": 3},
+            "qa": {
+                "price_coverage_min_pct": 99.0,
+                "supply_tolerance_sats": 1,
+                "lifespan_max_days": 3650,
+                "max_snapshot_gap_pct": 0.0,
+            },
+        }
+    )
+
+
+def test_live_snapshot_matches_the_lifecycle_snapshot(
+    tmp_path: Path, make_config: Callable[..., IngestConfig]
+) -> None:
+    # Blocks are ten minutes apart from 2009-01-03 18:15; height 35 is the first of 2009-01-04.
+    chain = synthetic_chain(40, tx_count=2)
+    with FakeBitcoind(chain) as node:
+        cfg = make_config(
+            tmp_path / "data", node=node, writer_mode="rolling", utxo_set=True, **_SETTINGS
+        )
+        pipeline.sync_range(0, 39, config=cfg)
+    lifecycle = _lifecycle_config(tmp_path, cfg)
+    day = date(2009, 1, 3)
+
+    live = SnapshotBuilder(lifecycle).build_live(persist=False)
+    assert list(live) == [day]
+    frames = LifecycleBuilder(lifecycle).build(persist=False).artifacts
+    full = SnapshotBuilder(lifecycle).build(
+        frames.created, frames.spent, start_date=day, end_date=day, persist=False
+    )
+    columns = ["group_key", "age_bucket", "output_count", "balance_sats", "cost_basis_usd"]
+    expected = full[day].to_pandas()[columns].sort_values(columns[:2]).reset_index(drop=True)
+    actual = live[day].to_pandas()[columns].sort_values(columns[:2]).reset_index(drop=True)
+    assert not actual.empty
+    pd.testing.assert_frame_equal(actual, expected)
+
+    with pytest.raises(SnapshotError):
+        SnapshotBuilder(lifecycle).build_live(start_date=date(2009, 1, 2), persist=False)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
 from src.utxo.builder import LifecycleBuilder
@@ -123,3 +125,94 @@ def test_streaming_builder_generates_frames(tmp_path, monkeypatch):
     assert created.iloc[0]["entity_id"] == "entity-1"
     assert not spent.empty
     assert spent["is_orphan"].eq(False).all()
+
+
+def _write_v2(df: pd.DataFrame, path: Path, hash_columns: tuple[str, ...]) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in hash_columns:
+        index = table.schema.get_field_index(name)
+        values = [bytes.fromhex(value) for value in df[name]]
+        table = table.set_column(
+            index, pa.field(name, pa.binary(32)), pa.array(values, pa.binary(32))
+        )
+    pq.write_table(table.replace_schema_metadata({b"schema_version": b"ingest.v2"}), path)
+
+
+def test_streaming_builder_joins_mixed_v1_and_v2_hashes(tmp_path, monkeypatch):
+    config = _sample_config(tmp_path)
+    monkeypatch.delenv("UTXO_LIFECYCLE_LEGACY", raising=False)
+    ingest = config.data.ingest
+    tx1, tx2 = "ab" * 32, "cd" * 32
+    tx_df = pd.read_parquet(ingest.transactions).assign(txid=[tx1, tx2])
+    _write_v2(tx_df, Path(ingest.transactions), ("txid",))
+    _write_v2(
+        pd.read_parquet(ingest.txin).assign(txid=[tx2], prev_txid=[tx1]),
+        Path(ingest.txin),
+        ("txid", "prev_txid"),
+    )
+    # txout stays ingest.v1 hex text.
+    _write_parquet(pd.read_parquet(ingest.txout).assign(txid=[tx1]), Path(ingest.txout))
+
+    result = LifecycleBuilder(config).build(persist=False)
+    created = result.frames.created
+    spent = result.frames.spent
+
+    assert created.iloc[0]["txid"] == tx1
+    assert created.iloc[0]["is_spent"] is True
+    assert created.iloc[0]["spend_txid_hint"] == tx2
+    assert spent.iloc[0]["source_txid"] == tx1
+    assert spent.iloc[0]["spend_txid"] == tx2
+    assert spent["is_orphan"].eq(False).all()
+
+
+def test_streaming_builder_attributes_entities_by_address_id(tmp_path, monkeypatch):
+    config = _sample_config(tmp_path)
+    monkeypatch.delenv("UTXO_LIFECYCLE_LEGACY", raising=False)
+    ingest = config.data.ingest
+    # The text column no longer matches the lookup; only the interned id does.
+    txout = pa.Table.from_pandas(
+        pd.read_parquet(ingest.txout).assign(addresses=[["unrelated"]]), preserve_index=False
+    )
+    txout = txout.append_column("address_ids", pa.array([[7]], pa.list_(pa.uint64())))
+    pq.write_table(txout, ingest.txout)
+    addresses_path = (
+        tmp_path / "ingest" / "addresses" / "part-addresses-000000000001-000000000007.parquet"
+    )
+    addresses_path.parent.mkdir(parents=True)
+    pq.write_table(
+        pa.table(
+            {
+                "address_id": pa.array([6, 7], pa.uint64()),
+                "address": ["elsewhere", "ADDR1"],
+                "first_seen_height": pa.array([90, 100], pa.int64()),
+            }
+        ),
+        addresses_path,
+    )
+    config.data.ingest.addresses = str(addresses_path.parent / "*.parquet")
+
+    created = LifecycleBuilder(config).build(persist=False).frames.created
+
+    assert created.iloc[0]["entity_id"] == "entity-1"
+    assert created.iloc[0]["entity_type"] == "exchange"
+    assert "address_ids" not in created.columns
+
+
+def test_streaming_builder_reads_spent_values_from_prevouts(tmp_path, monkeypatch):
+    config = _sample_config(tmp_path)
+    monkeypatch.delenv("UTXO_LIFECYCLE_LEGACY", raising=False)
+    ingest = config.data.ingest
+    # Deliberately differs from txout so the test shows which side the value came from.
+    txin = pd.read_parquet(ingest.txin).assign(
+        prev_value_sats=[123_000_000], prev_script_type=["pubkeyhash"], prev_height=[100]
+    )
+    _write_parquet(txin, Path(ingest.txin))
+
+    spent = LifecycleBuilder(config).build(persist=False).frames.spent
+
+    row = spent.iloc[0]
+    assert row["value_sats"] == 123_000_000
+    assert row["created_height"] == 100
+    assert row["creation_price_close"] == 45000.0
+    assert row["holding_days"] == 1.0
+    assert not row["is_orphan"]